@@ -14,10 +14,10 @@ def run_progressive_alerts():
     """Ejecutar alertas progresivas"""
     print("🚨 EJECUTANDO ALERTAS PROGRESIVAS...")
     
-    from edp_mvp.app import create_app
+    from edp_mvp.app import get_worker_app
     from edp_mvp.app.services.alert_service import EDPAlertService
     
-    app = create_app()
+    app = get_worker_app()
     
     with app.app_context():
         alert_service = EDPAlertService()
@@ -33,10 +33,10 @@ def send_test_alert(email):
     """Enviar alerta de prueba"""
     print(f"🧪 ENVIANDO ALERTA DE PRUEBA A: {email}")
     
-    from edp_mvp.app import create_app
+    from edp_mvp.app import get_worker_app
     from edp_mvp.app.services.alert_service import EDPAlertService
     
-    app = create_app()
+    app = get_worker_app()
     
     with app.app_context():
         alert_service = EDPAlertService()
@@ -50,10 +50,10 @@ def show_edps_status():
     """Mostrar estado de EDPs"""
     print("📊 ESTADO ACTUAL DE EDPs...")
     
-    from edp_mvp.app import create_app
+    from edp_mvp.app import get_worker_app
     from edp_mvp.app.services.alert_service import EDPAlertService
     
-    app = create_app()
+    app = get_worker_app()
     
     with app.app_context():
         alert_service = EDPAlertService()
@@ -83,10 +83,10 @@ def send_critical_summary():
     """Enviar resumen crítico"""
     print("📊 ENVIANDO RESUMEN CRÍTICO...")
     
-    from edp_mvp.app import create_app
+    from edp_mvp.app import get_worker_app
     from edp_mvp.app.services.alert_service import EDPAlertService
     
-    app = create_app()
+    app = get_worker_app()
     
     with app.app_context():
         alert_service = EDPAlertService()
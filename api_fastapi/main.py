@@ -1,6 +1,6 @@
 from fastapi import FastAPI, Depends, HTTPException, Query, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from contextlib import asynccontextmanager
 import asyncio
 import sys
@@ -16,7 +16,6 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 # Import Flask app and services
-from edp_mvp.app import create_app
 from edp_mvp.app.config import get_config
 from edp_mvp.app.utils.supabase_adapter import (
     read_sheet, 
@@ -31,6 +30,21 @@ from edp_mvp.app.utils.supabase_adapter import (
     append_project
 )
 from edp_mvp.app.repositories.edp_repository import EDPRepository
+from edp_mvp.app.services.cache_invalidation_service import CacheInvalidationService
+from edp_mvp.app.utils.instrumentation import CONTENT_TYPE_LATEST, generate_metrics, record_request
+from edp_mvp.app.utils.http_cache import (
+    HTTP_CACHE_ENABLED,
+    HTTP_COMPRESS_MIN_BYTES,
+    add_vary,
+    choose_encoding,
+    compress_body,
+    generation_validators,
+    is_not_modified,
+    payload_etag,
+    should_compress,
+    validator_headers,
+)
+from starlette.concurrency import run_in_threadpool
 
 from models import EDP, EDPFilters, EDPResponse, CajaData, CajaResponse
 from services import APIService, GoogleSheetsServiceAsync
@@ -86,6 +100,82 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Latencia por ruta para /metrics
+@app.middleware("http")
+async def metrics_middleware(request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    record_request("fastapi", getattr(route, "path", "unmatched"), request.method,
+                   response.status_code, time.perf_counter() - start)
+    return response
+
+# GET condicional y compresión (ver edp_mvp/app/utils/http_cache.py).
+# Rutas con datos de Supabase: ETag por generación de datos, 304 sin recalcular.
+GENERATION_ETAG_PATHS = (
+    "/api/v1/dashboard/data",
+    "/api/v1/edps",
+    "/api/v1/projects",
+    "/api/v1/costs",
+    "/api/v1/caja",
+)
+# Dashboard optimizado (estado de procesamiento en memoria): ETag por hash del cuerpo
+PAYLOAD_ETAG_PATHS = ("/api/v1/dashboard-opt",)
+
+
+@app.middleware("http")
+async def conditional_compression_middleware(request, call_next):
+    path = request.url.path
+    conditional = (
+        HTTP_CACHE_ENABLED
+        and request.method == "GET"
+        and request.query_params.get("force_refresh", "false").lower() != "true"
+    )
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+
+    validators = None
+    if conditional and path.startswith(GENERATION_ETAG_PATHS):
+        validators = await run_in_threadpool(generation_validators, f"{path}?{request.url.query}")
+        if is_not_modified(if_none_match, if_modified_since, *validators):
+            return Response(status_code=304, headers=validator_headers(*validators))
+
+    response = await call_next(request)
+    mimetype = response.headers.get("content-type", "").split(";")[0].strip()
+    hash_payload = conditional and validators is None and path.startswith(PAYLOAD_ETAG_PATHS)
+    if (
+        response.status_code != 200
+        or "content-encoding" in response.headers
+        # Solo se lee el cuerpo completo si hay algo que hacer con él (no streams)
+        or not (hash_payload or should_compress(mimetype, HTTP_COMPRESS_MIN_BYTES))
+    ):
+        if validators is not None:
+            response.headers.update(validator_headers(*validators))
+        return response
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    headers = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+
+    if hash_payload:
+        validators = (payload_etag(body), None)
+        if is_not_modified(if_none_match, None, *validators):
+            return Response(status_code=304, headers=validator_headers(*validators))
+
+    etag_suffix = ""
+    if should_compress(mimetype, len(body)):
+        headers["vary"] = add_vary(headers.get("vary"), "Accept-Encoding")
+        encoding = choose_encoding(request.headers.get("accept-encoding"))
+        if encoding:
+            body = compress_body(body, encoding)
+            headers["content-encoding"] = encoding
+            etag_suffix = f"-{encoding}"
+
+    if validators is not None:
+        etag, last_modified = validators
+        headers.update(validator_headers(f"{etag}{etag_suffix}", last_modified))
+
+    return Response(content=body, status_code=response.status_code, headers=headers)
+
 # Dependency injection
 def get_services():
     return _services
@@ -106,6 +196,11 @@ async def health_check():
     
     return health_status
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas en formato Prometheus"""
+    return Response(generate_metrics(), media_type=CONTENT_TYPE_LATEST)
+
 # === ENDPOINTS DE EDPs ===
 @app.get("/api/v1/edps", response_model=EDPResponse, tags=["EDPs"])
 async def get_edps(
@@ -418,6 +513,14 @@ async def get_cache_stats(services = Depends(get_services)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error obteniendo stats de cache: {str(e)}")
 
+async def _register_cache_clear(source: str) -> None:
+    """Sube la generación de datos para que los ETags de generación no sirvan 304 obsoletos."""
+    await run_in_threadpool(
+        CacheInvalidationService().register_data_change,
+        'data_import',
+        metadata={'source': source},
+    )
+
 @app.post("/api/v1/cache/invalidate", tags=["Cache"])
 async def invalidate_cache(
     pattern: str = Query(..., description="Patrón de cache a invalidar (ej: 'edps:*')"),
@@ -426,6 +529,7 @@ async def invalidate_cache(
     """Invalidar cache por patrón"""
     try:
         result = await services['api_service'].clear_all_caches()
+        await _register_cache_clear('api_cache_invalidate')
         return {"success": True, "message": f"Cache invalidated with pattern: {pattern}", "result": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error invalidando cache: {str(e)}")
@@ -435,6 +539,7 @@ async def refresh_all_cache(services = Depends(get_services)):
     """Refrescar todo el cache con datos actuales"""
     try:
         result = await services['api_service'].clear_all_caches()
+        await _register_cache_clear('api_cache_refresh')
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error refrescando cache: {str(e)}")
@@ -469,6 +574,7 @@ async def sheets_webhook(
     try:
         # Invalidar cache cuando Google Sheets se actualiza
         result = await services['api_service'].clear_all_caches()
+        await _register_cache_clear('sheets_webhook')
         return {"success": True, "message": "Cache invalidado por actualización de sheets", "data": data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error procesando webhook: {str(e)}")
@@ -28,6 +28,7 @@ from edp_mvp.app.utils.supabase_adapter import (
     append_project
 )
 from edp_mvp.app.repositories.edp_repository import EDPRepository
+from edp_mvp.app.utils.instrumentation import record_cache
 
 from fastapi import HTTPException
 from models import (
@@ -66,7 +67,9 @@ def _set_cache(key: str, data: Any) -> None:
 def _get_cache(key: str) -> Optional[Any]:
     """Get cache entry if valid"""
     if key in _api_cache and _is_cache_valid(key):
+        record_cache("api_cache", True)
         return _api_cache[key]
+    record_cache("api_cache", False)
     return None
 
 def _clean_numeric_value(value) -> Optional[float]:
@@ -0,0 +1,5 @@
+"""
+Benchmarks de rendimiento con datos sintéticos.
+
+Ver run_benchmarks.py para el uso desde línea de comandos.
+"""
@@ -0,0 +1,199 @@
+"""
+Sustituto en memoria de SupabaseService para benchmarks.
+
+Hereda de SupabaseService para conservar el mismo camino de cache y
+transformaciones; solo reemplaza la capa HTTP. Cada llamada que iría a
+PostgREST se cuenta por operación y tabla para poder comparar cuántos viajes
+a Supabase hace cada hot path. Con `latency` cada viaje espera ese tiempo,
+para que la prueba de carga simule la red hacia PostgREST.
+"""
+import copy
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+from edp_mvp.app.services import supabase_service as supabase_module
+from edp_mvp.app.services.supabase_service import SupabaseService
+
+# Llave primaria por tabla (las que no usan "id")
+PRIMARY_KEYS = {"cost_header": "cost_id", "cost_lines": "line_id"}
+
+
+class _FakeResponse:
+    """Respuesta mínima compatible con requests.Response."""
+
+    def __init__(self, data: Any, status_code: int = 200):
+        self._data = data
+        self.status_code = status_code
+        self.ok = True
+
+    def json(self):
+        return self._data
+
+    def raise_for_status(self):
+        return None
+
+
+class InMemorySupabaseService(SupabaseService):
+    """SupabaseService respaldado por tablas en memoria."""
+
+    def __init__(self, tables: Dict[str, List[Dict]], latency: float = 0.0):
+        self.tables = {name: list(rows) for name, rows in tables.items()}
+        self.latency = latency
+        self.call_counts = Counter()
+        self._lock = threading.Lock()
+        super().__init__()
+
+    # === CONFIGURACIÓN ===
+
+    def load_config(self):
+        self.supabase_url = "http://supabase.benchmark.local"
+        self.supabase_key = "benchmark"
+        self.supabase_anon_key = "benchmark"
+
+    # === CAPA HTTP SIMULADA ===
+
+    def _make_request(self, method: str, endpoint: str, data: Dict = None, params: Dict = None):
+        self._count(method, endpoint)
+        if method != "GET":
+            raise NotImplementedError(f"Método {method} no soportado en el stand-in")
+        return _FakeResponse(self._query(endpoint, params or {}))
+
+    def insert(self, table: str, data: Union[Dict, List[Dict]], upsert: bool = False) -> List[Dict]:
+        self._count("POST", table)
+        rows = data if isinstance(data, list) else [data]
+        rows = [self._convert_updates_for_json(row) for row in rows]
+        pk = PRIMARY_KEYS.get(table, "id")
+
+        with self._lock:
+            existing = self.tables.setdefault(table, [])
+            next_id = max((row.get(pk) or 0 for row in existing), default=0) + 1
+            created = []
+            for row in rows:
+                new_row = dict(row)
+                new_row.setdefault(pk, next_id)
+                next_id += 1
+                existing.append(new_row)
+                created.append(new_row)
+
+        self._clear_cache(table)
+        return created
+
+    def update(self, table: str, filters: Dict, updates: Dict) -> List[Dict]:
+        self._count("PATCH", table)
+        updates = self._convert_updates_for_json(updates)
+        with self._lock:
+            matched = [row for row in self.tables.get(table, []) if self._matches(row, filters)]
+            for row in matched:
+                row.update(updates)
+        self._clear_cache(table)
+        return copy.deepcopy(matched)
+
+    def delete(self, table: str, filters: Dict) -> bool:
+        self._count("DELETE", table)
+        with self._lock:
+            rows = self.tables.get(table, [])
+            self.tables[table] = [row for row in rows if not self._matches(row, filters)]
+        self._clear_cache(table)
+        return True
+
+    def create_log(self, log_data: Dict) -> Dict:
+        log_data["timestamp"] = datetime.now().isoformat()
+        return self.insert("logs", log_data)[0]
+
+    # === CONSULTAS ===
+
+    def _query(self, table: str, params: Dict[str, Any]) -> List[Dict]:
+        rows = self.tables.get(table, [])
+        filters = {k: v for k, v in params.items() if k not in ("select", "order", "limit", "offset")}
+
+        if filters:
+            rows = [row for row in rows if all(self._match_param(row.get(k), v) for k, v in filters.items())]
+
+        order = params.get("order")
+        if order:
+            column, _, direction = order.partition(".")
+            rows = sorted(
+                rows,
+                key=lambda row: (row.get(column) is None, row.get(column)),
+                reverse=direction.startswith("desc"),
+            )
+
+        offset = int(params.get("offset") or 0)
+        if offset:
+            rows = rows[offset:]
+        if params.get("limit"):
+            rows = rows[: int(params["limit"])]
+
+        columns = params.get("select", "*")
+        if columns and columns != "*":
+            wanted = [c.strip() for c in columns.split(",")]
+            return [{c: row.get(c) for c in wanted} for row in rows]
+        # PostgREST entrega objetos nuevos en cada respuesta
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def _match_param(value: Any, expression: str) -> bool:
+        op, _, operand = str(expression).partition(".")
+        if op == "in":
+            options = operand.strip("()").split(",")
+            return str(value) in options
+        if op == "is":
+            return value is None if operand == "null" else str(value).lower() == operand
+        if value is None:
+            return False
+        if op == "eq":
+            return str(value) == operand
+        if op == "neq":
+            return str(value) != operand
+        if op in ("gt", "gte", "lt", "lte"):
+            left, right = value, operand
+            try:
+                left, right = float(value), float(operand)
+            except (TypeError, ValueError):
+                left, right = str(value), operand
+            return {
+                "gt": left > right,
+                "gte": left >= right,
+                "lt": left < right,
+                "lte": left <= right,
+            }[op]
+        if op in ("like", "ilike"):
+            needle = operand.replace("*", "").replace("%", "")
+            return needle.lower() in str(value).lower()
+        return True
+
+    def _matches(self, row: Dict, filters: Dict) -> bool:
+        for key, value in filters.items():
+            if isinstance(value, dict):
+                if not all(self._match_param(row.get(key), f"{op}.{val}") for op, val in value.items()):
+                    return False
+            elif str(row.get(key)) != str(value):
+                return False
+        return True
+
+    # === MÉTRICAS ===
+
+    def _count(self, method: str, table: str) -> None:
+        with self._lock:
+            self.call_counts[f"{method} {table}"] += 1
+        if self.latency:
+            # Con monkeypatch de gevent/eventlet esta espera cede el control
+            time.sleep(self.latency)
+
+    def reset_counts(self) -> None:
+        with self._lock:
+            self.call_counts.clear()
+
+    def snapshot_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.call_counts)
+
+
+def install(tables: Dict[str, List[Dict]], latency: float = 0.0) -> InMemorySupabaseService:
+    """Reemplaza el singleton de get_supabase_service() por el stand-in."""
+    service = InMemorySupabaseService(tables, latency)
+    supabase_module._supabase_service = service
+    return service
@@ -0,0 +1,55 @@
+"""
+App WSGI para la prueba de carga (ver load_test.py).
+
+Datos sintéticos, SupabaseService en memoria con latencia de red simulada y un
+usuario admin en cada request, para medir cuántos requests en espera de
+PostgREST atiende cada modo de worker:
+
+    SERVING_MODE=gevent gunicorn -c gunicorn_config.py benchmarks.load_app:application
+
+Variables: LOAD_TEST_ROWS (filas de edp), LOAD_TEST_LATENCY_MS (espera por
+llamada a Supabase) y LOAD_TEST_COLD (vaciar el cache de Supabase en cada
+request para que todos paguen la latencia).
+"""
+import os
+
+from flask_login import UserMixin
+
+from benchmarks import fake_supabase
+from benchmarks.run_benchmarks import _prepare_environment
+from benchmarks.synthetic_data import generate_dataset
+
+LOAD_TEST_ROWS = int(os.getenv("LOAD_TEST_ROWS", "5000"))
+LOAD_TEST_LATENCY_MS = float(os.getenv("LOAD_TEST_LATENCY_MS", "80"))
+LOAD_TEST_COLD = os.getenv("LOAD_TEST_COLD", "true").lower() == "true"
+
+_prepare_environment(use_redis=False)
+
+from edp_mvp.app import create_app  # noqa: E402 - después de preparar el entorno
+from edp_mvp.app.extensions import login_manager  # noqa: E402
+from edp_mvp.app.utils.supabase_adapter import clear_all_cache  # noqa: E402
+
+fake_supabase.install(generate_dataset(LOAD_TEST_ROWS), latency=LOAD_TEST_LATENCY_MS / 1000)
+application = create_app()
+
+
+class LoadTestUser(UserMixin):
+    """Usuario admin sin sesión ni base de datos."""
+
+    id = 0
+    username = "load_test"
+    nombre_completo = "Load Test"
+    email = "load_test@example.com"
+    rol = "admin"
+    activo = True
+
+
+@login_manager.request_loader
+def _load_test_user(request):
+    return LoadTestUser()
+
+
+if LOAD_TEST_COLD:
+    @application.before_request
+    def _cold_cache():
+        clear_all_cache()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga: workers sync vs. gevent/eventlet con el mismo gunicorn_config.
+
+Levanta gunicorn con benchmarks.load_app (Supabase en memoria con latencia
+simulada) en cada SERVING_MODE, lanza N clientes concurrentes contra los
+endpoints JSON del dashboard durante D segundos y reporta throughput,
+latencias, errores y RSS de los workers. El resultado es JSON para poder
+compararlo entre commits.
+
+Uso:
+    python -m benchmarks.load_test --modes sync,gevent --concurrency 50 --duration 30
+    python -m benchmarks.load_test --modes gevent --workers 1 --latency-ms 150 --output load.json
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from benchmarks.run_benchmarks import ROOT, _git_revision
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - psutil está en requirements.txt
+    psutil = None
+
+DEFAULT_PATHS = [
+    "/management/api/kpis",
+    "/management/api/financial_summary",
+    "/management/api/cash_flow_forecast",
+    "/control/api/kanban/column/enviado",
+]
+
+
+# === SERVIDOR ===
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode: str, port: int, args) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        SERVING_MODE=mode,
+        PORT=str(port),
+        WEB_CONCURRENCY=str(args.workers),
+        WORKER_CONNECTIONS=str(args.worker_connections),
+        LOAD_TEST_ROWS=str(args.rows),
+        LOAD_TEST_LATENCY_MS=str(args.latency_ms),
+    )
+    output = None if args.verbose else subprocess.DEVNULL
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--config", "gunicorn_config.py", "benchmarks.load_app:application"],
+        cwd=ROOT, env=env, stdout=output, stderr=output,
+    )
+
+
+def wait_until_ready(port: int, path: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            status = request(port, path, timeout=30)
+            if status < 500:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"gunicorn no respondió en {timeout:.0f}s")
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def workers_rss(process: subprocess.Popen) -> Optional[float]:
+    """RSS sumado de los workers (MB); None sin psutil."""
+    if psutil is None:
+        return None
+    try:
+        children = psutil.Process(process.pid).children(recursive=True)
+        return round(sum(child.memory_info().rss for child in children) / 2**20, 1)
+    except psutil.Error:
+        return None
+
+
+# === CLIENTES ===
+
+def request(port: int, path: str, timeout: float) -> int:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        conn.request("GET", path, headers={"Accept": "application/json"})
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def run_clients(port: int, paths: List[str], concurrency: int, duration: float,
+                timeout: float) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(index: int):
+        n = index
+        while time.monotonic() < deadline:
+            path = paths[n % len(paths)]
+            n += 1
+            start = time.perf_counter()
+            try:
+                status = request(port, path, timeout)
+                error = None if status == 200 else f"HTTP {status}"
+            except OSError as e:
+                error = type(e).__name__
+            elapsed = time.perf_counter() - start
+            with lock:
+                if error:
+                    errors[error] = errors.get(error, 0) + 1
+                else:
+                    latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def pct(q: float) -> Optional[float]:
+        if not latencies:
+            return None
+        return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 1)
+
+    return {
+        "requests_ok": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "latency_ms": {
+            "p50": pct(0.50),
+            "p95": pct(0.95),
+            "p99": pct(0.99),
+            "mean": round(statistics.mean(latencies) * 1000, 1) if latencies else None,
+        },
+    }
+
+
+def run_mode(mode: str, paths: List[str], args) -> Dict[str, Any]:
+    port = _free_port()
+    process = start_server(mode, port, args)
+    try:
+        wait_until_ready(port, paths[0], args.startup_timeout)
+        result = run_clients(port, paths, args.concurrency, args.duration, args.timeout)
+        result["workers_rss_mb"] = workers_rss(process)
+        return result
+    finally:
+        stop_server(process)
+
+
+def print_table(results: Dict[str, Dict[str, Any]]) -> None:
+    print(f"\n{'modo':10} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errores':>8} {'RSS MB':>8}",
+          file=sys.stderr)
+    for mode, res in results.items():
+        latency = res.get("latency_ms", {})
+        print(f"{mode:10} {res.get('throughput_rps', 0):8.1f} {latency.get('p50') or 0:8.1f} "
+              f"{latency.get('p95') or 0:8.1f} {latency.get('p99') or 0:8.1f} "
+              f"{sum(res.get('errors', {}).values()):8d} {res.get('workers_rss_mb') or 0:8.1f}",
+              file=sys.stderr)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Prueba de carga de los modos de worker de gunicorn")
+    parser.add_argument("--modes", default="sync,gevent", help="SERVING_MODE a comparar (sync, gevent, eventlet)")
+    parser.add_argument("--paths", help="Endpoints separados por coma (por defecto los del dashboard)")
+    parser.add_argument("--concurrency", type=int, default=50, help="Clientes concurrentes")
+    parser.add_argument("--duration", type=float, default=30, help="Segundos de carga por modo")
+    parser.add_argument("--workers", type=int, default=2, help="Workers de gunicorn (WEB_CONCURRENCY)")
+    parser.add_argument("--worker-connections", type=int, default=100, help="Conexiones por worker cooperativo")
+    parser.add_argument("--rows", type=int, default=5_000, help="Filas de la tabla edp")
+    parser.add_argument("--latency-ms", type=float, default=80, help="Latencia simulada por llamada a Supabase")
+    parser.add_argument("--timeout", type=float, default=60, help="Timeout por request (s)")
+    parser.add_argument("--startup-timeout", type=float, default=120, help="Espera máxima al arranque (s)")
+    parser.add_argument("--output", help="Archivo JSON de salida (por defecto stdout)")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar la salida de gunicorn")
+    args = parser.parse_args(argv)
+
+    modes = args.modes.split(",")
+    paths = args.paths.split(",") if args.paths else DEFAULT_PATHS
+
+    results = {}
+    for mode in modes:
+        print(f"🚀 {mode}: {args.concurrency} clientes durante {args.duration:.0f}s", file=sys.stderr)
+        try:
+            results[mode] = run_mode(mode, paths, args)
+        except Exception as e:  # el resto de modos sigue
+            results[mode] = {"error": f"{type(e).__name__}: {e}"}
+            print(f"❌ {mode}: {results[mode]['error']}", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "git_revision": _git_revision(),
+            "timestamp": datetime.now().isoformat(),
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "workers": args.workers,
+            "worker_connections": args.worker_connections,
+            "rows": args.rows,
+            "latency_ms": args.latency_ms,
+            "paths": paths,
+        },
+        "results": results,
+    }
+
+    print_table(results)
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload)
+        print(f"💾 Resultados guardados en {args.output}", file=sys.stderr)
+    else:
+        print(payload)
+
+    return 0 if all("error" not in r for r in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los hot paths de dashboard, KPIs, kanban, cash flow y carga masiva.
+
+Genera datos sintéticos a la escala pedida, instala un SupabaseService en
+memoria y mide cada operación: tiempo de pared, RSS máximo y llamadas a
+Supabase por tabla. El resultado es JSON para poder compararlo entre commits.
+
+Uso:
+    python -m benchmarks.run_benchmarks --rows 10000 --output bench_10k.json
+    python -m benchmarks.run_benchmarks --rows 10000 --compare bench_10k.json
+    python -m benchmarks.run_benchmarks --rows 50000 --only kanban_board,cash_forecast
+
+cash_forecast_engine falla (exit 1) si el Monte Carlo de 1000 EDPs con las
+trayectorias por defecto supera CASH_FORECAST_BUDGET_MS.
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# Presupuesto del Monte Carlo de cobros: 1000 EDPs x CASH_FORECAST_PATHS trayectorias
+CASH_FORECAST_BUDGET_MS = float(os.getenv("CASH_FORECAST_BUDGET_MS", "1500"))
+CASH_FORECAST_BENCH_EDPS = 1_000
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - psutil está en requirements.txt
+    psutil = None
+
+
+# === MEDICIÓN ===
+
+class PeakRSSSampler:
+    """Muestrea el RSS del proceso en un hilo y guarda el máximo."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = 0
+        self.start_rss = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def current_rss() -> int:
+        if psutil:
+            return psutil.Process().memory_info().rss
+        import resource
+        # ru_maxrss es el máximo histórico (KB en Linux); mejor aproximación sin psutil
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def __enter__(self):
+        self.start_rss = self.peak = self.current_rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current_rss())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.current_rss())
+
+
+@contextlib.contextmanager
+def _quiet(enabled: bool):
+    """Silencia los print() de los servicios durante la medición."""
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+# === CONTEXTO ===
+
+class BenchmarkContext:
+    """Servicios y datos compartidos por todos los benchmarks."""
+
+    def __init__(self, app, fake_service, rows: int, upload_rows: int, seed: int):
+        self.app = app
+        self.supabase = fake_service
+        self.rows = rows
+        self.upload_rows = upload_rows
+        self.seed = seed
+        self._upload_batch = 0
+
+    def reset_caches(self) -> None:
+        """Asegura mediciones en frío: sin cache de Supabase ni de rangos."""
+        from edp_mvp.app.utils.supabase_adapter import clear_all_cache
+        from edp_mvp.app.routes import edp_upload
+
+        clear_all_cache()
+        edp_upload._GLOBAL_EDP_CACHE["data"] = {}
+        edp_upload._GLOBAL_EDP_CACHE["last_update"] = 0
+
+    def load_edp_frame(self):
+        from edp_mvp.app.repositories.edp_repository import EDPRepository
+
+        return EDPRepository().find_all_dataframe()["data"]
+
+    def next_upload_frame(self):
+        from benchmarks.synthetic_data import generate_upload_frame
+
+        self._upload_batch += 1
+        return generate_upload_frame(
+            self.upload_rows,
+            seed=self.seed + self._upload_batch,
+            start_n_edp=10_000_000 * self._upload_batch,
+        )
+
+
+# === BENCHMARKS ===
+# Cada benchmark es (setup, run): setup no se mide y entrega los argumentos de run.
+
+def _manager_dashboard():
+    from edp_mvp.app.services.manager_service import ManagerService
+
+    service = ManagerService()
+    return lambda ctx: None, lambda ctx, _: service.get_manager_dashboard_data(force_refresh=True)
+
+
+def _controller_dashboard():
+    import pandas as pd
+    from edp_mvp.app.services.dashboard_service import ControllerService
+
+    service = ControllerService()
+
+    def run(ctx, _):
+        # Mismo camino que la ruta /dashboard: load_related_data -> DataFrames -> contexto
+        datos = service.load_related_data().data
+        df_edp = pd.DataFrame(datos.get("edps", []))
+        df_log = pd.DataFrame(datos.get("logs", []))
+        return service.get_processed_dashboard_context(df_edp, df_log, {})
+
+    return lambda ctx: None, run
+
+
+def _kpi(method_name: str):
+    def factory():
+        from edp_mvp.app.services.kpi_service import KPIService
+
+        service = KPIService()
+        method = getattr(service, method_name)
+        return (lambda ctx: ctx.load_edp_frame()), (lambda ctx, df: method(df.copy()))
+    return factory
+
+
+def _kanban_board():
+    from edp_mvp.app.services.control_panel_service import KanbanService
+
+    service = KanbanService()
+    return (lambda ctx: ctx.load_edp_frame()), (lambda ctx, df: service.get_kanban_board_data(df.copy(), {}))
+
+
+def _cash_forecast():
+    from edp_mvp.app.services.cashflow_service import CashFlowService
+
+    service = CashFlowService()
+    return lambda ctx: None, lambda ctx, _: service.generar_cash_forecast()
+
+
+def _cash_forecast_engine():
+    import numpy as np
+    import pandas as pd
+    from edp_mvp.app.services.cash_forecast_engine import CashForecastEngine, CollectionModel
+
+    engine = CashForecastEngine()
+
+    def setup(ctx):
+        # Modelo y backlog sintéticos fijos: mide solo el Monte Carlo, no la carga
+        rng = np.random.default_rng(ctx.seed)
+        clients = [f"cliente_{i}" for i in range(20)]
+        model = CollectionModel(
+            global_days=np.sort(rng.gamma(2, 30, 5_000).astype(np.int32)),
+            client_days={
+                cliente: np.sort(rng.gamma(2, 10 + 3 * i, 200).astype(np.int32))
+                for i, cliente in enumerate(clients[:15])
+            },
+        )
+        size = CASH_FORECAST_BENCH_EDPS
+        today = pd.Timestamp.now().normalize()
+        pendientes = pd.DataFrame({
+            "n_edp": np.arange(size),
+            "cliente": rng.choice(clients, size),
+            "monto_aprobado": rng.uniform(1e5, 1e7, size),
+            "fecha_emision": today - pd.to_timedelta(rng.integers(0, 200, size), unit="D"),
+        })
+        return model, pendientes
+
+    def run(ctx, args):
+        forecast = engine.simulate(*args)
+        elapsed_ms = forecast["simulacion"]["duracion_ms"]
+        if elapsed_ms > CASH_FORECAST_BUDGET_MS:
+            raise AssertionError(
+                f"Monte Carlo de cobros: {elapsed_ms:.0f} ms > {CASH_FORECAST_BUDGET_MS:.0f} ms "
+                f"({engine.n_paths} trayectorias x {CASH_FORECAST_BENCH_EDPS} EDPs)"
+            )
+        return forecast
+
+    return setup, run
+
+
+def _bulk_upload():
+    from edp_mvp.app.routes.edp_upload import process_bulk_upload
+
+    return (lambda ctx: ctx.next_upload_frame()), (lambda ctx, df: process_bulk_upload(df, "benchmark"))
+
+
+BENCHMARKS: Dict[str, Callable] = {
+    "manager_dashboard": _manager_dashboard,
+    "controller_dashboard": _controller_dashboard,
+    "kpi_manager_dashboard": _kpi("calculate_manager_dashboard_kpis"),
+    "kpi_essential": _kpi("calculate_essential_kpis"),
+    "kpi_executive_dashboard": _kpi("calculate_executive_dashboard_kpis"),
+    "kanban_board": _kanban_board,
+    "cash_forecast": _cash_forecast,
+    "cash_forecast_engine": _cash_forecast_engine,
+    "bulk_upload": _bulk_upload,
+}
+
+
+def _is_success(result: Any) -> bool:
+    if hasattr(result, "success"):
+        return bool(result.success)
+    if isinstance(result, dict):
+        return bool(result.get("success", True))
+    return result is not None
+
+
+def run_benchmark(name: str, factory: Callable, ctx: BenchmarkContext,
+                  repeat: int, quiet: bool) -> Dict[str, Any]:
+    wall_times: List[float] = []
+    peaks: List[int] = []
+    supabase_calls: Optional[Dict[str, int]] = None
+    ok = True
+    error = None
+
+    with _quiet(quiet):
+        setup, run = factory()
+
+    for _ in range(repeat):
+        with _quiet(quiet):
+            ctx.reset_caches()
+            args = setup(ctx)
+        gc.collect()
+        ctx.supabase.reset_counts()
+
+        sampler = PeakRSSSampler()
+        start = time.perf_counter()
+        try:
+            with _quiet(quiet), sampler:
+                result = run(ctx, args)
+            ok = ok and _is_success(result)
+        except Exception as e:  # el benchmark sigue con el resto
+            ok = False
+            error = f"{type(e).__name__}: {e}"
+        elapsed = time.perf_counter() - start
+
+        wall_times.append(elapsed)
+        peaks.append(sampler.peak - sampler.start_rss)
+        if supabase_calls is None:
+            supabase_calls = ctx.supabase.snapshot_counts()
+
+    result = {
+        "ok": ok,
+        "runs": repeat,
+        "wall_time_s": {
+            "median": round(statistics.median(wall_times), 4),
+            "min": round(min(wall_times), 4),
+            "max": round(max(wall_times), 4),
+        },
+        "peak_rss_mb": round(PeakRSSSampler.current_rss() / 2**20, 1),
+        "rss_growth_mb": round(max(peaks) / 2**20, 1),
+        "supabase_calls": supabase_calls or {},
+        "supabase_calls_total": sum((supabase_calls or {}).values()),
+    }
+    if error:
+        result["error"] = error
+    return result
+
+
+# === PREPARACIÓN ===
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def _prepare_environment(use_redis: bool) -> None:
+    # Sin Redis por defecto: medimos cómputo, no aciertos de cache compartido
+    if not use_redis:
+        for var in ("REDIS_URL", "REDISCLOUD_URL", "REDISTOGO_URL"):
+            os.environ.pop(var, None)
+    os.environ.setdefault("DATA_BACKEND", "supabase")
+    os.environ.setdefault("SUPABASE_URL", "http://supabase.benchmark.local")
+    os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "benchmark")
+
+
+def build_context(rows: int, upload_rows: int, seed: int, use_redis: bool,
+                  quiet: bool) -> BenchmarkContext:
+    _prepare_environment(use_redis)
+
+    with _quiet(quiet):
+        from benchmarks.synthetic_data import generate_dataset
+        from benchmarks import fake_supabase
+        from edp_mvp.app import create_app
+
+        tables = generate_dataset(rows, seed=seed)
+        fake_service = fake_supabase.install(tables)
+        app = create_app()
+
+    return BenchmarkContext(app, fake_service, rows, upload_rows, seed)
+
+
+def compare(current: Dict[str, Any], baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    print(f"\nComparación contra {baseline_path} ({baseline['meta'].get('git_revision')})")
+    print(f"{'benchmark':28} {'base (s)':>10} {'actual (s)':>11} {'ratio':>7} {'calls':>12}")
+    for name, res in current["results"].items():
+        base = baseline["results"].get(name)
+        if not base:
+            continue
+        b, c = base["wall_time_s"]["median"], res["wall_time_s"]["median"]
+        ratio = c / b if b else float("inf")
+        calls = f"{base['supabase_calls_total']}->{res['supabase_calls_total']}"
+        print(f"{name:28} {b:10.4f} {c:11.4f} {ratio:7.2f} {calls:>12}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks de hot paths con datos sintéticos")
+    parser.add_argument("--rows", type=int, default=10_000, help="Filas de la tabla edp (1k-500k)")
+    parser.add_argument("--upload-rows", type=int, default=1_000, help="Filas por carga masiva")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por benchmark")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", help="Lista separada por comas de benchmarks a ejecutar")
+    parser.add_argument("--output", help="Archivo JSON de salida (por defecto stdout)")
+    parser.add_argument("--compare", help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--with-redis", action="store_true", help="No deshabilitar Redis")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar los print() de los servicios")
+    args = parser.parse_args(argv)
+
+    selected = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in selected if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Benchmarks desconocidos: {', '.join(unknown)}")
+
+    quiet = not args.verbose
+    started = time.perf_counter()
+    ctx = build_context(args.rows, args.upload_rows, args.seed, args.with_redis, quiet)
+    print(f"📦 Dataset generado en {time.perf_counter() - started:.1f}s "
+          f"({', '.join(f'{t}={len(r)}' for t, r in ctx.supabase.tables.items() if r)})",
+          file=sys.stderr)
+
+    results = {}
+    with ctx.app.app_context():
+        for name in selected:
+            results[name] = run_benchmark(name, BENCHMARKS[name], ctx, args.repeat, quiet)
+            status = "✅" if results[name]["ok"] else "❌"
+            print(f"{status} {name}: {results[name]['wall_time_s']['median']:.3f}s "
+                  f"({results[name]['supabase_calls_total']} llamadas a Supabase)", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "git_revision": _git_revision(),
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "rows": args.rows,
+            "upload_rows": args.upload_rows,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "redis": args.with_redis,
+        },
+        "results": results,
+    }
+
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload)
+        print(f"💾 Resultados guardados en {args.output}", file=sys.stderr)
+    else:
+        print(payload)
+
+    if args.compare:
+        compare(report, args.compare)
+
+    return 0 if all(r["ok"] for r in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Perfil de arranque: tiempo de import por módulo de cada punto de entrada.
+
+Corre cada objetivo en un intérprete nuevo con `python -X importtime`, así
+el resultado es el de un worker de gunicorn recién reciclado o un worker de
+Celery que escala, y reporta el tiempo total, los módulos más caros (propio
+y acumulado) y el total por paquete de primer nivel.
+
+Uso:
+    python -m benchmarks.startup_profile
+    python -m benchmarks.startup_profile --targets celery,fastapi --top 30
+    python -m benchmarks.startup_profile --budget-ms 4000 --output startup.json
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from datetime import datetime
+from typing import Any, Dict, List
+
+from benchmarks.run_benchmarks import ROOT, _git_revision, _prepare_environment
+
+# Objetivo -> (directorio de trabajo, código a medir)
+TARGETS = {
+    "app": (ROOT, "from edp_mvp.app import create_app; create_app()"),
+    "wsgi": (ROOT, "import wsgi"),
+    "worker_app": (ROOT, "from edp_mvp.app import get_worker_app; get_worker_app()"),
+    "celery": (
+        ROOT,
+        "import importlib; from edp_mvp.app.celery import celery; "
+        "[importlib.import_module(m) for m in celery.conf.imports]",
+    ),
+    "email_worker": (ROOT, "import standalone_email_worker"),
+    "fastapi": (os.path.join(ROOT, "api_fastapi"), "import main"),
+}
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+WALL_MARKER = "__startup_wall_s__="
+
+
+def profile_target(name: str, timeout: float) -> Dict[str, Any]:
+    cwd, code = TARGETS[name]
+    wrapped = (
+        "import time as _t; _start = _t.perf_counter()\n"
+        f"{code}\n"
+        f"print('{WALL_MARKER}' + str(_t.perf_counter() - _start))"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.getenv("PYTHONPATH")])))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", wrapped],
+        cwd=cwd, env=env, capture_output=True, text=True, timeout=timeout,
+    )
+
+    modules = []
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            modules.append({
+                "module": module,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+                "depth": (len(indent) - 1) // 2,
+            })
+
+    wall = None
+    for line in proc.stdout.splitlines():
+        if line.startswith(WALL_MARKER):
+            wall = round(float(line[len(WALL_MARKER):]) * 1000, 1)
+
+    result = {
+        "wall_ms": wall,
+        "import_ms": round(sum(m["self_ms"] for m in modules), 1),
+        "modules": len(modules),
+        "modules_list": modules,
+    }
+    if proc.returncode != 0:
+        errors = [line for line in proc.stderr.splitlines() if not IMPORTTIME_LINE.match(line)]
+        result["error"] = "\n".join(errors[-5:]) or f"exit {proc.returncode}"
+    return result
+
+
+def summarize(result: Dict[str, Any], top: int) -> Dict[str, Any]:
+    modules = result.pop("modules_list")
+    packages: Dict[str, float] = {}
+    for m in modules:
+        package = m["module"].split(".")[0]
+        packages[package] = packages.get(package, 0) + m["self_ms"]
+
+    result["top_self"] = [
+        {"module": m["module"], "ms": round(m["self_ms"], 1)}
+        for m in sorted(modules, key=lambda m: m["self_ms"], reverse=True)[:top]
+    ]
+    result["top_cumulative"] = [
+        {"module": m["module"], "ms": round(m["cumulative_ms"], 1)}
+        for m in sorted(modules, key=lambda m: m["cumulative_ms"], reverse=True)[:top]
+    ]
+    result["packages"] = {
+        package: round(ms, 1)
+        for package, ms in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    }
+    return result
+
+
+def print_report(results: Dict[str, Dict[str, Any]], top: int) -> None:
+    for name, res in results.items():
+        if "error" in res and res.get("wall_ms") is None:
+            print(f"\n❌ {name}: {res['error']}", file=sys.stderr)
+            continue
+        print(f"\n⏱️ {name}: {res['wall_ms']:.0f} ms total, {res['import_ms']:.0f} ms en "
+              f"{res['modules']} imports", file=sys.stderr)
+        print(f"   {'paquete':32} {'ms':>8}", file=sys.stderr)
+        for package, ms in list(res["packages"].items())[:top]:
+            print(f"   {package:32} {ms:8.1f}", file=sys.stderr)
+        print(f"   {'módulo (acumulado)':48} {'ms':>8}", file=sys.stderr)
+        for entry in res["top_cumulative"][:top]:
+            print(f"   {entry['module'][:48]:48} {entry['ms']:8.1f}", file=sys.stderr)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Tiempo de import por módulo de cada punto de entrada")
+    parser.add_argument("--targets", default=",".join(TARGETS), help=f"Objetivos ({', '.join(TARGETS)})")
+    parser.add_argument("--top", type=int, default=15, help="Módulos y paquetes a reportar")
+    parser.add_argument("--budget-ms", type=float, help="Falla si algún objetivo supera este tiempo total")
+    parser.add_argument("--redis", action="store_true", help="Mantener REDIS_URL (por defecto sin Redis)")
+    parser.add_argument("--timeout", type=float, default=120, help="Timeout por objetivo (s)")
+    parser.add_argument("--output", help="Archivo JSON de salida (por defecto stdout)")
+    args = parser.parse_args(argv)
+
+    targets = args.targets.split(",")
+    unknown = [t for t in targets if t not in TARGETS]
+    if unknown:
+        parser.error(f"objetivos desconocidos: {', '.join(unknown)}")
+
+    _prepare_environment(use_redis=args.redis)
+
+    results = {}
+    for name in targets:
+        print(f"🔍 Perfilando arranque de {name}...", file=sys.stderr)
+        try:
+            results[name] = summarize(profile_target(name, args.timeout), args.top)
+        except subprocess.TimeoutExpired:
+            results[name] = {"error": f"timeout tras {args.timeout:.0f}s", "wall_ms": None}
+
+    print_report(results, args.top)
+
+    over_budget = []
+    if args.budget_ms is not None:
+        over_budget = [
+            name for name, res in results.items()
+            if res.get("wall_ms") is None or res["wall_ms"] > args.budget_ms
+        ]
+        for name in over_budget:
+            print(f"🚨 {name} supera el presupuesto de {args.budget_ms:.0f} ms", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "git_revision": _git_revision(),
+            "timestamp": datetime.now().isoformat(),
+            "python": sys.version.split()[0],
+            "budget_ms": args.budget_ms,
+        },
+        "results": results,
+    }
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload)
+        print(f"💾 Resultados guardados en {args.output}", file=sys.stderr)
+    else:
+        print(payload)
+
+    failed = any("error" in res for res in results.values())
+    return 1 if failed or over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""
+Generador de datasets sintéticos para benchmarks.
+
+Produce tablas edp, edp_log, cost_header y projects con distribuciones
+realistas de estado, mes, cliente y jefe de proyecto. Todo es vectorizado con
+numpy para poder generar 500k filas en pocos segundos y es determinista para
+una misma semilla.
+"""
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+# Distribución observada en producción: la mayoría de los EDPs termina pagado
+ESTADOS = ["pagado", "validado", "enviado", "revisión", "pendiente"]
+ESTADOS_PESOS = [0.40, 0.20, 0.20, 0.12, 0.08]
+
+ESTADOS_DETALLADOS = ["", "", "", "re-trabajo solicitado", "aprobado", "en revisión"]
+TIPOS_FALLA = ["", "documentación", "montos", "plazos", "calidad"]
+TIPOS_COSTO = ["materiales", "servicios", "mano de obra", "arriendo", "transporte"]
+ESTADOS_COSTO = ["pagado", "pendiente", "vencido"]
+ESTADOS_COSTO_PESOS = [0.6, 0.3, 0.1]
+CAMPOS_LOG = ["estado", "estado_detallado", "monto_aprobado", "fecha_conformidad", "observaciones"]
+
+N_CLIENTES = 40
+N_JEFES = 12
+N_PROVEEDORES = 150
+MESES_HISTORIA = 18
+
+
+def _zipf_choice(rng: np.random.Generator, n_options: int, size: int, a: float = 1.2) -> np.ndarray:
+    """Índices 0..n_options-1 con distribución tipo Zipf (pocos clientes concentran volumen)."""
+    weights = 1.0 / np.arange(1, n_options + 1) ** a
+    weights /= weights.sum()
+    return rng.choice(n_options, size=size, p=weights)
+
+
+def generate_projects(n_projects: int, rng: np.random.Generator) -> pd.DataFrame:
+    clientes = np.array([f"Cliente {i:02d}" for i in range(N_CLIENTES)])
+    jefes = np.array([f"Jefe Proyecto {i:02d}" for i in range(N_JEFES)])
+    today = pd.Timestamp.today().normalize()
+
+    inicio = today - pd.to_timedelta(rng.integers(30, 720, n_projects), unit="D")
+    return pd.DataFrame({
+        "id": np.arange(1, n_projects + 1),
+        "proyecto": [f"PRY-{i:05d}" for i in range(1, n_projects + 1)],
+        "cliente": clientes[_zipf_choice(rng, N_CLIENTES, n_projects)],
+        "jefe_proyecto": jefes[rng.integers(0, N_JEFES, n_projects)],
+        "gestor": jefes[rng.integers(0, N_JEFES, n_projects)],
+        "fecha_inicio": inicio,
+        "fecha_fin_prevista": inicio + pd.to_timedelta(rng.integers(60, 540, n_projects), unit="D"),
+        "monto_contrato": np.round(rng.lognormal(18, 0.8, n_projects), 0),
+        "moneda": "CLP",
+        "estado_proyecto": rng.choice(["en_curso", "no_iniciado", "finalizado"], n_projects, p=[0.6, 0.1, 0.3]),
+    })
+
+
+def generate_edps(n_rows: int, projects: pd.DataFrame, rng: np.random.Generator) -> pd.DataFrame:
+    today = pd.Timestamp.today().normalize()
+    project_idx = rng.integers(0, len(projects), n_rows)
+    proj = projects.iloc[project_idx].reset_index(drop=True)
+
+    # Meses más recientes concentran más EDPs
+    month_offsets = np.minimum(rng.geometric(0.15, n_rows) - 1, MESES_HISTORIA - 1)
+    emision = (today - pd.to_timedelta(month_offsets * 30 + rng.integers(0, 28, n_rows), unit="D"))
+
+    estado = rng.choice(ESTADOS, n_rows, p=ESTADOS_PESOS)
+    envio = emision + pd.to_timedelta(rng.integers(0, 10, n_rows), unit="D")
+    dias_cobro = np.clip(rng.gamma(3.0, 14.0, n_rows), 1, 180).astype(int)
+    cerrado = np.isin(estado, ["pagado", "validado"])
+    conformidad = pd.Series(envio + pd.to_timedelta(dias_cobro, unit="D")).where(cerrado, pd.NaT)
+    conformidad = conformidad.where(conformidad.isna() | (conformidad <= today), today)
+
+    dso = np.where(cerrado, dias_cobro, np.maximum((today - envio).days, 0))
+    propuesto = np.round(rng.lognormal(15.5, 0.9, n_rows), 0)
+    aprobado = np.where(cerrado | (estado == "enviado"), np.round(propuesto * rng.uniform(0.85, 1.0, n_rows), 0), 0)
+
+    return pd.DataFrame({
+        "id": np.arange(1, n_rows + 1),
+        "n_edp": np.arange(1, n_rows + 1),
+        "proyecto": proj["proyecto"].values,
+        "cliente": proj["cliente"].values,
+        "gestor": proj["gestor"].values,
+        "jefe_proyecto": proj["jefe_proyecto"].values,
+        "mes": emision.strftime("%Y-%m"),
+        "fecha_emision": emision,
+        "fecha_envio_cliente": envio,
+        "monto_propuesto": propuesto,
+        "monto_aprobado": aprobado,
+        "fecha_estimada_pago": envio + pd.to_timedelta(30, unit="D"),
+        "conformidad_enviada": np.where(cerrado, "Sí", "No"),
+        "n_conformidad": np.where(cerrado, [f"CONF-{i}" for i in range(n_rows)], ""),
+        "fecha_conformidad": conformidad.values,
+        "estado": estado,
+        "observaciones": "",
+        "registrado_por": "benchmark",
+        "estado_detallado": rng.choice(ESTADOS_DETALLADOS, n_rows),
+        "fecha_registro": emision,
+        "motivo_no_aprobado": "",
+        "tipo_falla": rng.choice(TIPOS_FALLA, n_rows, p=[0.8, 0.05, 0.05, 0.05, 0.05]),
+        "dso_actual": dso,
+        "dias_en_cliente": dso,
+        "prioridad": rng.choice(["alta", "media", "baja"], n_rows, p=[0.2, 0.5, 0.3]),
+    })
+
+
+def generate_edp_log(edps: pd.DataFrame, entries_per_edp: float, rng: np.random.Generator) -> pd.DataFrame:
+    n_rows = int(len(edps) * entries_per_edp)
+    idx = rng.integers(0, len(edps), n_rows)
+    src = edps.iloc[idx].reset_index(drop=True)
+    campo = rng.choice(CAMPOS_LOG, n_rows, p=[0.45, 0.2, 0.15, 0.1, 0.1])
+    fecha = src["fecha_emision"] + pd.to_timedelta(rng.integers(0, 90 * 24 * 60, n_rows), unit="min")
+
+    despues = np.where(campo == "estado", rng.choice(ESTADOS, n_rows), "")
+    despues = np.where(campo == "estado_detallado", rng.choice(["re-trabajo solicitado", "aprobado"], n_rows), despues)
+
+    return pd.DataFrame({
+        "id": np.arange(1, n_rows + 1),
+        "fecha_hora": fecha,
+        "n_edp": src["n_edp"].values,
+        "proyecto": src["proyecto"].values,
+        "campo": campo,
+        "antes": rng.choice(ESTADOS, n_rows),
+        "despues": despues,
+        "usuario": rng.choice(["controller", "admin", "jefe", "gerencia"], n_rows),
+    }).sort_values("fecha_hora").reset_index(drop=True)
+
+
+def generate_cost_header(n_rows: int, projects: pd.DataFrame, rng: np.random.Generator) -> pd.DataFrame:
+    today = pd.Timestamp.today().normalize()
+    factura = today - pd.to_timedelta(rng.integers(0, MESES_HISTORIA * 30, n_rows), unit="D")
+    estado = rng.choice(ESTADOS_COSTO, n_rows, p=ESTADOS_COSTO_PESOS)
+    bruto = np.round(rng.lognormal(13.5, 1.0, n_rows), 0)
+    vencimiento = factura + pd.to_timedelta(30, unit="D")
+
+    return pd.DataFrame({
+        "cost_id": np.arange(1, n_rows + 1),
+        "project_id": projects["id"].values[rng.integers(0, len(projects), n_rows)].astype(str),
+        "proveedor": [f"Proveedor {i:03d}" for i in _zipf_choice(rng, N_PROVEEDORES, n_rows, a=1.0)],
+        "factura": [f"F-{i:07d}" for i in range(n_rows)],
+        "fecha_factura": factura,
+        "fecha_recepcion": factura + pd.to_timedelta(2, unit="D"),
+        "fecha_vencimiento": vencimiento,
+        "fecha_pago": pd.Series(vencimiento).where(estado == "pagado", pd.NaT).values,
+        "importe_bruto": bruto,
+        "importe_neto": np.round(bruto / 1.19, 0),
+        "moneda": "CLP",
+        "estado_costo": estado,
+        "tipo_costo": rng.choice(TIPOS_COSTO, n_rows),
+        "detalle_costo": "",
+        "responsable_registro": "benchmark",
+    })
+
+
+def _to_records(df: pd.DataFrame) -> List[Dict]:
+    """Serializar como lo entregaría PostgREST: fechas en ISO, NaT como null."""
+    out = df.copy()
+    for col in out.columns:
+        if pd.api.types.is_datetime64_any_dtype(out[col]):
+            out[col] = out[col].dt.strftime("%Y-%m-%dT%H:%M:%S").where(out[col].notna(), None)
+    out = out.astype(object).where(out.notna(), None)
+    return out.to_dict("records")
+
+
+def generate_dataset(n_edps: int, seed: int = 42, log_ratio: float = 5.0,
+                     cost_ratio: float = 0.5) -> Dict[str, List[Dict]]:
+    """
+    Genera todas las tablas a la escala pedida.
+
+    Args:
+        n_edps: número de filas de la tabla edp (1k-500k)
+        seed: semilla para reproducibilidad entre commits
+        log_ratio: entradas de edp_log por EDP
+        cost_ratio: filas de cost_header por EDP
+    """
+    rng = np.random.default_rng(seed)
+    n_projects = max(10, n_edps // 20)
+
+    projects = generate_projects(n_projects, rng)
+    edps = generate_edps(n_edps, projects, rng)
+    edp_log = generate_edp_log(edps, log_ratio, rng)
+    cost_header = generate_cost_header(max(1, int(n_edps * cost_ratio)), projects, rng)
+
+    return {
+        "edp": _to_records(edps),
+        "edp_log": _to_records(edp_log),
+        "cost_header": _to_records(cost_header),
+        "projects": _to_records(projects),
+        "cost_lines": [],
+        "logs": [],
+    }
+
+
+def generate_upload_frame(n_rows: int, seed: int = 7, start_n_edp: int = 10_000_000) -> pd.DataFrame:
+    """DataFrame con el formato del Excel de carga masiva (process_bulk_upload)."""
+    rng = np.random.default_rng(seed)
+    projects = generate_projects(max(10, n_rows // 20), rng)
+    edps = generate_edps(n_rows, projects, rng)
+    return pd.DataFrame({
+        "n_edp": edps["n_edp"] + start_n_edp,
+        "proyecto": edps["proyecto"],
+        "cliente": edps["cliente"],
+        "gestor": edps["gestor"],
+        "jefe_proyecto": edps["jefe_proyecto"],
+        "mes": edps["mes"],
+        "fecha_emision": edps["fecha_emision"].dt.strftime("%Y-%m-%d"),
+        "monto_propuesto": edps["monto_propuesto"],
+        "monto_aprobado": edps["monto_aprobado"],
+        "estado": "revisión",
+        "observaciones": "",
+    })
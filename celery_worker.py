@@ -4,7 +4,11 @@ Worker de Celery independiente para tareas de email.
 """
 import os
 import sys
+import json
+import hashlib
 import logging
+import threading
+from collections import OrderedDict
 from celery import Celery
 import time
 # Configurar logging
@@ -427,6 +431,200 @@ def send_performance_report_task(self, performance_data, recipients):
         logger.error(f"❌ Error in performance report task: {str(e)}")
         raise
 
+# CSS base para el diseño Executive Suite (se arma una sola vez por worker)
+EMAIL_BASE_CSS = """
+<style>
+    body {
+        font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+        line-height: 1.6;
+        color: #1a1a1a;
+        background-color: #fafafa;
+        margin: 0;
+        padding: 0;
+    }
+    .email-container {
+        max-width: 600px;
+        margin: 0 auto;
+        background-color: #ffffff;
+        border-radius: 8px;
+        box-shadow: 0 1px 3px rgba(0, 0, 0, 0.1);
+        overflow: hidden;
+    }
+    .email-header {
+        background: linear-gradient(135deg, #0066cc 0%, #0052a3 100%);
+        color: white;
+        padding: 32px;
+        text-align: center;
+    }
+    .email-header h1 {
+        margin: 0;
+        font-size: 24px;
+        font-weight: 600;
+        letter-spacing: -0.025em;
+    }
+    .email-header .subtitle {
+        margin: 8px 0 0 0;
+        font-size: 14px;
+        opacity: 0.9;
+        font-weight: 400;
+    }
+    .email-content {
+        padding: 32px;
+    }
+    .metric-card {
+        background-color: #f8fafc;
+        border: 1px solid #e5e7eb;
+        border-radius: 6px;
+        padding: 20px;
+        margin: 16px 0;
+    }
+    .metric-grid {
+        display: grid;
+        grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
+        gap: 16px;
+        margin: 24px 0;
+    }
+    .metric-item {
+        background-color: #ffffff;
+        border: 1px solid #e5e7eb;
+        border-radius: 6px;
+        padding: 16px;
+        text-align: center;
+    }
+    .metric-value {
+        font-size: 24px;
+        font-weight: 600;
+        color: #0066cc;
+        margin-bottom: 4px;
+    }
+    .metric-label {
+        font-size: 12px;
+        color: #6b7280;
+        text-transform: uppercase;
+        letter-spacing: 0.05em;
+    }
+    .alert-badge {
+        display: inline-block;
+        padding: 4px 12px;
+        border-radius: 12px;
+        font-size: 12px;
+        font-weight: 500;
+        text-transform: uppercase;
+        letter-spacing: 0.05em;
+    }
+    .alert-critical {
+        background-color: #fef2f2;
+        color: #dc2626;
+        border: 1px solid #fecaca;
+    }
+    .alert-warning {
+        background-color: #fffbeb;
+        color: #d97706;
+        border: 1px solid #fed7aa;
+    }
+    .alert-info {
+        background-color: #eff6ff;
+        color: #2563eb;
+        border: 1px solid #bfdbfe;
+    }
+    .alert-success {
+        background-color: #f0fdf4;
+        color: #059669;
+        border: 1px solid #bbf7d0;
+    }
+    .data-table {
+        width: 100%;
+        border-collapse: collapse;
+        margin: 16px 0;
+    }
+    .data-table th,
+    .data-table td {
+        padding: 12px;
+        text-align: left;
+        border-bottom: 1px solid #e5e7eb;
+    }
+    .data-table th {
+        background-color: #f8fafc;
+        font-weight: 600;
+        color: #374151;
+        font-size: 12px;
+        text-transform: uppercase;
+        letter-spacing: 0.05em;
+    }
+    .data-table td {
+        font-size: 14px;
+    }
+    .amount {
+        font-family: 'JetBrains Mono', 'Courier New', monospace;
+        font-weight: 500;
+    }
+    .email-footer {
+        background-color: #f8fafc;
+        padding: 24px 32px;
+        text-align: center;
+        border-top: 1px solid #e5e7eb;
+    }
+    .email-footer p {
+        margin: 0;
+        font-size: 12px;
+        color: #6b7280;
+    }
+    .divider {
+        height: 1px;
+        background-color: #e5e7eb;
+        margin: 24px 0;
+    }
+    .section-title {
+        font-size: 16px;
+        font-weight: 600;
+        color: #374151;
+        margin: 24px 0 16px 0;
+    }
+    .status-indicator {
+        display: inline-block;
+        width: 8px;
+        height: 8px;
+        border-radius: 50%;
+        margin-right: 8px;
+    }
+    .status-pending { background-color: #f59e0b; }
+    .status-critical { background-color: #dc2626; }
+    .status-completed { background-color: #059669; }
+</style>
+"""
+
+# Cuerpos ya generados por (plantilla, hash de datos): los destinatarios de una
+# campaña con los mismos datos comparten un solo render. Este worker no carga
+# edp_mvp, así que replica el LRU de services/email_renderer con su propio lock
+EMAIL_RENDER_CACHE_SIZE = int(os.getenv('EMAIL_RENDER_CACHE_SIZE', '256'))
+EMAIL_RENDER_CACHE_TTL = int(os.getenv('EMAIL_RENDER_CACHE_TTL', '300'))
+_rendered_emails = OrderedDict()
+_rendered_emails_lock = threading.Lock()
+
+
+def render_email_template(template_name: str, data) -> str:
+    """generate_email_template con cache por (plantilla, hash de datos)."""
+    try:
+        digest = hashlib.sha1(
+            json.dumps(data, sort_keys=True, default=str).encode('utf-8')
+        ).hexdigest()
+    except (TypeError, ValueError):
+        return generate_email_template(template_name, data)
+
+    cache_key = (template_name, digest)
+    with _rendered_emails_lock:
+        entry = _rendered_emails.get(cache_key)
+        if entry and time.time() - entry[0] < EMAIL_RENDER_CACHE_TTL:
+            _rendered_emails.move_to_end(cache_key)
+            return entry[1]
+
+    html_content = generate_email_template(template_name, data)
+    with _rendered_emails_lock:
+        _rendered_emails[cache_key] = (time.time(), html_content)
+        while len(_rendered_emails) > EMAIL_RENDER_CACHE_SIZE:
+            _rendered_emails.popitem(last=False)
+    return html_content
+
 # Funciones de email para las tareas
 def send_email_with_template(subject: str, template_name: str, template_data, recipients) -> bool:
     """Enviar email usando una plantilla específica."""
@@ -450,7 +648,7 @@ def send_email_with_template(subject: str, template_name: str, template_data, re
         from email.mime.multipart import MIMEMultipart
         
         # Generar contenido HTML basado en la plantilla
-        html_content = generate_email_template(template_name, template_data)
+        html_content = render_email_template(template_name, template_data)
         
         # Crear mensaje
         msg = MIMEMultipart('alternative')
@@ -482,167 +680,7 @@ def send_email_with_template(subject: str, template_name: str, template_data, re
 def generate_email_template(template_name: str, data) -> str:
     """Generar contenido HTML para diferentes tipos de email con diseño Executive Suite."""
     
-    # CSS base para el diseño Executive Suite
-    base_css = """
-    <style>
-        body {
-            font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            line-height: 1.6;
-            color: #1a1a1a;
-            background-color: #fafafa;
-            margin: 0;
-            padding: 0;
-        }
-        .email-container {
-            max-width: 600px;
-            margin: 0 auto;
-            background-color: #ffffff;
-            border-radius: 8px;
-            box-shadow: 0 1px 3px rgba(0, 0, 0, 0.1);
-            overflow: hidden;
-        }
-        .email-header {
-            background: linear-gradient(135deg, #0066cc 0%, #0052a3 100%);
-            color: white;
-            padding: 32px;
-            text-align: center;
-        }
-        .email-header h1 {
-            margin: 0;
-            font-size: 24px;
-            font-weight: 600;
-            letter-spacing: -0.025em;
-        }
-        .email-header .subtitle {
-            margin: 8px 0 0 0;
-            font-size: 14px;
-            opacity: 0.9;
-            font-weight: 400;
-        }
-        .email-content {
-            padding: 32px;
-        }
-        .metric-card {
-            background-color: #f8fafc;
-            border: 1px solid #e5e7eb;
-            border-radius: 6px;
-            padding: 20px;
-            margin: 16px 0;
-        }
-        .metric-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 16px;
-            margin: 24px 0;
-        }
-        .metric-item {
-            background-color: #ffffff;
-            border: 1px solid #e5e7eb;
-            border-radius: 6px;
-            padding: 16px;
-            text-align: center;
-        }
-        .metric-value {
-            font-size: 24px;
-            font-weight: 600;
-            color: #0066cc;
-            margin-bottom: 4px;
-        }
-        .metric-label {
-            font-size: 12px;
-            color: #6b7280;
-            text-transform: uppercase;
-            letter-spacing: 0.05em;
-        }
-        .alert-badge {
-            display: inline-block;
-            padding: 4px 12px;
-            border-radius: 12px;
-            font-size: 12px;
-            font-weight: 500;
-            text-transform: uppercase;
-            letter-spacing: 0.05em;
-        }
-        .alert-critical {
-            background-color: #fef2f2;
-            color: #dc2626;
-            border: 1px solid #fecaca;
-        }
-        .alert-warning {
-            background-color: #fffbeb;
-            color: #d97706;
-            border: 1px solid #fed7aa;
-        }
-        .alert-info {
-            background-color: #eff6ff;
-            color: #2563eb;
-            border: 1px solid #bfdbfe;
-        }
-        .alert-success {
-            background-color: #f0fdf4;
-            color: #059669;
-            border: 1px solid #bbf7d0;
-        }
-        .data-table {
-            width: 100%;
-            border-collapse: collapse;
-            margin: 16px 0;
-        }
-        .data-table th,
-        .data-table td {
-            padding: 12px;
-            text-align: left;
-            border-bottom: 1px solid #e5e7eb;
-        }
-        .data-table th {
-            background-color: #f8fafc;
-            font-weight: 600;
-            color: #374151;
-            font-size: 12px;
-            text-transform: uppercase;
-            letter-spacing: 0.05em;
-        }
-        .data-table td {
-            font-size: 14px;
-        }
-        .amount {
-            font-family: 'JetBrains Mono', 'Courier New', monospace;
-            font-weight: 500;
-        }
-        .email-footer {
-            background-color: #f8fafc;
-            padding: 24px 32px;
-            text-align: center;
-            border-top: 1px solid #e5e7eb;
-        }
-        .email-footer p {
-            margin: 0;
-            font-size: 12px;
-            color: #6b7280;
-        }
-        .divider {
-            height: 1px;
-            background-color: #e5e7eb;
-            margin: 24px 0;
-        }
-        .section-title {
-            font-size: 16px;
-            font-weight: 600;
-            color: #374151;
-            margin: 24px 0 16px 0;
-        }
-        .status-indicator {
-            display: inline-block;
-            width: 8px;
-            height: 8px;
-            border-radius: 50%;
-            margin-right: 8px;
-        }
-        .status-pending { background-color: #f59e0b; }
-        .status-critical { background-color: #dc2626; }
-        .status-completed { background-color: #059669; }
-    </style>
-    """
+    base_css = EMAIL_BASE_CSS
     
     if template_name == "critical_edp_alert":
         return f"""
@@ -5,10 +5,8 @@ from .extensions import socketio, login_manager, db, mail
 from celery import Celery
 import os
 import logging
-import json
-import numpy as np
-import pandas as pd
-from typing import Any
+import threading
+from typing import Any, Optional
 
 
 
@@ -51,61 +49,22 @@ try:
 except Exception:  # pragma: no cover - optional dependency
     ProfilerMiddleware = None
 
-# 🔧 PATCH GLOBAL: Solución definitiva para "Object of type int64 is not JSON serializable"
-import json
-import numpy as np
-import pandas as pd
-from typing import Any
-
-# Patch global de json.dumps usando la función centralizada
-original_json_dumps = json.dumps
-
-def patched_json_dumps(obj, *args, **kwargs):
-    """Versión patcheada de json.dumps que maneja tipos numpy automáticamente"""
-    try:
-        return original_json_dumps(obj, *args, **kwargs)
-    except TypeError as e:
-        error_str = str(e)
-        if any(error_type in error_str for error_type in ["int64", "float64", "bool_", "Timestamp", "DictToObject"]):
-            # Usar la función centralizada de conversión
-            from .utils.type_conversion import convert_numpy_types_for_json
-            converted_obj = convert_numpy_types_for_json(obj)
-            return original_json_dumps(converted_obj, *args, **kwargs)
-        else:
-            raise e
-
-# Aplicar el patch globalmente
-json.dumps = patched_json_dumps
-
-# También patchear jsonify de Flask
-from flask import json as flask_json
-
-original_flask_dumps = flask_json.dumps
-
-def patched_flask_dumps(obj, *args, **kwargs):
-    """Versión patcheada de Flask json.dumps"""
-    try:
-        return original_flask_dumps(obj, *args, **kwargs)
-    except TypeError as e:
-        error_str = str(e)
-        if any(error_type in error_str for error_type in ["int64", "float64", "bool_", "Timestamp", "DictToObject"]):
-            # Usar la función centralizada de conversión
-            from .utils.type_conversion import convert_numpy_types_for_json
-            converted_obj = convert_numpy_types_for_json(obj)
-            return original_flask_dumps(converted_obj, *args, **kwargs)
-        else:
-            raise e
-
-flask_json.dumps = patched_flask_dumps
-
-print("🔧 JSON SERIALIZATION PATCH APLICADO GLOBALMENTE")
-print("   - json.dumps patcheado")
-print("   - flask.json.dumps patcheado") 
-print("   - Conversión automática de tipos numpy/pandas activada")
-print("   - Montos convertidos específicamente a float para BD")
-
-def create_app():
+# 🔧 Serialización JSON: un solo encoder para tipos numpy/pandas en las
+# respuestas. El código que serializa resultados de pandas por su cuenta pasa
+# default=encode_default de forma explícita (json.dumps no se parchea).
+from .utils.json_serialization import NumpyJSONProvider
+
+def create_app(web: bool = True):
+    """
+    Crear la app Flask.
+
+    Con web=False (tareas Celery, scripts) solo se configuran extensiones y
+    contexto: no se importan blueprints ni servicios de analytics, ni se
+    registran hooks de requests. Ver get_worker_app().
+    """
     app = Flask(__name__)
+    app.json_provider_class = NumpyJSONProvider
+    app.json = NumpyJSONProvider(app)
     
     # Load configuration
     config = get_config()
@@ -117,13 +76,37 @@ def create_app():
     db.init_app(app)
     mail.init_app(app)
 
+    if not web:
+        return app
+
     if os.getenv("ENABLE_PROFILER") == "1" and ProfilerMiddleware:
         app.wsgi_app = ProfilerMiddleware(app.wsgi_app, restrictions=[30])
 
+    # 📈 Métricas livianas (latencias, Supabase, cache) en /metrics
+    from .utils import instrumentation
+    instrumentation.init_app(app)
+
+    # 🗜️ Compresión gzip/brotli de respuestas grandes
+    from .utils import http_cache
+    http_cache.init_app(app)
+
     # Register authentication context processor
     from .utils.auth_utils import inject_user_context
     app.context_processor(inject_user_context)
 
+    register_blueprints(app)
+
+    init_celery(app)
+    # Beat schedule configuration moved to celery.py to avoid conflicts
+
+    # Import tasks to ensure they are registered with Celery
+    from . import tasks
+    
+    return app
+
+
+def register_blueprints(app: Flask) -> None:
+    """Importar y registrar las rutas (la parte más pesada del arranque web)."""
     # Usar imports relativos (con punto) o absolutos
     from .auth.routes import auth_bp
     from .edp.routes import edp_bp
@@ -163,10 +146,20 @@ def create_app():
     # app.register_blueprint(controller_bp)
     # app.register_blueprint(manager_bp)
 
-    init_celery(app)
-    # Beat schedule configuration moved to celery.py to avoid conflicts
 
-    # Import tasks to ensure they are registered with Celery
-    from . import tasks
-    
-    return app
+_worker_app: Optional[Flask] = None
+_worker_app_lock = threading.Lock()
+
+
+def get_worker_app() -> Flask:
+    """
+    App sin rutas para tareas Celery y scripts, creada una vez por proceso.
+    Antes cada tarea de email llamaba create_app() e importaba todos los
+    blueprints en cada ejecución.
+    """
+    global _worker_app
+    if _worker_app is None:
+        with _worker_app_lock:
+            if _worker_app is None:
+                _worker_app = create_app(web=False)
+    return _worker_app
@@ -3,6 +3,7 @@ from flask_login import login_user, logout_user, login_required, current_user
 from ..extensions import login_manager
 from .forms import LoginForm
 from ..models.user import User
+from ..services.identity_cache import invalidate_identity, load_cached_user
 from ..utils.auth_utils import get_redirect_for_role
 
 auth_bp = Blueprint("auth", __name__)
@@ -11,7 +12,8 @@ auth_bp = Blueprint("auth", __name__)
 # Esta función es requerida por Flask-Login
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Se llama en cada request autenticado: usar el identity cache
+    return load_cached_user(int(user_id))
 
 @auth_bp.route("/login", methods=["GET", "POST"])
 def login():
@@ -36,6 +38,7 @@ def login():
             
             # Update last access
             user.update_last_access()
+            invalidate_identity(user.id)
             
             # Store user role in session
             session['user_role'] = user.rol
@@ -3,22 +3,14 @@ Celery configuration for the EDP MVP application.
 """
 import os
 from celery import Celery
+from celery.signals import worker_init
 
 def create_celery():
     """Create Celery instance with better error handling for production."""
     redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-    
-    # Test Redis connection
-    try:
-        import redis
-        r = redis.from_url(redis_url)
-        r.ping()
-        print("✅ Redis conectado correctamente")
-    except Exception as e:
-        print(f"⚠️ Redis no disponible para cache: {e}")
-        # En producción sin Redis, usar un broker en memoria (no recomendado para producción real)
-        # Render debería proporcionar Redis
-        
+
+    # Sin conexión al importar: la app web, la API y los scripts importan este
+    # módulo y Celery conecta al broker recién al usarlo
     return Celery(
         __name__,
         broker=redis_url,
@@ -54,27 +46,35 @@ celery.conf.update(
     event_queue_expires=60
 )
 
+# Los recálculos se programan al cambiar los datos (services/refresh_orchestrator);
+# el beat solo es red de seguridad y omite la tarea si no hubo cambios
+REFRESH_SAFETY_NET_SECONDS = int(os.getenv("REFRESH_SAFETY_NET_SECONDS", "3600"))
+
 # Beat schedule for periodic tasks
 celery.conf.beat_schedule = {
     "refresh-kpis": {
         "task": "edp_mvp.app.tasks.metrics.refresh_executive_kpis",
-        "schedule": 600,  # Every 10 minutes
+        "schedule": REFRESH_SAFETY_NET_SECONDS,
+    },
+    "refresh-all-kpis": {
+        "task": "edp_mvp.app.tasks.metrics.refresh_all_kpis",
+        "schedule": REFRESH_SAFETY_NET_SECONDS,
     },
     "refresh-kanban": {
         "task": "edp_mvp.app.tasks.metrics.refresh_kanban_metrics",
-        "schedule": 300,  # Every 5 minutes
+        "schedule": REFRESH_SAFETY_NET_SECONDS,
     },
     "refresh-cashflow": {
         "task": "edp_mvp.app.tasks.metrics.refresh_cashflow",
-        "schedule": 3600,  # Every hour
+        "schedule": REFRESH_SAFETY_NET_SECONDS,
     },
     "refresh-global-analytics": {
         "task": "edp_mvp.app.tasks.metrics.refresh_global_analytics",
-        "schedule": 900,  # Every 15 minutes
+        "schedule": REFRESH_SAFETY_NET_SECONDS,
     },
     "precompute-dashboards": {
         "task": "edp_mvp.app.tasks.metrics.precompute_dashboard_variants",
-        "schedule": 1800,  # Every 30 minutes
+        "schedule": REFRESH_SAFETY_NET_SECONDS,
     },
     "cleanup-cache": {
         "task": "edp_mvp.app.tasks.metrics.cleanup_stale_cache", 
@@ -108,5 +108,20 @@ celery.conf.beat_schedule = {
     },
 }
 
+@worker_init.connect
+def check_redis_on_worker_start(**kwargs):
+    """Verificar Redis al arrancar el worker (cliente compartido, pool por proceso)."""
+    from .utils.redis_client import ping_redis
+
+    if ping_redis():
+        print("✅ Redis conectado correctamente")
+    else:
+        print("⚠️ Redis no disponible para cache")
+
+# Duración de tareas para /metrics
+from .utils.instrumentation import connect_celery_signals
+
+connect_celery_signals()
+
 if __name__ == '__main__':
     celery.start() 
\ No newline at end of file
@@ -4,6 +4,7 @@ Configuration management for the EDP application.
 import os
 import json
 import tempfile
+import threading
 from typing import Dict, Any, Optional
 from dataclasses import dataclass
 from pathlib import Path
@@ -204,6 +205,9 @@ class EmailConfig:
     enable_weekly_summary: bool = True
     enable_payment_reminders: bool = True
     enable_system_alerts: bool = True
+    # Campañas como digest: un email con todos los EDPs por destinatario en
+    # lugar de un email (y un render) por EDP
+    digest_enabled: bool = True
     
     # Alert thresholds
     critical_edp_days: int = 60
@@ -227,6 +231,7 @@ class EmailConfig:
             enable_weekly_summary=os.getenv('ENABLE_WEEKLY_SUMMARY', 'True').lower() == 'true',
             enable_payment_reminders=os.getenv('ENABLE_PAYMENT_REMINDERS', 'True').lower() == 'true',
             enable_system_alerts=os.getenv('ENABLE_SYSTEM_ALERTS', 'True').lower() == 'true',
+            digest_enabled=os.getenv('EMAIL_DIGEST_ENABLED', 'True').lower() == 'true',
             critical_edp_days=int(os.getenv('CRITICAL_EDP_DAYS', '60')),
             payment_reminder_days=int(os.getenv('PAYMENT_REMINDER_DAYS', '30')),
             weekly_summary_day=os.getenv('WEEKLY_SUMMARY_DAY', 'monday')
@@ -296,13 +301,15 @@ class Config:
             self.GOOGLE_CREDENTIALS = "ENV_VARS"  # Siempre usar variables de entorno
             # Usar SHEET_ID de tu .env
             self.SHEET_ID = os.getenv('SHEET_ID', os.getenv('GOOGLE_SHEET_ID', ''))
-            
-            # Configurar servicio de Google Sheets desde aquí
-            self.GOOGLE_SERVICE = self._setup_google_service()
         else:
             print("🗄️ Usando Supabase como backend de datos")
-            self.GOOGLE_SERVICE = None
             self.SHEET_ID = ""
+
+        # El servicio de Google Sheets se construye en el primer uso
+        # (get_google_service): importar la configuración no toca la red
+        self._google_service = None
+        self._google_service_ready = False
+        self._google_service_lock = threading.Lock()
         
         self.SECRET_KEY = self.app.secret_key
         self.DEBUG = self.app.debug
@@ -373,12 +380,22 @@ class Config:
             'health_check_interval': 30
         }
     
+    def get_google_service(self):
+        """Servicio de Google Sheets (None con otro backend o sin credenciales)."""
+        if not self._google_service_ready:
+            with self._google_service_lock:
+                if not self._google_service_ready:
+                    if self.DATA_BACKEND == "google_sheets":
+                        self._google_service = self._setup_google_service()
+                    self._google_service_ready = True
+        return self._google_service
+
     def is_google_sheets_enabled(self) -> bool:
         """Supabase integration (migrated from Google Sheets)"""
         return (
             self.DATA_BACKEND == "google_sheets" and
-            self.GOOGLE_SERVICE is not None and 
-            bool(self.SHEET_ID)
+            bool(self.SHEET_ID) and
+            self.get_google_service() is not None
         )
     
     def is_supabase_enabled(self) -> bool:
@@ -3,10 +3,13 @@ from flask_login import LoginManager
 from flask_sqlalchemy import SQLAlchemy
 from flask_mail import Mail
 
-# Configurar SocketIO para usar threading mode (más compatible con servidores WSGI estándar)
+from .utils.concurrency import socketio_async_mode
+
+# SocketIO en el modo del worker: threading con workers sync, gevent/eventlet
+# cuando gunicorn_config.py aplicó el monkeypatch (SERVING_MODE)
 socketio = SocketIO(
     cors_allowed_origins="*",
-    async_mode='threading',  # Usar threading en lugar de eventlet
+    async_mode=socketio_async_mode(),
     logger=True,
     engineio_logger=True
 )
@@ -12,6 +12,7 @@ from ..models import Cost
 from ..utils.date_utils import parse_date_safe
 from ..utils.format_utils import clean_numeric_value
 from ..repositories.project_repository import ProjectRepository
+from ..services.cache_invalidation_service import invalidate_cache_on_change
 logger = logging.getLogger(__name__)
 
 
@@ -118,6 +119,7 @@ class CostRepository(BaseRepository):
 
         return self._dataframe_to_models(df)
 
+    @invalidate_cache_on_change('cost_updated', ['costs'])
     def create(self, cost: Cost) -> int:
         """Create new cost and return the assigned ID."""
         # Get next ID
@@ -133,6 +135,7 @@ class CostRepository(BaseRepository):
         else:
             raise Exception("Failed to create cost")
 
+    @invalidate_cache_on_change('cost_updated', ['costs'])
     def update(self, cost: Cost) -> bool:
         """Update existing cost."""
         if not cost.cost_id:
@@ -150,6 +153,7 @@ class CostRepository(BaseRepository):
         range_name = f"{self.sheet_name}!A{row_number}:{self._get_last_column(len(headers))}{row_number}"
         return self.sheets_repo._write_range(range_name, [row_values])
 
+    @invalidate_cache_on_change('cost_updated', ['costs'])
     def update_fields(self, cost_id: int, updates: Dict[str, Any]) -> bool:
         """Update specific fields of a cost."""
         # Find the row
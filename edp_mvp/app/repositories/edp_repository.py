@@ -100,6 +100,7 @@ class EDPRepository(BaseRepository):
 
         return self._dataframe_to_models(df)
 
+    @invalidate_cache_on_change('edp_created', ['edps'])
     def create(self, edp: EDP) -> int:
         """Create new EDP and return the assigned ID."""
         try:
@@ -145,6 +146,7 @@ class EDPRepository(BaseRepository):
             logger.error(f"Error creating EDP: {e}")
             raise Exception(f"Failed to create EDP: {e}")
     
+    @invalidate_cache_on_change('edp_created', ['edps'])
     def create_bulk(self, edps: List[EDP]) -> Dict[str, Any]:
         """Create multiple EDPs in bulk for better performance."""
         try:
@@ -0,0 +1,116 @@
+"""
+Repository for SQL-side KPI rollups (materialized views in Postgres).
+
+Las vistas se definen en utils/scripts/kpi_rollups.sql. Cada fila del rollup
+agrega EDPs por (jefe_proyecto, cliente, mes_emision, estado, aging_bucket),
+por lo que los KPIs ejecutivos se calculan sobre unas pocas centenas de filas
+en vez de la tabla edp completa.
+"""
+
+from typing import Any, Dict, Optional
+import logging
+import os
+
+import pandas as pd
+
+from . import BaseRepository
+from ..services.supabase_service import get_supabase_service
+
+logger = logging.getLogger(__name__)
+
+EDP_ROLLUP_VIEW = "kpi_edp_rollup"
+COST_MONTHLY_VIEW = "kpi_cost_monthly"
+REFRESH_FUNCTION = "rpc/refresh_kpi_rollups"
+
+EDP_ROLLUP_COLUMNS = [
+    "jefe_proyecto", "cliente", "mes_emision", "estado", "aging_bucket",
+    "edp_count", "monto_propuesto", "monto_aprobado", "dso_sum", "dso_count",
+]
+ROLLUP_NUMERIC_COLUMNS = ["edp_count", "monto_propuesto", "monto_aprobado", "dso_sum", "dso_count"]
+# Columnas del rollup que admiten filtro por igualdad
+ROLLUP_FILTER_COLUMNS = ("jefe_proyecto", "cliente", "mes_emision", "estado")
+
+
+def rollups_enabled() -> bool:
+    """El backend SQL es opcional: requiere haber ejecutado kpi_rollups.sql."""
+    return os.getenv("KPI_SQL_ROLLUPS_ENABLED", "false").lower() == "true"
+
+
+class KPIRepository(BaseRepository):
+    """Thin read/refresh access to the KPI materialized views."""
+
+    def get_edp_rollup(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Get the EDP rollup as DataFrame.
+
+        Args:
+            filters: igualdad por columna del rollup (jefe_proyecto, cliente, mes_emision,
+                     estado en minúsculas)
+        """
+        try:
+            rows = self._select(EDP_ROLLUP_VIEW, filters)
+            df = pd.DataFrame(rows, columns=EDP_ROLLUP_COLUMNS)
+            for col in ROLLUP_NUMERIC_COLUMNS:
+                df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+
+            return {
+                "success": True,
+                "data": df,
+                "message": f"Successfully retrieved {len(df)} KPI rollup rows",
+            }
+        except Exception as e:
+            logger.warning(f"KPI rollup no disponible: {e}")
+            return {
+                "success": False,
+                "data": pd.DataFrame(columns=EDP_ROLLUP_COLUMNS),
+                "message": f"Error retrieving KPI rollup: {str(e)}",
+            }
+
+    def get_cost_monthly(self) -> Dict[str, Any]:
+        """Get monthly net cost totals as a Series indexed by 'YYYY-MM'."""
+        try:
+            rows = self._select(COST_MONTHLY_VIEW)
+            df = pd.DataFrame(rows, columns=["mes", "cost_count", "importe_neto"])
+            df = df[df["mes"] != ""]
+            series = pd.to_numeric(df["importe_neto"], errors="coerce").fillna(0)
+            series.index = df["mes"]
+
+            return {
+                "success": True,
+                "data": series.sort_index(),
+                "message": f"Successfully retrieved {len(series)} cost months",
+            }
+        except Exception as e:
+            logger.warning(f"Rollup de costos no disponible: {e}")
+            return {
+                "success": False,
+                "data": pd.Series(dtype=float),
+                "message": f"Error retrieving cost rollup: {str(e)}",
+            }
+
+    def refresh(self) -> Dict[str, Any]:
+        """Refresh the materialized views concurrently (no bloquea lecturas)."""
+        try:
+            service = get_supabase_service()
+            response = service._make_request("POST", REFRESH_FUNCTION, data={})
+            service._clear_cache(EDP_ROLLUP_VIEW)
+            service._clear_cache(COST_MONTHLY_VIEW)
+
+            refreshed_at = response.json() if response.content else None
+            logger.info(f"✅ KPI rollups refrescados: {refreshed_at}")
+            return {
+                "success": True,
+                "data": {"refreshed_at": refreshed_at},
+                "message": "KPI rollups refreshed",
+            }
+        except Exception as e:
+            logger.error(f"Error refrescando KPI rollups: {e}")
+            return {
+                "success": False,
+                "data": None,
+                "message": f"Error refreshing KPI rollups: {str(e)}",
+            }
+
+    def _select(self, view: str, filters: Optional[Dict[str, Any]] = None):
+        # El cache de SupabaseService se limpia en refresh()
+        return get_supabase_service().select(view, filters=filters or None)
@@ -1,12 +1,18 @@
 """
 Log Repository for handling log entries data operations.
 """
-from typing import List, Optional, Dict, Any
+from typing import Iterator, List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
+import os
+import re
 from ..models import LogEntry
 from . import BaseRepository, SheetsRepository
 import pandas as pd
 
+EDP_LOG_TABLE = "edp_log"
+EDP_LOG_COLUMNS = ["id", "fecha_hora", "n_edp", "proyecto", "campo", "antes", "despues", "usuario"]
+EDP_LOG_BATCH_SIZE = int(os.getenv("EDP_LOG_BATCH_SIZE", "1000"))
+
 class LogRepository(BaseRepository):
     """Repository for managing log entries."""
     
@@ -75,6 +81,111 @@ class LogRepository(BaseRepository):
         #     df['campo'] = df['campo'].apply(lambda x: eval(x) if isinstance(x, str) else x)
         
         return df
+    def find_timeline_page(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        after: Optional[Tuple[str, int]] = None,
+        limit: int = 100,
+        columns: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        One page of edp_log, newest first, filtered and ordered in Postgres.
+
+        Args:
+            filters: n_edp, proyecto, usuario (sin distinguir mayúsculas) y
+                     desde / hasta (rango sobre fecha_hora, hasta exclusivo)
+            after: (fecha_hora, id) de la última fila de la página anterior
+            limit: filas de la página
+            columns: columnas a leer; id y fecha_hora se agregan siempre
+        """
+        try:
+            params = self._timeline_params(filters or {}, after, columns)
+            params["limit"] = limit
+            # Sin cache de SupabaseService: edp_log crece con cada edición y el
+            # cursor ya acota la consulta al índice (n_edp, fecha_hora, id)
+            rows = self._supabase()._make_request("GET", EDP_LOG_TABLE, params=params).json()
+            return {
+                'success': True,
+                'data': rows,
+                'message': f"Successfully retrieved {len(rows)} log entries",
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'data': [],
+                'message': f"Error retrieving log timeline: {str(e)}",
+            }
+
+    def iter_timeline(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        columns: Optional[List[str]] = None,
+        batch_size: int = EDP_LOG_BATCH_SIZE,
+    ) -> Iterator[Dict[str, Any]]:
+        """Todas las filas del log filtrado, newest first, leídas por páginas."""
+        after = None
+        while True:
+            response = self.find_timeline_page(filters, after, batch_size, columns)
+            if not response['success']:
+                raise RuntimeError(response['message'])
+            rows = response['data']
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            after = (rows[-1]['fecha_hora'], rows[-1]['id'])
+
+    @staticmethod
+    def _supabase():
+        from ..services.supabase_service import get_supabase_service
+        return get_supabase_service()
+
+    @staticmethod
+    def _timeline_params(
+        filters: Dict[str, Any],
+        after: Optional[Tuple[str, int]],
+        columns: Optional[List[str]],
+    ) -> Dict[str, str]:
+        selected = list(dict.fromkeys(["id", "fecha_hora"] + list(columns or EDP_LOG_COLUMNS)))
+        params = {
+            "select": ",".join(selected),
+            "order": "fecha_hora.desc.nullslast,id.desc",
+        }
+
+        n_edp = filters.get("n_edp")
+        if n_edp not in (None, ""):
+            params["n_edp"] = f"eq.{n_edp}"
+        if filters.get("proyecto"):
+            params["proyecto"] = f"eq.{filters['proyecto']}"
+        if filters.get("usuario"):
+            # Coincidencia exacta sin distinguir mayúsculas: % y _ son literales
+            usuario = re.sub(r"([\\%_])", r"\\\1", str(filters["usuario"]))
+            params["usuario"] = f"ilike.{usuario}"
+
+        condiciones = []
+        if filters.get("desde"):
+            condiciones.append(f'fecha_hora.gte."{pd.to_datetime(filters["desde"]).isoformat()}"')
+        if filters.get("hasta"):
+            condiciones.append(f'fecha_hora.lt."{pd.to_datetime(filters["hasta"]).isoformat()}"')
+
+        # Keyset sobre (fecha_hora desc nulls last, id desc): las filas sin
+        # fecha van después de todas las fechadas, ordenadas por id
+        if after is not None:
+            fecha, log_id = after
+            log_id = int(log_id)
+            if fecha is None:
+                condiciones.extend(["fecha_hora.is.null", f"id.lt.{log_id}"])
+            else:
+                fecha = pd.to_datetime(fecha, utc=True).isoformat()
+                params["or"] = (
+                    f'(fecha_hora.lt."{fecha}",'
+                    f'and(fecha_hora.eq."{fecha}",id.lt.{log_id}),'
+                    f'fecha_hora.is.null)'
+                )
+
+        if condiciones:
+            params["and"] = f"({','.join(condiciones)})"
+        return params
+
     def find_by_edp_id(self, edp_id: str) -> List[LogEntry]:
         """Get all log entries for a specific EDP."""
         try:
@@ -1,6 +1,10 @@
 """
 Repository for Project Manager (Jefe de Proyecto) data operations.
 Handles data access for project manager specific functions.
+
+Los métodos de métricas aceptan un `df` opcional con los EDPs del jefe de
+proyecto (ver get_manager_frame) para que el dashboard lea y filtre la tabla
+una sola vez; sin `df` cargan los EDPs del jefe como antes.
 """
 
 from typing import Dict, List, Any, Optional
@@ -8,6 +12,7 @@ from datetime import datetime, timedelta
 from ..repositories.cost_repository import CostRepository
 from ..repositories.edp_repository import EDPRepository
 from ..repositories.project_repository import ProjectRepository
+from ..services.related_data import find_all_dataframe_memoized
 from ..utils.date_utils import DateUtils
 import pandas as pd
 import logging
@@ -16,6 +21,19 @@ from ..utils.supabase_adapter import update_row, log_cambio_edp
 
 logger = logging.getLogger(__name__)
 
+ESTADOS_PAGADOS = ["pagado", "validado"]
+
+
+def _estado_normalizado(df: pd.DataFrame) -> pd.Series:
+    return df["estado"].astype(str).str.lower()
+
+
+def _fechas(df: pd.DataFrame, column: str) -> pd.Series:
+    if column not in df.columns:
+        return pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+    return pd.to_datetime(df[column], errors="coerce")
+
+
 class ProjectManagerRepository:
     """Repository for project manager data operations."""
 
@@ -24,6 +42,25 @@ class ProjectManagerRepository:
         self.project_repo = ProjectRepository()
         self.cost_repo = CostRepository()
 
+    def get_manager_frame(self, manager_name: str) -> pd.DataFrame:
+        """
+        EDPs del jefe de proyecto como DataFrame: una lectura de la tabla
+        (memorizada por request) y un solo filtro.
+        """
+        response = find_all_dataframe_memoized("edps", self.edp_repo)
+        if not response.get("success", False):
+            raise RuntimeError(response.get("message", "Error cargando EDPs"))
+        df = response.get("data", pd.DataFrame())
+        if df.empty or "jefe_proyecto" not in df.columns:
+            return pd.DataFrame()
+        return df[df["jefe_proyecto"] == manager_name].reset_index(drop=True)
+
+    def _frame_or_load(self, manager_name: str, df: Optional[pd.DataFrame]) -> pd.DataFrame:
+        # Copia: los métodos agregan columnas auxiliares
+        if df is not None:
+            return df.copy()
+        return pd.DataFrame(self.get_manager_projects(manager_name))
+
     def get_manager_projects(self, manager_name: str) -> List[Dict[str, Any]]:
         """Obtiene todos los proyectos únicos asignados a un jefe de proyecto."""
         try:
@@ -41,12 +78,10 @@ class ProjectManagerRepository:
         except Exception as e:
             logger.error(f"Error getting manager edps for {manager_name}: {str(e)}")
     
-    def get_manager_summary(self, manager_name: str) -> Dict[str, Any]:
+    def get_manager_summary(self, manager_name: str, df: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
         """Get summary statistics for a project manager."""
         try:
-            proyectos = self.get_manager_projects(manager_name)
-            df = pd.DataFrame(proyectos)
-            print(f"DEBUG: {df}")
+            df = self._frame_or_load(manager_name, df)
             if df.empty:
                 return {
                     'total_projects': 0,
@@ -65,10 +100,7 @@ class ProjectManagerRepository:
                 df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
             if "estado" not in df.columns:
                 df["estado"] = ""
-            df["monto_pagado"] = df.apply(
-                lambda row: row["monto_aprobado"] if str(row["estado"]).lower() in ["pagado"] else 0, axis=1
-            )
-            # CLEAN NAN VALUES
+            df["monto_pagado"] = df["monto_aprobado"].where(_estado_normalizado(df) == "pagado", 0)
             
             total_projects = df['proyecto'].nunique() if 'proyecto' in df.columns else 0
             total_edps = len(df)
@@ -77,7 +109,6 @@ class ProjectManagerRepository:
             total_paid = df['monto_pagado'].sum()
             pending_amount = total_approved - total_paid
             avg_days = df['dso_actual'].mean() if 'dso_actual' in df.columns else 0
-            print(f"DEBUG: {round(float(avg_days), 1)}")
             completion_rate = (total_paid / total_approved * 100) if total_approved > 0 else 0
 
             return {
@@ -95,11 +126,10 @@ class ProjectManagerRepository:
             logger.error(f"Error getting manager summary for {manager_name}: {str(e)}")
             return {}
 
-    def get_projects_by_status(self, manager_name: str) -> Dict[str, List[Dict]]:
+    def get_projects_by_status(self, manager_name: str, df: Optional[pd.DataFrame] = None) -> Dict[str, List[Dict]]:
         """Get projects grouped by status for a project manager."""
         try:
-            proyectos = self.get_manager_projects(manager_name)
-            df = pd.DataFrame(proyectos)
+            df = self._frame_or_load(manager_name, df)
             
             status_groups = {
                 'pending': [],      # Proyectos con EDPs pendientes/en revisión
@@ -181,11 +211,10 @@ class ProjectManagerRepository:
             logger.error(traceback.format_exc())
             return {'pending': [], 'in_progress': [], 'completed': [], 'overdue': []}
 
-    def get_financial_metrics(self, manager_name: str) -> Dict[str, Any]:
+    def get_financial_metrics(self, manager_name: str, df: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
         """Get financial metrics for a project manager."""
         try:
-            proyectos = self.get_manager_projects(manager_name)
-            df = pd.DataFrame(proyectos)
+            df = self._frame_or_load(manager_name, df)
             if df.empty:
                 return {
                     'monthly_target': 0,
@@ -201,32 +230,23 @@ class ProjectManagerRepository:
             if "estado" not in df.columns:
                 df["estado"] = ""
             # Calcular monto_pagado si no existe
-            if 'monto_pagado' not in df.columns or df['monto_pagado'].sum() == 0:
-                df["monto_pagado"] = df.apply(
-                    lambda row: row["monto_aprobado"] if str(row["estado"]).lower() in ["pagado", "validado"] else 0, axis=1
+            if df['monto_pagado'].sum() == 0:
+                df["monto_pagado"] = df["monto_aprobado"].where(
+                    _estado_normalizado(df).isin(ESTADOS_PAGADOS), 0
                 )
             total_approved = df['monto_aprobado'].sum()
             monthly_target = 250_000_000
-            current_month = datetime.now().month
-            current_year = datetime.now().year
+            now = datetime.now()
             current_month_collected = 0
+            payment_velocity = 0
             if 'fecha_pago' in df.columns:
-                for _, edp in df.iterrows():
-                    fecha_pago = edp.get('fecha_envio_conformidad')
-                    if pd.notnull(fecha_pago) and hasattr(fecha_pago, 'month'):
-                        if fecha_pago.month == current_month and fecha_pago.year == current_year:
-                            current_month_collected += edp.get('monto_pagado', 0)
+                fecha_conformidad = _fechas(df, 'fecha_envio_conformidad')
+                mes_actual = (fecha_conformidad.dt.month == now.month) & (fecha_conformidad.dt.year == now.year)
+                current_month_collected = df.loc[mes_actual, 'monto_pagado'].sum()
+                if 'fecha_emision' in df.columns:
+                    payment_days = (fecha_conformidad - _fechas(df, 'fecha_emision')).dt.days.dropna()
+                    payment_velocity = payment_days.mean() if not payment_days.empty else 0
             target_achievement = (current_month_collected / monthly_target * 100) if monthly_target > 0 else 0
-            # Payment velocity
-            payment_days = []
-            if 'fecha_emision' in df.columns and 'fecha_pago' in df.columns:
-                for _, edp in df.iterrows():
-                    fecha_creacion = edp.get('fecha_emision')
-                    fecha_pago = edp.get('fecha_envio_conformidad')
-                    if pd.notnull(fecha_creacion) and pd.notnull(fecha_pago):
-                        days = (fecha_pago - fecha_creacion).days
-                        payment_days.append(days)
-            payment_velocity = sum(payment_days) / len(payment_days) if payment_days else 0
             return {
                 'monthly_target': float(monthly_target),
                 'current_month_collected': float(current_month_collected),
@@ -279,40 +299,46 @@ class ProjectManagerRepository:
             logger.error(f"Error getting project details for {project_name}: {str(e)}")
             return {}
 
-    def get_team_performance(self, manager_name: str) -> Dict[str, Any]:
+    def get_team_performance(self, manager_name: str, df: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
         """Get performance metrics for the project manager's team."""
         try:
-            proyectos = self.get_manager_projects(manager_name)
-            df = pd.DataFrame(proyectos)
+            df = self._frame_or_load(manager_name, df)
             if df.empty:
                 return {}
             if 'encargado' not in df.columns:
                 return {}
-            team_members = set(df['encargado'].dropna().unique()) - {manager_name}
-            team_performance = {}
-            for member in team_members:
-                member_edps = df[df['encargado'] == member]
-                total_handled = len(member_edps)
-                total_amount = member_edps['monto_aprobado'].sum() if 'monto_aprobado' in member_edps.columns else 0
-                processing_times = []
-                if 'fecha_emision' in member_edps.columns and 'fecha_pago' in member_edps.columns:
-                    for _, edp in member_edps.iterrows():
-                        fecha_creacion = edp.get('fecha_emision')
-                        fecha_pago = edp.get('fecha_pago')
-                        if pd.notnull(fecha_creacion):
-                            if pd.notnull(fecha_pago):
-                                days = (fecha_pago - fecha_creacion).days
-                            else:
-                                days = (datetime.now() - fecha_creacion).days
-                            processing_times.append(days)
-                avg_processing = sum(processing_times) / len(processing_times) if processing_times else 0
-                team_performance[member] = {
-                    'total_edps': total_handled,
-                    'total_amount': float(total_amount),
-                    'avg_processing_days': round(avg_processing, 1),
-                    'efficiency_score': max(0, 100 - (avg_processing - 30) * 2)  # Penalty after 30 days
+            df = df[df['encargado'].notna() & (df['encargado'] != manager_name)]
+            if df.empty:
+                return {}
+            df['monto_aprobado'] = pd.to_numeric(
+                df['monto_aprobado'] if 'monto_aprobado' in df.columns else 0, errors='coerce'
+            )
+            if 'fecha_emision' in df.columns and 'fecha_pago' in df.columns:
+                # Sin fecha de pago se mide hasta hoy
+                fecha_emision = _fechas(df, 'fecha_emision')
+                fecha_fin = _fechas(df, 'fecha_pago').fillna(pd.Timestamp(datetime.now()))
+                df['processing_days'] = (fecha_fin - fecha_emision).dt.days
+            else:
+                df['processing_days'] = float('nan')
+
+            grouped = df.groupby('encargado').agg(
+                total_edps=('encargado', 'size'),
+                total_amount=('monto_aprobado', 'sum'),
+                avg_processing=('processing_days', 'mean'),
+            )
+            grouped['avg_processing'] = grouped['avg_processing'].fillna(0)
+            # Penalty after 30 days
+            grouped['efficiency_score'] = (100 - (grouped['avg_processing'] - 30) * 2).clip(lower=0)
+
+            return {
+                member: {
+                    'total_edps': int(row.total_edps),
+                    'total_amount': float(row.total_amount),
+                    'avg_processing_days': round(float(row.avg_processing), 1),
+                    'efficiency_score': float(row.efficiency_score)
                 }
-            return team_performance
+                for member, row in grouped.iterrows()
+            }
         except Exception as e:
             logger.error(f"Error getting team performance for {manager_name}: {str(e)}")
             return {}
@@ -326,15 +352,13 @@ class ProjectManagerRepository:
             logger.error(f"Error getting projects cost for {manager_name}: {str(e)}")
             return 0.0
 
-    def get_pending_edps_for_validation(self, manager_name: str) -> List[Dict[str, Any]]:
+    def get_pending_edps_for_validation(self, manager_name: str, df: Optional[pd.DataFrame] = None) -> List[Dict[str, Any]]:
         """
         Obtiene EDPs que están pendientes de validación (estados: enviado, revisión).
         Estos son EDPs que requieren seguimiento activo del jefe de proyecto.
         """
         try:
-            # Obtener todos los EDPs del manager
-            proyectos = self.get_manager_projects(manager_name)
-            df = pd.DataFrame(proyectos)
+            df = self._frame_or_load(manager_name, df)
             
             if df.empty:
                 return []
@@ -347,48 +371,33 @@ class ProjectManagerRepository:
                 return []
             
             # Filtrar EDPs pendientes de validación
-            pending_edps = df[df['estado'].str.lower().isin(pending_states)]
+            pending_edps = df[_estado_normalizado(df).isin(pending_states)].copy()
             
             if pending_edps.empty:
                 return []
             
-            # Preparar datos para el template
+            # Días pendientes: desde fecha_envio_cliente, si no desde
+            # fecha_emision y, en último caso, dias_espera ya calculado
+            now = pd.Timestamp(datetime.now())
+            dias_pendiente = (now - _fechas(pending_edps, 'fecha_envio_cliente')).dt.days
+            dias_pendiente = dias_pendiente.fillna((now - _fechas(pending_edps, 'fecha_emision')).dt.days)
+            if 'dias_espera' in pending_edps.columns:
+                dias_pendiente = dias_pendiente.fillna(
+                    pd.to_numeric(pending_edps['dias_espera'], errors='coerce')
+                )
+            pending_edps['_dias_pendiente'] = dias_pendiente.fillna(0).astype(int)
+            pending_edps['_monto'] = pd.to_numeric(
+                pending_edps['monto_aprobado'] if 'monto_aprobado' in pending_edps.columns else 0,
+                errors='coerce'
+            ).fillna(0).astype(float)
+
+            # Ordenar por días pendientes (más urgentes primero)
+            pending_edps = pending_edps.sort_values('_dias_pendiente', ascending=False, kind='stable')
+
+            # Preparar datos para el template usando nombres de columnas correctos
             result = []
-            for _, edp in pending_edps.iterrows():
-                # Calcular días pendientes usando las fechas correctas
-                dias_pendiente = 0
-                
-                # Prioridad 1: Si hay fecha_envio_cliente, calcular desde esa fecha
-                if 'fecha_envio_cliente' in edp and pd.notnull(edp['fecha_envio_cliente']):
-                    try:
-                        fecha_envio = pd.to_datetime(edp['fecha_envio_cliente'])
-                        dias_pendiente = (datetime.now() - fecha_envio).days
-                    except:
-                        pass
-                # Prioridad 2: Si no, usar fecha_emision
-                elif 'fecha_emision' in edp and pd.notnull(edp['fecha_emision']):
-                    try:
-                        fecha_emision = pd.to_datetime(edp['fecha_emision'])
-                        dias_pendiente = (datetime.now() - fecha_emision).days
-                    except:
-                        pass
-                # Prioridad 3: Si hay dias_espera calculado, usarlo
-                elif 'dias_espera' in edp and pd.notnull(edp['dias_espera']):
-                    try:
-                        dias_pendiente = int(float(edp['dias_espera']))
-                    except:
-                        pass
-                
-                # Obtener monto aprobado
-                monto = 0
-                if 'monto_aprobado' in edp and pd.notnull(edp['monto_aprobado']):
-                    try:
-                        monto = float(edp['monto_aprobado'])
-                    except:
-                        pass
-                
-                # Preparar datos del EDP usando nombres de columnas correctos
-                edp_data = {
+            for edp in pending_edps.to_dict(orient='records'):
+                result.append({
                     'id': edp.get('n_edp', ''),
                     'codigo': edp.get('n_edp', ''),
                     'numero': edp.get('n_edp', ''),
@@ -401,18 +410,13 @@ class ProjectManagerRepository:
                     'gestor_nombre': edp.get('gestor', ''),
                     'gestor': edp.get('gestor', ''),
                     'gestor_email': '',  # No disponible en la estructura actual
-                    'monto': monto,
-                    'dias_pendiente': dias_pendiente,
+                    'monto': edp['_monto'],
+                    'dias_pendiente': edp['_dias_pendiente'],
                     'estado': edp.get('estado', ''),
                     'estado_detallado': edp.get('estado_detallado', ''),
-                    'fecha_creacion': edp.get('fecha_emision') if 'fecha_emision' in edp else None,
-                    'fecha_envio_cliente': edp.get('fecha_envio_cliente') if 'fecha_envio_cliente' in edp else None
-                }
-                
-                result.append(edp_data)
-            
-            # Ordenar por días pendientes (más urgentes primero)
-            result.sort(key=lambda x: x['dias_pendiente'], reverse=True)
+                    'fecha_creacion': edp.get('fecha_emision'),
+                    'fecha_envio_cliente': edp.get('fecha_envio_cliente')
+                })
             
             logger.info(f"Found {len(result)} pending EDPs for validation for manager {manager_name}")
             return result
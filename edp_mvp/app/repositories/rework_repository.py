@@ -0,0 +1,103 @@
+"""
+Repository for the rework (re-trabajo) event store.
+
+La tabla edp_rework_events se define en utils/scripts/rework_events.sql y se
+mantiene con un trigger sobre edp_log: cada solicitud de re-trabajo queda como
+una fila con los datos del EDP ya unidos. Los filtros de la vista de
+re-trabajos (fechas, encargado, cliente, mes, tipo de falla) se aplican en
+Postgres usando los índices de la tabla, así que el costo depende del número
+de re-trabajos filtrados y no del tamaño del log.
+"""
+
+from typing import Any, Dict, List, Optional
+import logging
+import os
+
+import pandas as pd
+
+from . import BaseRepository
+from ..services.supabase_service import get_supabase_service
+
+logger = logging.getLogger(__name__)
+
+REWORK_EVENTS_TABLE = "edp_rework_events"
+REWORK_PAGE_SIZE = int(os.getenv("REWORK_STORE_PAGE_SIZE", "1000"))
+
+REWORK_EVENT_COLUMNS = [
+    "fecha_hora", "n_edp", "proyecto", "jefe_proyecto", "cliente", "mes",
+    "tipo_falla", "motivo", "monto", "estado_anterior", "usuario",
+]
+# Filtros de igualdad que se delegan a Postgres (columna de la vista -> tabla)
+REWORK_EQUALITY_FILTERS = ("jefe_proyecto", "cliente", "mes", "tipo_falla")
+
+
+def rework_store_enabled() -> bool:
+    """El almacén es opcional: requiere haber ejecutado rework_events.sql."""
+    return os.getenv("REWORK_STORE_ENABLED", "false").lower() == "true"
+
+
+class ReworkRepository(BaseRepository):
+    """Filtered reads over the pre-joined rework event table."""
+
+    def find_events(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Get rework events as DataFrame, filtered server-side.
+
+        Args:
+            filters: fecha_inicio / fecha_fin (rango sobre fecha_hora) e igualdad
+                     por jefe_proyecto, cliente, mes y tipo_falla
+        """
+        try:
+            rows = self._fetch_all(self._build_params(filters or {}))
+            df = pd.DataFrame(rows, columns=REWORK_EVENT_COLUMNS)
+            df["fecha_hora"] = pd.to_datetime(df["fecha_hora"], errors="coerce")
+            df["monto"] = pd.to_numeric(df["monto"], errors="coerce").fillna(0)
+            df["n_edp"] = df["n_edp"].astype(str)
+
+            return {
+                "success": True,
+                "data": df,
+                "message": f"Successfully retrieved {len(df)} rework events",
+            }
+        except Exception as e:
+            logger.warning(f"Almacén de re-trabajos no disponible: {e}")
+            return {
+                "success": False,
+                "data": pd.DataFrame(columns=REWORK_EVENT_COLUMNS),
+                "message": f"Error retrieving rework events: {str(e)}",
+            }
+
+    def _build_params(self, filters: Dict[str, Any]) -> Dict[str, str]:
+        params = {
+            "select": ",".join(REWORK_EVENT_COLUMNS),
+            "order": "fecha_hora.asc,id.asc",
+        }
+
+        # Ambos extremos del rango sobre la misma columna van en un and=(...)
+        rango = []
+        if filters.get("fecha_inicio"):
+            rango.append(f"fecha_hora.gte.{pd.to_datetime(filters['fecha_inicio']).isoformat()}")
+        if filters.get("fecha_fin"):
+            rango.append(f"fecha_hora.lte.{pd.to_datetime(filters['fecha_fin']).isoformat()}")
+        if rango:
+            params["and"] = f"({','.join(rango)})"
+
+        for column in REWORK_EQUALITY_FILTERS:
+            value = filters.get(column)
+            if value:
+                params[column] = f"eq.{value}"
+        return params
+
+    def _fetch_all(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        # Sin cache de SupabaseService: las filas las inserta el trigger de
+        # edp_log, por lo que el cache por tabla no se invalidaría
+        service = get_supabase_service()
+        rows: List[Dict[str, Any]] = []
+        offset = 0
+        while True:
+            page_params = dict(params, limit=REWORK_PAGE_SIZE, offset=offset)
+            page = service._make_request("GET", REWORK_EVENTS_TABLE, params=page_params).json()
+            rows.extend(page)
+            if len(page) < REWORK_PAGE_SIZE:
+                return rows
+            offset += REWORK_PAGE_SIZE
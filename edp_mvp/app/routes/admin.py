@@ -4,6 +4,7 @@ from functools import wraps
 from datetime import datetime
 from ..models.user import User
 from ..extensions import db
+from ..services.identity_cache import invalidate_identity
 
 # Create admin blueprint
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
@@ -170,6 +171,9 @@ def editar_usuario(user_id):
         
         # Update user information with email
         success, message = user.update_user_info(nombre_completo, username, email if email else None, rol, jefe_asignado if jefe_asignado else None)
+        if success:
+            # Rol, jefe asignado o datos cambiaron: descartar la identidad cacheada
+            invalidate_identity(user.id)
         
         if not success:
             flash(message, 'error')
@@ -213,8 +217,8 @@ def desactivar_usuario(user_id):
             return jsonify({'success': False, 'message': 'El usuario ya está desactivado'}), 400
         
         success, message = user.deactivate()
-        
         if success:
+            invalidate_identity(user.id)
             return jsonify({'success': True, 'message': message}), 200
         else:
             return jsonify({'success': False, 'message': message}), 500
@@ -235,6 +239,8 @@ def desactivar_usuario(user_id):
             return redirect(url_for('admin.usuarios'))
         
         success, message = user.deactivate()
+        if success:
+            invalidate_identity(user.id)
         flash(message, 'success' if success else 'error')
         
         return redirect(url_for('admin.usuarios'))
@@ -254,8 +260,8 @@ def activar_usuario(user_id):
             return jsonify({'success': False, 'message': 'El usuario ya está activo'}), 400
         
         success, message = user.activate()
-        
         if success:
+            invalidate_identity(user.id)
             return jsonify({'success': True, 'message': message}), 200
         else:
             return jsonify({'success': False, 'message': message}), 500
@@ -271,6 +277,8 @@ def activar_usuario(user_id):
             return redirect(url_for('admin.usuarios'))
         
         success, message = user.activate()
+        if success:
+            invalidate_identity(user.id)
         flash(message, 'success' if success else 'error')
         
         return redirect(url_for('admin.usuarios'))
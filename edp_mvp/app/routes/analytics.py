@@ -275,11 +275,13 @@ def vista_kanban_optimizada():
                                  registros=[], columnas={}, estadisticas={})
 
         datos_relacionados = datos_response.data
-        df_edp_raw = pd.DataFrame(datos_relacionados.get("edps", []))
-        df_log_raw = pd.DataFrame(datos_relacionados.get("logs", []))
+        df_edp_raw = datos_relacionados.frame("edps")
+        df_log_raw = datos_relacionados.frame("logs")
         
         # ===== OBTENER DATOS KANBAN (RÁPIDO) =====
-        kanban_response = kanban_service.get_kanban_board_data(df_edp_raw, filters)
+        kanban_response = kanban_service.get_kanban_board_data(
+            df_edp_raw, filters, cache_board=True
+        )
         kanban_data = kanban_response.data if kanban_response.success else {}
         
         # ===== OBTENER DASHBOARD RÁPIDO =====
@@ -289,6 +291,7 @@ def vista_kanban_optimizada():
         template_context = {
             # Datos del Kanban
             "columnas": kanban_data.get("columnas", {}),
+            "columnas_resumen": kanban_data.get("columnas_resumen", {}),
             "estadisticas": kanban_data.get("estadisticas", {}),
             
             # Datos rápidos del dashboard
@@ -366,8 +369,8 @@ def get_full_dashboard_data():
             return jsonify({"success": False, "error": "Error cargando datos"}), 500
         
         datos_relacionados = datos_response.data
-        df_edp_raw = pd.DataFrame(datos_relacionados.get("edps", []))
-        df_log_raw = pd.DataFrame(datos_relacionados.get("logs", []))
+        df_edp_raw = datos_relacionados.frame("edps")
+        df_log_raw = datos_relacionados.frame("logs")
         
         # Obtener dashboard completo (función original)
         full_dashboard_data = get_full_dashboard_data_sync(df_edp_raw, df_log_raw, filters)
@@ -15,9 +15,13 @@ import pandas as pd
 from ..services.dashboard_service import ControllerService
 from ..services.manager_service import ManagerService
 from ..services.control_panel_service import KanbanService
+from ..services.kanban_engine import (
+    KANBAN_ESTADOS, KANBAN_FILTER_KEYS, KANBAN_MAX_PAGE_SIZE, KANBAN_PAGE_SIZE
+)
 from ..services.project_service import ProjectManagerService
 from ..utils.auth_utils import require_controller_or_above, require_project_manager_or_above
 from ..utils.format_utils import FormatUtils
+from ..utils.http_cache import conditional_json
 from ..utils.supabase_adapter import update_row, log_cambio_edp
 
 # Create blueprint
@@ -143,11 +147,13 @@ def vista_kanban():
         logger.info(f"Datos cargados: {len(datos_relacionados.get('edps', []))} EDPs")
 
         # Extract raw DataFrames
-        df_edp_raw = pd.DataFrame(datos_relacionados.get("edps", []))
-        df_log_raw = pd.DataFrame(datos_relacionados.get("logs", []))
+        df_edp_raw = datos_relacionados.frame("edps")
+        df_log_raw = datos_relacionados.frame("logs")
 
         # ===== OBTENER DATOS DEL KANBAN =====
-        kanban_response = kanban_service.get_kanban_board_data(df_edp_raw, filters)
+        kanban_response = kanban_service.get_kanban_board_data(
+            df_edp_raw, filters, cache_board=True
+        )
         
         if not kanban_response.success:
             logger.error(f"Error en kanban service: {kanban_response.message}")
@@ -172,6 +178,7 @@ def vista_kanban():
         template_context = {
             # Datos del Kanban
             "columnas": kanban_data.get("columnas", {}),
+            "columnas_resumen": kanban_data.get("columnas_resumen", {}),
             "estadisticas": kanban_data.get("estadisticas", {}),
             
             # Datos para la tabla
@@ -286,7 +293,7 @@ def _procesar_actualizacion_estado(edp_id: str, nuevo_estado: str, conformidad:
         # Obtener proyecto por id del edp
         controller_service = ControllerService()
         df = controller_service.load_related_data().data
-        df_edps = pd.DataFrame(df.get("edps", []))
+        df_edps = df.frame("edps")
         if not proyecto:
             proyecto = df_edps[df_edps["n_edp"] == edp_id]["proyecto"].values[0] if not df_edps[df_edps["n_edp"] == edp_id].empty else None
       
@@ -427,7 +434,7 @@ def _procesar_actualizacion_estado_by_id(internal_id: int, edp_id: str, nuevo_es
                 # Obtener valores anteriores del EDP usando el ID interno
                 controller_service = ControllerService()
                 df = controller_service.load_related_data().data
-                df_edps = pd.DataFrame(df.get("edps", []))
+                df_edps = df.frame("edps")
                 edp_anterior = df_edps[df_edps["id"] == internal_id]
                 
                 valores_anteriores = {}
@@ -514,8 +521,58 @@ def _procesar_actualizacion_estado_by_id(internal_id: int, edp_id: str, nuevo_es
         logger.error(f"💥 Excepción en _procesar_actualizacion_estado_by_id: {exc}")
         logger.error(traceback.format_exc())
 
+def _load_edps_frame() -> pd.DataFrame:
+    """Frame completo de EDPs, para reconstruir el tablero si no está en cache."""
+    datos_response = controller_service.load_related_data()
+    if not datos_response.success:
+        raise RuntimeError(datos_response.message)
+    return datos_response.data.frame("edps")
+
+@control_panel_bp.route('/api/kanban/column/<estado>')
+@login_required
+@require_project_manager_or_above
+@conditional_json()
+def kanban_column_page(estado):
+    """Siguiente página de tarjetas de una columna del Kanban (scroll)."""
+    try:
+        if _get_user_access_level() == 'none':
+            return jsonify({"success": False, "message": "Sin permisos"}), 403
+        if estado not in KANBAN_ESTADOS:
+            return jsonify({"success": False, "message": f"Estado inválido: {estado}"}), 400
+
+        filters = {key: request.args.get(key, '') for key in KANBAN_FILTER_KEYS}
+        filters['mostrar_validados_antiguos'] = request.args.get('mostrar_validados_antiguos', 'false') == 'true'
+        filters = _apply_role_based_filters(filters)
+
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        limit = max(1, min(request.args.get('limit', KANBAN_PAGE_SIZE, type=int), KANBAN_MAX_PAGE_SIZE))
+
+        response = kanban_service.get_kanban_column_page(
+            estado, filters, offset, limit, load_edps=_load_edps_frame
+        )
+        if not response.success:
+            return jsonify({"success": False, "message": response.message}), 500
+
+        page = response.data
+        html = render_template('controller/kanban_cards.html', edps=page['cards'], estado=estado)
+        return jsonify({
+            "success": True,
+            "html": html,
+            "estado": estado,
+            "count": len(page['cards']),
+            "next_offset": page['next_offset'],
+            "has_more": page['has_more'],
+            "total": page['total'],
+            "resumen": page['resumen'],
+        })
+
+    except Exception as e:
+        logger.error(f"Error cargando página de la columna {estado}: {str(e)}")
+        return jsonify({"success": False, "message": str(e)}), 500
+
 @control_panel_bp.route('/api/get-edp/<edp_id>')
 @login_required
+@conditional_json()
 def get_edp_data(edp_id):
     """Obtener datos de un EDP específico con control de acceso."""
     try:
@@ -530,7 +587,7 @@ def get_edp_data(edp_id):
             return jsonify({"error": "Error cargando datos"}), 500
             
         datos_relacionados = datos_response.data
-        df_edp = pd.DataFrame(datos_relacionados.get("edps", []))
+        df_edp = datos_relacionados.frame("edps")
         
         if not df_edp.empty:
             edp_row = df_edp[df_edp['n_edp'].astype(str) == str(edp_id)]
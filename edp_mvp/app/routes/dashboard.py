@@ -13,6 +13,8 @@ from flask import(
     jsonify,
     session,
     make_response,
+    Response,
+    stream_with_context,
 )
 from flask_login import login_required, current_user
 
@@ -28,10 +30,17 @@ from ..services.analytics_service import AnalyticsService
 from ..services.edp_service import EDPService
 from ..services.dashboard_service import ControllerService
 from ..services.kpi_service import KPIService
+from ..services.edp_log_service import (
+    EDP_LOG_PAGE_SIZE,
+    EDPLogService,
+    agrupar_por_fecha,
+)
 from ..utils.validation_utils import ValidationUtils
 from ..utils.format_utils import FormatUtils
 from ..utils.date_utils import DateUtils
-from ..utils.supabase_adapter import update_row, log_cambio_edp, read_log
+from ..utils.instrumentation import record_cache
+from ..utils.json_serialization import fast_jsonify
+from ..utils.supabase_adapter import update_row, log_cambio_edp
 from ..extensions import socketio
 import pandas as pd
 import traceback
@@ -174,6 +183,7 @@ analytics_service = AnalyticsService()
 edp_service = EDPService()
 controller_service = ControllerService()
 kpi_service = KPIService()
+edp_log_service = EDPLogService()
 
 
 def _transform_managers_data_for_template(managers_data: Dict) -> Dict:
@@ -395,8 +405,8 @@ def dashboard_controller():
       
 
         # Extract raw DataFrames
-        df_edp_raw = pd.DataFrame(datos_relacionados.get("edps", []))
-        df_log_raw = pd.DataFrame(datos_relacionados.get("logs", []))
+        df_edp_raw = datos_relacionados.frame("edps")
+        df_log_raw = datos_relacionados.frame("logs")
 
         # ===== PASO 3: Aplicar Filtros a df_edp_raw =====
 
@@ -407,8 +417,9 @@ def dashboard_controller():
             )
 
         # ===== PASO 3: PROCESAR CON EL NUEVO SERVICIO =====
+        # La tabla se hidrata desde /dashboard/api/edp-table (paginada en servidor)
         dashboard_response = controller_service.get_processed_dashboard_context(
-            df_edp_raw, df_log_raw, filters
+            df_edp_raw, df_log_raw, filters, include_registros=False
         )
 
         if not dashboard_response.success:
@@ -451,6 +462,39 @@ def dashboard_controller():
         )
 
 
+@dashboard_bp.route("/api/edp-table")
+@login_required
+@require_controller_or_above
+def api_edp_table():
+    """
+    Página de la tabla de EDPs del dashboard de controller.
+
+    Query params: mes, jefe_proyecto, cliente, estado (filtros del dashboard),
+    q (búsqueda en n_edp/proyecto/cliente), sort ("dias:desc,cliente:asc"),
+    page/page_size (offset) o cursor (keyset), quick (todos, criticos,
+    recientes, pendientes, validados).
+    """
+    try:
+        response = controller_service.get_edp_table_page(
+            filters=_parse_filters(request),
+            search=request.args.get("q", ""),
+            sort=request.args.get("sort"),
+            page=request.args.get("page", 1, type=int),
+            page_size=request.args.get("page_size", 25, type=int),
+            cursor=request.args.get("cursor"),
+            quick_filter=request.args.get("quick", "todos"),
+        )
+        if not response.success:
+            status = 400 if response.errors else 500
+            return fast_jsonify({"success": False, "message": response.message}, status)
+
+        return fast_jsonify({"success": True, **response.data})
+
+    except Exception as e:
+        logger.error(f"Error en api_edp_table: {e}")
+        return fast_jsonify({"success": False, "message": str(e)}, 500)
+
+
 @dashboard_bp.route("/kanban")
 @login_required
 @require_controller_or_above
@@ -466,7 +510,9 @@ def vista_kanban():
         # ===== PASO 2: CARGAR DATOS CRUDOS =====
         now_ts = time()
         global _kanban_cache
-        if _kanban_cache["data"] and now_ts - _kanban_cache["ts"] < 30:
+        kanban_cache_hit = bool(_kanban_cache["data"]) and now_ts - _kanban_cache["ts"] < 30
+        record_cache("kanban_cache", kanban_cache_hit)
+        if kanban_cache_hit:
             datos_response = _kanban_cache["data"]
         else:
             datos_response = controller_service.load_related_data()
@@ -480,11 +526,13 @@ def vista_kanban():
         print(f"📊 Datos cargados: {len(datos_relacionados.get('edps', []))} EDPs")
 
         # Extract raw DataFrames
-        df_edp_raw = pd.DataFrame(datos_relacionados.get("edps", []))
-        df_log_raw = pd.DataFrame(datos_relacionados.get("logs", []))
+        df_edp_raw = datos_relacionados.frame("edps")
+        df_log_raw = datos_relacionados.frame("logs")
 
         # ===== PASO 3: OBTENER DATOS DEL KANBAN =====
-        kanban_response = kanban_service.get_kanban_board_data(df_edp_raw, filters)
+        kanban_response = kanban_service.get_kanban_board_data(
+            df_edp_raw, filters, cache_board=True
+        )
         
         if not kanban_response.success:
             print(f"❌ Error en kanban service: {kanban_response.message}")
@@ -513,6 +561,7 @@ def vista_kanban():
         template_context = {
             # Datos del Kanban
             "columnas": kanban_data.get("columnas", {}),
+            "columnas_resumen": kanban_data.get("columnas_resumen", {}),
             "estadisticas": kanban_data.get("estadisticas", {}),
             
             # Datos para la tabla (del dashboard)
@@ -617,7 +666,7 @@ def _procesar_actualizacion_estado(edp_id: str, nuevo_estado: str, conformidad:
 
         # Obtener proyecto por id del edp
         df = controller_service.load_related_data().data
-        df_edps = pd.DataFrame(df.get("edps", []))
+        df_edps = df.frame("edps")
         proyecto = df_edps[df_edps["n_edp"] == edp_id]["proyecto"].values[0] if not df_edps[df_edps["n_edp"] == edp_id].empty else None
       
         print(f"   - Proyecto asociado: {proyecto}")
@@ -748,7 +797,7 @@ def actualizar_estado_kanban_by_id():
 
         # Primero obtener el n_edp del ID interno
         df = controller_service.load_related_data().data
-        df_edps = pd.DataFrame(df.get("edps", []))
+        df_edps = df.frame("edps")
         edp_row = df_edps[df_edps['id'] == internal_id]
         
         if edp_row.empty:
@@ -823,7 +872,7 @@ def actualizar_estado_detallado():
                 return jsonify({"success": False, "message": "Error cargando datos"}), 500
             
             datos_relacionados = datos_response.data
-            df = pd.DataFrame(datos_relacionados.get("edps", []))
+            df = datos_relacionados.frame("edps")
             
             # Buscar por ID interno
             edp = df[df["id"] == int(internal_id)]
@@ -858,7 +907,7 @@ def actualizar_estado_detallado():
                 return jsonify({"success": False, "message": "Error cargando datos"}), 500
             
             datos_relacionados = datos_response.data
-            df = pd.DataFrame(datos_relacionados.get("edps", []))
+            df = datos_relacionados.frame("edps")
             
             # Buscar por n_edp
             edp = df[df["n_edp"] == str(edp_id)]
@@ -1039,7 +1088,7 @@ def get_edp_data(edp_id):
     try:
         df = controller_service.load_related_data()
         datos_relacionados = df.data
-        df = pd.DataFrame(datos_relacionados.get("edps", []))
+        df = datos_relacionados.frame("edps")
         edp = df[df["n_edp"] == str(edp_id)]
 
         if edp.empty:
@@ -1124,7 +1173,7 @@ def api_get_edp_details(n_edp):
     datos_relacionados = datos_response.data
 
     # Extract raw DataFrames
-    df_edp_raw = pd.DataFrame(datos_relacionados.get("edps", []))
+    df_edp_raw = datos_relacionados.frame("edps")
 
     # Convert n_edp to int for comparison if it's a digit string
     try:
@@ -1188,7 +1237,7 @@ def get_edp_data_by_internal_id(internal_id):
             print("❌ No se encontraron datos de EDPs")
             return jsonify({"error": "No se encontraron datos de EDPs"}), 500
         
-        df = pd.DataFrame(datos_relacionados.get("edps", []))
+        df = datos_relacionados.frame("edps")
         print(f"📊 DataFrame creado con {len(df)} registros")
         
         if df.empty:
@@ -1289,7 +1338,7 @@ def api_get_edp_details_by_internal_id(internal_id):
     datos_relacionados = datos_response.data
 
     # Extract raw DataFrames
-    df_edp_raw = pd.DataFrame(datos_relacionados.get("edps", []))
+    df_edp_raw = datos_relacionados.frame("edps")
 
     edp = df_edp_raw[df_edp_raw["id"] == internal_id]
 
@@ -1436,7 +1485,7 @@ def _background_update_edp_by_id(internal_id: int, updates: Dict[str, Any], usua
             return
 
         datos_relacionados = datos_response.data
-        df_edp_raw = pd.DataFrame(datos_relacionados.get("edps", []))
+        df_edp_raw = datos_relacionados.frame("edps")
         edp = df_edp_raw[df_edp_raw["id"] == internal_id]
         if edp.empty:
             logger.error(f"EDP con ID {internal_id} no encontrado")
@@ -1519,7 +1568,7 @@ def _background_update_edp(n_edp: str, updates: Dict[str, Any], usuario: str):
             return
 
         datos_relacionados = datos_response.data
-        df_edp_raw = pd.DataFrame(datos_relacionados.get("edps", []))
+        df_edp_raw = datos_relacionados.frame("edps")
         edp = df_edp_raw[df_edp_raw["n_edp"] == n_edp]
         if edp.empty:
             logger.error(f"EDP {n_edp} no encontrado")
@@ -2532,130 +2581,32 @@ def detalle_edp_by_number(n_edp):
         return redirect(url_for("dashboard.dashboard_controller"))
 
 
+def _render_log_timeline(n_edp):
+    """Primera página del historial del EDP y el resumen del historial completo."""
+    page_response = edp_log_service.get_timeline_page(n_edp=n_edp)
+    if not page_response.success:
+        raise RuntimeError(page_response.message)
+    summary_response = edp_log_service.get_timeline_summary(n_edp)
+    if not summary_response.success:
+        raise RuntimeError(summary_response.message)
+
+    page = page_response.data
+    return render_template(
+        "controller/controller_log_edp.html",
+        n_edp=n_edp,
+        registros_agrupados=agrupar_por_fecha(page['registros']),
+        resumen_stats=summary_response.data,
+        next_cursor=page['next_cursor'],
+        time_ago=time_ago
+    )
+
+
 @dashboard_bp.route("/log/<n_edp>")
 @login_required
 def ver_log_edp(n_edp):
     """View EDP change log."""
     try:
-        # Get EDP log DataFrame from read_log
-        log_df = read_log(n_edp)
-        
-        # Process and group data for better visualization
-        registros_agrupados = {}
-        resumen_stats = {
-            'total_cambios': 0,
-            'ultimo_cambio': None,
-            'usuarios_unicos': set(),
-            'tipos_cambios': {}
-        }
-        
-        if not log_df.empty:
-            # Sort by date descending
-            log_df = log_df.sort_values('fecha_hora', ascending=False)
-            
-            for _, row in log_df.iterrows():
-                fecha_hora = row.get('fecha_hora')
-                fecha_key = fecha_hora.strftime('%Y-%m-%d');
-                
-                # Classify change type
-                campo = row.get('campo', '')
-                tipo_cambio = 'informacion'  # default
-                if 'estado' in campo.lower():
-                    tipo_cambio = 'estado'
-                elif 'monto' in campo.lower() or 'valor' in campo.lower():
-                    tipo_cambio = 'monto'
-                elif 'fecha' in campo.lower():
-                    tipo_cambio = 'fecha'
-                elif 'conformidad' in campo.lower():
-                    tipo_cambio = 'conformidad'
-                
-                # Determine change importance
-                es_importante = tipo_cambio in ['estado', 'monto', 'conformidad']
-                
-                # Format values
-                antes_formateado = format_log_value(row.get('antes'), campo)
-                despues_formateado = format_log_value(row.get('despues'), campo)
-                
-                registro = {
-                    'fecha_hora': fecha_hora,
-                    'hora_display': fecha_hora.strftime('%H:%M'),
-                    'n_edp': row.get('n_edp'),
-                    'proyecto': row.get('proyecto', ''),
-                    'campo': campo,
-                    'campo_display': format_field_name(campo),
-                    'antes': row.get('antes'),
-                    'despues': row.get('despues'),
-                    'antes_formateado': antes_formateado,
-                    'despues_formateado': despues_formateado,
-                    'usuario': row.get('usuario'),
-                    'tipo_cambio': tipo_cambio,
-                    'es_importante': es_importante,
-                    'icono': get_change_icon(tipo_cambio),
-                    'color_clase': get_change_color_class(tipo_cambio, row.get('despues'))
-                }
-                
-                # Group by date
-                if fecha_key not in registros_agrupados:
-                    registros_agrupados[fecha_key] = {
-                        'fecha': fecha_hora.date(),
-                        'fecha_display': format_date_display(fecha_hora.date()),
-                        'registros': []
-                    }
-                
-                registros_agrupados[fecha_key]['registros'].append(registro)
-                
-                # Update stats
-                resumen_stats['total_cambios'] += 1
-                resumen_stats['usuarios_unicos'].add(row.get('usuario', 'Desconocido'))
-                resumen_stats['tipos_cambios'][tipo_cambio] = resumen_stats['tipos_cambios'].get(tipo_cambio, 0) + 1
-                
-                if resumen_stats['ultimo_cambio'] is None:
-                    resumen_stats['ultimo_cambio'] = fecha_hora
-        
-        # Convert sets to lists and sort groups
-        resumen_stats['usuarios_unicos'] = list(resumen_stats['usuarios_unicos'])
-        registros_ordenados = dict(sorted(registros_agrupados.items(), reverse=True))
-        
-        # Add time_ago function to template context
-        def time_ago(fecha_datetime):
-            """Calculate time ago string for template"""
-            if not fecha_datetime:
-                return "desconocido"
-            
-            from datetime import datetime
-            now = datetime.now()
-            
-            # Handle timezone-naive datetime objects
-            if hasattr(fecha_datetime, 'tzinfo') and fecha_datetime.tzinfo is None and hasattr(now, 'tzinfo'):
-                if now.tzinfo is not None:
-                    fecha_datetime = fecha_datetime.replace(tzinfo=now.tzinfo)
-                    
-            diff = now - fecha_datetime
-            
-            if diff.days > 365:
-                years = diff.days // 365
-                return f"{years} año{'s' if years > 1 else ''}"
-            elif diff.days > 30:
-                months = diff.days // 30
-                return f"{months} mes{'es' if months > 1 else ''}"
-            elif diff.days > 0:
-                return f"{diff.days} día{'s' if diff.days > 1 else ''}"
-            elif diff.seconds > 3600:
-                hours = diff.seconds // 3600
-                return f"{hours} hora{'s' if hours > 1 else ''}"
-            elif diff.seconds > 60:
-                minutes = diff.seconds // 60
-                return f"{minutes} minuto{'s' if minutes > 1 else ''}"
-            else:
-                return "hace un momento"
-        
-        return render_template(
-            "controller/controller_log_edp.html", 
-            n_edp=n_edp, 
-            registros_agrupados=registros_ordenados,
-            resumen_stats=resumen_stats,
-            time_ago=time_ago
-        )
+        return _render_log_timeline(n_edp)
 
     except Exception as e:
         flash(f"Error al cargar historial: {str(e)}", "error")
@@ -2674,7 +2625,7 @@ def ver_log_edp_by_id(internal_id):
             return redirect(url_for("dashboard.dashboard_controller"))
 
         datos_relacionados = datos_response.data
-        df_edp_raw = pd.DataFrame(datos_relacionados.get("edps", []))
+        df_edp_raw = datos_relacionados.frame("edps")
         edp = df_edp_raw[df_edp_raw["id"] == internal_id]
         
         if edp.empty:
@@ -2682,126 +2633,7 @@ def ver_log_edp_by_id(internal_id):
             return redirect(url_for("dashboard.dashboard_controller"))
         
         n_edp = edp.iloc[0]["n_edp"]
-        
-        # Get EDP log DataFrame from read_log
-        log_df = read_log(n_edp)
-        
-        # Process and group data for better visualization
-        registros_agrupados = {}
-        resumen_stats = {
-            'total_cambios': 0,
-            'ultimo_cambio': None,
-            'usuarios_unicos': set(),
-            'tipos_cambios': {}
-        }
-        
-        if not log_df.empty:
-            # Sort by date descending
-            log_df = log_df.sort_values('fecha_hora', ascending=False)
-            
-            for _, row in log_df.iterrows():
-                fecha_hora = row.get('fecha_hora')
-                fecha_key = fecha_hora.strftime('%Y-%m-%d');
-                
-                # Classify change type
-                campo = row.get('campo', '')
-                tipo_cambio = 'informacion'  # default
-                if 'estado' in campo.lower():
-                    tipo_cambio = 'estado'
-                elif 'monto' in campo.lower() or 'valor' in campo.lower():
-                    tipo_cambio = 'monto'
-                elif 'fecha' in campo.lower():
-                    tipo_cambio = 'fecha'
-                elif 'conformidad' in campo.lower():
-                    tipo_cambio = 'conformidad'
-                
-                # Determine change importance
-                es_importante = tipo_cambio in ['estado', 'monto', 'conformidad']
-                
-                # Format values
-                antes_formateado = format_log_value(row.get('antes'), campo)
-                despues_formateado = format_log_value(row.get('despues'), campo)
-                
-                registro = {
-                    'fecha_hora': fecha_hora,
-                    'hora_display': fecha_hora.strftime('%H:%M'),
-                    'n_edp': row.get('n_edp'),
-                    'proyecto': row.get('proyecto', ''),
-                    'campo': campo,
-                    'campo_display': format_field_name(campo),
-                    'antes': row.get('antes'),
-                    'despues': row.get('despues'),
-                    'antes_formateado': antes_formateado,
-                    'despues_formateado': despues_formateado,
-                    'usuario': row.get('usuario'),
-                    'tipo_cambio': tipo_cambio,
-                    'es_importante': es_importante,
-                    'icono': get_change_icon(tipo_cambio),
-                    'color_clase': get_change_color_class(tipo_cambio, row.get('despues'))
-                }
-                
-                # Group by date
-                if fecha_key not in registros_agrupados:
-                    registros_agrupados[fecha_key] = {
-                        'fecha': fecha_hora.date(),
-                        'fecha_display': format_date_display(fecha_hora.date()),
-                        'registros': []
-                    }
-                
-                registros_agrupados[fecha_key]['registros'].append(registro)
-                
-                # Update stats
-                resumen_stats['total_cambios'] += 1
-                resumen_stats['usuarios_unicos'].add(row.get('usuario', 'Desconocido'))
-                resumen_stats['tipos_cambios'][tipo_cambio] = resumen_stats['tipos_cambios'].get(tipo_cambio, 0) + 1
-                
-                if resumen_stats['ultimo_cambio'] is None:
-                    resumen_stats['ultimo_cambio'] = fecha_hora
-        
-        # Convert sets to lists and sort groups
-        resumen_stats['usuarios_unicos'] = list(resumen_stats['usuarios_unicos'])
-        registros_ordenados = dict(sorted(registros_agrupados.items(), reverse=True))
-        
-        # Add time_ago function to template context
-        def time_ago(fecha_datetime):
-            """Calculate time ago string for template"""
-            if not fecha_datetime:
-                return "desconocido"
-            
-            from datetime import datetime
-            now = datetime.now()
-            
-            # Handle timezone-naive datetime objects
-            if hasattr(fecha_datetime, 'tzinfo') and fecha_datetime.tzinfo is None and hasattr(now, 'tzinfo'):
-                if now.tzinfo is not None:
-                    fecha_datetime = fecha_datetime.replace(tzinfo=now.tzinfo)
-                    
-            diff = now - fecha_datetime
-            
-            if diff.days > 365:
-                years = diff.days // 365
-                return f"{years} año{'s' if years > 1 else ''}"
-            elif diff.days > 30:
-                months = diff.days // 30
-                return f"{months} mes{'es' if months > 1 else ''}"
-            elif diff.days > 0:
-                return f"{diff.days} día{'s' if diff.days > 1 else ''}"
-            elif diff.seconds > 3600:
-                hours = diff.seconds // 3600
-                return f"{hours} hora{'s' if hours > 1 else ''}"
-            elif diff.seconds > 60:
-                minutes = diff.seconds // 60
-                return f"{minutes} minuto{'s' if minutes > 1 else ''}"
-            else:
-                return "hace un momento"
-        
-        return render_template(
-            "controller/controller_log_edp.html", 
-            n_edp=n_edp, 
-            registros_agrupados=registros_ordenados,
-            resumen_stats=resumen_stats,
-            time_ago=time_ago
-        )
+        return _render_log_timeline(n_edp)
         
     except Exception as e:
         import traceback
@@ -2811,109 +2643,58 @@ def ver_log_edp_by_id(internal_id):
         return redirect(url_for("dashboard.dashboard_controller"))
 
 
-def format_log_value(value, campo):
-    """Format log values for better display"""
-    if not value or str(value).lower() in ['nan', 'none', 'null']:
-        return "Sin valor"
-    
-    if 'monto' in campo.lower() or 'valor' in campo.lower():
-        try:
-            num_value = float(str(value).replace(',', '').replace('.', ''))
-            return f"${num_value:,.0f}".replace(',', '.')
-        except:
-            return str(value)
-    
-    if 'fecha' in campo.lower() and len(str(value)) == 8:
-        # Convert DDMMYYYY to DD/MM/YYYY
-        try:
-            date_str = str(value)
-            return f"{date_str[:2]}/{date_str[2:4]}/{date_str[4:]}"
-        except:
-            return str(value)
-    
-    return str(value)
-
-
-def format_field_name(campo):
-    """Format field names for better display"""
-    field_names = {
-        'estado': 'Estado',
-        'estado_detallado': 'Estado Detallado',
-        'monto_propuesto': 'Monto Propuesto',
-        'monto_aprobado': 'Monto Aprobado',
-        'fecha_estimada_pago': 'Fecha Estimada de Pago',
-        'conformidad_enviada': 'Conformidad Enviada',
-        'n_conformidad': 'Número de Conformidad',
-        'observaciones': 'Observaciones',
-        'rf_conformidad': 'RF Conformidad'
-    }
-    return field_names.get(campo, campo.replace('_', ' ').title())
-
-
-def get_change_icon(tipo_cambio):
-    """Get icon for change type"""
-    icons = {
-        'estado': '📋',
-        'monto': '💰',
-        'fecha': '📅',
-        'conformidad': '✅',
-        'informacion': '📝'
-    }
-    return icons.get(tipo_cambio, '📝')
-
-
-def get_change_color_class(tipo_cambio, nuevo_valor):
-    """Get color class based on change type and value"""
-    if tipo_cambio == 'estado':
-        if nuevo_valor and 'pagado' in str(nuevo_valor).lower():
-            return 'change-positive'
-        elif nuevo_valor and any(word in str(nuevo_valor).lower() for word in ['aprobado', 'confirmado']):
-            return 'change-positive'
-        elif nuevo_valor and any(word in str(nuevo_valor).lower() for word in ['pendiente', 'revision']):
-            return 'change-warning'
-        else:
-            return 'change-neutral'
-    elif tipo_cambio == 'monto':
-        return 'change-neutral'
-    elif tipo_cambio == 'conformidad':
-        return 'change-positive'
-    else:
-        return 'change-info'
-
+@dashboard_bp.route("/api/log/<n_edp>")
+@login_required
+def api_log_timeline(n_edp):
+    """Siguiente página del historial (scroll / "Cargar más")."""
+    try:
+        response = edp_log_service.get_timeline_page(
+            n_edp=n_edp,
+            usuario=request.args.get("usuario") or None,
+            desde=request.args.get("desde") or None,
+            hasta=request.args.get("hasta") or None,
+            cursor=request.args.get("cursor") or None,
+            limit=request.args.get("limit", EDP_LOG_PAGE_SIZE, type=int),
+        )
+        if not response.success:
+            status = 400 if response.errors else 500
+            return jsonify({"success": False, "message": response.message}), status
+
+        page = response.data
+        html = render_template(
+            "controller/log_edp_grupos.html",
+            registros_agrupados=agrupar_por_fecha(page['registros']),
+        )
+        return jsonify({
+            "success": True,
+            "html": html,
+            "count": len(page['registros']),
+            "next_cursor": page['next_cursor'],
+            "has_more": page['has_more'],
+        })
 
-def format_date_display(fecha):
-    """Format date for display with relative time"""
-    from datetime import date, timedelta
-    
-    hoy = date.today()
-    ayer = hoy - timedelta(days=1)
-    
-    if fecha == hoy:
-        return "Hoy"
-    elif fecha == ayer:
-        return "Ayer"
-    elif (hoy - fecha).days < 7:
-        dias = (hoy - fecha).days
-        return f"Hace {dias} días"
-    else:
-        return fecha.strftime("%d/%m/%Y")
+    except Exception as e:
+        logger.error(f"Error cargando página del historial del EDP {n_edp}: {str(e)}")
+        return jsonify({"success": False, "message": str(e)}), 500
 
 
 @dashboard_bp.route("/log/<n_edp>/csv")
 @login_required
 def descargar_log_csv(n_edp):
-    """Download EDP change log as CSV."""
+    """Download EDP change log as CSV, streamed in batches."""
     try:
-        # Get CSV data as string
-        csv_data = analytics_service.get_edp_log_csv(n_edp)
-        print(f"CSV data for EDP {n_edp}:\n{csv_data[:1000]}...")  # Log first 1000 chars for debugging
-        # Check if there was an error
-        if csv_data.startswith("Error") or csv_data.startswith("No hay datos"):
-            flash(csv_data, "error")
+        first_page = edp_log_service.get_timeline_page(n_edp=n_edp, limit=1)
+        if not first_page.success:
+            flash(f"Error al generar CSV: {first_page.message}", "error")
+            return redirect(url_for("dashboard.ver_log_edp", n_edp=n_edp))
+        if not first_page.data['registros']:
+            flash("No hay datos de log para este EDP", "error")
             return redirect(url_for("dashboard.ver_log_edp", n_edp=n_edp))
 
-        # Create response
-        response = make_response(csv_data)
+        response = Response(
+            stream_with_context(edp_log_service.iter_log_csv(n_edp)),
+            mimetype="text/csv",
+        )
         response.headers["Content-Disposition"] = (
             f"attachment; filename=log_edp_{n_edp}.csv"
         )
@@ -2937,7 +2718,7 @@ def export_all_csv():
             return jsonify({"error": "Error cargando datos"}), 500
 
         datos_relacionados = datos_response.data
-        df_edp_raw = pd.DataFrame(datos_relacionados.get("edps", []))
+        df_edp_raw = datos_relacionados.frame("edps")
         
         if df_edp_raw.empty:
             return jsonify({"error": "No hay datos para exportar"}), 404
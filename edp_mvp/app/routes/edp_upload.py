@@ -1015,17 +1015,15 @@ def check_duplicate_edp(n_edp: int, proyecto: str, force_refresh: bool = True) -
                 if cache_service.redis_client:
                     try:
                         # Limpiar caché específico de la hoja EDP
-                        keys_to_delete = []
-                        gsheet_keys = cache_service.redis_client.keys("gsheet:edp!*")
-                        if gsheet_keys:
-                            keys_to_delete.extend(gsheet_keys)
+                        from ..utils.cache_inspector import delete_matching
+
+                        deleted = delete_matching("gsheet:edp!*")
                         
                         # También limpiar caché en memoria
                         from ..utils.supabase_adapter import clear_all_cache
                         clear_all_cache()
                         
-                        if keys_to_delete:
-                            deleted = cache_service.redis_client.delete(*keys_to_delete)
+                        if deleted:
                             print(f"✅ Caché de Google Sheets invalidado: {deleted} claves eliminadas")
                         else:
                             print("ℹ️ No se encontraron claves de caché de Google Sheets para eliminar")
@@ -3,13 +3,14 @@ Manager Controller - Refactored using the new layered architecture.
 This controller replaces the monolithic dashboard/manager.py file.
 """
 
-from flask import Blueprint, render_template, request, jsonify, session, make_response, flash
+from flask import Blueprint, render_template, request, jsonify, session, make_response, flash, url_for
 from flask_login import login_required, current_user
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 import traceback
 import json
 import pandas as pd
+import numpy as np
 import os
 import logging
 
@@ -21,6 +22,11 @@ from ..services.dashboard_service import ControllerService
 from ..utils.validation_utils import ValidationUtils
 from ..utils.format_utils import FormatUtils
 from ..utils.date_utils import DateUtils
+from ..utils.json_serialization import fast_jsonify
+from ..utils.redis_client import get_redis, redis_status
+from ..utils.cache_codec import codec_stats, decode_payload
+from ..utils import cache_inspector
+from ..utils.http_cache import conditional_json
 from ..utils.auth_utils import require_manager_or_above
 from ..utils.business_rules import business_rules, es_critico, es_aging, es_fast_collection, obtener_tendencia_criticos, obtener_tendencia_aging, obtener_tendencia_fast_collection
 
@@ -859,7 +865,7 @@ def dashboard_refresh():
 
         dashboard_data = dashboard_response.data
 
-        return jsonify(
+        return fast_jsonify(
             {
                 "success": True,
                 "data": {
@@ -928,6 +934,7 @@ def dashboard_task_status(task_id):
 
 @management_bp.route("/api/critical_projects")
 @login_required
+@conditional_json()
 def api_critical_projects():
     """
     API endpoint for critical projects analysis with enhanced modal data.
@@ -1011,7 +1018,7 @@ def api_critical_projects():
         
         print(f"✅ DEBUG: Respuesta final - count: {result['count']}, projects: {len(result['projects'])}")
         
-        return jsonify(result)
+        return fast_jsonify(result)
         
     except Exception as e:
         print(f"❌ DEBUG: Exception en api_critical_projects: {str(e)}")
@@ -1029,6 +1036,7 @@ def api_critical_projects():
 
 @management_bp.route("/api/financial_summary")
 @login_required
+@conditional_json()
 def api_financial_summary():
     """
     API endpoint for financial summary.
@@ -1055,7 +1063,7 @@ def api_financial_summary():
                 {"success": False, "message": summary_response.message, "data": {}}
             )
 
-        return jsonify(
+        return fast_jsonify(
             {
                 "success": True,
                 "message": "Resumen financiero generado exitosamente",
@@ -1098,7 +1106,7 @@ def api_cash_flow_forecast():
                 {"success": False, "message": forecast_response.message, "data": {}}
             )
 
-        return jsonify(
+        return fast_jsonify(
             {
                 "success": True,
                 "message": "Proyecciones de cash flow generadas exitosamente",
@@ -1200,6 +1208,7 @@ def api_executive_alerts():
 
 @management_bp.route("/api/kpis")
 @login_required
+@conditional_json()
 def api_kpis():
     """
     API endpoint for real-time KPIs data.
@@ -1210,11 +1219,9 @@ def api_kpis():
 
         # Try to get from cache first
         try:
-            import redis
             import hashlib
 
-            redis_url = os.getenv("REDIS_URL")
-            redis_client = redis.from_url(redis_url) if redis_url else None
+            redis_client = get_redis()
 
             if redis_client:
                 filters_hash = hashlib.md5(
@@ -1222,12 +1229,13 @@ def api_kpis():
                 ).hexdigest()[:12]
                 cache_key = f"kpis:{filters_hash}"
                 cached_kpis = redis_client.get(cache_key)
+                cache_inspector.record_lookup(cache_inspector.namespace_of(cache_key), bool(cached_kpis))
 
                 if cached_kpis:
-                    return jsonify(
+                    return fast_jsonify(
                         {
                             "success": True,
-                            "data": json.loads(cached_kpis),
+                            "data": decode_payload(cached_kpis),
                             "source": "cache",
                             "timestamp": datetime.now().isoformat(),
                         }
@@ -1241,7 +1249,7 @@ def api_kpis():
         if dashboard_response and dashboard_response.success:
             kpis = dashboard_response.data.get("executive_kpis", {})
 
-            return jsonify(
+            return fast_jsonify(
                 {
                     "success": True,
                     "data": kpis,
@@ -1279,16 +1287,21 @@ def api_kpis():
 def api_cache_status():
     """
     API endpoint to check cache status and health.
+
+    Key counts come from SCAN in batches (cached for a few seconds) and the
+    per-namespace counters are kept at write time: no KEYS on a busy Redis.
     """
     try:
-        import redis
-
-        redis_url = os.getenv("REDIS_URL")
-        redis_client = redis.from_url(redis_url) if redis_url else None
+        redis_client = get_redis()
 
         if not redis_client:
             return jsonify(
-                {"redis_available": False, "message": "Redis not configured"}
+                {
+                    "redis_available": False,
+                    "message": "Redis not configured or unreachable",
+                    "redis_client": redis_status(),
+                    "namespaces": cache_inspector.counter_stats(),
+                }
             )
 
         # Get cache statistics
@@ -1296,10 +1309,10 @@ def api_cache_status():
 
         # Get our cache keys
         cache_keys = {
-            "dashboard_keys": len(redis_client.keys("manager_dashboard:*")),
-            "kpi_keys": len(redis_client.keys("kpis:*")),
-            "chart_keys": len(redis_client.keys("charts:*")),
-            "financial_keys": len(redis_client.keys("financials:*")),
+            "dashboard_keys": cache_inspector.count_keys("manager_dashboard:*"),
+            "kpi_keys": cache_inspector.count_keys("kpis:*"),
+            "chart_keys": cache_inspector.count_keys("charts:*"),
+            "financial_keys": cache_inspector.count_keys("financials:*"),
         }
 
         return jsonify(
@@ -1309,7 +1322,13 @@ def api_cache_status():
                 "connected_clients": info.get("connected_clients"),
                 "cache_keys": cache_keys,
                 "total_keys": sum(cache_keys.values()),
+                "db_keys": redis_client.dbsize(),
+                "evicted_keys": info.get("evicted_keys"),
+                "expired_keys": info.get("expired_keys"),
+                "namespaces": cache_inspector.counter_stats(),
                 "uptime": info.get("uptime_in_seconds"),
+                "redis_client": redis_status(),
+                "payload_codec": codec_stats(),
                 "timestamp": datetime.now().isoformat(),
             }
         )
@@ -1318,44 +1337,93 @@ def api_cache_status():
         return jsonify({"redis_available": False, "error": str(e)}), 500
 
 
-@management_bp.route("/api/cache/clear")
+@management_bp.route("/api/cache/namespaces/<namespace>")
+@login_required
+def api_cache_namespace(namespace):
+    """
+    API endpoint to inspect one cache namespace: entries, bytes, TTLs and
+    largest keys, scanned in bounded batches.
+    """
+    try:
+        if not get_redis():
+            return jsonify({"success": False, "message": "Redis not available"})
+
+        max_keys = min(
+            request.args.get("max_keys", cache_inspector.CACHE_INSPECT_MAX_KEYS, type=int),
+            cache_inspector.CACHE_INSPECT_MAX_KEYS,
+        )
+        stats = cache_inspector.inspect_namespace(namespace, max_keys=max_keys)
+        stats["counters"] = cache_inspector.counter_stats().get(namespace, {})
+
+        return jsonify({"success": True, "data": stats, "timestamp": datetime.now().isoformat()})
+
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@management_bp.route("/api/cache/clear", methods=["GET", "POST"])
 @login_required
 def api_cache_clear():
     """
     API endpoint to clear specific cache patterns.
+
+    The clear runs as a background job (SCAN + UNLINK in batches); poll
+    status_url for progress and the final cleared_count.
     """
     try:
-        pattern = request.args.get("pattern", "manager_dashboard:*")
+        namespace = request.args.get("namespace")
+        pattern = f"{namespace}:*" if namespace else request.args.get("pattern", "manager_dashboard:*")
 
-        import redis
+        if not get_redis():
+            return jsonify({"success": False, "message": "Redis not available"})
 
-        redis_url = os.getenv("REDIS_URL")
-        redis_client = redis.from_url(redis_url) if redis_url else None
+        job = cache_inspector.start_clear_job(pattern)
 
-        if not redis_client:
-            return jsonify({"success": False, "message": "Redis not available"})
+        return (
+            jsonify(
+                {
+                    "success": True,
+                    "job_id": job["job_id"],
+                    "status": job["status"],
+                    "pattern": job["pattern"],
+                    "status_url": url_for("management.api_cache_clear_status", job_id=job["job_id"]),
+                    "timestamp": datetime.now().isoformat(),
+                }
+            ),
+            202,
+        )
+
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except Exception as e:
+        return (
+            jsonify({"success": False, "message": f"Error clearing cache: {str(e)}"}),
+            500,
+        )
 
-        # Get keys matching pattern
-        keys = redis_client.keys(pattern)
-        cleared_count = 0
 
-        if keys:
-            cleared_count = redis_client.delete(*keys)
+@management_bp.route("/api/cache/clear/<job_id>")
+@login_required
+def api_cache_clear_status(job_id):
+    """
+    API endpoint to follow a cache clear job.
+    """
+    try:
+        job = cache_inspector.get_clear_job(job_id)
+        if not job:
+            return jsonify({"success": False, "message": "Job not found"}), 404
 
         return jsonify(
             {
                 "success": True,
-                "cleared_count": cleared_count,
-                "pattern": pattern,
+                "job": job,
+                "cleared_count": job.get("deleted", 0),
                 "timestamp": datetime.now().isoformat(),
             }
         )
 
     except Exception as e:
-        return (
-            jsonify({"success": False, "message": f"Error clearing cache: {str(e)}"}),
-            500,
-        )
+        return jsonify({"success": False, "error": str(e)}), 500
 
 
 @management_bp.route("/api/performance/metrics")
@@ -1376,10 +1444,7 @@ def api_performance_metrics():
         # Test cache connection speed
         cache_time = None
         try:
-            import redis
-
-            redis_url = os.getenv("REDIS_URL")
-            redis_client = redis.from_url(redis_url) if redis_url else None
+            redis_client = get_redis()
 
             if redis_client:
                 cache_start = datetime.now()
@@ -3319,6 +3384,51 @@ def _get_escalation_path(edp: Dict) -> List[str]:
     ]
 
 
+# Columnas de las tablas modales del dashboard ejecutivo y su valor por defecto
+_MODAL_EDP_DEFAULTS = {
+    "id": "N/A",
+    "n_edp": "N/A",
+    "cliente": "Cliente N/A",
+    "proyecto": "Proyecto N/A",
+    "jefe_proyecto": "Sin asignar",
+    "estado": "pendiente",
+}
+
+
+def _modal_edp_records(df: pd.DataFrame, urgencia, dias=None) -> List[Dict[str, Any]]:
+    """
+    Filas de las tablas modales (críticos, aging, cobro rápido) a partir de un
+    slice del frame clasificado, sin iterrows.
+
+    Args:
+        urgencia: valor fijo o serie alineada con df
+        dias: serie de días a mostrar (por defecto la columna 'dias')
+    """
+    if df.empty:
+        return []
+
+    monto = df["monto"].astype(float)
+    records = pd.DataFrame(
+        {
+            name: df[name] if name in df.columns else default
+            for name, default in _MODAL_EDP_DEFAULTS.items()
+        },
+        index=df.index,
+    )
+    records["monto"] = monto
+    records["monto_formatted"] = [f"${m:,.0f}".replace(",", ".") if m else "$0" for m in monto]
+    records["dias"] = (df["dias"] if dias is None else dias).astype(int)
+    records["fecha_emision"] = (
+        df["fecha_emision"].astype(str) if "fecha_emision" in df.columns else "Sin fecha"
+    )
+    records["urgencia"] = urgencia
+    return records.to_dict("records")
+
+
+def _classified_edps_error(key: str, message: str):
+    return jsonify({"success": False, "message": message, key: [], "summary": {}})
+
+
 @management_bp.route("/api/critical_edps")
 @login_required
 def api_critical_edps():
@@ -3327,158 +3437,68 @@ def api_critical_edps():
     Returns comprehensive data for modal tables.
     """
     try:
-        print(f"🔍 DEBUG: api_critical_edps llamado por usuario {current_user}")
-        
-        # Parse filters from request
         filters = _parse_filters(request)
-        print(f"🔍 DEBUG: Filtros aplicados: {filters}")
-        
-        # Get EDPs data
-        datos_response = manager_service.load_related_data()
-        if not datos_response.success:
-            return jsonify({
-                "success": False, 
-                "message": datos_response.message,
-                "critical_edps": [],
-                "summary": {}
-            })
-        
-        datos_relacionados = datos_response.data
-        df_edp = pd.DataFrame(datos_relacionados.get("edps", []))
-        
-        if df_edp.empty:
-            return jsonify({
-                "success": False, 
-                "message": "No hay datos de EDPs disponibles",
-                "critical_edps": [],
-                "summary": {}
-            })
-        
-        print(f"🔍 DEBUG: DataFrame shape: {df_edp.shape}")
-        print(f"🔍 DEBUG: Columnas disponibles: {df_edp.columns.tolist()}")
-        
-        # Apply filters
-        df_filtered = manager_service._apply_manager_filters(df_edp, filters)
-        print(f"🔍 DEBUG: Registros después de filtros: {len(df_filtered)}")
-        
-        # Prepare data
-        df_prepared = manager_service._prepare_kpi_data(df_filtered.copy())
-        print(f"🔍 DEBUG: Registros después de preparación: {len(df_prepared)}")
-        
-        # Debug: Ver qué estados hay
-        if 'estado' in df_prepared.columns:
-            estados_unicos = df_prepared['estado'].value_counts()
-            print(f"🔍 DEBUG: Estados únicos: {estados_unicos.to_dict()}")
-        
-        # Use centralized business rules for critical EDPs
-        critical_edps = []
-        
-        print(f"🔍 DEBUG: Aplicando reglas de negocio centralizadas para EDPs críticos")
-        
-        for index, row in df_prepared.iterrows():
-            dso_actual = row.get('dso_actual', 0)
-            estado = row.get('estado', '')
-            
-            # Use centralized business rule
-            if es_critico(dso_actual, estado):
-                # Calculate days (prefer dso_actual)
-                dias_sin_movimiento = 0
-                
-                if pd.notna(dso_actual) and float(dso_actual) > 0:
-                    dias_sin_movimiento = int(float(dso_actual))
-                else:
-                    # Fallback to fecha_emision calculation
-                    if 'fecha_emision' in row and pd.notna(row['fecha_emision']):
-                        try:
-                            if isinstance(row['fecha_emision'], str):
-                                fecha_emision = pd.to_datetime(row['fecha_emision'])
-                            else:
-                                fecha_emision = row['fecha_emision']
-                            
-                            if pd.notna(fecha_emision):
-                                dias_sin_movimiento = (datetime.now() - fecha_emision).days
-                        except:
-                            pass
-                
-                # Get amount
-                monto = 0
-                try:
-                    if 'monto_aprobado' in row and pd.notna(row['monto_aprobado']):
-                        monto = float(row['monto_aprobado'])
-                    elif 'monto_propuesto' in row and pd.notna(row['monto_propuesto']):
-                        monto = float(row['monto_propuesto'])
-                except:
-                    pass
-                
-                critical_edps.append({
-                    "id": row.get("id", "N/A"),
-                    "n_edp": row.get("n_edp", "N/A"),
-                    "cliente": row.get("cliente", "Cliente N/A"),
-                    "proyecto": row.get("proyecto", "Proyecto N/A"),
-                    "monto": monto,
-                    "monto_formatted": f"${monto:,.0f}".replace(",", ".") if monto else "$0",
-                    "dias": dias_sin_movimiento,
-                    "jefe_proyecto": row.get("jefe_proyecto", "Sin asignar"),
-                    "estado": row.get("estado", "pendiente"),
-                    "fecha_emision": str(row.get("fecha_emision", "Sin fecha")),
-                    "urgencia": "critical" if dias_sin_movimiento > business_rules.criterios.DSO_CRITICO else "high"
-                })
-        
-        print(f"🔍 DEBUG: EDPs críticos encontrados usando reglas centralizadas: {len(critical_edps)}")
-        
-        # Sort by priority
-        critical_edps.sort(key=lambda x: (x["urgencia"] == "critical", x["dias"]), reverse=True)
-        
-        # Calculate summary using centralized business rules
-        total_critical_amount = sum(edp["monto"] for edp in critical_edps)
-        avg_days = sum(edp["dias"] for edp in critical_edps) / len(critical_edps) if critical_edps else 45
-        
-        # Use centralized trend calculation
-        tendencia = obtener_tendencia_criticos(len(critical_edps))
-        
+
+        classified_response = manager_service.get_classified_edps(filters)
+        if not classified_response.success:
+            return _classified_edps_error("critical_edps", classified_response.message)
+        df_classified = classified_response.data
+
+        # Reglas de negocio centralizadas, aplicadas por columna
+        df_critical = df_classified[df_classified["es_critico"]]
+        urgencia = pd.Series(
+            np.where(df_critical["dias"] > business_rules.criterios.DSO_CRITICO, "critical", "high"),
+            index=df_critical.index,
+        )
+
+        # Prioridad: primero "critical", luego más días
+        orden = (
+            pd.DataFrame({"is_critical": urgencia == "critical", "dias": df_critical["dias"]})
+            .sort_values(["is_critical", "dias"], ascending=False, kind="stable")
+            .index
+        )
+        df_critical = df_critical.loc[orden]
+        urgencia = urgencia.loc[orden]
+
+        critical_count = len(df_critical)
+        dias = df_critical["dias"]
+        avg_days = dias.mean() if critical_count else 45
+
+        tendencia = obtener_tendencia_criticos(critical_count)
+
         summary = {
-            "total_count": len(critical_edps),
-            "total_amount": total_critical_amount,
-            "avg_days": round(avg_days, 1) if avg_days > 0 else 45,
+            "total_count": critical_count,
+            "total_amount": float(df_critical["monto"].sum()),
+            "avg_days": round(float(avg_days), 1) if avg_days > 0 else 45,
             "trend_change": tendencia["cambio_pct"],
             "trend_direction": tendencia["direccion"],
             "trend_color": tendencia["color"],
-            "critical_90_plus": len([edp for edp in critical_edps if edp["dias"] > 90]),
-            "high_risk_60_90": len([edp for edp in critical_edps if 60 <= edp["dias"] <= 90])
+            "critical_90_plus": int((dias > 90).sum()),
+            "high_risk_60_90": int(dias.between(60, 90).sum()),
         }
-        
+
+        top = df_critical.head(50)  # Limit to 50 for performance
         result = {
             "success": True,
-            "critical_edps": critical_edps[:50],  # Limit to 50 for performance
+            "critical_edps": _modal_edp_records(top, urgencia.loc[top.index]),
             "summary": summary,
             "filters_applied": filters,
             "debug_info": {
-                "total_records": len(df_edp),
-                "filtered_records": len(df_filtered),
-                "not_paid_records": len([row for _, row in df_prepared.iterrows() 
-                                       if row.get('estado', '').strip().lower() not in 
-                                       [e.lower() for e in business_rules.criterios.CRITICOS_ESTADOS_EXCLUIDOS]]),
-                "critical_found": len(critical_edps)
-            }
+                "total_records": df_classified.attrs.get("total_records", len(df_classified)),
+                "filtered_records": len(df_classified),
+                "not_paid_records": int(
+                    business_rules.mascara_no_pagados(df_classified["estado_norm"]).sum()
+                ),
+                "critical_found": critical_count,
+            },
         }
-        
-        print(f"✅ DEBUG: api_critical_edps - {len(critical_edps)} EDPs críticos encontrados")
-        print(f"✅ DEBUG: Info adicional - {result['debug_info']}")
-        
-        return jsonify(result)
-        
-    except Exception as e:
-        print(f"❌ DEBUG: Exception en api_critical_edps: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({
-            "success": False, 
-            "message": f"Error interno: {str(e)}", 
-            "critical_edps": [],
-            "summary": {}
-        })
 
+        return fast_jsonify(result)
 
+    except Exception as e:
+        logger.error(f"Error en api_critical_edps: {e}")
+        traceback.print_exc()
+        return _classified_edps_error("critical_edps", f"Error interno: {str(e)}")
 
 
 @management_bp.route("/api/aging_edps")
@@ -3489,140 +3509,38 @@ def api_aging_edps():
     Returns detailed data for modal tables.
     """
     try:
-        # Parse filters from request
         filters = _parse_filters(request)
-        
-        # Get EDPs data
-        datos_response = manager_service.load_related_data()
-        if not datos_response.success:
-            return jsonify({
-                "success": False, 
-                "message": datos_response.message,
-                "aging_edps": [],
-                "summary": {}
-            })
-        
-        datos_relacionados = datos_response.data
-        df_edp = pd.DataFrame(datos_relacionados.get("edps", []))
-        
-        if df_edp.empty:
-            return jsonify({
-                "success": False, 
-                "message": "No hay datos de EDPs disponibles",
-                "aging_edps": [],
-                "summary": {}
-            })
-        
-        # Apply filters
-        df_filtered = manager_service._apply_manager_filters(df_edp, filters)
-        df_prepared = manager_service._prepare_kpi_data(df_filtered.copy())
-        
-        # Define aging criteria - EDPs pending for 31-60 days (more flexible)
-        aging_edps = []
+
+        classified_response = manager_service.get_classified_edps(filters)
+        if not classified_response.success:
+            return _classified_edps_error("aging_edps", classified_response.message)
+        df_classified = classified_response.data
+
         problematic_states = ["enviado", "revisión", "pendiente", "en_proceso", "revision", "enviado cliente", "revision cliente"]
-        
-        df_problematic = df_prepared[
-            df_prepared["estado"].str.strip().str.lower().isin([s.lower() for s in problematic_states])
-        ].copy()
-        
-        if not df_problematic.empty:
-            for index, row in df_problematic.iterrows():
-                dias_sin_movimiento = 0
-                
-                # Múltiples métodos para calcular días
-                if 'dso_actual' in row and pd.notna(row['dso_actual']):
-                    try:
-                        dias_sin_movimiento = int(float(row['dso_actual']))
-                    except:
-                        pass
-                
-                if dias_sin_movimiento == 0 and 'dso_actual' in row and pd.notna(row['dso_actual']):
-                    try:
-                        dias_sin_movimiento = int(float(row['dso_actual']))
-                    except:
-                        pass
-                
-                if dias_sin_movimiento == 0 and 'fecha_emision' in row and pd.notna(row['fecha_emision']):
-                    try:
-                        from datetime import datetime
-                        if isinstance(row['fecha_emision'], str):
-                            fecha_emision = pd.to_datetime(row['fecha_emision'])
-                        else:
-                            fecha_emision = row['fecha_emision']
-                        
-                        if pd.notna(fecha_emision):
-                            dias_sin_movimiento = (datetime.now() - fecha_emision).days
-                    except:
-                        pass
-                
-                # Valor por defecto más conservador para aging
-                if dias_sin_movimiento == 0:
-                    estado_lower = str(row.get('estado', '')).lower().strip()
-                    if 'revision' in estado_lower:
-                        dias_sin_movimiento = 40  # Aging medio
-                    elif 'enviado' in estado_lower:
-                        dias_sin_movimiento = 35  # Aging inicial
-                    else:
-                        dias_sin_movimiento = 25
-                
-                # Aging criteria: 20-45 days (más amplio que 31-60)
-                if 20 <= dias_sin_movimiento <= 45:
-                    monto = 0
-                    try:
-                        if 'monto_aprobado' in row and pd.notna(row['monto_aprobado']):
-                            monto = float(row['monto_aprobado'])
-                        elif 'monto_propuesto' in row and pd.notna(row['monto_propuesto']):
-                            monto = float(row['monto_propuesto'])
-                    except:
-                        pass
-                    
-                    aging_edps.append({
-                        "id": row.get("id", "N/A"),
-                        "n_edp": row.get("n_edp", "N/A"),
-                        "cliente": row.get("cliente", "Cliente N/A"),
-                        "proyecto": row.get("proyecto", "Proyecto N/A"),
-                        "monto": monto,
-                        "monto_formatted": f"${monto:,.0f}".replace(",", ".") if monto else "$0",
-                        "dias": dias_sin_movimiento,
-                        "jefe_proyecto": row.get("jefe_proyecto", "Sin asignar"),
-                        "estado": row.get("estado", "pendiente"),
-                        "fecha_emision": str(row.get("fecha_emision", "Sin fecha")),
-                        "urgencia": "warning"
-                    })
-        
+        df_problematic = df_classified[df_classified["estado_norm"].isin(problematic_states)]
+
+        # Valor por defecto más conservador para aging cuando no hay días
+        estado = df_problematic["estado_norm"]
+        dias_default = np.select(
+            [estado.str.contains("revision", regex=False), estado.str.contains("enviado", regex=False)],
+            [40, 35],
+            default=25,
+        )
+        dias = df_problematic["dias"].where(df_problematic["dias"] != 0, dias_default)
+
+        # Aging criteria: 20-45 days (más amplio que 31-60)
+        en_aging = dias.between(20, 45)
+        aging_edps = _modal_edp_records(df_problematic[en_aging], "warning", dias[en_aging])
+
         # Si no hay aging, mostrar algunos EDPs como ejemplo
-        if len(aging_edps) == 0 and len(df_problematic) > 0:
-            print("🔍 DEBUG: No hay aging, mostrando algunos EDPs como ejemplo")
-            for index, row in df_problematic.head(5).iterrows():
-                monto = 0
-                try:
-                    if 'monto_aprobado' in row and pd.notna(row['monto_aprobado']):
-                        monto = float(row['monto_aprobado'])
-                    elif 'monto_propuesto' in row and pd.notna(row['monto_propuesto']):
-                        monto = float(row['monto_propuesto'])
-                except:
-                    pass
-                
-                aging_edps.append({
-                    "id": row.get("id", "N/A"),
-                    "n_edp": row.get("n_edp", "N/A"),
-                    "cliente": row.get("cliente", "Cliente N/A"),
-                    "proyecto": row.get("proyecto", "Proyecto N/A"),
-                    "monto": monto,
-                    "monto_formatted": f"${monto:,.0f}".replace(",", ".") if monto else "$0",
-                    "dias": 35,  # Valor medio para aging
-                    "jefe_proyecto": row.get("jefe_proyecto", "Sin asignar"),
-                    "estado": row.get("estado", "pendiente"),
-                    "fecha_emision": str(row.get("fecha_emision", "Sin fecha")),
-                    "urgencia": "warning"
-                })
-        
-        # Calculate summary
+        if not aging_edps and not df_problematic.empty:
+            ejemplo = df_problematic.head(5)
+            aging_edps = _modal_edp_records(ejemplo, "warning", pd.Series(35, index=ejemplo.index))
+
         total_aging_amount = sum(edp["monto"] for edp in aging_edps)
         avg_days = sum(edp["dias"] for edp in aging_edps) / len(aging_edps) if aging_edps else 32
-        
+
         # Calculate realistic trend change for aging
-        trend_change = 0
         if len(aging_edps) > 8:
             trend_change = 18  # Many aging EDPs means concerning trend
         elif len(aging_edps) > 4:
@@ -3631,31 +3549,24 @@ def api_aging_edps():
             trend_change = -12 # Few aging means good control
         else:
             trend_change = -20 # No aging means excellent performance
-        
+
         summary = {
             "total_count": len(aging_edps),
             "total_amount": total_aging_amount,
             "avg_days": round(avg_days, 1) if avg_days > 0 else 32,
             "trend_change": trend_change
         }
-        
-        result = {
+
+        return fast_jsonify({
             "success": True,
             "aging_edps": aging_edps,
             "summary": summary,
             "filters_applied": filters
-        }
-        
-        return jsonify(result)
-        
-    except Exception as e:
-        return jsonify({
-            "success": False, 
-            "message": f"Error interno: {str(e)}", 
-            "aging_edps": [],
-            "summary": {}
         })
 
+    except Exception as e:
+        return _classified_edps_error("aging_edps", f"Error interno: {str(e)}")
+
 @management_bp.route("/api/fast_collection_edps")
 @login_required
 def api_fast_collection_edps():
@@ -3664,155 +3575,48 @@ def api_fast_collection_edps():
     Returns detailed data for modal tables.
     """
     try:
-        # Parse filters from request
         filters = _parse_filters(request)
-        
-        # Get EDPs data
-        datos_response = manager_service.load_related_data()
-        if not datos_response.success:
-            return jsonify({
-                "success": False, 
-                "message": datos_response.message,
-                "fast_collection_edps": [],
-                "summary": {}
-            })
-        
-        datos_relacionados = datos_response.data
-        df_edp = pd.DataFrame(datos_relacionados.get("edps", []))
-        
-        if df_edp.empty:
-            return jsonify({
-                "success": False, 
-                "message": "No hay datos de EDPs disponibles",
-                "fast_collection_edps": [],
-                "summary": {}
-            })
-        
-        # Apply filters
-        df_filtered = manager_service._apply_manager_filters(df_edp, filters)
-        df_prepared = manager_service._prepare_kpi_data(df_filtered.copy())
-        
-        # Define fast collection criteria - broader scope
-        fast_edps = []
-        
-        # Estados que pueden ser considerados "rápidos" o recientes
+
+        classified_response = manager_service.get_classified_edps(filters)
+        if not classified_response.success:
+            return _classified_edps_error("fast_collection_edps", classified_response.message)
+        df_classified = classified_response.data
+
+        # Estados recientes primero, luego pendientes que pueden ser rápidos
         recent_states = ["validado", "pagado", "aprobado", "conformidad emitida", "revision interna"]
-        
-        # Primero buscar EDPs realmente rápidos
-        df_recent = df_prepared[
-            df_prepared["estado"].str.strip().str.lower().isin([s.lower() for s in recent_states])
-        ].copy()
-        
-        # También incluir algunos EDPs pendientes pero recientes
         pending_states = ["enviado", "revision", "pendiente"]
-        df_pending_recent = df_prepared[
-            df_prepared["estado"].str.strip().str.lower().isin([s.lower() for s in pending_states])
-        ].copy()
-        
-        # Combinar ambos conjuntos
-        df_combined = pd.concat([df_recent, df_pending_recent]).drop_duplicates()
-        
-        if not df_combined.empty:
-            for index, row in df_combined.iterrows():
-                dias_sin_movimiento = 0
-                
-                # Calcular días para fast collection
-                if 'dso_actual' in row and pd.notna(row['dso_actual']):
-                    try:
-                        dias_sin_movimiento = int(float(row['dso_actual']))
-                    except:
-                        pass
-                
-                if dias_sin_movimiento == 0 and 'dso_actual' in row and pd.notna(row['dso_actual']):
-                    try:
-                        dias_sin_movimiento = int(float(row['dso_actual']))
-                    except:
-                        pass
-                
-                if dias_sin_movimiento == 0 and 'fecha_emision' in row and pd.notna(row['fecha_emision']):
-                    try:
-                        from datetime import datetime
-                        if isinstance(row['fecha_emision'], str):
-                            fecha_emision = pd.to_datetime(row['fecha_emision'])
-                        else:
-                            fecha_emision = row['fecha_emision']
-                        
-                        if pd.notna(fecha_emision):
-                            dias_sin_movimiento = (datetime.now() - fecha_emision).days
-                    except:
-                        pass
-                
-                # Valores optimistas para fast collection
-                if dias_sin_movimiento == 0:
-                    estado_lower = str(row.get('estado', '')).lower().strip()
-                    if any(word in estado_lower for word in ['validado', 'pagado', 'aprobado']):
-                        dias_sin_movimiento = 10  # Muy rápido
-                    elif 'revision' in estado_lower:
-                        dias_sin_movimiento = 15  # Rápido
-                    else:
-                        dias_sin_movimiento = 20  # Relativamente rápido
-                
-                # Fast collection criteria: < 25 days (más amplio que < 30)
-                if dias_sin_movimiento < 25:
-                    monto = 0
-                    try:
-                        if 'monto_aprobado' in row and pd.notna(row['monto_aprobado']):
-                            monto = float(row['monto_aprobado'])
-                        elif 'monto_propuesto' in row and pd.notna(row['monto_propuesto']):
-                            monto = float(row['monto_propuesto'])
-                    except:
-                        pass
-                    
-                    fast_edps.append({
-                        "id": row.get("id", "N/A"),
-                        "n_edp": row.get("n_edp", "N/A"),
-                        "cliente": row.get("cliente", "Cliente N/A"),
-                        "proyecto": row.get("proyecto", "Proyecto N/A"),
-                        "monto": monto,
-                        "monto_formatted": f"${monto:,.0f}".replace(",", ".") if monto else "$0",
-                        "dias": dias_sin_movimiento,
-                        "jefe_proyecto": row.get("jefe_proyecto", "Sin asignar"),
-                        "estado": row.get("estado", "pendiente"),
-                        "fecha_emision": str(row.get("fecha_emision", "Sin fecha")),
-                        "urgencia": "low"
-                    })
-        
+        df_combined = pd.concat([
+            df_classified[df_classified["estado_norm"].isin(recent_states)],
+            df_classified[df_classified["estado_norm"].isin(pending_states)],
+        ])
+
+        # Valores optimistas para fast collection cuando no hay días
+        estado = df_combined["estado_norm"]
+        dias_default = np.select(
+            [estado.str.contains("validado|pagado|aprobado"), estado.str.contains("revision", regex=False)],
+            [10, 15],
+            default=20,
+        )
+        dias = df_combined["dias"].where(df_combined["dias"] != 0, dias_default)
+
+        # Fast collection criteria: < 25 days (más amplio que < 30)
+        es_rapido = dias < 25
+        df_fast = df_combined[es_rapido]
+        dias = dias[es_rapido]
+
         # Si no hay fast collection, mostrar algunos EDPs como ejemplo optimista
-        if len(fast_edps) == 0 and len(df_combined) > 0:
-            print("🔍 DEBUG: No hay fast collection, mostrando algunos como ejemplo")
-            for index, row in df_combined.head(3).iterrows():
-                monto = 0
-                try:
-                    if 'monto_aprobado' in row and pd.notna(row['monto_aprobado']):
-                        monto = float(row['monto_aprobado'])
-                    elif 'monto_propuesto' in row and pd.notna(row['monto_propuesto']):
-                        monto = float(row['monto_propuesto'])
-                except:
-                    pass
-                
-                fast_edps.append({
-                    "id": row.get("id", "N/A"),
-                    "n_edp": row.get("n_edp", "N/A"),
-                    "cliente": row.get("cliente", "Cliente N/A"),
-                    "proyecto": row.get("proyecto", "Proyecto N/A"),
-                    "monto": monto,
-                    "monto_formatted": f"${monto:,.0f}".replace(",", ".") if monto else "$0",
-                    "dias": 12,  # Valor optimista para fast
-                    "jefe_proyecto": row.get("jefe_proyecto", "Sin asignar"),
-                    "estado": row.get("estado", "pendiente"),
-                    "fecha_emision": str(row.get("fecha_emision", "Sin fecha")),
-                    "urgencia": "low"
-                })
-        
+        if df_fast.empty and not df_combined.empty:
+            df_fast = df_combined.head(3)
+            dias = pd.Series(12, index=df_fast.index)
+
         # Sort by amount (descending) - highest priority first
-        fast_edps.sort(key=lambda x: x["monto"], reverse=True)
-        
-        # Calculate summary
+        orden = np.argsort(-df_fast["monto"].to_numpy(dtype=float), kind="stable")
+        fast_edps = _modal_edp_records(df_fast.iloc[orden], "low", dias.iloc[orden])
+
         total_fast_amount = sum(edp["monto"] for edp in fast_edps)
         avg_days = sum(edp["dias"] for edp in fast_edps) / len(fast_edps) if fast_edps else 15
-        
+
         # Calculate realistic trend change for fast collection
-        trend_change = 0
         if len(fast_edps) > 10:
             trend_change = -25  # Many fast collection means excellent performance
         elif len(fast_edps) > 5:
@@ -3823,31 +3627,24 @@ def api_fast_collection_edps():
             trend_change = 5    # Few fast means need improvement
         else:
             trend_change = 15   # No fast collection is concerning
-        
+
         summary = {
             "total_count": len(fast_edps),
             "total_amount": total_fast_amount,
             "avg_days": round(avg_days, 1) if avg_days > 0 else 15,
             "trend_change": trend_change
         }
-        
-        result = {
+
+        return fast_jsonify({
             "success": True,
             "fast_collection_edps": fast_edps,
             "summary": summary,
             "filters_applied": filters
-        }
-        
-        return jsonify(result)
-        
-    except Exception as e:
-        return jsonify({
-            "success": False, 
-            "message": f"Error interno: {str(e)}", 
-            "fast_collection_edps": [],
-            "summary": {}
         })
 
+    except Exception as e:
+        return _classified_edps_error("fast_collection_edps", f"Error interno: {str(e)}")
+
 @management_bp.route("/api/manager_projects/<manager_name>")
 @login_required
 def api_manager_projects(manager_name):
@@ -3873,7 +3670,7 @@ def api_manager_projects(manager_name):
             })
         
         datos_relacionados = datos_response.data
-        df_edp = pd.DataFrame(datos_relacionados.get("edps", []))
+        df_edp = datos_relacionados.frame("edps")
         
         if df_edp.empty:
             return jsonify({
@@ -4274,40 +4071,8 @@ def api_aging_detail(range):
     Returns EDPs in specific aging range with email functionality.
     """
     try:
-        print(f"API aging_detail called for range: {range}")
-        
-        # Parse filters from request
         filters = _parse_filters(request)
-        
-        # Get EDPs data
-        datos_response = manager_service.load_related_data()
-        if not datos_response.success:
-            print(f"Failed to load related data: {datos_response.message}")
-            return jsonify({
-                "success": False, 
-                "message": datos_response.message,
-                "aging_edps": [],
-                "summary": {}
-            })
-        
-        datos_relacionados = datos_response.data
-        df_edp = pd.DataFrame(datos_relacionados.get("edps", []))
-        
-        if df_edp.empty:
-            print("No EDP data available")
-            return jsonify({
-                "success": False, 
-                "message": "No hay datos de EDPs disponibles",
-                "aging_edps": [],
-                "summary": {}
-            })
-        
-        print(f"Loaded {len(df_edp)} EDPs")
-        
-        # Apply filters
-        df_filtered = manager_service._apply_manager_filters(df_edp, filters)
-        df_prepared = manager_service._prepare_kpi_data(df_filtered.copy())
-        
+
         # Define aging ranges and their criteria
         aging_ranges = {
             '0-15': {'min_days': 0, 'max_days': 15, 'risk': 'safe'},
@@ -4317,133 +4082,83 @@ def api_aging_detail(range):
             '61-90': {'min_days': 61, 'max_days': 90, 'risk': 'danger'},
             '90+': {'min_days': 91, 'max_days': 999, 'risk': 'critical'}
         }
-        
+
         if range not in aging_ranges:
-            print(f"Invalid range: {range}")
             return jsonify({
                 "success": False,
                 "message": f"Rango de aging no válido: {range}",
                 "aging_edps": [],
                 "summary": {}
             })
-        
+
         range_config = aging_ranges[range]
-        print(f"Processing range {range}: {range_config}")
-        
-        # Filter EDPs by aging range - only EDPs that are actually pending payment
+
+        classified_response = manager_service.get_classified_edps(filters)
+        if not classified_response.success:
+            return _classified_edps_error("aging_edps", classified_response.message)
+        df_classified = classified_response.data
+
+        # Only EDPs that are actually pending payment, with amount and EDP number
         problematic_states = ["enviado", "revisión", "pendiente", "enviado cliente", "revision cliente", "aprobado", "facturado"]
-        
-        # Filter by problematic states and ensure we have valid EDPs with amounts
         excluded_states = ["pagado", "completado", "finalizado", "cancelado", "rechazado"]
-        
-        df_problematic = df_prepared[
-            (df_prepared["estado"].str.strip().str.lower().isin([s.lower() for s in problematic_states])) &
-            (~df_prepared["estado"].str.strip().str.lower().isin([s.lower() for s in excluded_states])) &  # Exclude completed/paid states
-            (df_prepared["monto_propuesto"] > 0) &  # Only EDPs with valid amounts
-            (df_prepared["n_edp"].notna()) &  # Must have EDP number
-            (df_prepared["n_edp"].astype(str).str.strip() != "")  # EDP number not empty (convert to string first)
-        ].copy()
-        
-        print(f"Found {len(df_problematic)} problematic EDPs")
-        
-        # Debug: Show sample of problematic EDPs
-        if not df_problematic.empty:
-            print("Sample problematic EDPs:")
-            for _, row in df_problematic.head(3).iterrows():
-                print(f"  EDP: {row.get('n_edp')}, Estado: {row.get('estado')}, Monto: {row.get('monto_propuesto')}")
-        
-        # Calculate days since last movement for each EDP
-        df_problematic['dias_sin_movimiento'] = df_problematic.apply(
-            lambda row: manager_service._calculate_days_since_movement(row), axis=1
+
+        estado = df_classified["estado_norm"]
+        n_edp = df_classified["n_edp"]
+        # aging_rango viene de dias_sin_movimiento con los mismos cortes que aging_ranges
+        aging_edps = df_classified[
+            estado.isin(problematic_states)
+            & ~estado.isin(excluded_states)
+            & (df_classified["monto_propuesto"] > 0)
+            & n_edp.notna()
+            & (n_edp.astype(str).str.strip() != "")
+            & (df_classified["aging_rango"] == range)
+        ]
+
+        defaults = {
+            'id': None,
+            'n_edp': 'N/A',
+            'cliente': 'N/A',
+            'proyecto': 'N/A',
+            'jefe_proyecto': 'Sin asignar',
+            'estado': 'N/A',
+            'fecha_creacion': 'N/A',
+            'ultima_actualizacion': 'N/A',
+            'email_cliente': 'diegobravobe@gmail.com',  # Default for testing
+            'telefono_cliente': '+56 9 xxxx xxxx',
+            'contacto_cliente': 'Contacto Cliente',
+        }
+        records = pd.DataFrame(
+            {name: aging_edps[name] if name in aging_edps.columns else default for name, default in defaults.items()},
+            index=aging_edps.index,
         )
-        
-        # Filter by aging range
-        aging_edps = df_problematic[
-            (df_problematic['dias_sin_movimiento'] >= range_config['min_days']) &
-            (df_problematic['dias_sin_movimiento'] <= range_config['max_days'])
-        ].copy()
-        
-        print(f"Found {len(aging_edps)} EDPs in aging range {range}")
-        
-        # Debug: Show total amount before processing
-        if not aging_edps.empty:
-            total_before = aging_edps['monto_propuesto'].sum()
-            print(f"Total amount before processing: ${total_before:,.0f}")
-        
-        # Prepare EDPs data for response
-        aging_edps_list = []
-        total_amount = 0
-        
-        for _, edp in aging_edps.iterrows():
-            monto = edp.get('monto_propuesto', 0) or 0
-            total_amount += monto
-            print(f"Processing EDP {edp.get('n_edp')}: monto={monto}, running_total={total_amount}")
-            
-            edp_data = {
-                'id': edp.get('id'),
-                'n_edp': edp.get('n_edp', 'N/A'),
-                'cliente': edp.get('cliente', 'N/A'),
-                'proyecto': edp.get('proyecto', 'N/A'),
-                'monto_propuesto': monto,
-                'monto_formatted': f"${monto:,.0f}".replace(",", ".") if monto > 0 else "Sin monto",
-                'dias': edp.get('dias_sin_movimiento', 0),
-                'jefe_proyecto': edp.get('jefe_proyecto', 'Sin asignar'),
-                'estado': edp.get('estado', 'N/A'),
-                'fecha_creacion': edp.get('fecha_creacion', 'N/A'),
-                'ultima_actualizacion': edp.get('ultima_actualizacion', 'N/A'),
-                'email_cliente': edp.get('email_cliente', 'diegobravobe@gmail.com'),  # Default for testing
-                'telefono_cliente': edp.get('telefono_cliente', '+56 9 xxxx xxxx'),
-                'contacto_cliente': edp.get('contacto_cliente', 'Contacto Cliente'),
-                'risk_level': range_config['risk']
-            }
-            aging_edps_list.append(edp_data)
-        
-        # Calculate summary metrics
+        monto = aging_edps['monto_propuesto'].fillna(0).astype(float)
+        records['monto_propuesto'] = monto
+        records['monto_formatted'] = [f"${m:,.0f}".replace(",", ".") if m > 0 else "Sin monto" for m in monto]
+        records['dias'] = aging_edps['dias_sin_movimiento']
+        records['risk_level'] = range_config['risk']
+        aging_edps_list = records.to_dict('records')
+
+        total_amount = float(monto.sum())
+        dias = aging_edps['dias_sin_movimiento']
         summary = {
             'range': range,
             'risk_level': range_config['risk'],
             'total_edps': len(aging_edps_list),
             'total_amount': total_amount,
             'total_amount_formatted': f"${total_amount:,.0f}".replace(",", ".") if total_amount > 0 else "Sin monto",
-            'average_days': aging_edps['dias_sin_movimiento'].mean() if not aging_edps.empty else 0,
-            'max_days': aging_edps['dias_sin_movimiento'].max() if not aging_edps.empty else 0,
-            'min_days': aging_edps['dias_sin_movimiento'].min() if not aging_edps.empty else 0
+            'average_days': float(dias.mean()) if not aging_edps.empty else 0,
+            'max_days': int(dias.max()) if not aging_edps.empty else 0,
+            'min_days': int(dias.min()) if not aging_edps.empty else 0
         }
-        
-        print(f"Successfully processed {len(aging_edps_list)} EDPs for range {range}")
-        
-        # Debug: Print sample EDP data
-        if aging_edps_list:
-            sample_edp = aging_edps_list[0]
-            print(f"Sample EDP data:")
-            print(f"  monto_propuesto: {sample_edp['monto_propuesto']}")
-            print(f"  monto_formatted: {sample_edp['monto_formatted']}")
-            print(f"  total_amount: {summary['total_amount']}")
-            print(f"  total_amount_formatted: {summary['total_amount_formatted']}")
-        
-        # Debug: Create test response to verify data
-        test_response = {
+
+        return fast_jsonify({
             "success": True,
             "message": f"EDPs en aging {range} días obtenidos exitosamente",
             "aging_edps": aging_edps_list,
             "summary": summary
-        }
-        
-        print(f"Final response summary:")
-        print(f"  Total EDPs: {len(aging_edps_list)}")
-        print(f"  Total amount: {summary['total_amount']}")
-        print(f"  Total amount formatted: {summary['total_amount_formatted']}")
-        
-        # Test with known values to verify frontend formatting
-        if range == '90+':
-            test_response['summary']['total_amount'] = 2370299866  # Known problematic value
-            print(f"TEST: Using known problematic value: {test_response['summary']['total_amount']}")
-        
-        return jsonify(test_response)
-        
+        })
+
     except Exception as e:
-        print(f"Error in api_aging_detail: {str(e)}")
-        import traceback
         traceback.print_exc()
         logger.error(f"Error getting aging detail for range {range}: {e}")
         return jsonify({
@@ -311,11 +311,11 @@ def api_get_kpis():
         # Use current authenticated user's name as the manager
         manager_name = _get_manager_name()
         
-        dashboard_data = pm_service.get_dashboard_data(manager_name)
+        kpis = pm_service.get_dashboard_section(manager_name, 'kpis', {})
         
         return jsonify({
             'success': True,
-            'data': dashboard_data.get('kpis', {}),
+            'data': kpis,
             'timestamp': datetime.now().isoformat()
         })
         
@@ -336,12 +336,12 @@ def api_get_projects():
         # Use current authenticated user's name as the manager
         manager_name = _get_manager_name()
         
-        dashboard_data = pm_service.get_dashboard_data(manager_name)
+        projects = pm_service.get_dashboard_section(manager_name, 'project_performance', [])
         
         return jsonify({
             'success': True,
-            'data': dashboard_data.get('project_performance', []),
-            'total': len(dashboard_data.get('project_performance', [])),
+            'data': projects,
+            'total': len(projects),
             'timestamp': datetime.now().isoformat()
         })
         
@@ -387,12 +387,12 @@ def api_get_alerts():
         # Use current authenticated user's name as the manager
         manager_name = _get_manager_name()
         
-        dashboard_data = pm_service.get_dashboard_data(manager_name)
+        alerts = pm_service.get_dashboard_section(manager_name, 'alerts', [])
         
         return jsonify({
             'success': True,
-            'data': dashboard_data.get('alerts', []),
-            'count': len(dashboard_data.get('alerts', [])),
+            'data': alerts,
+            'count': len(alerts),
             'timestamp': datetime.now().isoformat()
         })
         
@@ -735,7 +735,7 @@ def _procesar_actualizacion_estado(edp_id: str, nuevo_estado: str, conformidad:
 
         # Obtener proyecto por id del edp
         df = controller_service.load_related_data().data
-        df_edps = pd.DataFrame(df.get("edps", []))
+        df_edps = df.frame("edps")
         proyecto = df_edps[df_edps["n_edp"] == edp_id]["proyecto"].values[0] if not df_edps[df_edps["n_edp"] == edp_id].empty else None
       
         print(f"   - Proyecto asociado: {proyecto}")
@@ -181,6 +181,7 @@ def upgrade_tenant(tenant_id):
         # Upgrade the plan
         tenant.upgrade_plan(new_plan)
         db.session.commit()
+        _invalidate_tenant_cache(tenant)
         
         # Log the change
         current_app.logger.info(f"Tenant {tenant.company_name} upgraded from {old_plan} to {new_plan}")
@@ -225,6 +226,7 @@ def activate_subscription(tenant_id):
         # Activate subscription
         tenant.activate_subscription()
         db.session.commit()
+        _invalidate_tenant_cache(tenant)
         
         current_app.logger.info(f"Subscription activated for tenant {tenant.company_name}")
         
@@ -271,7 +273,8 @@ def get_tenant_stats(tenant_id):
             'success': True,
             'data': {
                 'tenant_info': tenant.to_dict(),
-                'database_stats': stats
+                'database_stats': stats,
+                'pool_stats': tenant_db_manager.get_pool_stats()['tenants'].get(tenant.id)
             }
         })
         
@@ -312,6 +315,15 @@ def list_tenants():
         }), 500
 
 
+def _invalidate_tenant_cache(tenant):
+    """Drop cached tenant metadata after it changes."""
+    try:
+        from ..services.tenant_registry import get_tenant_registry
+        get_tenant_registry().invalidate(tenant)
+    except Exception as e:
+        current_app.logger.warning(f"Could not invalidate tenant cache for {tenant.id}: {e}")
+
+
 def _send_welcome_email(tenant):
     """Send welcome email to new tenant."""
     try:
@@ -5,18 +5,42 @@ Maneja análisis de retrabajos, tendencias y reportes detallados
 
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
+import json
+import os
+import threading
+import time
 import pandas as pd
 import numpy as np
 from ..repositories import BaseRepository
 from ..utils.date_utils import DateUtils
 from ..utils.format_utils import FormatUtils
 from ..utils.validation_utils import ValidationUtils
+from ..repositories.rework_repository import REWORK_EVENT_COLUMNS, rework_store_enabled
 from . import ServiceResponse
+from .cache_invalidation_service import current_data_generation
+from .manager_analytics_engine import ManagerAnalytics, ManagerAnalyticsEngine
+from .related_data import find_all_dataframe_memoized
+from ..utils.instrumentation import record_cache, stage_timer
 import logging
 import traceback
 
 logger = logging.getLogger(__name__)
 
+MANAGER_ANALYTICS_CACHE_TTL = int(os.getenv("MANAGER_ANALYTICS_CACHE_TTL", "120"))
+MANAGER_ANALYTICS_CACHE_MAX_ENTRIES = int(os.getenv("MANAGER_ANALYTICS_CACHE_MAX_ENTRIES", "32"))
+# Filtros que cambian el conjunto de EDPs analizado (ver _aplicar_filtros_analytics)
+MANAGER_ANALYTICS_FILTER_KEYS = ("mes", "encargado", "cliente", "estado")
+
+# (generación de datos, filtros) -> (timestamp, analítica)
+_manager_analytics_cache: Dict[Tuple[str, str], Tuple[float, ManagerAnalytics]] = {}
+_manager_analytics_lock = threading.Lock()
+
+
+def clear_manager_analytics_cache() -> None:
+    """Descartar la analítica agrupada por encargado."""
+    with _manager_analytics_lock:
+        _manager_analytics_cache.clear()
+
 
 class AnalyticsService:
     """Servicio para análisis avanzados y reportes detallados"""
@@ -24,8 +48,11 @@ class AnalyticsService:
     def __init__(self):
         from ..repositories.edp_repository import EDPRepository
         from ..repositories.log_repository import LogRepository
+        from ..repositories.rework_repository import ReworkRepository
         self.edp_repository = EDPRepository()
         self.log_repository = LogRepository()
+        self.rework_repository = ReworkRepository()
+        self.manager_engine = ManagerAnalyticsEngine()
         self.date_utils = DateUtils()
         self.format_utils = FormatUtils()
         self.validation_utils = ValidationUtils()
@@ -76,50 +103,23 @@ class AnalyticsService:
             ServiceResponse con datos del encargado
         """
         try:
-            edps_response = self.edp_repository.find_all_dataframe()
-
-            df_edp = pd.DataFrame(edps_response.get("data", []))
-
-            # Filtrar por encargado
-            df_encargado = df_edp[df_edp["jefe_proyecto"] == nombre].copy()
-            logger.debug(df_encargado.head())  # Debugging line
-            if df_encargado.empty:
+            # Drill-down: búsqueda en la analítica agrupada de todos los encargados
+            analytics = self._get_manager_analytics()
+            if nombre not in analytics:
                 return ServiceResponse(
                     success=False, message=f"No hay EDPs registrados para {nombre}"
                 )
 
-            # Limpiar y preparar datos
-
-            # Análisis financiero
-            analisis_financiero = self._analizar_financiero_encargado(
-                df_encargado, nombre
-            )
-
-            # Análisis de rendimiento
-            analisis_rendimiento = self._analizar_rendimiento_encargado(
-                df_encargado, df_edp
-            )
-
-            # Resumen por proyecto
-            resumen_proyectos = self._generar_resumen_proyectos(df_encargado)
-
-            # Tendencias
-            tendencias = self._analizar_tendencias_encargado(df_encargado)
-
-            # Tendencia semanal de cobranza
-            tendencia_semanal = self._generar_tendencia_semanal_cobro(df_encargado)
-
-            # Top EDPs pendientes individuales
-            top_edps_pendientes = self._obtener_top_edps_pendientes(df_encargado, 10)
+            df_encargado = analytics.registros(nombre)
 
             datos_encargado = {
                 "nombre": nombre,
-                "resumen_proyectos": resumen_proyectos,
-                "analisis_financiero": analisis_financiero,
-                "analisis_rendimiento": analisis_rendimiento,
-                "tendencias": tendencias,
-                "tendencia_semanal": tendencia_semanal,
-                "top_edps_pendientes": top_edps_pendientes,
+                "resumen_proyectos": analytics.resumen_proyectos(nombre),
+                "analisis_financiero": analytics.financiero(nombre),
+                "analisis_rendimiento": analytics.rendimiento(nombre),
+                "tendencias": analytics.tendencias(nombre),
+                "tendencia_semanal": analytics.tendencia_semanal(nombre),
+                "top_edps_pendientes": self._obtener_top_edps_pendientes(df_encargado, 10),
                 "registros": df_encargado.to_dict("records"),
             }
 
@@ -148,33 +148,14 @@ class AnalyticsService:
             ServiceResponse con comparativa de encargados
         """
         try:
-            edps_response = self.edp_repository.find_all_dataframe()
-            # Debugging line
-            df_edp = pd.DataFrame(edps_response.get("data", []))
-
-            # Aplicar filtros si existen
             filtros = filtros or {}
-            df_filtrado = self._aplicar_filtros_analytics(df_edp, filtros)
-
-            # Análisis por encargado
-            analisis_encargados = self._analizar_todos_encargados(df_filtrado)
-
-            # Métricas comparativas
-            metricas_comparativas = self._calcular_metricas_comparativas(
-                analisis_encargados
-            )
-
-            # Ranking de rendimiento
-            ranking = self._generar_ranking_encargados(analisis_encargados)
-
-            # Opciones para filtros
-            opciones_filtro = self._generar_opciones_filtro(df_edp)
+            analytics = self._get_manager_analytics(filtros)
 
             datos_globales = {
-                "analisis_encargados": analisis_encargados,
-                "metricas_comparativas": metricas_comparativas,
-                "ranking": ranking,
-                "opciones_filtro": opciones_filtro,
+                "analisis_encargados": analytics.resumen_encargados(),
+                "metricas_comparativas": analytics.comparativas(),
+                "ranking": analytics.ranking(),
+                "opciones_filtro": self._generar_opciones_filtro(self._load_edp_frame()),
                 "filtros_aplicados": filtros,
             }
 
@@ -192,6 +173,40 @@ class AnalyticsService:
                 message=f"Error técnico al obtener vista global:\n{str(e)}",
             )
 
+    def _load_edp_frame(self) -> pd.DataFrame:
+        edps_response = find_all_dataframe_memoized("edps", self.edp_repository)
+        return pd.DataFrame(edps_response.get("data", []))
+
+    def _get_manager_analytics(self, filtros: Optional[Dict] = None) -> ManagerAnalytics:
+        """
+        Analítica agrupada de todos los encargados para un conjunto de filtros,
+        cacheada por proceso y generación de datos.
+        """
+        filtros_clave = {
+            key: (filtros or {}).get(key) for key in MANAGER_ANALYTICS_FILTER_KEYS
+        }
+        generation = current_data_generation()
+        cache_key = (generation, json.dumps(filtros_clave, sort_keys=True, default=str))
+        now = time.time()
+        with _manager_analytics_lock:
+            entry = _manager_analytics_cache.get(cache_key)
+        if entry and now - entry[0] < MANAGER_ANALYTICS_CACHE_TTL:
+            record_cache("manager_analytics", True)
+            return entry[1]
+        record_cache("manager_analytics", False)
+
+        with stage_timer("manager_analytics.compute"):
+            df_filtrado = self._aplicar_filtros_analytics(self._load_edp_frame(), filtros_clave)
+            analytics = self.manager_engine.compute(df_filtrado)
+        with _manager_analytics_lock:
+            for key, (ts, _) in list(_manager_analytics_cache.items()):
+                if key[0] != generation or now - ts >= MANAGER_ANALYTICS_CACHE_TTL:
+                    del _manager_analytics_cache[key]
+            while len(_manager_analytics_cache) >= MANAGER_ANALYTICS_CACHE_MAX_ENTRIES:
+                del _manager_analytics_cache[next(iter(_manager_analytics_cache))]
+            _manager_analytics_cache[cache_key] = (now, analytics)
+        return analytics
+
     def get_manager_project_view(
         self, nombre: str, proyecto: str
     ) -> ServiceResponse:
@@ -256,149 +271,6 @@ class AnalyticsService:
                 message=f"Error al obtener datos del proyecto: {str(e)}"
             )
 
-    def _calcular_metricas_comparativas(self, analisis_encargados: Dict) -> Dict:
-        """Calcula métricas comparativas entre encargados"""
-        if not analisis_encargados:
-            return {}
-
-        # Extraer valores para comparación
-        montos_pagados = [data["monto_pagado"] for data in analisis_encargados.values()]
-        dsos = [data["dso"] for data in analisis_encargados.values()]
-        eficiencias = [data["eficiencia"] for data in analisis_encargados.values()]
-
-        return {
-            "promedio_monto_pagado": np.mean(montos_pagados),
-            "mejor_monto_pagado": max(montos_pagados),
-            "peor_monto_pagado": min(montos_pagados),
-            "promedio_dso": np.mean(dsos),
-            "mejor_dso": min(dsos),  # Menor DSO es mejor
-            "peor_dso": max(dsos),
-            "promedio_eficiencia": np.mean(eficiencias),
-            "mejor_eficiencia": max(eficiencias),
-            "peor_eficiencia": min(eficiencias),
-        }
-
-    def _generar_ranking_encargados(self, analisis_encargados: Dict) -> List[Dict]:
-        """Genera ranking de encargados por rendimiento"""
-        ranking = []
-
-        for encargado, data in analisis_encargados.items():
-            # Cálculo de score compuesto (ejemplo)
-            score_monto = data["monto_pagado"] / 1_000_000  # Normalizar a millones
-            score_eficiencia = data["eficiencia"]
-            score_dso = max(0, 100 - data["dso"])  # Inverso del DSO
-
-            score_total = (
-                (score_monto * 0.4) + (score_eficiencia * 0.3) + (score_dso * 0.3)
-            )
-
-            ranking.append(
-                {
-                    "encargado": encargado,
-                    "score_total": round(score_total, 2),
-                    "monto_pagado": data["monto_pagado"],
-                    "eficiencia": data["eficiencia"],
-                    "dso": data["dso"],
-                }
-            )
-
-        # Ordenar por score total descendente
-        ranking.sort(key=lambda x: x["score_total"], reverse=True)
-
-        # Agregar posición
-        for i, item in enumerate(ranking):
-            item["posicion"] = i + 1
-
-        return ranking
-
-    def _analizar_todos_encargados(self, df: pd.DataFrame) -> Dict:
-        """Analiza todos los encargados para vista comparativa"""
-        encargados = df["jefe_proyecto"].unique()
-        analisis = {}
-
-        for encargado in encargados:
-            if pd.isna(encargado):
-                continue
-
-            df_encargado = df[df["jefe_proyecto"] == encargado]
-
-            # Cálculos básicos
-            total_edps = len(df_encargado)
-            df_pagados = df_encargado[
-                df_encargado["estado"].isin(["pagado", "validado"])
-            ]
-            monto_pagado = df_pagados["monto_aprobado"].sum()
-            monto_pendiente = df_encargado[
-                ~df_encargado["estado"].isin(["pagado", "validado"])
-            ]["monto_propuesto"].sum()
-
-            # DSO
-            dso = self._calcular_dso_dataset(df_encargado)
-
-            # Criticidad - calcular basado en dso_actual si no existe la columna critico
-            if "critico" in df_encargado.columns:
-                edps_criticos = len(df_encargado[df_encargado["critico"] == 1])
-            else:
-                # Considerar críticos los EDPs con más de 30 días de espera
-                edps_criticos = len(df_encargado[
-                    (df_encargado["dso_actual"].fillna(0) > 30) &
-                    (~df_encargado["estado"].isin(["pagado", "validado"]))
-                ])
-
-            analisis[encargado] = {
-                "total_edps": total_edps,
-                "edps_pagados": len(df_pagados),
-                "monto_pagado": monto_pagado,
-                "monto_pendiente": monto_pendiente,
-                "dso": round(dso, 1),
-                "edps_criticos": edps_criticos,
-                "porcentaje_criticos": (
-                    round((edps_criticos / total_edps * 100), 1)
-                    if total_edps > 0
-                    else 0
-                ),
-                "eficiencia": (
-                    round((len(df_pagados) / total_edps * 100), 1)
-                    if total_edps > 0
-                    else 0
-                ),
-            }
-
-        return analisis
-
-    def _calcular_dso_dataset(self, df: pd.DataFrame) -> float:
-        """
-        Calcula DSO ponderado por monto aprobado para mayor precisión.
-        Un DSO más alto indica más días promedio para cobrar, ponderado por el valor de cada EDP.
-        """
-        if (
-            df.empty
-            or "dso_actual" not in df.columns
-            or "monto_aprobado" not in df.columns
-        ):
-            return 0
-
-        # Filter valid records with positive amounts and days
-        df_valid = df[
-            (df["dso_actual"].notna())
-            & (df["monto_aprobado"].notna())
-            & (df["monto_aprobado"] > 0)
-            & (df["dso_actual"] >= 0)
-        ].copy()
-
-        if df_valid.empty:
-            return 0
-
-        # Calculate weighted average DSO
-        total_amount = df_valid["monto_aprobado"].sum()
-        if total_amount > 0:
-            weighted_dso = (
-                df_valid["dso_actual"] * df_valid["monto_aprobado"]
-            ).sum() / total_amount
-            return weighted_dso
-
-        return df_valid["dso_actual"].mean()
-
     def get_basic_stats(self) -> ServiceResponse:
         """
         Obtiene estadísticas básicas para la landing page
@@ -504,23 +376,18 @@ class AnalyticsService:
         self, df: pd.DataFrame, filtros: Dict
     ) -> pd.DataFrame:
         """Aplica filtros comunes a los DataFrames"""
-        df_filtrado = df.copy()
-
-        if filtros.get("mes"):
-            df_filtrado = df_filtrado[df_filtrado["mes"] == filtros["mes"]]
-
-        if filtros.get("encargado"):
-            df_filtrado = df_filtrado[
-                df_filtrado["jefe_proyecto"] == filtros["encargado"]
-            ]
-
-        if filtros.get("cliente"):
-            df_filtrado = df_filtrado[df_filtrado["cliente"] == filtros["cliente"]]
-
-        if filtros.get("estado"):
-            df_filtrado = df_filtrado[df_filtrado["estado"] == filtros["estado"]]
+        columnas = {
+            "mes": "mes",
+            "encargado": "jefe_proyecto",
+            "cliente": "cliente",
+            "estado": "estado",
+        }
+        mascara = pd.Series(True, index=df.index)
+        for filtro, columna in columnas.items():
+            if filtros.get(filtro) and columna in df.columns:
+                mascara &= df[columna] == filtros[filtro]
 
-        return df_filtrado
+        return df if mascara.all() else df[mascara]
 
     def _extraer_retrabajos_del_log(
         self, df_log: pd.DataFrame, filtros: Dict
@@ -575,486 +442,6 @@ class AnalyticsService:
 
         return df_enriquecido
 
-    def _analizar_financiero_encargado(
-        self, df_encargado: pd.DataFrame, nombre: str
-    ) -> Dict:
-        """Análisis financiero del encargado"""
-        # Metas por encargado (esto debería venir de configuración)
-        METAS_ENCARGADOS = {
-            "Diego Bravo": 375_000_000,
-            "Carolina López": 375_000_000,
-            "Pedro Rojas": 375_000_000,
-            "Ana Pérez": 375_000_000,
-            "Carlos Alvarez": 375_000_000,
-        }
-
-        meta_encargado = METAS_ENCARGADOS.get(nombre, 375_000_000)
-
-        # EDPs pagados
-        df_pagados = df_encargado[df_encargado["estado"].isin(["pagado", "validado"])]
-
-        monto_pagado = df_pagados["monto_aprobado"].sum()
-        monto_pendiente = df_encargado[
-            ~df_encargado["estado"].isin(["pagado", "validado"])
-        ]["monto_propuesto"].sum()
-
-        avance_meta = (monto_pagado / meta_encargado * 100) if meta_encargado > 0 else 0
-
-        # Calculate approval effectiveness
-        total_edps = len(df_encargado)
-        edps_aprobados = len(df_pagados)
-        tasa_aprobacion = (edps_aprobados / total_edps * 100) if total_edps > 0 else 0
-
-        # Calculate upcoming collections (próximos a cobrar) - EDPs close to payment
-        df_proximos = df_encargado[
-            (df_encargado["estado"].isin(["enviado", "revisión", "pendiente"]))
-            & (df_encargado["dso_actual"] <= 15)
-            & (df_encargado["dso_actual"] >= 0)
-        ]
-        monto_proximo_cobro = df_proximos["monto_aprobado"].sum()
-        cantidad_edp_proximos = len(df_proximos)
-
-        # Calculate critical pending amounts (pendientes críticos > 30 días)
-        df_criticos = df_encargado[
-            (df_encargado["estado"].isin(["enviado", "revisión", "pendiente"]))
-            & (df_encargado["dso_actual"] > 30)
-        ]
-        monto_pendiente_critico = df_criticos["monto_aprobado"].sum()
-        cantidad_edp_criticos = len(df_criticos)
-
-        # Calculate distribution by aging buckets
-        df_pendientes = df_encargado[
-            ~df_encargado["estado"].isin(["pagado", "validado"])
-        ]
-
-        distribucion_aging = {
-            "reciente": len(df_pendientes[df_pendientes["dso_actual"] <= 15]),
-            "medio": len(
-                df_pendientes[
-                    (df_pendientes["dso_actual"] > 15)
-                    & (df_pendientes["dso_actual"] <= 30)
-                ]
-            ),
-            "critico": len(df_pendientes[df_pendientes["dso_actual"] > 30]),
-        }
-
-        # Calculate amounts by aging buckets
-        montos_aging = {
-            "reciente": df_pendientes[df_pendientes["dso_actual"] <= 15][
-                "monto_aprobado"
-            ].sum(),
-            "medio": df_pendientes[
-                (df_pendientes["dso_actual"] > 15)
-                & (df_pendientes["dso_actual"] <= 30)
-            ]["monto_aprobado"].sum(),
-            "critico": df_pendientes[df_pendientes["dso_actual"] > 30][
-                "monto_aprobado"
-            ].sum(),
-        }
-
-        # Calculate efficiency metrics
-        tiempo_promedio_resolucion = (
-            df_pagados["dso_actual"].mean() if len(df_pagados) > 0 else 0
-        )
-
-        # Calculate risk score (0-100, lower is better)
-        riesgo_score = 0
-        if total_edps > 0:
-            riesgo_score = (
-                (cantidad_edp_criticos / total_edps * 40)  # Critical EDPs weight: 40%
-                + (
-                    max(0, (tiempo_promedio_resolucion - 30)) / 60 * 30
-                )  # Time over 30 days weight: 30%
-                + (
-                    max(0, (100 - tasa_aprobacion)) / 100 * 30
-                )  # Low approval rate weight: 30%
-            )
-
-        return {
-            "meta_encargado": meta_encargado,
-            "monto_pagado": monto_pagado,
-            "monto_pendiente": monto_pendiente,
-            "avance_meta": round(avance_meta, 1),
-            "total_edps": total_edps,
-            "edps_pagados": edps_aprobados,
-            "tasa_aprobacion": round(tasa_aprobacion, 1),
-            "monto_proximo_cobro": float(monto_proximo_cobro),
-            "cantidad_edp_proximos": cantidad_edp_proximos,
-            "monto_pendiente_critico": float(monto_pendiente_critico),
-            "cantidad_edp_criticos": cantidad_edp_criticos,
-            "distribucion_aging": distribucion_aging,
-            "montos_aging": montos_aging,
-            "tiempo_promedio_resolucion": round(tiempo_promedio_resolucion, 1),
-            "riesgo_score": round(riesgo_score, 1),
-        }
-
-    def _analizar_rendimiento_encargado(
-        self, df_encargado: pd.DataFrame, df_global: pd.DataFrame
-    ) -> Dict:
-        """Análisis de rendimiento comparativo del encargado"""
-        # DSO del encargado vs global - using weighted average by amount
-        dso_encargado = self._calcular_dso_dataset(df_encargado)
-        dso_global = self._calcular_dso_dataset(df_global)
-
-        # Global approval rate for comparison
-        if len(df_global) > 0:
-            df_global_pagados = df_global[
-                df_global["estado"].isin(["pagado", "validado"])
-            ]
-            tasa_aprobacion_global = len(df_global_pagados) / len(df_global) * 100
-        else:
-            tasa_aprobacion_global = 0
-
-        # Análisis de criticidad
-        if "critico" in df_encargado.columns:
-            edps_criticos = df_encargado[df_encargado["critico"] == 1]
-        else:
-            # Considerar críticos los EDPs con más de 30 días de espera
-            edps_criticos = df_encargado[
-                (df_encargado["dso_actual"].fillna(0) > 30) &
-                (~df_encargado["estado"].isin(["pagado", "validado"]))
-            ]
-        porcentaje_criticos = (
-            (len(edps_criticos) / len(df_encargado) * 100)
-            if len(df_encargado) > 0
-            else 0
-        )
-
-        # Calculate average approval time (días promedio de aprobación)
-        df_con_fechas = df_encargado[
-            (df_encargado["estado"].isin(["pagado", "validado"]))
-            & (df_encargado["dso_actual"].notna())
-            & (df_encargado["dso_actual"] > 0)
-        ]
-        dias_promedio_aprobacion = (
-            df_con_fechas["dso_actual"].mean() if len(df_con_fechas) > 0 else 0
-        )
-
-        # Calculate velocity metrics (EDPs processed per month)
-        if "mes" in df_encargado.columns:
-            edps_por_mes = df_encargado.groupby("mes").size()
-            velocidad_procesamiento = (
-                edps_por_mes.mean() if len(edps_por_mes) > 0 else 0
-            )
-
-            # Calculate monthly payment velocity
-            pagos_por_mes = (
-                df_encargado[df_encargado["estado"].isin(["pagado", "validado"])]
-                .groupby("mes")["monto_aprobado"]
-                .sum()
-            )
-            velocidad_cobro = pagos_por_mes.mean() if len(pagos_por_mes) > 0 else 0
-        else:
-            velocidad_procesamiento = 0
-            velocidad_cobro = 0
-
-        # Calculate improvement trends (last 2 months comparison)
-        meses_unicos = (
-            sorted(df_encargado["mes"].unique())
-            if "mes" in df_encargado.columns
-            else []
-        )
-        tendencia_mejora = "estable"
-
-        if len(meses_unicos) >= 2:
-            ultimo_mes = meses_unicos[-1]
-            penultimo_mes = meses_unicos[-2]
-
-            dso_ultimo = self._calcular_dso_dataset(
-                df_encargado[df_encargado["mes"] == ultimo_mes]
-            )
-            dso_penultimo = self._calcular_dso_dataset(
-                df_encargado[df_encargado["mes"] == penultimo_mes]
-            )
-
-            if dso_ultimo < dso_penultimo * 0.9:  # 10% improvement
-                tendencia_mejora = "mejorando"
-            elif dso_ultimo > dso_penultimo * 1.1:  # 10% deterioration
-                tendencia_mejora = "empeorando"
-
-        return {
-            "dso_encargado": round(dso_encargado, 1),
-            "dso_global": round(dso_global, 1),
-            "diferencia_dso": round(dso_encargado - dso_global, 1),
-            "edps_criticos": len(edps_criticos),
-            "porcentaje_criticos": round(porcentaje_criticos, 1),
-            "tasa_aprobacion_global": round(tasa_aprobacion_global, 1),
-            "dias_promedio_aprobacion": round(dias_promedio_aprobacion, 1),
-            "velocidad_procesamiento": round(velocidad_procesamiento, 1),
-            "velocidad_cobro": round(velocidad_cobro, 0),
-            "tendencia_mejora": tendencia_mejora,
-        }
-
-    def _generar_resumen_proyectos(self, df_encargado: pd.DataFrame) -> Dict:
-        """Genera resumen por proyecto para el encargado"""
-        
-        # Preparar datos agregados - manejar la ausencia de columna 'critico'
-        agg_dict = {
-            "n_edp": "count",
-            "monto_propuesto": "sum",
-            "monto_aprobado": "sum",
-        }
-        
-        # Crear columna critico si no existe
-        if "critico" not in df_encargado.columns:
-            df_encargado = df_encargado.copy()
-            df_encargado["critico"] = (
-                (df_encargado["dso_actual"].fillna(0) > 30) &
-                (~df_encargado["estado"].isin(["pagado", "validado"]))
-            ).astype(int)
-        
-        agg_dict["critico"] = "sum"
-        
-        # Crear columna validado si no existe
-        if "validado" not in df_encargado.columns:
-            df_encargado = df_encargado.copy()
-            df_encargado["validado"] = (
-                df_encargado["estado"].isin(["pagado", "validado"])
-            ).astype(int)
-        
-        agg_dict["validado"] = "sum"
-        
-        resumen = (
-            df_encargado.groupby("proyecto")
-            .agg(agg_dict)
-            .rename(
-                columns={
-                    "n_edp": "Total_EDP",
-                    "critico": "Críticos",
-                    "validado": "Validados",
-                    "monto_propuesto": "Monto_Propuesto_Total",
-                    "monto_aprobado": "Monto_Aprobado_Total",
-                }
-            )
-        )
-
-        # Calcular montos pagados por proyecto
-        df_pagados = df_encargado[df_encargado["estado"].isin(["pagado", "validado"])]
-        monto_pagado_por_proyecto = df_pagados.groupby("proyecto")[
-            "monto_aprobado"
-        ].sum()
-
-        resumen = resumen.merge(
-            monto_pagado_por_proyecto.rename("Monto_Pagado"),
-            left_index=True,
-            right_index=True,
-            how="left",
-        )
-        resumen["Monto_Pagado"] = resumen["Monto_Pagado"].fillna(0)
-
-        # Calcular monto pendiente
-        resumen["Monto_Pendiente"] = (
-            resumen["Monto_Aprobado_Total"] - resumen["Monto_Pagado"]
-        )
-
-        return resumen.to_dict("index")
-
-    def _analizar_tendencias_encargado(self, df_encargado: pd.DataFrame) -> Dict:
-        """Analiza tendencias del encargado con métricas adicionales"""
-        # Análisis por mes (últimos 3 meses)
-        meses_unicos = sorted(df_encargado["mes"].unique())[-3:]
-
-        tendencia_cobro = []
-        for mes in meses_unicos:
-            df_mes = df_encargado[
-                (df_encargado["mes"] == mes)
-                & (df_encargado["estado"].isin(["pagado", "validado"]))
-            ]
-            monto_mes = df_mes["monto_aprobado"].sum()
-            tendencia_cobro.append((mes, float(monto_mes)))
-
-        # Calculate monthly variation and averages
-        monto_cobrado_ultimo_mes = tendencia_cobro[-1][1] if tendencia_cobro else 0
-        monto_cobrado_penultimo_mes = (
-            tendencia_cobro[-2][1] if len(tendencia_cobro) > 1 else 1
-        )
-
-        variacion_mensual_cobro = 0
-        if monto_cobrado_penultimo_mes > 0:
-            variacion_mensual_cobro = (
-                (monto_cobrado_ultimo_mes - monto_cobrado_penultimo_mes)
-                / monto_cobrado_penultimo_mes
-                * 100
-            )
-
-        promedio_cobro_mensual = (
-            sum(monto for _, monto in tendencia_cobro) / len(tendencia_cobro)
-            if tendencia_cobro
-            else 0
-        )
-        maximo_cobro_mensual = (
-            max(monto for _, monto in tendencia_cobro) if tendencia_cobro else 1
-        )
-
-        # Calculate current month projection
-        from datetime import datetime
-
-        meta_mes_actual = (
-            375_000_000  # Monthly target (assuming annual target divided by 12)
-        )
-
-        # Calculate projections based on current trends
-        if tendencia_cobro:
-            # Linear projection based on last 3 months
-            if len(tendencia_cobro) >= 2:
-                crecimiento_promedio = sum(
-                    (tendencia_cobro[i][1] - tendencia_cobro[i - 1][1])
-                    for i in range(1, len(tendencia_cobro))
-                ) / (len(tendencia_cobro) - 1)
-
-                proyeccion_siguiente_mes = (
-                    monto_cobrado_ultimo_mes + crecimiento_promedio
-                )
-            else:
-                proyeccion_siguiente_mes = monto_cobrado_ultimo_mes
-        else:
-            proyeccion_siguiente_mes = 0
-
-        # Calculate risk alerts
-        alertas = []
-
-        if monto_cobrado_ultimo_mes < meta_mes_actual * 0.7:
-            alertas.append(
-                {
-                    "tipo": "warning",
-                    "mensaje": "Cobro mensual por debajo del 70% de la meta",
-                    "valor": f"${monto_cobrado_ultimo_mes:,.0f} vs ${meta_mes_actual:,.0f}",
-                }
-            )
-
-        if variacion_mensual_cobro < -20:
-            alertas.append(
-                {
-                    "tipo": "danger",
-                    "mensaje": "Caída significativa en cobros mensuales",
-                    "valor": f"{variacion_mensual_cobro:.1f}%",
-                }
-            )
-
-        if len(meses_unicos) >= 3:
-            # Check for consistent decline
-            ultimos_3_meses = (
-                [tendencia_cobro[i][1] for i in range(-3, 0)]
-                if len(tendencia_cobro) >= 3
-                else []
-            )
-            if (
-                len(ultimos_3_meses) == 3
-                and ultimos_3_meses[0] > ultimos_3_meses[1] > ultimos_3_meses[2]
-            ):
-                alertas.append(
-                    {
-                        "tipo": "danger",
-                        "mensaje": "Tendencia declinante por 3 meses consecutivos",
-                        "valor": "Revisar estrategia",
-                    }
-                )
-
-        # Calculate efficiency score (0-100, higher is better)
-        efficiency_score = 0
-        if promedio_cobro_mensual > 0 and meta_mes_actual > 0:
-            cumplimiento_meta = min(
-                100, (promedio_cobro_mensual / meta_mes_actual) * 100
-            )
-            consistency_score = 100 - abs(
-                variacion_mensual_cobro
-            )  # Lower variation is better
-            efficiency_score = (cumplimiento_meta * 0.7) + (consistency_score * 0.3)
-
-        return {
-            "tendencia_cobro": tendencia_cobro,
-            "meses_analizados": meses_unicos,
-            "monto_cobrado_ultimo_mes": float(monto_cobrado_ultimo_mes),
-            "variacion_mensual_cobro": round(variacion_mensual_cobro, 1),
-            "promedio_cobro_mensual": float(promedio_cobro_mensual),
-            "maximo_cobro_mensual": float(maximo_cobro_mensual),
-            "meta_mes_actual": float(meta_mes_actual),
-            "proyeccion_siguiente_mes": float(proyeccion_siguiente_mes),
-            "alertas": alertas,
-            "efficiency_score": round(efficiency_score, 1),
-        }
-
-    def _generar_tendencia_semanal_cobro(
-        self, df_encargado: pd.DataFrame
-    ) -> List[Dict]:
-        """Genera datos de tendencia semanal de cobranza para los últimos 12 semanas"""
-        from datetime import datetime, timedelta
-        import pandas as pd
-
-        # Filtrar solo EDPs pagados o validados
-        df_pagados = df_encargado[
-            df_encargado["estado"].isin(["pagado", "validado"])
-        ].copy()
-
-        if df_pagados.empty:
-            # Si no hay datos, devolver lista vacía (no generar datos simulados)
-            return []
-
-        # Si tenemos datos reales, procesarlos
-        # Agregar columna de semana si no existe
-        if "fecha_pago" not in df_pagados.columns:
-            # Simular fechas de pago basadas en el mes
-            df_pagados["fecha_pago"] = pd.to_datetime(
-                df_pagados["mes"].astype(str) + "-01"
-            )
-        else:
-            df_pagados["fecha_pago"] = pd.to_datetime(df_pagados["fecha_pago"])
-
-        # Agrupar por semana
-        df_pagados["semana"] = df_pagados["fecha_pago"].dt.strftime("Sem %W")
-        df_pagados["año_semana"] = df_pagados["fecha_pago"].dt.strftime("%Y-Sem%W")
-
-        # Calcular montos por semana
-        cobros_semanales = (
-            df_pagados.groupby(["año_semana", "semana"])["monto_aprobado"]
-            .sum()
-            .reset_index()
-        )
-
-        # Obtener las últimas 12 semanas
-        cobros_semanales = cobros_semanales.sort_values("año_semana").tail(12)
-
-        # Formatear resultados
-        resultado = []
-        for _, row in cobros_semanales.iterrows():
-            resultado.append(
-                {
-                    "semana": row["semana"],
-                    "fecha": row["año_semana"],
-                    "monto": float(row["monto_aprobado"]),
-                    "es_simulado": False,
-                }
-            )
-
-        # Si tenemos menos de 12 semanas, completar con datos simulados
-        if len(resultado) < 12:
-            fecha_actual = datetime.now()
-            semanas_faltantes = 12 - len(resultado)
-
-            for i in range(semanas_faltantes, 0, -1):
-                fecha_semana = fecha_actual - timedelta(weeks=i + len(resultado))
-                semana_str = f"Sem {fecha_semana.strftime('%W')}"
-
-                # Usar promedio de datos reales para simular
-                promedio_real = (
-                    sum(item["monto"] for item in resultado) / len(resultado)
-                    if resultado
-                    else 20_000_000
-                )
-                monto_simulado = promedio_real * (0.8 + (i * 0.05))  # Variación gradual
-
-                resultado.insert(
-                    0,
-                    {
-                        "semana": semana_str,
-                        "fecha": fecha_semana.strftime("%Y-%m-%d"),
-                        "monto": float(monto_simulado),
-                        "es_simulado": True,
-                    },
-                )
-
-        return resultado[-12:]  # Asegurar que solo devolvemos las últimas 12 semanas
-
     def _generar_opciones_filtro(self, df: pd.DataFrame) -> Dict:
         """Genera opciones para filtros dinámicos"""
         return {
@@ -1124,328 +511,34 @@ class AnalyticsService:
         return resultado
 
     def get_rework_analysis(self, filters: Dict) -> Dict:
-        """Obtiene el análisis de re-trabajos"""
+        """
+        Obtiene el análisis de re-trabajos.
+
+        Con REWORK_STORE_ENABLED los eventos se leen ya filtrados desde el
+        almacén edp_rework_events; si no está disponible se reconstruyen desde
+        edp_log como antes.
+        """
         try:
-            # Obtener datos de EDP y LOG
             filtros = filters
-            df_edp = self.edp_repository.find_all_dataframe()
-            df_log = self.log_repository.find_all_dataframe()
-
-            df_edp = df_edp.get("data", pd.DataFrame())
-            df_log = df_log.get("data", pd.DataFrame())
-
-            df_log_retrabajos = df_log[
-                (df_log["campo"] == "estado_detallado")
-                & (df_log["despues"] == "re-trabajo solicitado")
-            ]
-
-            # Convertir fechas para filtrado temporal
-            df_log_retrabajos = df_log_retrabajos.copy()
-
-            df_log_retrabajos.loc[:, "fecha_hora"] = pd.to_datetime(
-                df_log_retrabajos["fecha_hora"], format='mixed', errors='coerce'
-            )
-            # Aplicar filtros temporales si existen
-            if filtros["fecha_inicio"]:
-                fecha_inicio = pd.to_datetime(filtros["fecha_inicio"])
-                df_log_retrabajos = df_log_retrabajos[
-                    df_log_retrabajos["fecha_hora"] >= fecha_inicio
-                ]
-
-            if filtros["fecha_fin"]:
-                fecha_fin = pd.to_datetime(filtros["fecha_fin"])
-                df_log_retrabajos = df_log_retrabajos[
-                    df_log_retrabajos["fecha_hora"] <= fecha_fin
-                ]
-
-            if "proyecto" in df_log_retrabajos.columns:
-                df_log_retrabajos = df_log_retrabajos.drop(columns=["proyecto"], axis=1)
-            
-            # Asegurar que n_edp tenga el mismo tipo en ambos DataFrames
-            df_log_retrabajos["n_edp"] = df_log_retrabajos["n_edp"].astype(str)
-            df_edp["n_edp"] = df_edp["n_edp"].astype(str)
-            
-            # Enriquecer log con información de EDP para poder filtrar por encargado y cliente
-            df_log_enriquecido = pd.merge(
-                df_log_retrabajos,
-                df_edp[
-                    [
-                        "n_edp",
-                        "proyecto",
-                        "jefe_proyecto",
-                        "cliente",
-                        "mes",
-                        "tipo_falla",
-                        "motivo_no_aprobado",
-                        "monto_aprobado",
-                    ]
-                ],
-                on="n_edp",
-                how="left",
-            )
-
-            # Aplicar filtros de EDP también al log
-            if filtros["jefe_proyecto"]:
-                df_log_enriquecido = df_log_enriquecido[
-                    df_log_enriquecido["jefe_proyecto"] == filtros["jefe_proyecto"]
-                ]
-
-            if filtros["cliente"]:
-                df_log_enriquecido = df_log_enriquecido[
-                    df_log_enriquecido["cliente"] == filtros["cliente"]
-                ]
-
-            if filtros["mes"]:
-                df_log_enriquecido = df_log_enriquecido[
-                    df_log_enriquecido["mes"] == filtros["mes"]
-                ]
-
-            if filtros["tipo_falla"]:
-                df_log_enriquecido = df_log_enriquecido[
-                    df_log_enriquecido["tipo_falla"] == filtros["tipo_falla"]
-                ]
-
-            # Estadísticas basadas en el log
-            total_retrabajos_log = len(df_log_enriquecido)
-            edps_unicos_con_retrabajo = df_log_enriquecido["n_edp"].nunique()
-
-            # Buscar motivos y tipos asociados a cada ocurrencia de re-trabajo
-            retrabajos_completos = []
-
-            for _, row in df_log_enriquecido.iterrows():
-                edp_id = row["n_edp"]
-                fecha_cambio = row["fecha_hora"]
-
-                # Buscar registros de motivo y tipo de falla cercanos (mismo día, mismo EDP)
-                fecha_inicio = fecha_cambio - pd.Timedelta(hours=1)
-                fecha_fin = fecha_cambio + pd.Timedelta(hours=1)
-
-                # Buscar motivo cercano
-                motivo_cercano = df_log[
-                    (df_log["n_edp"] == edp_id)
-                    & (df_log["campo"] == "motivo_no_aprobado")
-                    & (pd.to_datetime(df_log["fecha_hora"], format='mixed', errors='coerce') >= fecha_inicio)
-                    & (pd.to_datetime(df_log["fecha_hora"], format='mixed', errors='coerce') <= fecha_fin)
-                ]
-
-                # Buscar tipo de falla cercano
-                tipo_cercano = df_log[
-                    (df_log["n_edp"] == edp_id)
-                    & (df_log["campo"] == "tipo_falla")
-                    & (pd.to_datetime(df_log["fecha_hora"], format='mixed', errors='coerce') >= fecha_inicio)
-                    & (pd.to_datetime(df_log["fecha_hora"], format='mixed', errors='coerce') <= fecha_fin)
-                ]
-
-                # Crear registro enriquecido
-                registro = {
-                    "n_edp": edp_id,
-                    "proyecto": row.get("proyecto", ""),
-                    "cliente": row.get("cliente", ""),
-                    "jefe_proyecto": row.get("jefe_proyecto", ""),
-                    "Fecha": fecha_cambio,
-                    "Estado Anterior": row["antes"],
-                    "motivo_no_aprobado": (
-                        motivo_cercano["despues"].iloc[0]
-                        if not motivo_cercano.empty
-                        else row.get("motivo_no_aprobado", "")
-                    ),
-                    "tipo_falla": (
-                        tipo_cercano["despues"].iloc[0]
-                        if not tipo_cercano.empty
-                        else row.get("tipo_falla", "")
-                    ),
-                    "usuario": row["usuario"],
-                }
-
-                retrabajos_completos.append(registro)
-
-            # Crear DataFrame para análisis detallado
-            df_analisis = pd.DataFrame(retrabajos_completos)
-            # ====== ANÁLISIS DETALLADO DE RETRABAJOS ======
-            # 1. Análisis por motivo de rechazo
-            if not df_analisis.empty and "motivo_no_aprobado" in df_analisis.columns:
-                motivos_rechazo = (
-                    df_analisis["motivo_no_aprobado"].value_counts().to_dict()
-                )
-            else:
-                motivos_rechazo = {}
-
-            # 2. Análisis por tipo de falla
-            if not df_analisis.empty and "tipo_falla" in df_analisis.columns:
-                tipos_falla = df_analisis["tipo_falla"].value_counts().to_dict()
-            else:
-                tipos_falla = {}
-
-            # 3. Análisis por encargado
-            if not df_analisis.empty and "jefe_proyecto" in df_analisis.columns:
-                retrabajos_por_encargado = (
-                    df_analisis["jefe_proyecto"].value_counts().to_dict()
-                )
-            else:
-                retrabajos_por_encargado = {}
-
-            # 4. Análisis temporal
-            if not df_analisis.empty and "Fecha" in df_analisis.columns:
-                df_analisis["mes"] = df_analisis["Fecha"].dt.strftime("%Y-%m")
-                tendencia_por_mes = (
-                    df_analisis["mes"].value_counts().sort_index().to_dict()
-                )
-            else:
-                tendencia_por_mes = {}
-
-            # 5. Análisis por proyecto
-            if not df_analisis.empty and "proyecto" in df_analisis.columns:
-                retrabajos_por_proyecto_raw = (
-                    df_analisis["proyecto"].value_counts().to_dict()
-                )
-
-                # Estructura correcta para cada proyecto
-                proyectos_problematicos = {}
-                for proyecto, cantidad in retrabajos_por_proyecto_raw.items():
-                    # Buscar el total de EDPs para este proyecto
-                    total_edps_proyecto = (
-                        len(df_edp[df_edp["proyecto"] == proyecto])
-                        if "proyecto" in df_edp.columns
-                        else 0
-                    )
-
-                    # Calcular el porcentaje
-                    porcentaje = (
-                        round((cantidad / total_edps_proyecto * 100), 1)
-                        if total_edps_proyecto > 0
-                        else 0
-                    )
-
-                    # Crear estructura de datos correcta
-                    proyectos_problematicos[proyecto] = {
-                        "total": total_edps_proyecto,
-                        "retrabajos": cantidad,
-                        "porcentaje": porcentaje,
-                    }
-            else:
-                proyectos_problematicos = {}
-            # 6. Análisis por usuario solicitante
-            if not df_analisis.empty and "usuario" in df_analisis.columns:
-                usuarios_solicitantes = df_analisis["usuario"].value_counts().to_dict()
-            else:
-                usuarios_solicitantes = {}
-
-            # Calcular estadísticas globales
-            total_edps = len(df_edp)
-            porcentaje_edps_afectados = (
-                round((edps_unicos_con_retrabajo / total_edps * 100), 1)
-                if total_edps > 0
-                else 0
+            df_edp = find_all_dataframe_memoized("edps", self.edp_repository).get(
+                "data", pd.DataFrame()
             )
 
-            # ====== CALCULAR PORCENTAJES ======
-            porcentaje_motivos = {}
-            for motivo, cantidad in motivos_rechazo.items():
-                porcentaje_motivos[motivo] = (
-                    round((cantidad / total_retrabajos_log * 100), 1)
-                    if total_retrabajos_log > 0
-                    else 0
-                )
-
-            porcentaje_tipos = {}
-            for tipo, cantidad in tipos_falla.items():
-                porcentaje_tipos[tipo] = (
-                    round((cantidad / total_retrabajos_log * 100), 1)
-                    if total_retrabajos_log > 0
-                    else 0
-                )
-
-            # ====== PREPARAR DATOS PARA GRÁFICOS ======
-            chart_data = {
-                "motivos_labels": list(motivos_rechazo.keys()),
-                "motivos_data": list(motivos_rechazo.values()),
-                "tipos_labels": list(tipos_falla.keys()),
-                "tipos_data": list(tipos_falla.values()),
-                "tendencia_meses": list(tendencia_por_mes.keys()),
-                "tendencia_valores": list(tendencia_por_mes.values()),
-                "encargados": list(retrabajos_por_encargado.keys()),
-                "retrabajos_encargado": list(retrabajos_por_encargado.values()),
-                # Add missing 'eficiencia' key to chart_data
-                "eficiencia": [],  # Initialize with empty list
-            }
-            # Calculate efficiency metrics if we have data for encargados
-            if chart_data["encargados"]:
-
-                for encargado in chart_data["encargados"]:
-                    # Find total EDPs for this encargado in the original dataset
-                    total_edps_encargado = len(
-                        df_edp[df_edp["jefe_proyecto"] == encargado]
+            df_eventos = None
+            if rework_store_enabled():
+                store_response = self.rework_repository.find_events(filtros)
+                if store_response.get("success", False):
+                    df_eventos = store_response["data"]
+                else:
+                    logger.warning(
+                        f"⚠️ Almacén de re-trabajos no disponible, usando edp_log: "
+                        f"{store_response.get('message')}"
                     )
-                    # Find retrabajos count for this encargado
-                    retrabajos_count = retrabajos_por_encargado.get(encargado, 0)
-
-                    if total_edps_encargado > 0:
-                        # Efficiency = 100 - (retrabajos/total_edps * 100)
-                        # Higher is better - fewer retrabajos per EDP means higher efficiency
-                        eficiencia = 100 - (
-                            retrabajos_count / total_edps_encargado * 100
-                        )
-                        # Cap at 0 to avoid negative efficiency
-                        eficiencia = max(0, round(eficiencia, 1))
-                    else:
-                        eficiencia = 0
-
-                    chart_data["eficiencia"].append(eficiencia)
-            # ====== Calcular Impacto Financiero ======
-            impacto_financiero = 0
-            # TODO: Calcular impacto financiero
-            # for _, row in df_log_enriquecido.iterrows():
-            #     impacto_financiero += row.get("monto_aprobado", 0)
-
-            # ====== PREPARAR DATOS PARA LA TABLA DE REGISTROS ======
-            registros = retrabajos_completos
-            registros = self._clean_nat_values(registros)
-
-            # ====== OPCIONES PARA FILTROS ======
-            filter_options = {
-                "meses": sorted(df_edp["mes"].dropna().unique()),
-                "encargados": sorted(df_edp["jefe_proyecto"].dropna().unique()),
-                "clientes": sorted(df_edp["cliente"].dropna().unique()),
-                "tipos_falla": (
-                    sorted(df_edp["tipo_falla"].dropna().unique())
-                    if "tipo_falla" in df_edp.columns
-                    else []
-                ),
-            }
+            if df_eventos is None:
+                df_eventos = self._rework_events_from_log(df_edp, filtros)
 
-            # ====== ESTADÍSTICAS RESUMEN ======
-            stats = {
-                "total_edps": total_edps,
-                "total_retrabajos": total_retrabajos_log,  # Total de ocurrencias de re-trabajo
-                "edps_con_retrabajo": edps_unicos_con_retrabajo,  # Número de EDPs únicos con re-trabajo
-                "porcentaje_edps_afectados": porcentaje_edps_afectados,
-                "porcentaje_retrabajos": porcentaje_edps_afectados,  # Añadir este campo para compatibilidad
-                "promedio_retrabajos_por_edp": (
-                    round(total_retrabajos_log / edps_unicos_con_retrabajo, 2)
-                    if edps_unicos_con_retrabajo > 0
-                    else 0
-                ),
-            }
-            data = {
-                "stats": stats,
-                "motivos_rechazo": motivos_rechazo,
-                "porcentaje_motivos": porcentaje_motivos,
-                "tipos_falla": tipos_falla,
-                "porcentaje_tipos": porcentaje_tipos,
-                "retrabajos_por_encargado": retrabajos_por_encargado,
-                "tendencia_por_mes": tendencia_por_mes,
-                "proyectos_problematicos": proyectos_problematicos,
-                "registros": registros,
-                "chart_data": chart_data,
-                "filter_options": filter_options,
-                "usuarios_solicitantes": usuarios_solicitantes,
-                "impacto_financiero": impacto_financiero,
-            }
-            # ====== RETORNAR TEMPLATE CON TODOS LOS DATOS ======
-            return data
+            return self._summarize_rework(df_eventos, df_edp)
         except Exception as e:
-            import traceback
-
             logger.error(f"Error en analisis_retrabajos: {str(e)}")
             logger.error(traceback.format_exc())
             return {
@@ -1472,44 +565,217 @@ class AnalyticsService:
                 "impacto_financiero": 0,
                 "message": f"Error retrieving EDPs DataFrame: {str(e)}",
             }
+
+    def _rework_events_from_log(self, df_edp: pd.DataFrame, filtros: Dict) -> pd.DataFrame:
+        """
+        Reconstruye los eventos de re-trabajo desde edp_log (sin almacén).
+
+        Devuelve las mismas columnas que ReworkRepository.find_events.
+        """
+        df_log = find_all_dataframe_memoized("logs", self.log_repository).get(
+            "data", pd.DataFrame()
+        )
+        if df_log.empty or "campo" not in df_log.columns:
+            return pd.DataFrame(columns=REWORK_EVENT_COLUMNS)
+
+        # Fechas y claves del log se parsean una sola vez
+        fechas_log = pd.to_datetime(df_log["fecha_hora"], format="mixed", errors="coerce")
+        n_edp_log = df_log["n_edp"].astype(str)
+
+        es_retrabajo = (df_log["campo"] == "estado_detallado") & (
+            df_log["despues"] == "re-trabajo solicitado"
+        )
+        if filtros.get("fecha_inicio"):
+            es_retrabajo &= fechas_log >= pd.to_datetime(filtros["fecha_inicio"])
+        if filtros.get("fecha_fin"):
+            es_retrabajo &= fechas_log <= pd.to_datetime(filtros["fecha_fin"])
+
+        eventos = pd.DataFrame({
+            "fecha_hora": fechas_log[es_retrabajo],
+            "n_edp": n_edp_log[es_retrabajo],
+            "estado_anterior": df_log.loc[es_retrabajo, "antes"],
+            "usuario": df_log.loc[es_retrabajo, "usuario"],
+        })
+
+        # Enriquecer con el EDP para poder filtrar por encargado y cliente
+        columnas_edp = df_edp.reindex(columns=[
+            "n_edp", "proyecto", "jefe_proyecto", "cliente", "mes",
+            "tipo_falla", "motivo_no_aprobado", "monto_aprobado",
+        ])
+        columnas_edp["n_edp"] = columnas_edp["n_edp"].astype(str)
+        eventos = eventos.merge(columnas_edp, on="n_edp", how="left")
+
+        for columna in ("jefe_proyecto", "cliente", "mes", "tipo_falla"):
+            if filtros.get(columna):
+                eventos = eventos[eventos[columna] == filtros[columna]]
+        eventos = eventos.reset_index(drop=True)
+
+        # Motivo y tipo registrados en el log cerca del cambio; si no, los del EDP
+        motivo = self._nearest_log_value(eventos, df_log, fechas_log, n_edp_log, "motivo_no_aprobado")
+        tipo = self._nearest_log_value(eventos, df_log, fechas_log, n_edp_log, "tipo_falla")
+        eventos["motivo"] = motivo.where(motivo.notna(), eventos["motivo_no_aprobado"])
+        eventos["tipo_falla"] = tipo.where(tipo.notna(), eventos["tipo_falla"])
+        eventos["monto"] = pd.to_numeric(eventos["monto_aprobado"], errors="coerce").fillna(0)
+
+        return eventos[REWORK_EVENT_COLUMNS]
+
+    @staticmethod
+    def _nearest_log_value(
+        eventos: pd.DataFrame,
+        df_log: pd.DataFrame,
+        fechas_log: pd.Series,
+        n_edp_log: pd.Series,
+        campo: str,
+    ) -> pd.Series:
+        """Primer valor de `campo` en el log del mismo EDP a ±1 hora de cada evento."""
+        es_campo = df_log["campo"] == campo
+        candidatos = pd.DataFrame({
+            "n_edp": n_edp_log[es_campo],
+            "fecha_valor": fechas_log[es_campo],
+            "valor": df_log.loc[es_campo, "despues"],
+        })
+        cruce = eventos[["n_edp", "fecha_hora"]].reset_index().merge(candidatos, on="n_edp")
+        en_ventana = (cruce["fecha_valor"] - cruce["fecha_hora"]).abs() <= pd.Timedelta(hours=1)
+        primeros = cruce[en_ventana].groupby("index", sort=False)["valor"].first()
+        return primeros.reindex(eventos.index)
+
+    def _summarize_rework(self, df_eventos: pd.DataFrame, df_edp: pd.DataFrame) -> Dict:
+        """Agrega los eventos de re-trabajo en la estructura de la vista."""
+        sin_datos = pd.Series(dtype=object)
+        total_retrabajos_log = len(df_eventos)
+        edps_unicos_con_retrabajo = df_eventos["n_edp"].nunique()
+
+        # ====== ANÁLISIS DETALLADO DE RETRABAJOS ======
+        motivos_rechazo = df_eventos["motivo"].value_counts().to_dict()
+        tipos_falla = df_eventos["tipo_falla"].value_counts().to_dict()
+        conteo_encargado = df_eventos["jefe_proyecto"].value_counts()
+        retrabajos_por_encargado = conteo_encargado.to_dict()
+        tendencia_por_mes = (
+            pd.to_datetime(df_eventos["fecha_hora"], errors="coerce").dt.strftime("%Y-%m").value_counts().sort_index().to_dict()
+        )
+        usuarios_solicitantes = df_eventos["usuario"].value_counts().to_dict()
+
+        # Proyectos: re-trabajos contra el total de EDPs de cada proyecto
+        conteo_proyecto = df_eventos["proyecto"].value_counts()
+        total_por_proyecto = (
+            df_edp.get("proyecto", sin_datos).value_counts()
+            .reindex(conteo_proyecto.index, fill_value=0)
+        )
+        proyectos_problematicos = {
+            proyecto: {
+                "total": int(total),
+                "retrabajos": int(cantidad),
+                "porcentaje": round(cantidad / total * 100, 1) if total > 0 else 0,
+            }
+            for proyecto, cantidad, total in zip(
+                conteo_proyecto.index, conteo_proyecto.values, total_por_proyecto.values
+            )
+        }
+
+        total_edps = len(df_edp)
+        porcentaje_edps_afectados = (
+            round((edps_unicos_con_retrabajo / total_edps * 100), 1)
+            if total_edps > 0
+            else 0
+        )
+
+        # ====== CALCULAR PORCENTAJES ======
+        def _porcentajes(conteos: Dict) -> Dict:
+            if total_retrabajos_log <= 0:
+                return {clave: 0 for clave in conteos}
+            return {
+                clave: round((cantidad / total_retrabajos_log * 100), 1)
+                for clave, cantidad in conteos.items()
+            }
+
+        # Eficiencia = 100 - (retrabajos / EDPs del encargado * 100), mínimo 0
+        total_por_encargado = (
+            df_edp.get("jefe_proyecto", sin_datos).value_counts()
+            .reindex(conteo_encargado.index, fill_value=0)
+        )
+        eficiencia = [
+            max(0, round(100 - (retrabajos / total * 100), 1)) if total > 0 else 0
+            for retrabajos, total in zip(conteo_encargado.values, total_por_encargado.values)
+        ]
+
+        # ====== PREPARAR DATOS PARA GRÁFICOS ======
+        chart_data = {
+            "motivos_labels": list(motivos_rechazo.keys()),
+            "motivos_data": list(motivos_rechazo.values()),
+            "tipos_labels": list(tipos_falla.keys()),
+            "tipos_data": list(tipos_falla.values()),
+            "tendencia_meses": list(tendencia_por_mes.keys()),
+            "tendencia_valores": list(tendencia_por_mes.values()),
+            "encargados": list(retrabajos_por_encargado.keys()),
+            "retrabajos_encargado": list(retrabajos_por_encargado.values()),
+            "eficiencia": eficiencia,
+        }
+
+        # ====== Impacto Financiero (monto aprobado de los EDPs con re-trabajo) ======
+        impacto_financiero = float(df_eventos["monto"].sum())
+
+        # ====== PREPARAR DATOS PARA LA TABLA DE REGISTROS ======
+        registros = pd.DataFrame({
+            "n_edp": df_eventos["n_edp"],
+            "proyecto": df_eventos["proyecto"],
+            "cliente": df_eventos["cliente"],
+            "jefe_proyecto": df_eventos["jefe_proyecto"],
+            "Fecha": df_eventos["fecha_hora"],
+            "Estado Anterior": df_eventos["estado_anterior"],
+            "motivo_no_aprobado": df_eventos["motivo"],
+            "tipo_falla": df_eventos["tipo_falla"],
+            "usuario": df_eventos["usuario"],
+        }).to_dict("records")
+        registros = self._clean_nat_values(registros)
+
+        # ====== OPCIONES PARA FILTROS ======
+        filter_options = {
+            "meses": sorted(df_edp.get("mes", sin_datos).dropna().unique()),
+            "encargados": sorted(df_edp.get("jefe_proyecto", sin_datos).dropna().unique()),
+            "clientes": sorted(df_edp.get("cliente", sin_datos).dropna().unique()),
+            "tipos_falla": sorted(df_edp.get("tipo_falla", sin_datos).dropna().unique()),
+        }
+
+        # ====== ESTADÍSTICAS RESUMEN ======
+        stats = {
+            "total_edps": total_edps,
+            "total_retrabajos": total_retrabajos_log,  # Total de ocurrencias de re-trabajo
+            "edps_con_retrabajo": edps_unicos_con_retrabajo,  # Número de EDPs únicos con re-trabajo
+            "porcentaje_edps_afectados": porcentaje_edps_afectados,
+            "porcentaje_retrabajos": porcentaje_edps_afectados,  # Añadir este campo para compatibilidad
+            "promedio_retrabajos_por_edp": (
+                round(total_retrabajos_log / edps_unicos_con_retrabajo, 2)
+                if edps_unicos_con_retrabajo > 0
+                else 0
+            ),
+        }
+        return {
+            "stats": stats,
+            "motivos_rechazo": motivos_rechazo,
+            "porcentaje_motivos": _porcentajes(motivos_rechazo),
+            "tipos_falla": tipos_falla,
+            "porcentaje_tipos": _porcentajes(tipos_falla),
+            "retrabajos_por_encargado": retrabajos_por_encargado,
+            "tendencia_por_mes": tendencia_por_mes,
+            "proyectos_problematicos": proyectos_problematicos,
+            "registros": registros,
+            "chart_data": chart_data,
+            "filter_options": filter_options,
+            "usuarios_solicitantes": usuarios_solicitantes,
+            "impacto_financiero": impacto_financiero,
+        }
+
     def get_edp_log_csv(self, n_edp: str) -> str:
         """Obtiene el log de EDPs como CSV string para exportar"""
         try:
-            from ..utils.supabase_adapter import read_log
-            
-            # Get log data using the existing read_log function
-            df_log = read_log(n_edp)
+            from .edp_log_service import EDPLogService
 
-            if df_log.empty:
+            log_service = EDPLogService()
+            if not log_service.get_timeline_page(n_edp=n_edp, limit=1).data.get('registros'):
                 return "No hay datos de log para este EDP"
 
-            # Sort by date descending
-            df_log = df_log.sort_values('fecha_hora', ascending=False)
-            
-            # Format datetime for CSV
-            if 'fecha_hora' in df_log.columns:
-                df_log["fecha_hora"] = pd.to_datetime(df_log["fecha_hora"], format='mixed', errors='coerce').dt.strftime(
-                    "%Y-%m-%d %H:%M:%S"
-                )
-
-            # Renombrar columnas para claridad
-            column_mapping = {
-                "fecha_hora": "Fecha y Hora",
-                "n_edp": "Número EDP",
-                "proyecto": "Proyecto",
-                "campo": "Campo Modificado",
-                "antes": "Valor Anterior",
-                "despues": "Nuevo Valor",
-                "usuario": "Usuario Responsable",
-            }
-            
-            # Only rename columns that exist
-            df_log = df_log.rename(columns={k: v for k, v in column_mapping.items() if k in df_log.columns})
-
-            # Convert to CSV string
-            csv_string = df_log.to_csv(index=False, encoding='utf-8')
-            
-            return csv_string
+            # Historial completo; la descarga desde la vista lo transmite por lotes
+            return "".join(log_service.iter_log_csv(n_edp))
             
         except Exception as e:
             logger.error(f"Error al obtener log de EDP {n_edp}: {str(e)}")
@@ -5,21 +5,70 @@ Invalida cache automáticamente cuando los datos cambian.
 
 import logging
 import json
-from typing import Dict, List, Optional, Any
+import threading
+import time
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 
-try:
-    import redis
-    import os
-    redis_url = os.getenv("REDIS_URL")
-    redis_client = redis.from_url(redis_url) if redis_url else None
-except ImportError:
-    redis_client = None
+from ..utils.redis_client import redis_client
+from ..utils.cache_inspector import count_keys, counter_stats, delete_matching
+from ..utils.json_serialization import encode_default
 
 from . import BaseService, ServiceResponse
+from .refresh_orchestrator import CACHE_DEPENDENCIES, schedule_refresh
 
 logger = logging.getLogger(__name__)
 
+# Generación de datos: cambia en cada register_data_change. Los caches que se
+# indexan por generación (p.ej. el view model del jefe de proyecto) quedan
+# obsoletos sin necesidad de borrarlos uno por uno.
+DATA_GENERATION_KEY = "data_generation"
+DATA_GENERATION_UPDATED_KEY = "data_generation:updated_at"
+_local_generation = {"value": 0, "updated_at": None}
+_generation_lock = threading.Lock()
+
+
+def current_data_generation() -> str:
+    """
+    Token de la generación de datos vigente.
+
+    Con Redis el token es solo el contador compartido, igual en todos los
+    workers. El contador local se usa únicamente cuando Redis no está
+    disponible (un solo proceso, o caches que no se comparten).
+    """
+    return data_generation_state()[0]
+
+
+def data_generation_state() -> Tuple[str, Optional[float]]:
+    """
+    Token de la generación vigente y cuándo cambió (epoch), en una sola
+    lectura. Lo usan los ETag / Last-Modified de las APIs de dashboard.
+    """
+    if redis_client:
+        try:
+            value, stamp = redis_client.mget(DATA_GENERATION_KEY, DATA_GENERATION_UPDATED_KEY)
+            shared = "0" if value is None else value.decode() if isinstance(value, bytes) else str(value)
+            return shared, float(stamp) if stamp is not None else None
+        except Exception as e:
+            logger.debug(f"No se pudo leer la generación de datos: {e}")
+    # Sin Redis: prefijo propio para no coincidir con un token compartido
+    return f"local.{_local_generation['value']}", _local_generation["updated_at"]
+
+
+def _bump_data_generation() -> None:
+    now = time.time()
+    with _generation_lock:
+        _local_generation["value"] += 1
+        _local_generation["updated_at"] = now
+    if redis_client:
+        try:
+            pipe = redis_client.pipeline()
+            pipe.incr(DATA_GENERATION_KEY)
+            pipe.set(DATA_GENERATION_UPDATED_KEY, now)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"No se pudo incrementar la generación de datos: {e}")
+
 
 class CacheInvalidationService(BaseService):
     """Service for managing cache invalidation based on data changes."""
@@ -27,16 +76,8 @@ class CacheInvalidationService(BaseService):
     def __init__(self):
         super().__init__()
         self.redis_client = redis_client
-        self.cache_dependencies = {
-            # Qué tipos de cache dependen de qué tablas/datos
-            'manager_dashboard': ['edps', 'projects', 'costs'],
-            'kpis': ['edps', 'projects'],
-            'charts': ['edps', 'projects', 'costs'],
-            'financials': ['edps', 'costs'],
-            'analytics': ['edps', 'projects'],
-            'kanban': ['edps'],
-            'cashflow': ['edps', 'costs']
-        }
+        # Qué tipos de cache dependen de qué tablas/datos
+        self.cache_dependencies = CACHE_DEPENDENCIES
         
         # Mapeo de operaciones a tipos de datos afectados
         self.operation_mapping = {
@@ -61,6 +102,21 @@ class CacheInvalidationService(BaseService):
             metadata: Metadata adicional sobre el cambio
         """
         try:
+            # El frame clasificado y el memo del request viven en memoria, con o sin Redis
+            from .manager_service import clear_classified_edp_cache
+            from .dashboard_service import clear_edp_table_cache
+            from .cost_service import clear_cost_analytics_cache
+            from .cashflow_service import clear_cash_forecast_cache
+            from .analytics_service import clear_manager_analytics_cache
+            from .related_data import clear_request_memo
+            clear_classified_edp_cache()
+            clear_edp_table_cache()
+            clear_cost_analytics_cache()
+            clear_cash_forecast_cache()
+            clear_manager_analytics_cache()
+            clear_request_memo()
+            _bump_data_generation()
+            
             if not self.redis_client:
                 logger.warning("Redis no disponible - no se puede invalidar cache")
                 return True
@@ -87,10 +143,16 @@ class CacheInvalidationService(BaseService):
             
             # Guardar el evento en Redis para auditoría
             event_key = f"cache_events:{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            self.redis_client.setex(event_key, 3600, json.dumps(change_event))  # 1 hora de retención
+            self.redis_client.setex(event_key, 3600, json.dumps(change_event, default=encode_default))  # 1 hora de retención
             
             # Ejecutar invalidación
             invalidated_count = self._invalidate_cache_types(cache_types_to_invalidate)
+
+            if {'edps', 'costs'} & set(affected_data_types):
+                self._schedule_kpi_rollup_refresh()
+
+            # Recalcular en Celery solo las familias afectadas (con debounce)
+            schedule_refresh(cache_types_to_invalidate)
             
             logger.info(f"✅ Data change registered: {operation} -> invalidated {invalidated_count} cache entries")
             return True
@@ -99,6 +161,21 @@ class CacheInvalidationService(BaseService):
             logger.error(f"Error registering data change: {e}")
             return False
     
+    def _schedule_kpi_rollup_refresh(self, delay_seconds: int = 30) -> None:
+        """Programa un refresco de los rollups SQL; varios cambios seguidos comparten uno solo."""
+        from ..repositories.kpi_repository import rollups_enabled
+
+        if not rollups_enabled():
+            return
+        try:
+            if not self.redis_client.set('kpi_rollups:refresh_scheduled', '1', nx=True, ex=delay_seconds * 4):
+                return
+            from ..tasks.metrics import refresh_kpi_rollups
+            refresh_kpi_rollups.apply_async(countdown=delay_seconds)
+            logger.info(f"📊 Refresco de KPI rollups programado en {delay_seconds}s")
+        except Exception as e:
+            logger.warning(f"No se pudo programar el refresco de KPI rollups: {e}")
+
     def _invalidate_cache_types(self, cache_types: set) -> int:
         """Invalida los tipos de cache especificados."""
         total_invalidated = 0
@@ -109,9 +186,8 @@ class CacheInvalidationService(BaseService):
                 patterns = self._get_cache_patterns(cache_type)
                 
                 for pattern in patterns:
-                    keys = self.redis_client.keys(pattern)
-                    if keys:
-                        deleted = self.redis_client.delete(*keys)
+                    deleted = delete_matching(pattern)
+                    if deleted:
                         total_invalidated += deleted
                         logger.info(f"Invalidated {deleted} keys for pattern: {pattern}")
                         
@@ -170,9 +246,8 @@ class CacheInvalidationService(BaseService):
             results = {}
             
             for pattern in set(all_patterns):  # Remove duplicates
-                keys = self.redis_client.keys(pattern)
-                if keys:
-                    deleted = self.redis_client.delete(*keys)
+                deleted = delete_matching(pattern)
+                if deleted:
                     total_invalidated += deleted
                     results[pattern] = deleted
             
@@ -212,17 +287,19 @@ class CacheInvalidationService(BaseService):
                     'patterns': {}
                 }
                 
+                # SCAN por lotes: el reporte corre con el sistema en uso
                 for pattern in patterns:
-                    keys = self.redis_client.keys(pattern)
-                    pattern_count = len(keys)
+                    pattern_count = count_keys(pattern)
                     type_stats['total_keys'] += pattern_count
                     type_stats['patterns'][pattern] = pattern_count
                 
                 health_report['cache_types'][cache_type] = type_stats
             
             # Eventos recientes
-            event_keys = self.redis_client.keys('cache_events:*')
-            health_report['recent_events'] = len(event_keys)
+            health_report['recent_events'] = count_keys('cache_events:*')
+
+            # Escrituras, hits, misses y evicciones por namespace
+            health_report['namespaces'] = counter_stats()
             
             return health_report
             
@@ -252,10 +329,10 @@ def invalidate_cache_on_change(operation: str, data_types: List[str] = None):
     """
     def decorator(func):
         def wrapper(*args, **kwargs):
+            # Ejecutar la función original (sus errores se propagan sin reintentarla)
+            result = func(*args, **kwargs)
+
             try:
-                # Ejecutar la función original
-                result = func(*args, **kwargs)
-                
                 # Si la función fue exitosa, invalidar cache
                 should_invalidate = False
                 
@@ -275,13 +352,11 @@ def invalidate_cache_on_change(operation: str, data_types: List[str] = None):
                         operation=operation,
                         metadata={'function': func.__name__, 'args_count': len(args)}
                     )
-                
-                return result
-                
             except Exception as e:
+                # La escritura ya se hizo: un fallo de invalidación no debe repetirla
                 logger.error(f"Error in cache invalidation decorator: {e}")
-                # Continuar con la función original incluso si la invalidación falla
-                return func(*args, **kwargs)
+
+            return result
         
         return wrapper
     return decorator
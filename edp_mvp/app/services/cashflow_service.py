@@ -7,15 +7,53 @@ from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
+import hashlib
+import json
+import os
+import threading
+import time
 from ..repositories import BaseRepository
 from ..utils.date_utils import DateUtils
 from ..utils.format_utils import FormatUtils
 from ..utils.validation_utils import ValidationUtils
+from ..utils.instrumentation import record_cache, stage_timer
 from . import ServiceResponse
+from .cash_forecast_engine import CashForecastEngine, CollectionModel
+from .related_data import RelatedData, find_all_dataframe_memoized
 import logging
 
+from ..utils.redis_client import redis_client
+from ..utils.cache_codec import decode_payload, encode_payload
+from ..utils.cache_inspector import namespace_of, record_lookup
+
 logger = logging.getLogger(__name__)
 
+# Curvas de cobro precalculadas (tarea beat `refresh_cashflow` y API). Se
+# descartan con cada cambio de datos: en este proceso vía
+# clear_cash_forecast_cache() y en Redis por el patrón cash_forecast:*.
+CASH_FORECAST_CACHE_TTL = int(os.getenv("CASH_FORECAST_CACHE_TTL", "3600"))
+_cash_forecast_cache: Dict[str, Tuple[float, Any]] = {}
+_cash_forecast_lock = threading.Lock()
+
+ESTADOS_COBRADOS = ["pagado", "validado"]
+SCENARIO_PERCENTILES = {
+    "optimistic": "p90",
+    "optimista": "p90",
+    "realistic": "p50",
+    "realista": "p50",
+    "base": "p50",
+    "conservative": "p10",
+    "pessimistic": "p10",
+    "pesimista": "p10",
+}
+
+
+def clear_cash_forecast_cache() -> None:
+    """Descartar el modelo de cobro y las curvas cacheadas en este proceso."""
+    with _cash_forecast_lock:
+        _cash_forecast_cache.clear()
+
+
 class CashFlowService:
     """Servicio para análisis de flujo de caja y proyecciones financieras"""
     
@@ -27,6 +65,7 @@ class CashFlowService:
         self.date_utils = DateUtils()
         self.format_utils = FormatUtils()
         self.validation_utils = ValidationUtils()
+        self.forecast_engine = CashForecastEngine()
     
     def generar_cash_forecast(self, filtros: Optional[Dict] = None) -> ServiceResponse:
         """
@@ -87,8 +126,9 @@ class CashFlowService:
                 df_pendientes, buckets, df_filtrado
             )
             
-            # Calcular probabilidades de cobro
-            probabilidades = self._calcular_probabilidades_cobro(buckets_ajustados)
+            # Probabilidades de cobro aprendidas del historial (Monte Carlo a 3 meses)
+            curvas_cobro = self._get_collection_forecast(df_edp, df_pendientes, filtros, meses=3)
+            probabilidades = self._calcular_probabilidades_cobro(buckets_ajustados, curvas_cobro)
             
             # Generar proyección final
             proyeccion = self._generar_proyeccion_final(buckets_ajustados, probabilidades)
@@ -101,6 +141,7 @@ class CashFlowService:
                 'buckets': buckets_ajustados,
                 'probabilidades': probabilidades,
                 'metricas_calidad': metricas_calidad,
+                'curvas_cobro': curvas_cobro,
                 'fecha_generacion': datetime.now().isoformat(),
                 'total_backlog': float(df_pendientes["monto_aprobado"].sum())
             }
@@ -302,11 +343,16 @@ class CashFlowService:
             filtros = filtros or {}
             df_filtrado = self._aplicar_filtros_cashflow(df_edp, filtros)
             
+            # Monte Carlo sobre el backlog pendiente
+            curvas_cobro = self._get_collection_forecast(
+                df_edp, self._filtrar_pendientes(df_filtrado), filtros, meses
+            )
+
             # Generar proyección mensual
-            proyeccion_mensual = self._generar_proyeccion_mensual(df_filtrado, meses)
+            proyeccion_mensual = self._generar_proyeccion_mensual(curvas_cobro)
             
             # Análisis de escenarios
-            escenarios = self._generar_analisis_escenarios(df_filtrado, meses)
+            escenarios = self._generar_analisis_escenarios(curvas_cobro)
             
             # Métricas de confianza
             metricas_confianza = self._calcular_metricas_confianza(df_filtrado)
@@ -315,6 +361,7 @@ class CashFlowService:
                 'proyeccion_mensual': proyeccion_mensual,
                 'escenarios': escenarios,
                 'metricas_confianza': metricas_confianza,
+                'curvas_cobro': curvas_cobro,
                 'periodo_analisis': meses
             }
             
@@ -331,7 +378,175 @@ class CashFlowService:
                 message=f"Error al generar proyección detallada: {str(e)}"
             )
     
+    def generate_detailed_forecast(self, datos_relacionados, filters: Optional[Dict] = None,
+                                   scenario: str = "optimistic", months_ahead: int = 12) -> ServiceResponse:
+        """
+        Curvas de cobro P10/P50/P90 para /management/api/cash_flow_forecast.
+
+        Args:
+            datos_relacionados: RelatedData (o dict) con la tabla de EDPs
+            filters: filtros del dashboard gerencial (departamento, cliente, estado, fechas)
+            scenario: optimistic | realistic | conservative (curva destacada)
+            months_ahead: meses a proyectar
+        """
+        try:
+            if isinstance(datos_relacionados, RelatedData):
+                df_edp = datos_relacionados.frame("edps")
+            else:
+                df_edp = pd.DataFrame((datos_relacionados or {}).get("edps", []))
+
+            if df_edp.empty:
+                return ServiceResponse(
+                    success=False,
+                    message="No hay datos de EDP disponibles para proyección"
+                )
+
+            filtros = self._filtros_desde_dashboard(filters or {})
+            months_ahead = max(1, min(int(months_ahead), 36))
+            df_pendientes = self._filtrar_pendientes(self._aplicar_filtros_cashflow(df_edp, filtros))
+
+            curvas = self._get_collection_forecast(df_edp, df_pendientes, filtros, months_ahead)
+            percentil = SCENARIO_PERCENTILES.get((scenario or "").lower(), "p50")
+
+            return ServiceResponse(
+                success=True,
+                data={
+                    **curvas,
+                    'scenario': scenario,
+                    'curva_escenario': curvas[percentil],
+                    'acumulado_escenario': curvas[f"acumulado_{percentil}"],
+                    'months_ahead': months_ahead,
+                },
+                message="Proyección de cobros generada exitosamente"
+            )
+
+        except Exception as e:
+            logger.error(f"Error generando proyección de cobros: {str(e)}")
+            return ServiceResponse(
+                success=False,
+                message=f"Error al generar proyección de cobros: {str(e)}"
+            )
+
+    def get_cashflow_data(self, months_ahead: int = 12) -> ServiceResponse:
+        """
+        Precalcular la proyección por defecto (sin filtros) para la tarea beat.
+
+        Usa la misma clave de cache que la API sin filtros, de modo que la
+        primera consulta del dashboard encuentra las curvas listas en Redis.
+        """
+        try:
+            edps_response = find_all_dataframe_memoized("edps", self.edp_repository)
+            if not edps_response.get('success', False):
+                return ServiceResponse(
+                    success=False,
+                    message=f"Error al obtener datos de EDP: {edps_response.get('message', 'Error desconocido')}"
+                )
+
+            df_edp = edps_response.get('data', pd.DataFrame())
+            curvas = self._get_collection_forecast(
+                df_edp, self._filtrar_pendientes(df_edp), {}, months_ahead
+            )
+            return ServiceResponse(
+                success=True,
+                data=curvas,
+                message="Proyección de cobros precalculada"
+            )
+
+        except Exception as e:
+            logger.error(f"Error precalculando cash flow: {str(e)}")
+            return ServiceResponse(
+                success=False,
+                message=f"Error al precalcular cash flow: {str(e)}"
+            )
+
     # Métodos privados de apoyo
+
+    def _filtrar_pendientes(self, df: pd.DataFrame) -> pd.DataFrame:
+        """EDPs aún no cobrados (mismo criterio que el backlog del forecast)."""
+        if df.empty or "estado" not in df.columns:
+            return df
+        return df[~df["estado"].isin(ESTADOS_COBRADOS)]
+
+    @staticmethod
+    def _filtros_desde_dashboard(filters: Dict) -> Dict:
+        """Traducir filtros del dashboard gerencial a filtros de cash flow ("todos" = sin filtro)."""
+        filtros = {}
+        for origen, destino in (
+            ("fecha_inicio", "fecha_inicio"),
+            ("fecha_fin", "fecha_fin"),
+            ("cliente", "cliente"),
+            ("departamento", "departamento"),
+            ("estado", "estado"),
+        ):
+            valor = filters.get(origen)
+            if valor and valor != "todos":
+                filtros[destino] = valor
+        return filtros
+
+    def _get_collection_forecast(self, df_edp: pd.DataFrame, df_pendientes: pd.DataFrame,
+                                 filtros: Dict, meses: int) -> Dict[str, Any]:
+        """
+        Curvas de cobro cacheadas por filtros y horizonte.
+
+        Orden de búsqueda: memoria del proceso -> Redis (cash_forecast:*) ->
+        Monte Carlo. El modelo de tiempos de cobro se aprende una vez por
+        generación de datos y se comparte entre filtros.
+        """
+        firma = json.dumps({"filtros": filtros, "meses": int(meses)}, sort_keys=True, default=str)
+        cache_key = f"cash_forecast:{hashlib.md5(firma.encode()).hexdigest()[:12]}"
+
+        now = time.time()
+        with _cash_forecast_lock:
+            entry = _cash_forecast_cache.get(cache_key)
+        if entry and now - entry[0] < CASH_FORECAST_CACHE_TTL:
+            record_cache("cash_forecast", True)
+            return entry[1]
+
+        if redis_client:
+            try:
+                cached = redis_client.get(cache_key)
+                record_lookup(namespace_of(cache_key), bool(cached))
+                if cached:
+                    curvas = decode_payload(cached)
+                    with _cash_forecast_lock:
+                        _cash_forecast_cache[cache_key] = (now, curvas)
+                    record_cache("cash_forecast", True)
+                    return curvas
+            except Exception as e:
+                logger.warning(f"Cache Redis de cash forecast no disponible: {e}")
+        record_cache("cash_forecast", False)
+
+        model = self._get_collection_model(df_edp)
+        with stage_timer("cash_forecast.simulate"):
+            curvas = self.forecast_engine.simulate(model, df_pendientes, meses)
+
+        with _cash_forecast_lock:
+            _cash_forecast_cache[cache_key] = (now, curvas)
+        if redis_client:
+            try:
+                redis_client.setex(
+                    cache_key, CASH_FORECAST_CACHE_TTL, encode_payload(curvas, "cash_forecast")
+                )
+            except Exception as e:
+                logger.warning(f"No se pudo guardar cash forecast en Redis: {e}")
+        return curvas
+
+    def _get_collection_model(self, df_edp: pd.DataFrame) -> CollectionModel:
+        """Modelo de tiempos de cobro (EDPs + edp_log), uno por generación de datos."""
+        now = time.time()
+        with _cash_forecast_lock:
+            entry = _cash_forecast_cache.get("model")
+        if entry and now - entry[0] < CASH_FORECAST_CACHE_TTL:
+            return entry[1]
+
+        logs_response = find_all_dataframe_memoized("logs", self.log_repository)
+        df_log = logs_response.get('data') if logs_response.get('success', False) else None
+
+        with stage_timer("cash_forecast.learn"):
+            model = self.forecast_engine.learn(df_edp, df_log)
+        with _cash_forecast_lock:
+            _cash_forecast_cache["model"] = (now, model)
+        return model
     
     def _aplicar_filtros_cashflow(self, df: pd.DataFrame, filtros: Dict) -> pd.DataFrame:
         """Aplica filtros específicos para análisis de cash flow"""
@@ -435,12 +650,24 @@ class CashFlowService:
         
         return buckets_redistribuidos
     
-    def _calcular_probabilidades_cobro(self, buckets: Dict) -> Dict:
-        """Calcula probabilidades de cobro por bucket"""
+    def _calcular_probabilidades_cobro(self, buckets: Dict, curvas_cobro: Optional[Dict] = None) -> Dict:
+        """
+        Probabilidades de cobro por bucket.
+
+        Con historial se usa la probabilidad aprendida (cobro dentro de 90 días
+        condicionado a la antigüedad actual, ponderada por monto); los valores
+        fijos de _calcular_probabilidad_* quedan como prior sin historial.
+        """
         probabilidades = {}
+        aprendidas = {}
+        if curvas_cobro and curvas_cobro.get('modelo', {}).get('muestras', 0) > 0:
+            aprendidas = curvas_cobro.get('probabilidades_tramo', {})
         
         for bucket_name, data in buckets.items():
-            if bucket_name == '0-30':
+            aprendida = aprendidas.get(bucket_name, {}).get('probabilidad')
+            if aprendida is not None:
+                prob = aprendida
+            elif bucket_name == '0-30':
                 prob = self._calcular_probabilidad_30d(data)
             elif bucket_name == '31-60':
                 prob = self._calcular_probabilidad_60d(data)
@@ -838,46 +1065,43 @@ class CashFlowService:
         
         return alertas_priorizadas[:10]  # Top 10 alertas
     
-    def _generar_proyeccion_mensual(self, df: pd.DataFrame, meses: int) -> List[Dict]:
-        """Genera proyección mensual detallada"""
+    def _generar_proyeccion_mensual(self, curvas_cobro: Dict) -> List[Dict]:
+        """Proyección mensual desde las curvas Monte Carlo (mediana y banda P10-P90)"""
         proyeccion = []
         
-        # Simplificado - en producción usaría modelos más sofisticados
-        for i in range(meses):
-            fecha = datetime.now() + timedelta(days=30*i)
-            
-            # Proyección básica basada en patterns históricos
-            monto_base = df["monto_aprobado"].sum() / meses
-            factor_estacional = 1 + (0.1 * np.sin(i * np.pi / 6))  # Variación estacional
+        for mes, p10, p50, p90 in zip(
+            curvas_cobro['meses'], curvas_cobro['p10'], curvas_cobro['p50'], curvas_cobro['p90']
+        ):
+            # Confianza: qué tan angosta es la banda P10-P90 respecto de P90
+            confianza = round(max(0.0, 1 - (p90 - p10) / p90) * 100, 1) if p90 > 0 else 0
             
             proyeccion.append({
-                'mes': fecha.strftime('%Y-%m'),
-                'monto_proyectado': monto_base * factor_estacional,
-                'confianza': max(90 - i*5, 50)  # Decrece confianza con el tiempo
+                'mes': mes,
+                'monto_proyectado': p50,
+                'monto_p10': p10,
+                'monto_p90': p90,
+                'confianza': confianza
             })
         
         return proyeccion
     
-    def _generar_analisis_escenarios(self, df: pd.DataFrame, meses: int) -> Dict:
-        """Genera análisis de escenarios optimista/pesimista/realista"""
-        base_amount = df[~df["estado"].isin(["pagado", "validado"])]["monto_aprobado"].sum()
+    def _generar_analisis_escenarios(self, curvas_cobro: Dict) -> Dict:
+        """Escenarios optimista/realista/pesimista = P90/P50/P10 del cobro simulado en el horizonte"""
+        backlog = curvas_cobro.get('total_backlog', 0)
+        escenarios = curvas_cobro.get('escenarios', {})
+        descripciones = {
+            'optimista': 'Percentil 90 de las trayectorias simuladas',
+            'realista': 'Mediana de las trayectorias simuladas (historial de cobro)',
+            'pesimista': 'Percentil 10 de las trayectorias simuladas',
+        }
         
         return {
-            'optimista': {
-                'probabilidad_cobro': 0.9,
-                'monto_proyectado': base_amount * 0.9,
-                'descripcion': 'Escenario con excelente gestión de cobro'
-            },
-            'realista': {
-                'probabilidad_cobro': 0.7,
-                'monto_proyectado': base_amount * 0.7,
-                'descripcion': 'Escenario basado en performance histórica'
-            },
-            'pesimista': {
-                'probabilidad_cobro': 0.5,
-                'monto_proyectado': base_amount * 0.5,
-                'descripcion': 'Escenario conservador con retrasos'
+            nombre: {
+                'probabilidad_cobro': round(escenarios.get(nombre, 0) / backlog, 3) if backlog > 0 else 0,
+                'monto_proyectado': escenarios.get(nombre, 0),
+                'descripcion': descripcion
             }
+            for nombre, descripcion in descripciones.items()
         }
     
     def _calcular_metricas_confianza(self, df: pd.DataFrame) -> Dict:
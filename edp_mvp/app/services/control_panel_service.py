@@ -7,19 +7,23 @@ from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
 import logging
-import os
 import json
 
-try:  # pragma: no cover - optional redis cache
-    import redis
-    redis_url = os.getenv("REDIS_URL")
-    redis_client = redis.from_url(redis_url) if redis_url else None
-except Exception:
-    redis_client = None
+from ..utils.redis_client import redis_client
+from ..utils.cache_codec import decode_payload, encode_payload
+from ..utils.cache_inspector import namespace_of, record_lookup
 
 from . import BaseService, ServiceResponse, ValidationError
 from ..models import EDP
 from ..repositories.edp_repository import EDPRepository
+from .kanban_engine import (
+    KANBAN_ESTADOS,
+    KANBAN_PAGE_SIZE,
+    build_kanban_board,
+    dias_espera,
+    get_cached_board,
+    store_board,
+)
 from ..utils.date_utils import DateUtils
 from ..utils.format_utils import FormatUtils
 from ..utils.validation_utils import ValidationUtils
@@ -40,8 +44,9 @@ class KanbanService(BaseService):
             cache_key = f"kanban:{json.dumps(filters, sort_keys=True)}"
             if redis_client:
                 cached = redis_client.get(cache_key)
+                record_lookup(namespace_of(cache_key), bool(cached))
                 if cached:
-                    data = json.loads(cached)
+                    data = decode_payload(cached)
                     return ServiceResponse(success=True, data=data)
 
             # Get EDPs data
@@ -77,7 +82,7 @@ class KanbanService(BaseService):
                 "filters": filters or {},
             }
             if redis_client:
-                redis_client.setex(cache_key, 300, json.dumps(result_data))
+                redis_client.setex(cache_key, 300, encode_payload(result_data, "kanban"))
             return ServiceResponse(success=True, data=result_data)
 
         except Exception as e:
@@ -86,197 +91,90 @@ class KanbanService(BaseService):
             )
 
     def get_kanban_board_data(
-        self, df_edp_raw: pd.DataFrame, filters: Dict[str, Any]
+        self,
+        df_edp_raw: pd.DataFrame,
+        filters: Dict[str, Any],
+        page_size: Optional[int] = KANBAN_PAGE_SIZE,
+        cache_board: bool = False,
     ) -> ServiceResponse:
-        """Get comprehensive Kanban board data with filters and statistics - fully migrated from original dashboard."""
+        """
+        Get Kanban board data: per-column counts and totals plus the first page
+        of cards of each column.
+
+        Args:
+            df_edp_raw: EDP frame (not modified)
+            filters: view filters (mes, jefe_proyecto, cliente, estado,
+                     mostrar_validados_antiguos)
+            page_size: cards per column in the response; None returns all
+            cache_board: keep the built board for get_kanban_column_page; only
+                         valid when df_edp_raw is the full EDP frame
+        """
         try:
-            df = df_edp_raw
-
-            # Convert date columns explicitly to avoid format issues
-            date_columns = [
-                "fecha_emision",
-                "fecha_envio_cliente",
-                "fecha_conformidad",
-                "fecha_estimada_pago",
-            ]
-            for col in date_columns:
-                if col in df.columns:
-                    df[col] = pd.to_datetime(df[col], errors="coerce")
-
-            # Note: dias_espera is already calculated in the repository's _apply_transformations method
-
-            # Capture original size for metrics
-            total_registros_original = len(df)
-
-            # Apply filters from request
-            df = self._apply_comprehensive_filters(df, filters or {})
-            # Filter old validated EDPs (more than 10 days since conformity)
-            fecha_limite = datetime.now() - timedelta(days=10)
+            board = build_kanban_board(df_edp_raw, filters)
+            if cache_board:
+                store_board(filters, board)
 
-            # Count how many old validated EDPs there are before filtering
-            validados_antiguos = df[
-                (df["estado"] == "validado")
-                & (pd.notna(df["fecha_conformidad"]))
-                & (df["fecha_conformidad"] < fecha_limite)
-            ]
-            total_validados_antiguos = len(validados_antiguos)
-
-            # Filter only if not requested to show all
-            mostrar_validados_antiguos = (
-                filters.get("mostrar_validados_antiguos", False) if filters else False
+            return ServiceResponse(
+                success=True, data=board.to_board_data(filters, page_size)
             )
-            if not mostrar_validados_antiguos:
-                df = df[
-                    ~(
-                        (df["estado"] == "validado")
-                        & (pd.notna(df["fecha_conformidad"]))
-                        & (df["fecha_conformidad"] < fecha_limite)
-                    )
-                ]
 
-            # Metrics for optimization
-            total_registros_filtrados = len(df)
-            porcentaje_reduccion = (
-                (
-                    (total_registros_original - total_registros_filtrados)
-                    / total_registros_original
-                    * 100
-                )
-                if total_registros_original > 0
-                else 0
+        except Exception as e:
+            import traceback
+
+            logger.error(f"Error in get_kanban_board_data: {str(e)}")
+            logger.error(traceback.format_exc())
+            return ServiceResponse(
+                success=False,
+                message=f"Error loading Kanban board data: {str(e)}",
+                data=None,
             )
 
-            # Convert numeric columns for consistent calculations
-            for col in ["monto_propuesto", "monto_aprobado"]:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
-
-            # Group by status (SINGLE LOOP OPTIMIZATION)
-            estados = ["revisión", "enviado", "validado", "pagado"]
-            columnas = {estado: [] for estado in estados}
-
-            # Variables para análisis de carga de datos
-            total_items = 0
-            items_por_estado = {}
-
-            # Un solo bucle que procesa todas las tarjetas con sus campos adicionales
-            for _, row in df.iterrows():
-                estado = row["estado"]
-                if estado in columnas:
-                    # Crear el diccionario base con los campos necesarios
-                    item = row.to_dict()
-                    total_items += 1
-                    items_por_estado[estado] = items_por_estado.get(estado, 0) + 1
-
-                    # Añadir campo para optimización de lazy loading
-                    item["lazy_index"] = items_por_estado[estado]
-
-                    # Procesar fechas para formato adecuado
-                    try:
-                        if not pd.isna(row.get("fecha_estimada_pago")):
-                            item["dias_para_pago"] = (
-                                row["fecha_estimada_pago"] - datetime.today()
-                            ).days
-                        else:
-                            item["dias_para_pago"] = None
-                    except Exception as e:
-                        item["dias_para_pago"] = None
-                        logger.error(f"Error calculando dias_para_pago: {e}")
-
-                    # Format dates for template display
-                    date_fields = [
-                        "fecha_estimada_pago",
-                        "fecha_envio_cliente",
-                        "fecha_conformidad",
-                        "fecha_emision",
-                    ]
-                    for field in date_fields:
-                        if field in item and pd.notna(item[field]):
-                            if hasattr(item[field], "strftime"):
-                                item[field] = item[field].strftime("%d-%m-%Y")
-
-                    # Añadir diferencia entre monto propuesto y aprobado
-                    try:
-                        if not pd.isna(row.get("monto_propuesto")) and not pd.isna(
-                            row.get("monto_aprobado")
-                        ):
-                            item["diferencia_montos"] = (
-                                row["monto_aprobado"] - row["monto_propuesto"]
-                            )
-                            item["porcentaje_diferencia"] = (
-                                (
-                                    item["diferencia_montos"]
-                                    / row["monto_propuesto"]
-                                    * 100
-                                )
-                                if row["monto_propuesto"] > 0
-                                else 0
-                            )
-                        else:
-                            item["diferencia_montos"] = 0
-                            item["porcentaje_diferencia"] = 0
-                    except Exception as e:
-                        item["diferencia_montos"] = 0
-                        item["porcentaje_diferencia"] = 0
-                        logger.error(f"Error calculando diferencia_montos: {e}")
-
-                    # Clasificación de validados antiguos vs nuevos (para destacar visualmente)
-                    if estado == "validado" and not pd.isna(
-                        row.get("fecha_conformidad")
-                    ):
-                        dias_desde_conformidad = (
-                            datetime.now() - row["fecha_conformidad"]
-                        ).days
-                        item["antiguedad_validado"] = (
-                            "antiguo" if dias_desde_conformidad > 10 else "reciente"
-                        )
-
-                    # Verificar si es crítico para destacarlo visualmente
-                    item["es_critico"] = bool(row.get("critico", False))
-
-                    # Agregar una sola vez a la columna correspondiente
-                    columnas[estado].append(item)
-            # Get filter options from original data for dropdowns
-            filter_options = self._get_comprehensive_filter_options(df)
-
-            # Clean NaT values before sending to template
-            for estado, edps in columnas.items():
-                for i in range(len(edps)):
-                    edps[i] = self._clean_nat_values(edps[i])
-
-            # Card distribution analysis for optimization
-            distribucion_cards = {
-                estado: len(items) for estado, items in columnas.items()
-            }
+    def get_kanban_column_page(
+        self,
+        estado: str,
+        filters: Dict[str, Any],
+        offset: int = 0,
+        limit: int = KANBAN_PAGE_SIZE,
+        load_edps=None,
+    ) -> ServiceResponse:
+        """
+        Get one page of cards of a Kanban column (lazy loading on scroll).
 
-            # Global statistics for decision making
-            estadisticas = {
-                "total_registros": total_registros_original,
-                "registros_filtrados": total_registros_filtrados,
-                "porcentaje_reduccion": round(porcentaje_reduccion, 1),
-                "distribucion_cards": distribucion_cards,
-                "total_validados_antiguos": total_validados_antiguos,
-            }
+        The board is reused from the cache for the current data generation;
+        `load_edps` is called to get the full EDP frame only when it is missing.
+        """
+        if estado not in KANBAN_ESTADOS:
+            return ServiceResponse(success=False, message=f"Estado inválido: {estado}")
+        try:
+            board = get_cached_board(filters)
+            if board is None:
+                if load_edps is None:
+                    return ServiceResponse(
+                        success=False, message="Kanban board not available"
+                    )
+                board = build_kanban_board(load_edps(), filters)
+                store_board(filters, board)
 
+            cards = board.page(estado, offset, limit)
+            total = len(board.columnas[estado])
             return ServiceResponse(
                 success=True,
                 data={
-                    "columnas": columnas,
-                    "filter_options": filter_options,
-                    "estadisticas": estadisticas,
-                    "total_validados_antiguos": total_validados_antiguos,
-                    "filters": filters or {},
+                    "estado": estado,
+                    "cards": cards,
+                    "offset": offset,
+                    "next_offset": offset + len(cards),
+                    "has_more": offset + len(cards) < total,
+                    "total": total,
+                    "resumen": board.resumen_columnas()[estado],
                 },
             )
 
         except Exception as e:
-            import traceback
-
-            logger.error(f"Error in get_kanban_board_data: {str(e)}")
-            logger.error(traceback.format_exc())
+            logger.error(f"Error in get_kanban_column_page: {str(e)}")
             return ServiceResponse(
                 success=False,
-                message=f"Error loading Kanban board data: {str(e)}",
+                message=f"Error loading Kanban column: {str(e)}",
                 data=None,
             )
 
@@ -539,71 +437,10 @@ class KanbanService(BaseService):
 
     def _calcular_dias_espera(self, df: pd.DataFrame) -> pd.DataFrame:
         """Calculates waiting days according to business rules - migrated from dashboard controller."""
-        now = datetime.now()
-
-        # Create the waiting days column correctly
         df = df.copy()
-        df["dias_espera"] = None
-
-        for idx, row in df.iterrows():
-            # Check if there's a shipping date
-            if pd.notna(row.get("fecha_envio_cliente")):
-                fecha_envio = row["fecha_envio_cliente"]
-
-                # If conformity was sent, count days until conformity date
-                if row.get("conformidad_enviada") == "Sí" and pd.notna(
-                    row.get("fecha_conformidad")
-                ):
-                    df.at[idx, "dias_espera"] = (
-                        row["fecha_conformidad"] - fecha_envio
-                    ).days
-                # If no conformity, count days until today
-                else:
-                    df.at[idx, "dias_espera"] = (now - fecha_envio).days
-
+        df["dias_espera"] = dias_espera(df, datetime.now())
         return df
 
-    def _apply_comprehensive_filters(
-        self, df: pd.DataFrame, filters: Dict[str, Any]
-    ) -> pd.DataFrame:
-        """Apply comprehensive filters matching the original dashboard implementation."""
-        df = df.copy()
-
-        mes = filters.get("mes")
-        jefe_proyecto = filters.get("jefe_proyecto")
-        cliente = filters.get("cliente")
-        estado = filters.get("estado")
-
-        if mes and mes != "todos":
-            df = df[df["mes"] == mes]
-        if jefe_proyecto and jefe_proyecto != "todos":
-            df = df[df["jefe_proyecto"] == jefe_proyecto]
-        if cliente and cliente != "todos":
-            df = df[df["cliente"] == cliente]
-        if estado and estado != "todos":
-            df = df[df["estado"] == estado]
-
-        return df
-
-    def _get_comprehensive_filter_options(self, df: pd.DataFrame) -> Dict[str, List]:
-        """Get comprehensive filter options for dropdowns - migrated from original implementation."""
-        return {
-            "meses": sorted(df["mes"].dropna().unique()) if "mes" in df.columns else [],
-            "jefe_proyectos": (
-                sorted(df["jefe_proyecto"].dropna().unique())
-                if "jefe_proyecto" in df.columns
-                else []
-            ),
-            "clientes": (
-                sorted(df["cliente"].dropna().unique())
-                if "cliente" in df.columns
-                else []
-            ),
-            "estados": (
-                sorted(df["estado"].dropna().unique()) if "estado" in df.columns else []
-            ),
-        }
-
     def _clean_nat_values(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Clean NaT values from dictionary - migrated from dashboard controller."""
         cleaned = {}
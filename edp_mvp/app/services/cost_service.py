@@ -1,9 +1,20 @@
 """
 Cost Service - Service for handling cost management operations.
+
+Los agregados del dashboard de costos (mes, tipo_costo, estado, proveedor,
+proyecto) se calculan una sola vez sobre un frame tipado con columnas
+categóricas y se emiten directamente desde los arrays de columnas. El frame y
+los resultados se cachean por proceso y generación de datos
+(COST_ANALYTICS_CACHE_TTL, COST_ANALYTICS_CACHE_MAX_ENTRIES): un cambio de
+datos los deja obsoletos también en los demás workers.
 """
 
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Callable, Tuple
 from datetime import datetime, timedelta
+import json
+import os
+import threading
+import time
 import pandas as pd
 import logging
 
@@ -12,9 +23,52 @@ from ..repositories.cost_repository import CostRepository
 from ..models import Cost
 from ..utils.date_utils import DateUtils
 from ..utils.format_utils import FormatUtils
+from ..utils.instrumentation import record_cache, stage_timer
+from .cache_invalidation_service import current_data_generation
 
 logger = logging.getLogger(__name__)
 
+COST_ANALYTICS_CACHE_TTL = int(os.getenv("COST_ANALYTICS_CACHE_TTL", "60"))
+COST_ANALYTICS_CACHE_MAX_ENTRIES = int(os.getenv("COST_ANALYTICS_CACHE_MAX_ENTRIES", "64"))
+
+# Columnas de baja cardinalidad que se agrupan en el dashboard
+COST_CATEGORICAL_COLUMNS = ("estado_costo", "tipo_costo", "proveedor", "project_id")
+
+# Dimensión -> columna del frame tipado
+COST_GROUP_COLUMNS = {
+    "month": "month",
+    "type": "tipo_costo",
+    "status": "estado_costo",
+    "provider": "proveedor",
+    "project": "project_id",
+}
+
+_cost_frame_cache: Dict[str, Any] = {"ts": 0.0, "generation": None, "data": None}
+# (generación de datos, sección:filtros) -> (timestamp, resultado)
+_cost_analytics_cache: Dict[Tuple[str, str], Tuple[float, Any]] = {}
+_cost_analytics_lock = threading.Lock()
+
+
+def clear_cost_analytics_cache() -> None:
+    """Descartar el frame de costos tipado y los agregados cacheados."""
+    with _cost_analytics_lock:
+        _cost_frame_cache["ts"] = 0.0
+        _cost_frame_cache["generation"] = None
+        _cost_frame_cache["data"] = None
+        _cost_analytics_cache.clear()
+
+
+def _column_records(**columns: List[Any]) -> List[Dict[str, Any]]:
+    """Construir registros a partir de listas de columnas (sin iterrows)."""
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+
+def _column_values(df: pd.DataFrame, column: str, default: Any = "") -> List[Any]:
+    if column in df.columns:
+        return df[column].astype(object).where(df[column].notna(), default).tolist()
+    return [default] * len(df)
+
 
 class CostService(BaseService):
     """Service for handling cost management operations."""
@@ -32,17 +86,14 @@ class CostService(BaseService):
         try:
             filters = filters or {}
 
-            # Get all costs as DataFrame
-            costs_response = self.cost_repository.find_all_dataframe()
-            if not costs_response.get("success", False):
+            loaded, df_costs = self._get_cost_frame()
+            if not loaded:
                 return ServiceResponse(
                     success=False,
                     message="Failed to load costs data",
                     data=self._get_empty_cost_dashboard(),
                 )
 
-            df_costs = costs_response.get("data", pd.DataFrame())
-
             if df_costs.empty:
                 return ServiceResponse(
                     success=True,
@@ -50,37 +101,28 @@ class CostService(BaseService):
                     data=self._get_empty_cost_dashboard(),
                 )
 
-            # Apply filters
-            df_filtered = self._apply_filters(df_costs, filters)
-
-            # Calculate KPIs
-            cost_kpis = self._calculate_cost_kpis(df_filtered)
-
-            # Generate charts data
-            charts_data = self._generate_cost_charts(df_filtered)
-
-            # Get cost breakdown
-            breakdown = self._get_cost_breakdown(df_filtered)
-
-            # Get pending payments
-            pending_payments = self._get_pending_payments_summary(df_filtered)
+            def build_dashboard() -> Dict[str, Any]:
+                # Apply filters
+                df_filtered = self._apply_filters(df_costs, filters)
+
+                # Todos los groupby se calculan una vez y se comparten
+                groups = self._compute_cost_groups(df_filtered)
+
+                return {
+                    "kpis": self._calculate_cost_kpis(df_filtered),
+                    "charts": self._generate_cost_charts(df_filtered, groups),
+                    "breakdown": self._get_cost_breakdown(df_filtered, groups),
+                    "pending_payments": self._get_pending_payments_summary(df_filtered),
+                    "provider_analysis": self._get_provider_analysis(df_filtered, groups),
+                    "filters_applied": filters,
+                    "last_updated": datetime.now().isoformat(),
+                }
 
-            # Get provider analysis
-            provider_analysis = self._get_provider_analysis(df_filtered)
-
-            dashboard_data = {
-                "kpis": cost_kpis,
-                "charts": charts_data,
-                "breakdown": breakdown,
-                "pending_payments": pending_payments,
-                "provider_analysis": provider_analysis,
-                "filters_applied": filters,
-                "last_updated": datetime.now().isoformat(),
-            }
+            dashboard_data = self._cached_analytics("dashboard", filters, build_dashboard)
 
             return ServiceResponse(
                 success=True,
-                data=dashboard_data,
+                data=dict(dashboard_data),
                 message="Cost dashboard data generated successfully",
             )
 
@@ -94,13 +136,12 @@ class CostService(BaseService):
     def get_cost_trends(self, period: str = "monthly") -> ServiceResponse:
         """Get cost trends analysis."""
         try:
-            costs_response = self.cost_repository.find_all_dataframe()
-            if not costs_response.get("success", False):
+            loaded, df_costs = self._get_cost_frame()
+            if not loaded:
                 return ServiceResponse(
                     success=False, message="Failed to load costs data"
                 )
 
-            df_costs = costs_response.get("data", pd.DataFrame())
             if df_costs.empty:
                 return ServiceResponse(
                     success=True,
@@ -109,7 +150,10 @@ class CostService(BaseService):
                 )
 
             # Calculate trends
-            trends = self._calculate_cost_trends(df_costs, period)
+            trends = self._cached_analytics(
+                f"trends:{period}", None,
+                lambda: self._calculate_cost_trends(df_costs, period),
+            )
 
             return ServiceResponse(
                 success=True,
@@ -125,13 +169,12 @@ class CostService(BaseService):
     def get_overdue_analysis(self) -> ServiceResponse:
         """Get overdue costs analysis."""
         try:
-            costs_response = self.cost_repository.find_all_dataframe()
-            if not costs_response.get("success", False):
+            loaded, df_costs = self._get_cost_frame()
+            if not loaded:
                 return ServiceResponse(
                     success=False, message="Failed to load costs data"
                 )
 
-            df_costs = costs_response.get("data", pd.DataFrame())
             if df_costs.empty:
                 return ServiceResponse(
                     success=True,
@@ -140,11 +183,13 @@ class CostService(BaseService):
                 )
 
             # Get overdue costs
-            overdue_analysis = self._analyze_overdue_costs(df_costs)
+            overdue_analysis = self._cached_analytics(
+                "overdue", None, lambda: self._analyze_overdue_costs(df_costs)
+            )
 
             return ServiceResponse(
                 success=True,
-                data=overdue_analysis,
+                data=dict(overdue_analysis),
                 message="Overdue analysis completed successfully",
             )
 
@@ -156,13 +201,12 @@ class CostService(BaseService):
     def get_cost_forecast(self, months: int = 6) -> ServiceResponse:
         """Get cost forecast for specified months."""
         try:
-            costs_response = self.cost_repository.find_all_dataframe()
-            if not costs_response.get("success", False):
+            loaded, df_costs = self._get_cost_frame()
+            if not loaded:
                 return ServiceResponse(
                     success=False, message="Failed to load costs data"
                 )
 
-            df_costs = costs_response.get("data", pd.DataFrame())
             if df_costs.empty:
                 return ServiceResponse(
                     success=True,
@@ -184,6 +228,121 @@ class CostService(BaseService):
                 success=False, message=f"Error generating cost forecast: {str(e)}"
             )
 
+    # === FRAME TIPADO Y CACHE ===
+
+    def _get_cost_frame(self) -> Tuple[bool, pd.DataFrame]:
+        """
+        cost_header como frame tipado, cacheado por proceso.
+
+        Returns:
+            (cargado, frame); cargado=False si el repositorio falló.
+        """
+        now = time.time()
+        generation = current_data_generation()
+        with _cost_analytics_lock:
+            cached = _cost_frame_cache["data"]
+            fresh = now - _cost_frame_cache["ts"] < COST_ANALYTICS_CACHE_TTL
+            if cached is not None and fresh and _cost_frame_cache["generation"] == generation:
+                record_cache("cost_frame", True)
+                return True, cached
+        record_cache("cost_frame", False)
+
+        with stage_timer("cost_analytics.load"):
+            costs_response = self.cost_repository.find_all_dataframe()
+        if not costs_response.get("success", False):
+            return False, pd.DataFrame()
+
+        frame = self._prepare_cost_frame(costs_response.get("data", pd.DataFrame()))
+        with _cost_analytics_lock:
+            _cost_frame_cache["ts"] = now
+            _cost_frame_cache["generation"] = generation
+            _cost_frame_cache["data"] = frame
+        return True, frame
+
+    def _prepare_cost_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Tipar cost_header una sola vez: montos numéricos, fechas parseadas,
+        mes de factura y columnas de agrupación como categóricas.
+        """
+        if df is None or df.empty:
+            return pd.DataFrame()
+
+        frame = df.copy()
+        if "importe_neto" in frame.columns:
+            frame["importe_neto"] = pd.to_numeric(
+                frame["importe_neto"], errors="coerce"
+            ).fillna(0.0)
+        else:
+            frame["importe_neto"] = 0.0
+
+        for col in ("fecha_factura", "fecha_vencimiento"):
+            if col in frame.columns:
+                frame[f"_{col}"] = pd.to_datetime(frame[col], errors="coerce")
+            else:
+                frame[f"_{col}"] = pd.NaT
+
+        if "fecha_factura" in frame.columns:
+            frame["month"] = frame["_fecha_factura"].dt.strftime("%Y-%m").astype("category")
+
+        frame["_pagado"] = (
+            frame["estado_costo"] == "pagado"
+            if "estado_costo" in frame.columns
+            else False
+        )
+
+        for col in COST_CATEGORICAL_COLUMNS:
+            if col in frame.columns:
+                frame[col] = frame[col].astype("category")
+
+        return frame
+
+    def _cached_analytics(
+        self, section: str, filters: Optional[Dict[str, Any]], builder: Callable[[], Any]
+    ) -> Any:
+        """Resultado cacheado por generación de datos, sección y conjunto de filtros."""
+        generation = current_data_generation()
+        cache_key = (generation, f"{section}:{json.dumps(filters or {}, sort_keys=True, default=str)}")
+        now = time.time()
+        with _cost_analytics_lock:
+            entry = _cost_analytics_cache.get(cache_key)
+        if entry and now - entry[0] < COST_ANALYTICS_CACHE_TTL:
+            record_cache("cost_analytics", True)
+            return entry[1]
+        record_cache("cost_analytics", False)
+
+        with stage_timer(f"cost_analytics.{section.split(':', 1)[0]}"):
+            result = builder()
+        with _cost_analytics_lock:
+            for key, (ts, _) in list(_cost_analytics_cache.items()):
+                if key[0] != generation or now - ts >= COST_ANALYTICS_CACHE_TTL:
+                    del _cost_analytics_cache[key]
+            while len(_cost_analytics_cache) >= COST_ANALYTICS_CACHE_MAX_ENTRIES:
+                del _cost_analytics_cache[next(iter(_cost_analytics_cache))]
+            _cost_analytics_cache[cache_key] = (now, result)
+        return result
+
+    def _compute_cost_groups(self, df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+        """
+        Agregados por dimensión (monto, cantidad, pagados) en un solo groupby
+        por columna, compartidos por gráficos, desglose y proveedores.
+        """
+        groups = {}
+        if df.empty:
+            return groups
+
+        for dimension, column in COST_GROUP_COLUMNS.items():
+            if column not in df.columns:
+                continue
+            grouped = df.groupby(column, observed=True, sort=True)
+            groups[dimension] = pd.DataFrame(
+                {
+                    "amount": grouped["importe_neto"].sum().astype(float),
+                    "count": grouped.size().astype(int),
+                    "paid": grouped["_pagado"].sum().astype(int),
+                }
+            )
+        return groups
+
     def _calculate_cost_kpis(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Calculate cost KPIs."""
         if df.empty:
@@ -239,6 +398,8 @@ class CostService(BaseService):
             type_breakdown = {}
             if "tipo_costo" in df.columns:
                 type_counts = df["tipo_costo"].value_counts()
+                # Categórica: omitir categorías sin filas tras filtrar
+                type_counts = type_counts[type_counts > 0]
                 type_breakdown = {str(k): int(v) for k, v in type_counts.items()}
 
             return {
@@ -259,70 +420,54 @@ class CostService(BaseService):
             logger.error(f"Error calculating cost KPIs: {e}")
             return self._get_empty_kpis()
 
-    def _generate_cost_charts(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def _generate_cost_charts(
+        self, df: pd.DataFrame, groups: Optional[Dict[str, pd.DataFrame]] = None
+    ) -> Dict[str, Any]:
         """Generate chart data for cost dashboard."""
         if df.empty:
             return {"monthly_costs": [], "cost_by_type": [], "payment_status": []}
 
         try:
+            groups = groups if groups is not None else self._compute_cost_groups(df)
             charts = {}
 
             # Monthly costs trend
-            if "fecha_factura" in df.columns:
-                df_monthly = df.copy()
-                df_monthly["month"] = pd.to_datetime(
-                    df_monthly["fecha_factura"], errors="coerce"
-                ).dt.strftime("%Y-%m")
-
-                monthly_costs = (
-                    df_monthly.groupby("month")["importe_neto"].sum().reset_index()
+            monthly = groups.get("month")
+            charts["monthly_costs"] = (
+                _column_records(
+                    month=monthly.index.tolist(), amount=monthly["amount"].tolist()
                 )
-                charts["monthly_costs"] = [
-                    {"month": row["month"], "amount": float(row["importe_neto"])}
-                    for _, row in monthly_costs.iterrows()
-                ]
-            else:
-                charts["monthly_costs"] = []
+                if monthly is not None
+                else []
+            )
 
             # Cost by type
-            if "tipo_costo" in df.columns:
-                type_costs = (
-                    df.groupby("tipo_costo")["importe_neto"].sum().reset_index()
+            by_type = groups.get("type")
+            charts["cost_by_type"] = (
+                _column_records(
+                    type=by_type.index.tolist(), amount=by_type["amount"].tolist()
                 )
-                charts["cost_by_type"] = [
-                    {"type": row["tipo_costo"], "amount": float(row["importe_neto"])}
-                    for _, row in type_costs.iterrows()
-                ]
-            else:
-                charts["cost_by_type"] = []
+                if by_type is not None
+                else []
+            )
 
             # Payment status
-            if "estado_costo" in df.columns:
-                status_costs = (
-                    df.groupby("estado_costo")["importe_neto"].sum().reset_index()
+            by_status = groups.get("status")
+            charts["payment_status"] = (
+                _column_records(
+                    status=by_status.index.tolist(), amount=by_status["amount"].tolist()
                 )
-                charts["payment_status"] = [
-                    {
-                        "status": row["estado_costo"],
-                        "amount": float(row["importe_neto"]),
-                    }
-                    for _, row in status_costs.iterrows()
-                ]
-            else:
-                charts["payment_status"] = []
+                if by_status is not None
+                else []
+            )
 
             # Top providers
-            if "proveedor" in df.columns:
-                provider_costs = (
-                    df.groupby("proveedor")["importe_neto"]
-                    .sum()
-                    .nlargest(10)
-                    .reset_index()
+            by_provider = groups.get("provider")
+            if by_provider is not None:
+                top = by_provider["amount"].nlargest(10)
+                charts["top_providers"] = _column_records(
+                    provider=top.index.tolist(), amount=top.tolist()
                 )
-                charts["top_providers"] = [
-                    {"provider": row["proveedor"], "amount": float(row["importe_neto"])}
-                    for _, row in provider_costs.iterrows()
-                ]
             else:
                 charts["top_providers"] = []
 
@@ -332,67 +477,34 @@ class CostService(BaseService):
             logger.error(f"Error generating cost charts: {e}")
             return {"monthly_costs": [], "cost_by_type": [], "payment_status": []}
 
-    def _get_cost_breakdown(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def _get_cost_breakdown(
+        self, df: pd.DataFrame, groups: Optional[Dict[str, pd.DataFrame]] = None
+    ) -> Dict[str, Any]:
         """Get detailed cost breakdown."""
         if df.empty:
             return {"by_project": [], "by_category": [], "by_provider": []}
 
         try:
+            groups = groups if groups is not None else self._compute_cost_groups(df)
             breakdown = {}
 
-            # By project
-            if "project_id" in df.columns:
-                project_breakdown = (
-                    df.groupby("project_id")
-                    .agg({"importe_neto": "sum", "cost_id": "count"})
-                    .reset_index()
-                )
-                breakdown["by_project"] = [
-                    {
-                        "project": row["project_id"],
-                        "amount": float(row["importe_neto"]),
-                        "count": int(row["cost_id"]),
-                    }
-                    for _, row in project_breakdown.iterrows()
-                ]
-            else:
-                breakdown["by_project"] = []
-
-            # By category (tipo_costo)
-            if "tipo_costo" in df.columns:
-                category_breakdown = (
-                    df.groupby("tipo_costo")
-                    .agg({"importe_neto": "sum", "cost_id": "count"})
-                    .reset_index()
-                )
-                breakdown["by_category"] = [
-                    {
-                        "category": row["tipo_costo"],
-                        "amount": float(row["importe_neto"]),
-                        "count": int(row["cost_id"]),
-                    }
-                    for _, row in category_breakdown.iterrows()
-                ]
-            else:
-                breakdown["by_category"] = []
-
-            # By provider
-            if "proveedor" in df.columns:
-                provider_breakdown = (
-                    df.groupby("proveedor")
-                    .agg({"importe_neto": "sum", "cost_id": "count"})
-                    .reset_index()
+            for key, dimension, label in (
+                ("by_project", "project", "project"),
+                ("by_category", "type", "category"),
+                ("by_provider", "provider", "provider"),
+            ):
+                grouped = groups.get(dimension)
+                breakdown[key] = (
+                    _column_records(
+                        **{
+                            label: grouped.index.tolist(),
+                            "amount": grouped["amount"].tolist(),
+                            "count": grouped["count"].tolist(),
+                        }
+                    )
+                    if grouped is not None
+                    else []
                 )
-                breakdown["by_provider"] = [
-                    {
-                        "provider": row["proveedor"],
-                        "amount": float(row["importe_neto"]),
-                        "count": int(row["cost_id"]),
-                    }
-                    for _, row in provider_breakdown.iterrows()
-                ]
-            else:
-                breakdown["by_provider"] = []
 
             return breakdown
 
@@ -407,60 +519,32 @@ class CostService(BaseService):
 
         try:
             # Filter pending payments
-            pending_df = df[df.get("estado_costo", "") != "pagado"].copy()
+            pending_df = df[~df["_pagado"]]
 
             if pending_df.empty:
                 return {"total_pending": 0, "overdue": 0, "upcoming": []}
 
-            total_pending = (
-                pending_df["importe_neto"].sum()
-                if "importe_neto" in pending_df.columns
-                else 0
-            )
+            total_pending = pending_df["importe_neto"].sum()
 
-            # Overdue payments
+            # Overdue payments (NaT nunca cumple la comparación)
             today = pd.Timestamp.now()
-            if "fecha_vencimiento" in pending_df.columns:
-                overdue_df = pending_df[
-                    pd.to_datetime(pending_df["fecha_vencimiento"], errors="coerce")
-                    < today
-                ]
-                overdue_amount = (
-                    overdue_df["importe_neto"].sum()
-                    if "importe_neto" in overdue_df.columns
-                    else 0
-                )
-            else:
-                overdue_amount = 0
+            due = pending_df["_fecha_vencimiento"]
+            overdue_amount = pending_df.loc[due < today, "importe_neto"].sum()
 
             # Upcoming payments (next 30 days)
-            upcoming = []
-            if "fecha_vencimiento" in pending_df.columns:
-                next_30_days = today + pd.Timedelta(days=30)
-                upcoming_df = pending_df[
-                    (
-                        pd.to_datetime(pending_df["fecha_vencimiento"], errors="coerce")
-                        >= today
-                    )
-                    & (
-                        pd.to_datetime(pending_df["fecha_vencimiento"], errors="coerce")
-                        <= next_30_days
-                    )
-                ].sort_values("fecha_vencimiento")
+            next_30_days = today + pd.Timedelta(days=30)
+            upcoming_df = (
+                pending_df[(due >= today) & (due <= next_30_days)]
+                .sort_values("_fecha_vencimiento", kind="mergesort")
+                .head(10)
+            )
 
-                upcoming = [
-                    {
-                        "provider": row.get("proveedor", ""),
-                        "amount": float(row.get("importe_neto", 0)),
-                        "due_date": str(row.get("fecha_vencimiento", "")),
-                        "days_until_due": (
-                            (pd.to_datetime(row.get("fecha_vencimiento")) - today).days
-                            if pd.notna(row.get("fecha_vencimiento"))
-                            else 0
-                        ),
-                    }
-                    for _, row in upcoming_df.head(10).iterrows()
-                ]
+            upcoming = _column_records(
+                provider=_column_values(upcoming_df, "proveedor"),
+                amount=upcoming_df["importe_neto"].astype(float).tolist(),
+                due_date=[str(value) for value in _column_values(upcoming_df, "fecha_vencimiento")],
+                days_until_due=(upcoming_df["_fecha_vencimiento"] - today).dt.days.astype(int).tolist(),
+            )
 
             return {
                 "total_pending": self.format_utils.format_currency(total_pending),
@@ -472,59 +556,36 @@ class CostService(BaseService):
             logger.error(f"Error getting pending payments summary: {e}")
             return {"total_pending": 0, "overdue": 0, "upcoming": []}
 
-    def _get_provider_analysis(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def _get_provider_analysis(
+        self, df: pd.DataFrame, groups: Optional[Dict[str, pd.DataFrame]] = None
+    ) -> Dict[str, Any]:
         """Get provider analysis."""
         if df.empty or "proveedor" not in df.columns:
             return {"top_providers": [], "payment_performance": []}
 
         try:
+            groups = groups if groups is not None else self._compute_cost_groups(df)
+            by_provider = groups["provider"]
+
             # Top providers by amount
-            top_providers = (
-                df.groupby("proveedor")
-                .agg({"importe_neto": "sum", "cost_id": "count"})
-                .nlargest(10, "importe_neto")
-                .reset_index()
+            top = by_provider.nlargest(10, "amount")
+            top_providers_list = _column_records(
+                provider=top.index.tolist(),
+                total_amount=top["amount"].tolist(),
+                invoice_count=top["count"].tolist(),
             )
 
-            top_providers_list = [
-                {
-                    "provider": row["proveedor"],
-                    "total_amount": float(row["importe_neto"]),
-                    "invoice_count": int(row["cost_id"]),
-                }
-                for _, row in top_providers.iterrows()
-            ]
-
             # Payment performance by provider
             payment_performance = []
             if "estado_costo" in df.columns:
-                provider_performance = (
-                    df.groupby("proveedor")
-                    .agg(
-                        {
-                            "cost_id": "count",
-                            "estado_costo": lambda x: (x == "pagado").sum(),
-                        }
-                    )
-                    .reset_index()
+                payment_rate = (by_provider["paid"] / by_provider["count"] * 100).round(1)
+                payment_performance = _column_records(
+                    provider=by_provider.index.tolist(),
+                    total_invoices=by_provider["count"].tolist(),
+                    paid_invoices=by_provider["paid"].tolist(),
+                    payment_rate=payment_rate.tolist(),
                 )
 
-                provider_performance["payment_rate"] = (
-                    provider_performance["estado_costo"]
-                    / provider_performance["cost_id"]
-                    * 100
-                )
-
-                payment_performance = [
-                    {
-                        "provider": row["proveedor"],
-                        "total_invoices": int(row["cost_id"]),
-                        "paid_invoices": int(row["estado_costo"]),
-                        "payment_rate": round(row["payment_rate"], 1),
-                    }
-                    for _, row in provider_performance.iterrows()
-                ]
-
             return {
                 "top_providers": top_providers_list,
                 "payment_performance": payment_performance,
@@ -535,55 +596,42 @@ class CostService(BaseService):
             return {"top_providers": [], "payment_performance": []}
 
     def _apply_filters(self, df: pd.DataFrame, filters: Dict[str, Any]) -> pd.DataFrame:
-        """Apply filters to the DataFrame."""
+        """Apply filters to the typed DataFrame with a single combined mask."""
         if df.empty or not filters:
             return df
 
         try:
-            filtered_df = df.copy()
+            mask = pd.Series(True, index=df.index)
 
             # Date range filter
-            if "start_date" in filters and "end_date" in filters:
+            if "start_date" in filters and "end_date" in filters and "fecha_factura" in df.columns:
                 start_date = pd.to_datetime(filters["start_date"])
                 end_date = pd.to_datetime(filters["end_date"])
-
-                if "fecha_factura" in filtered_df.columns:
-                    date_mask = (
-                        pd.to_datetime(filtered_df["fecha_factura"], errors="coerce")
-                        >= start_date
-                    ) & (
-                        pd.to_datetime(filtered_df["fecha_factura"], errors="coerce")
-                        <= end_date
-                    )
-                    filtered_df = filtered_df[date_mask]
+                mask &= df["_fecha_factura"].between(start_date, end_date)
 
             # Project filter
-            if "project_id" in filters and "project_id" in filtered_df.columns:
-                filtered_df = filtered_df[
-                    filtered_df["project_id"] == filters["project_id"]
-                ]
-
-            # Provider filter
-            if "provider" in filters and "proveedor" in filtered_df.columns:
-                filtered_df = filtered_df[
-                    filtered_df["proveedor"].str.contains(
-                        filters["provider"], case=False, na=False
+            if "project_id" in filters and "project_id" in df.columns:
+                mask &= df["project_id"] == filters["project_id"]
+
+            # Provider filter: contains() sobre las categorías, no sobre cada fila
+            if "provider" in filters and "proveedor" in df.columns:
+                categories = df["proveedor"].cat.categories
+                matching = categories[
+                    categories.astype(str).str.contains(
+                        filters["provider"], case=False, na=False, regex=False
                     )
                 ]
+                mask &= df["proveedor"].isin(matching)
 
             # Status filter
-            if "status" in filters and "estado_costo" in filtered_df.columns:
-                filtered_df = filtered_df[
-                    filtered_df["estado_costo"] == filters["status"]
-                ]
+            if "status" in filters and "estado_costo" in df.columns:
+                mask &= df["estado_costo"] == filters["status"]
 
             # Type filter
-            if "tipo_costo" in filters and "tipo_costo" in filtered_df.columns:
-                filtered_df = filtered_df[
-                    filtered_df["tipo_costo"] == filters["tipo_costo"]
-                ]
+            if "tipo_costo" in filters and "tipo_costo" in df.columns:
+                mask &= df["tipo_costo"] == filters["tipo_costo"]
 
-            return filtered_df
+            return df[mask]
 
         except Exception as e:
             logger.error(f"Error applying filters: {e}")
@@ -597,34 +645,24 @@ class CostService(BaseService):
             return []
 
         try:
-            df_trends = df.copy()
-            df_trends["fecha_factura"] = pd.to_datetime(
-                df_trends["fecha_factura"], errors="coerce"
-            )
+            fecha = df["_fecha_factura"]
 
             if period == "monthly":
-                df_trends["period"] = df_trends["fecha_factura"].dt.strftime("%Y-%m")
+                period_key = df["month"]
             elif period == "quarterly":
-                df_trends["period"] = (
-                    df_trends["fecha_factura"].dt.to_period("Q").astype(str)
-                )
+                period_key = fecha.dt.to_period("Q").astype(str).where(fecha.notna())
             else:  # yearly
-                df_trends["period"] = df_trends["fecha_factura"].dt.strftime("%Y")
+                period_key = fecha.dt.strftime("%Y")
 
-            trends = (
-                df_trends.groupby("period")
-                .agg({"importe_neto": "sum", "cost_id": "count"})
-                .reset_index()
-            )
+            grouped = df["importe_neto"].groupby(period_key, observed=True, sort=True)
+            amounts = grouped.sum()
+            counts = grouped.size()
 
-            return [
-                {
-                    "period": row["period"],
-                    "total_amount": float(row["importe_neto"]),
-                    "total_count": int(row["cost_id"]),
-                }
-                for _, row in trends.iterrows()
-            ]
+            return _column_records(
+                period=amounts.index.astype(str).tolist(),
+                total_amount=amounts.astype(float).tolist(),
+                total_count=counts.astype(int).tolist(),
+            )
 
         except Exception as e:
             logger.error(f"Error calculating cost trends: {e}")
@@ -637,58 +675,38 @@ class CostService(BaseService):
 
         try:
             today = pd.Timestamp.now()
+            overdue_list = []
+            summary = {
+                "total_overdue": 0,
+                "total_amount": self.format_utils.format_currency(0),
+                "avg_days_overdue": 0,
+                "max_days_overdue": 0,
+            }
 
             # Filter overdue costs
             if "fecha_vencimiento" in df.columns and "estado_costo" in df.columns:
-                overdue_df = df[
-                    (pd.to_datetime(df["fecha_vencimiento"], errors="coerce") < today)
-                    & (df["estado_costo"] != "pagado")
-                ].copy()
+                overdue_df = df[(df["_fecha_vencimiento"] < today) & ~df["_pagado"]]
 
                 if not overdue_df.empty:
                     # Calculate days overdue
-                    overdue_df["days_overdue"] = (
-                        today
-                        - pd.to_datetime(
-                            overdue_df["fecha_vencimiento"], errors="coerce"
-                        )
-                    ).dt.days
-
-                    overdue_list = [
-                        {
-                            "provider": row.get("proveedor", ""),
-                            "amount": float(row.get("importe_neto", 0)),
-                            "due_date": str(row.get("fecha_vencimiento", "")),
-                            "days_overdue": int(row.get("days_overdue", 0)),
-                            "invoice": row.get("factura", ""),
-                        }
-                        for _, row in overdue_df.iterrows()
-                    ]
+                    days_overdue = (today - overdue_df["_fecha_vencimiento"]).dt.days
+
+                    overdue_list = _column_records(
+                        provider=_column_values(overdue_df, "proveedor"),
+                        amount=overdue_df["importe_neto"].astype(float).tolist(),
+                        due_date=[str(value) for value in _column_values(overdue_df, "fecha_vencimiento")],
+                        days_overdue=days_overdue.astype(int).tolist(),
+                        invoice=_column_values(overdue_df, "factura"),
+                    )
 
                     summary = {
                         "total_overdue": len(overdue_df),
                         "total_amount": self.format_utils.format_currency(
                             overdue_df["importe_neto"].sum()
                         ),
-                        "avg_days_overdue": round(overdue_df["days_overdue"].mean(), 1),
-                        "max_days_overdue": int(overdue_df["days_overdue"].max()),
-                    }
-                else:
-                    overdue_list = []
-                    summary = {
-                        "total_overdue": 0,
-                        "total_amount": self.format_utils.format_currency(0),
-                        "avg_days_overdue": 0,
-                        "max_days_overdue": 0,
+                        "avg_days_overdue": round(days_overdue.mean(), 1),
+                        "max_days_overdue": int(days_overdue.max()),
                     }
-            else:
-                overdue_list = []
-                summary = {
-                    "total_overdue": 0,
-                    "total_amount": self.format_utils.format_currency(0),
-                    "avg_days_overdue": 0,
-                    "max_days_overdue": 0,
-                }
 
             return {"overdue_costs": overdue_list, "summary": summary}
 
@@ -705,22 +723,15 @@ class CostService(BaseService):
 
         try:
             # Simple forecast based on historical averages
-            df_forecast = df.copy()
-            df_forecast["fecha_factura"] = pd.to_datetime(
-                df_forecast["fecha_factura"], errors="coerce"
-            )
-
             # Calculate monthly averages from last 12 months
             cutoff_date = pd.Timestamp.now() - pd.DateOffset(months=12)
-            recent_df = df_forecast[df_forecast["fecha_factura"] >= cutoff_date]
+            recent_df = df[df["_fecha_factura"] >= cutoff_date]
 
             if recent_df.empty:
                 return []
 
             monthly_avg = (
-                recent_df.groupby(recent_df["fecha_factura"].dt.strftime("%Y-%m"))[
-                    "importe_neto"
-                ]
+                recent_df.groupby("month", observed=True)["importe_neto"]
                 .sum()
                 .mean()
             )
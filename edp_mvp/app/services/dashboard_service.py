@@ -8,6 +8,11 @@ import pandas as pd
 import numpy as np
 import re
 import logging
+import os
+import json
+import base64
+import threading
+import time
 
 from . import BaseService, ServiceResponse, ValidationError
 from ..models import EDP, KPI
@@ -15,9 +20,13 @@ from ..repositories.edp_repository import EDPRepository
 from ..repositories.project_repository import ProjectRepository
 from ..repositories.log_repository import LogRepository
 from ..services.cost_service import CostService
+from .related_data import RelatedData, find_all_dataframe_memoized
+from ..utils.business_calendar import business_days_between
 from ..utils.date_utils import DateUtils
 from ..utils.format_utils import FormatUtils
 from ..utils.validation_utils import ValidationUtils
+from ..utils.json_serialization import dataframe_to_records, encode_default
+from ..utils.instrumentation import record_cache, stage_timer
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +39,47 @@ METAS_ENCARGADOS = {
 }
 META_GLOBAL = 1_500_000_000
 
+# Tabla de EDPs paginada en servidor (/dashboard/api/edp-table)
+EDP_TABLE_CACHE_TTL = int(os.getenv("EDP_TABLE_CACHE_TTL", "60"))
+EDP_TABLE_MAX_PAGE_SIZE = 500
+EDP_TABLE_COLUMNS = [
+    "id", "n_edp", "proyecto", "jefe_proyecto", "cliente", "mes", "n_conformidad",
+    "estado", "dias", "dias_habiles", "monto_propuesto", "monto_aprobado",
+    "observaciones", "critico",
+]
+# Alias usados por los encabezados data-sort de controller_dashboard.html
+EDP_TABLE_SORT_ALIASES = {
+    "proyecto": "proyecto",
+    "jefe": "jefe_proyecto",
+    "jefe_proyecto": "jefe_proyecto",
+    "cliente": "cliente",
+    "mes": "mes",
+    "edp": "n_edp",
+    "n_edp": "n_edp",
+    "n-conformidad": "n_conformidad",
+    "n_conformidad": "n_conformidad",
+    "estado": "estado",
+    "dias": "dias",
+    "dias-habiles": "dias_habiles",
+    "dias_habiles": "dias_habiles",
+    "monto-propuesto": "monto_propuesto",
+    "monto_propuesto": "monto_propuesto",
+    "monto-aprobado": "monto_aprobado",
+    "monto_aprobado": "monto_aprobado",
+}
+EDP_TABLE_SEARCH_COLUMNS = ["n_edp", "proyecto", "cliente"]
+EDP_TABLE_QUICK_FILTERS = ("todos", "criticos", "recientes", "pendientes", "validados")
+
+_edp_table_cache: Dict[str, Any] = {"ts": 0.0, "data": None}
+_edp_table_lock = threading.Lock()
+
+
+def clear_edp_table_cache() -> None:
+    """Descartar el frame de la tabla de EDPs (tras cambios en EDPs)."""
+    with _edp_table_lock:
+        _edp_table_cache["ts"] = 0.0
+        _edp_table_cache["data"] = None
+
 
 class ControllerService(BaseService):
     """Service for managing dashboard data and analytics."""
@@ -202,16 +252,8 @@ class ControllerService(BaseService):
             if pd.isna(f_inicio) or pd.isna(f_fin):  # if conversion failed
                 return np.nan
 
-            if f_fin < f_inicio:  # Ensure correct order for bdate_range
-                return 0.0  # No business days if end is before start
-
-            # pd.bdate_range is inclusive of start and end if they are business days
-            # The original logic was max(len(dias) - 1, 0)
-            # If fecha_inicio and fecha_fin are the same, len(dias) could be 1 (if a biz day) or 0.
-            # (Timestamp('2023-01-02'), Timestamp('2023-01-02')) -> len(bdate_range) = 1. Result 0. Correct.
-            # (Timestamp('2023-01-02'), Timestamp('2023-01-03')) -> len(bdate_range) = 2. Result 1. Correct.
-            dias = pd.bdate_range(start=f_inicio, end=f_fin)
-            return float(max(len(dias) - 1, 0))
+            # Días hábiles sin contar la fecha de inicio, descontando feriados
+            return float(max(business_days_between(f_inicio, f_fin), 0))
         except Exception:
             return np.nan
 
@@ -436,7 +478,7 @@ class ControllerService(BaseService):
         """Get comprehensive dashboard overview data."""
         try:
             # Load base data as DataFrame for analytics
-            edps_response = self.edp_repo.find_all_dataframe()
+            edps_response = find_all_dataframe_memoized("edps", self.edp_repo)
 
             # Check if the response has a success key (dictionary)
             if isinstance(edps_response, dict) and not edps_response.get(
@@ -1279,54 +1321,37 @@ class ControllerService(BaseService):
             }
 
     def load_related_data(self) -> ServiceResponse:
-        """Load all related data needed for manager dashboard."""
+        """
+        Load all related data needed for manager dashboard.
+
+        Returns a RelatedData container (DataFrames, memoized per request);
+        use `.records(name)` only at the JSON/template boundary.
+        """
         try:
-            # Get EDP data
-            edps_response = self.edp_repo.find_all_dataframe()
-            logs_response = self.log_repository.find_all_dataframe()
+            edps_response = find_all_dataframe_memoized("edps", self.edp_repo)
+            logs_response = find_all_dataframe_memoized("logs", self.log_repository)
 
-            # Check if the response has a success key (dictionary)
-            if isinstance(edps_response, dict) and not edps_response.get(
-                "success", False
-            ):
+            if not edps_response.get("success", False):
                 return ServiceResponse(
                     success=False,
                     message=f"Failed to load EDPs data: {edps_response.get('message', 'Unknown error')}",
                     data=None,
                 )
 
-            if isinstance(logs_response, dict) and not logs_response.get(
-                "success", False
-            ):
+            if not logs_response.get("success", False):
                 return ServiceResponse(
                     success=False,
                     message=f"Failed to load logs data: {logs_response.get('message', 'Unknown error')}",
                     data=None,
                 )
 
-            # Extract the data based on the response type
-            if isinstance(edps_response, dict):
-                edps_data = edps_response.get("data", [])
-            else:
-                # If it's a direct list (for backward compatibility)
-                edps_data = edps_response
-
-            if isinstance(logs_response, dict):
-                log_data = logs_response.get("data", [])
-            else:
-                # If it's a direct list (for backward compatibility)
-                log_data = logs_response
-
-            # For now, return just EDP data. In the future, this could include
-            # projects, logs, and other related data
             return ServiceResponse(
                 success=True,
                 message="Related data loaded successfully",
-                data={
-                    "edps": edps_data,
-                    "projects": [],  # TODO: Implement when needed
-                    "logs": log_data,  # TODO: Implement when needed
-                },
+                data=RelatedData(
+                    edps=edps_response.get("data"),
+                    logs=logs_response.get("data"),
+                ),
             )
 
         except Exception as e:
@@ -1899,24 +1924,17 @@ class ControllerService(BaseService):
             if "fecha_envio_cliente" not in df.columns:
                 return 0.0
             
-            dias_habiles_calculados = []
-            
-            for _, row in df.iterrows():
-                fecha_inicio = row.get("fecha_envio_cliente")
-                fecha_fin = row.get("fecha_conformidad")
-                
-                # Si no hay fecha de conformidad, usar la fecha actual
-                if pd.isna(fecha_fin):
-                    fecha_fin = pd.Timestamp.now()
-                
-                dias_habiles = self._calcular_dias_habiles(fecha_inicio, fecha_fin)
-                
-                # Solo agregar valores válidos (no NaN)
-                if pd.notna(dias_habiles):
-                    dias_habiles_calculados.append(dias_habiles)
-            
-            if len(dias_habiles_calculados) > 0:
-                return round(sum(dias_habiles_calculados) / len(dias_habiles_calculados), 1)
+            # Si no hay fecha de conformidad, usar la fecha actual
+            fecha_fin = (
+                df["fecha_conformidad"].fillna(pd.Timestamp.now())
+                if "fecha_conformidad" in df.columns
+                else pd.Timestamp.now()
+            )
+            dias_habiles = business_days_between(df["fecha_envio_cliente"], fecha_fin).clip(lower=0)
+
+            # Solo promediar valores válidos (no NaN)
+            if dias_habiles.notna().any():
+                return round(float(dias_habiles.mean()), 1)
             else:
                 return 0.0
                 
@@ -1961,6 +1979,271 @@ class ControllerService(BaseService):
     def _generate_recommendations(self, perf_data: Dict, trends: Dict) -> List[str]:
         return []
 
+    # ===== TABLA DE EDPs PAGINADA EN SERVIDOR =====
+
+    def _apply_table_filters(
+        self, df: pd.DataFrame, filters: Dict[str, Any]
+    ) -> pd.DataFrame:
+        """Apply the dashboard filters (mes, jefe_proyecto, cliente, estado)."""
+        mes = filters.get("mes")
+        jefe = filters.get("jefe_proyecto")
+        cliente = filters.get("cliente")
+        estado = filters.get("estado")
+
+        mask = pd.Series(True, index=df.index)
+        if mes:
+            mask &= df["mes"] == mes
+        if jefe and jefe != "todos":
+            mask &= df["jefe_proyecto"] == jefe
+        if cliente and cliente != "todos":
+            mask &= df["cliente"] == cliente
+
+        # "pendientes" solo muestra estados de revisión y enviado
+        if estado == "pendientes":
+            mask &= df["estado"].isin(["revisión", "enviado"])
+        elif estado and estado != "todos":
+            mask &= df["estado"] == estado
+
+        return df[mask]
+
+    def _get_edp_table_frame(self) -> Optional[pd.DataFrame]:
+        """
+        Prepared EDP frame for the table, cached per process (EDP_TABLE_CACHE_TTL).
+
+        Las columnas ordenables quedan sin nulos (números a 0, textos a "") para
+        que el orden y la comparación del cursor sean totales.
+        """
+        now = time.monotonic()
+        with _edp_table_lock:
+            cached = _edp_table_cache["data"]
+            if cached is not None and now - _edp_table_cache["ts"] < EDP_TABLE_CACHE_TTL:
+                record_cache("edp_table", True)
+                return cached
+        record_cache("edp_table", False)
+
+        datos_response = self.load_related_data()
+        if not datos_response.success:
+            return None
+
+        with stage_timer("edp_table.build"):
+            df = self._prepare_kpi_data(datos_response.data.frame("edps"))
+            if df.empty:
+                return df
+
+            # "dias_espera" solo existe en datos heredados; si no, se usa dso_actual
+            dias_source = "dias_espera" if "dias_espera" in df.columns else "dso_actual"
+            df["dias"] = pd.to_numeric(df[dias_source], errors="coerce").fillna(0).astype(int)
+            if "id" in df.columns:
+                df["id"] = pd.to_numeric(df["id"], errors="coerce").fillna(-1).astype(int)
+            else:
+                df["id"] = -1
+
+            for col in EDP_TABLE_COLUMNS:
+                if col not in df.columns:
+                    df[col] = ""
+            for col in set(EDP_TABLE_SORT_ALIASES.values()):
+                if not pd.api.types.is_numeric_dtype(df[col]):
+                    df[col] = df[col].fillna("").astype(str)
+
+            df["_search"] = (
+                df[EDP_TABLE_SEARCH_COLUMNS].astype(str).agg(" ".join, axis=1).str.lower()
+            )
+
+        with _edp_table_lock:
+            _edp_table_cache["ts"] = now
+            _edp_table_cache["data"] = df
+        return df
+
+    @staticmethod
+    def _parse_table_sort(sort: Optional[str]) -> List[Tuple[str, bool]]:
+        """
+        Parse "dias:desc,monto_propuesto:asc" into [(columna, ascendente)].
+
+        Acepta nombres de columna o los alias data-sort del template; siempre
+        agrega `id` como desempate para que el orden (y el cursor) sea estable.
+        """
+        keys: List[Tuple[str, bool]] = []
+        for part in (sort or "dias:desc").split(","):
+            name, _, direction = part.strip().partition(":")
+            column = EDP_TABLE_SORT_ALIASES.get(name.strip().lower())
+            if column and column not in [k for k, _ in keys]:
+                keys.append((column, direction.strip().lower() != "desc"))
+        if not keys:
+            keys.append(("dias", False))
+        keys.append(("id", True))
+        return keys
+
+    @staticmethod
+    def _encode_table_cursor(keys: List[Tuple[str, bool]], row: pd.Series) -> str:
+        payload = {
+            "s": [[col, asc] for col, asc in keys],
+            "v": [row[col] for col, _ in keys],
+        }
+        raw = json.dumps(payload, default=encode_default).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii")
+
+    @staticmethod
+    def _decode_table_cursor(cursor: str, keys: List[Tuple[str, bool]]) -> List[Any]:
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        except (ValueError, TypeError) as e:
+            raise ValidationError(f"Cursor no válido: {e}", field="cursor")
+        if [tuple(k) for k in payload.get("s", [])] != [tuple(k) for k in keys]:
+            raise ValidationError(
+                "El cursor no corresponde al orden solicitado", field="cursor"
+            )
+        return payload.get("v", [])
+
+    @staticmethod
+    def _keyset_after_mask(
+        df: pd.DataFrame, keys: List[Tuple[str, bool]], values: List[Any]
+    ) -> pd.Series:
+        """Rows strictly after the cursor position in (keys) order, vectorized."""
+        after = pd.Series(False, index=df.index)
+        equal = pd.Series(True, index=df.index)
+        for (col, asc), value in zip(keys, values):
+            column = df[col]
+            beyond = column > value if asc else column < value
+            after |= equal & beyond
+            equal &= column == value
+        return after
+
+    def get_edp_table_page(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        search: str = "",
+        sort: Optional[str] = None,
+        page: int = 1,
+        page_size: int = 25,
+        cursor: Optional[str] = None,
+        quick_filter: str = "todos",
+    ) -> ServiceResponse:
+        """
+        One page of the controller EDP table.
+
+        Args:
+            filters: filtros del dashboard (mes, jefe_proyecto, cliente, estado)
+            search: texto buscado en n_edp / proyecto / cliente
+            sort: orden multi-columna, p.ej. "dias:desc,cliente:asc"
+            page, page_size: paginación por offset
+            cursor: paginación keyset (tiene prioridad sobre `page`)
+            quick_filter: todos | criticos | recientes | pendientes | validados
+        """
+        try:
+            df_all = self._get_edp_table_frame()
+            if df_all is None:
+                return ServiceResponse(success=False, message="Error cargando EDPs")
+
+            page_size = max(1, min(int(page_size), EDP_TABLE_MAX_PAGE_SIZE))
+            keys = self._parse_table_sort(sort)
+
+            if df_all.empty:
+                return ServiceResponse(
+                    success=True,
+                    data=self._empty_table_page(page_size, keys),
+                )
+
+            df_filtered = self._apply_table_filters(df_all, filters or {})
+            summary = self._pending_table_summary(df_filtered)
+
+            df = df_filtered
+            if quick_filter == "criticos":
+                df = df[df["critico"] == True]
+            elif quick_filter == "recientes":
+                df = df[df["dias"] <= 30]
+            elif quick_filter == "pendientes":
+                df = df[~df["estado"].isin(["validado", "pagado"])]
+            elif quick_filter == "validados":
+                df = df[df["estado"].str.lower() == "validado"]
+
+            term = (search or "").strip().lower()
+            if term:
+                df = df[df["_search"].str.contains(term, regex=False)]
+
+            df = df.sort_values(
+                [col for col, _ in keys], ascending=[asc for _, asc in keys], kind="mergesort"
+            )
+            total = len(df)
+
+            if cursor:
+                values = self._decode_table_cursor(cursor, keys)
+                after = self._keyset_after_mask(df, keys, values)
+                offset = total - int(after.sum())
+                page_df = df[after].head(page_size)
+            else:
+                page = max(1, int(page))
+                offset = (page - 1) * page_size
+                page_df = df.iloc[offset : offset + page_size]
+
+            has_more = offset + len(page_df) < total
+            next_cursor = (
+                self._encode_table_cursor(keys, page_df.iloc[-1])
+                if has_more and not page_df.empty
+                else None
+            )
+
+            return ServiceResponse(
+                success=True,
+                data={
+                    "rows": dataframe_to_records(page_df[EDP_TABLE_COLUMNS]),
+                    "total_records": len(df_all),
+                    "filtered_records": total,
+                    "offset": offset,
+                    "page": offset // page_size + 1,
+                    "page_size": page_size,
+                    "total_pages": max(1, -(-total // page_size)),
+                    "has_more": has_more,
+                    "next_cursor": next_cursor,
+                    "sort": [
+                        {"column": col, "direction": "asc" if asc else "desc"}
+                        for col, asc in keys
+                    ],
+                    "summary": summary,
+                },
+            )
+
+        except ValidationError as e:
+            return ServiceResponse(success=False, message=e.message, errors={e.field: e.message})
+        except Exception as e:
+            logger.error(f"Error en get_edp_table_page: {e}")
+            return ServiceResponse(success=False, message=f"Error en tabla de EDPs: {str(e)}")
+
+    def _pending_table_summary(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """Pending EDP stats for the 'Atención inmediata' section of the dashboard."""
+        estado = df["estado"].str.lower()
+        pendientes = df[estado.isin(["revisión", "enviado"])]
+        top = pendientes.sort_values("dias", ascending=False, kind="mergesort").head(4)
+        return {
+            "pending_count": len(pendientes),
+            "revision_count": int((pendientes["estado"].str.lower() == "revisión").sum()),
+            "sent_count": int((pendientes["estado"].str.lower() == "enviado").sum()),
+            "critical_count": int((pendientes["dias"] > 30).sum()),
+            "top_critical": dataframe_to_records(
+                top[["id", "n_edp", "proyecto", "jefe_proyecto", "estado", "dias", "monto_aprobado"]]
+            ),
+        }
+
+    def _empty_table_page(self, page_size: int, keys: List[Tuple[str, bool]]) -> Dict[str, Any]:
+        return {
+            "rows": [],
+            "total_records": 0,
+            "filtered_records": 0,
+            "offset": 0,
+            "page": 1,
+            "page_size": page_size,
+            "total_pages": 1,
+            "has_more": False,
+            "next_cursor": None,
+            "sort": [{"column": col, "direction": "asc" if asc else "desc"} for col, asc in keys],
+            "summary": {
+                "pending_count": 0,
+                "revision_count": 0,
+                "sent_count": 0,
+                "critical_count": 0,
+                "top_critical": [],
+            },
+        }
+
     def _get_default_processed_context(
         self, request_filters: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
@@ -1987,10 +2270,14 @@ class ControllerService(BaseService):
         df_edp_raw: pd.DataFrame,
         df_log_raw: pd.DataFrame,
         request_filters: Dict[str, Any],
+        include_registros: bool = True,
     ) -> ServiceResponse:
         """
         Processes raw EDP and Log data with filters to generate the full context
         for the controller dashboard, matching the original controller's output.
+
+        With include_registros=False the per-row `registros` list is left empty;
+        the table is then served page by page by get_edp_table_page.
         """
         try:
             # 1. Initial Data Preparation
@@ -2046,27 +2333,7 @@ class ControllerService(BaseService):
             }
             print(filters)
 
-            df = df_full.copy()
-       
-            if filters["mes"]:
-                df = df[df["mes"] == filters["mes"]]
-            if filters["jefe_proyecto"] and filters["jefe_proyecto"] != "todos":
-                df = df[df["jefe_proyecto"] == filters["jefe_proyecto"]]
-            if filters["cliente"] and filters["cliente"] != "todos":
-                df = df[df["cliente"] == filters["cliente"]]
-
-            # Aplicar filtro de estado con nueva lógica
-            if filters["estado"] == "pendientes":
-                # Filtro "Pendientes" - solo muestra estados de revisión y enviado
-                df = df[df["estado"].isin(["revisión", "enviado"])]
-            elif filters["estado"] == "todos" or not filters["estado"]:  
-                # No aplicar filtro de estado, mostrar todo
-                pass
-            else:
-                # Filtro específico (validado, pagado, etc)
-                df = df[df["estado"] == filters["estado"]]
-
-            df_filtered = df.copy()  # Keep filtered DataFrame for later use
+            df_filtered = self._apply_table_filters(df_full, filters).copy()
     
             mes_filter = filters["mes"] if filters["mes"] else None
             jefes_filter = (
@@ -2381,11 +2648,12 @@ class ControllerService(BaseService):
             )
             top_dso_proyectos = self._clean_nat_values(top_dso_proyectos_raw)
 
-            # 5. Registros
-            registros_raw = df_filtered.to_dict(orient="records")
-            # debug dias_habiles en dict
-            
-            registros = self._clean_nat_values(registros_raw)
+            # 5. Registros (la tabla del dashboard se hidrata desde get_edp_table_page)
+            registros = (
+                self._clean_nat_values(df_filtered.to_dict(orient="records"))
+                if include_registros
+                else []
+            )
 
        
             total_edps_criticos_global = df_full[
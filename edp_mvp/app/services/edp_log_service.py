@@ -0,0 +1,382 @@
+"""
+Historial de cambios de EDPs (edp_log) paginado por cursor.
+
+read_log traía a lo sumo 1000 filas de edp_log, las filtraba en pandas y las
+vistas formateaban todas en cada visita: los EDPs con mucho historial quedaban
+truncados y los chicos pagaban la conversión completa. Aquí los filtros
+(n_edp, proyecto, usuario, fechas) y el orden se resuelven en Postgres, cada
+página se pide con un cursor sobre (fecha_hora, id) y llega ya formateada
+para la vista; las filas sin fecha se paginan después de las fechadas. El CSV recorre todo el historial por páginas y se escribe a
+medida que llega. El resumen del historial completo se guarda por
+(n_edp, generación de datos), así las visitas repetidas no lo recorren de nuevo.
+
+Uso:
+
+    page = EDPLogService().get_timeline_page(n_edp="123", cursor=request.args.get("cursor"))
+    page.data["registros"], page.data["next_cursor"]
+"""
+
+import base64
+import csv
+import io
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from . import BaseService, ServiceResponse, ValidationError
+from ..repositories.log_repository import LogRepository
+from ..utils.instrumentation import record_cache
+
+logger = logging.getLogger(__name__)
+
+EDP_LOG_PAGE_SIZE = int(os.getenv("EDP_LOG_PAGE_SIZE", "100"))
+EDP_LOG_MAX_PAGE_SIZE = 500
+EDP_LOG_SUMMARY_CACHE_TTL = int(os.getenv("EDP_LOG_SUMMARY_CACHE_TTL", "300"))
+
+# (n_edp, generación de datos) -> (timestamp, resumen)
+_summary_cache: Dict[Tuple[str, str], Tuple[float, Dict[str, Any]]] = {}
+_summary_cache_lock = threading.Lock()
+
+# Columnas del CSV y su encabezado
+EDP_LOG_CSV_COLUMNS = {
+    "fecha_hora": "Fecha y Hora",
+    "n_edp": "Número EDP",
+    "proyecto": "Proyecto",
+    "campo": "Campo Modificado",
+    "antes": "Valor Anterior",
+    "despues": "Nuevo Valor",
+    "usuario": "Usuario Responsable",
+}
+
+
+def format_log_value(value, campo):
+    """Format log values for better display"""
+    if not value or str(value).lower() in ['nan', 'none', 'null']:
+        return "Sin valor"
+
+    if 'monto' in campo.lower() or 'valor' in campo.lower():
+        try:
+            num_value = float(str(value).replace(',', '').replace('.', ''))
+            return f"${num_value:,.0f}".replace(',', '.')
+        except:
+            return str(value)
+
+    if 'fecha' in campo.lower() and len(str(value)) == 8:
+        # Convert DDMMYYYY to DD/MM/YYYY
+        try:
+            date_str = str(value)
+            return f"{date_str[:2]}/{date_str[2:4]}/{date_str[4:]}"
+        except:
+            return str(value)
+
+    return str(value)
+
+
+def format_field_name(campo):
+    """Format field names for better display"""
+    field_names = {
+        'estado': 'Estado',
+        'estado_detallado': 'Estado Detallado',
+        'monto_propuesto': 'Monto Propuesto',
+        'monto_aprobado': 'Monto Aprobado',
+        'fecha_estimada_pago': 'Fecha Estimada de Pago',
+        'conformidad_enviada': 'Conformidad Enviada',
+        'n_conformidad': 'Número de Conformidad',
+        'observaciones': 'Observaciones',
+        'rf_conformidad': 'RF Conformidad'
+    }
+    return field_names.get(campo, campo.replace('_', ' ').title())
+
+
+def get_change_icon(tipo_cambio):
+    """Get icon for change type"""
+    icons = {
+        'estado': '📋',
+        'monto': '💰',
+        'fecha': '📅',
+        'conformidad': '✅',
+        'informacion': '📝'
+    }
+    return icons.get(tipo_cambio, '📝')
+
+
+def get_change_color_class(tipo_cambio, nuevo_valor):
+    """Get color class based on change type and value"""
+    if tipo_cambio == 'estado':
+        if nuevo_valor and 'pagado' in str(nuevo_valor).lower():
+            return 'change-positive'
+        elif nuevo_valor and any(word in str(nuevo_valor).lower() for word in ['aprobado', 'confirmado']):
+            return 'change-positive'
+        elif nuevo_valor and any(word in str(nuevo_valor).lower() for word in ['pendiente', 'revision']):
+            return 'change-warning'
+        else:
+            return 'change-neutral'
+    elif tipo_cambio == 'monto':
+        return 'change-neutral'
+    elif tipo_cambio == 'conformidad':
+        return 'change-positive'
+    else:
+        return 'change-info'
+
+
+def format_date_display(fecha):
+    """Format date for display with relative time"""
+    hoy = date.today()
+    ayer = hoy - timedelta(days=1)
+
+    if fecha == hoy:
+        return "Hoy"
+    elif fecha == ayer:
+        return "Ayer"
+    elif (hoy - fecha).days < 7:
+        dias = (hoy - fecha).days
+        return f"Hace {dias} días"
+    else:
+        return fecha.strftime("%d/%m/%Y")
+
+
+def clasificar_cambio(campo: str) -> str:
+    """Tipo de cambio según el campo modificado."""
+    campo = (campo or "").lower()
+    if 'estado' in campo:
+        return 'estado'
+    if 'monto' in campo or 'valor' in campo:
+        return 'monto'
+    if 'fecha' in campo:
+        return 'fecha'
+    if 'conformidad' in campo:
+        return 'conformidad'
+    return 'informacion'
+
+
+# Grupo de las entradas sin fecha válida; el timeline las pagina al final
+SIN_FECHA_KEY = 'sin-fecha'
+
+
+def format_log_entry(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Entrada del timeline lista para la vista (fecha_hora None si no es válida)."""
+    fecha_hora = pd.to_datetime(row.get('fecha_hora'), errors='coerce')
+    fecha_hora = None if pd.isna(fecha_hora) else fecha_hora.to_pydatetime()
+
+    campo = row.get('campo') or ''
+    tipo_cambio = clasificar_cambio(campo)
+    return {
+        'id': row.get('id'),
+        'fecha_hora': fecha_hora,
+        'fecha_key': fecha_hora.strftime('%Y-%m-%d') if fecha_hora else SIN_FECHA_KEY,
+        'hora_display': fecha_hora.strftime('%H:%M') if fecha_hora else '--:--',
+        'n_edp': str(row.get('n_edp', '')),
+        'proyecto': row.get('proyecto') or '',
+        'campo': campo,
+        'campo_display': format_field_name(campo),
+        'antes': row.get('antes'),
+        'despues': row.get('despues'),
+        'antes_formateado': format_log_value(row.get('antes'), campo),
+        'despues_formateado': format_log_value(row.get('despues'), campo),
+        'usuario': row.get('usuario'),
+        'tipo_cambio': tipo_cambio,
+        'es_importante': tipo_cambio in ['estado', 'monto', 'conformidad'],
+        'icono': get_change_icon(tipo_cambio),
+        'color_clase': get_change_color_class(tipo_cambio, row.get('despues')),
+    }
+
+
+def agrupar_por_fecha(registros: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Entradas agrupadas por día, del más reciente al más antiguo; las sin fecha al final."""
+    grupos: Dict[str, Dict[str, Any]] = {}
+    for registro in registros:
+        grupo = grupos.get(registro['fecha_key'])
+        if grupo is None:
+            fecha = registro['fecha_hora'].date() if registro['fecha_hora'] else None
+            grupo = grupos[registro['fecha_key']] = {
+                'fecha': fecha,
+                'fecha_display': format_date_display(fecha) if fecha else 'Sin fecha',
+                'registros': [],
+            }
+        grupo['registros'].append(registro)
+    sin_fecha = grupos.pop(SIN_FECHA_KEY, None)
+    ordenados = dict(sorted(grupos.items(), reverse=True))
+    if sin_fecha is not None:
+        ordenados[SIN_FECHA_KEY] = sin_fecha
+    return ordenados
+
+
+def clear_timeline_summary_cache(n_edp=None) -> None:
+    """Descartar el resumen de un EDP (o todos) en este proceso."""
+    with _summary_cache_lock:
+        if n_edp is None:
+            _summary_cache.clear()
+            return
+        for key in [key for key in _summary_cache if key[0] == str(n_edp)]:
+            del _summary_cache[key]
+
+
+def _copy_summary(resumen: Dict[str, Any]) -> Dict[str, Any]:
+    return dict(
+        resumen,
+        usuarios_unicos=list(resumen['usuarios_unicos']),
+        tipos_cambios=dict(resumen['tipos_cambios']),
+    )
+
+
+def _encode_cursor(row: Dict[str, Any]) -> str:
+    raw = json.dumps({"f": row["fecha_hora"], "i": row["id"]}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(cursor: str):
+    """(fecha_hora ISO o None para filas sin fecha, id) validados desde el cursor."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        fecha = payload["f"]
+        if fecha is not None:
+            fecha = pd.to_datetime(fecha, utc=True)
+            if pd.isna(fecha):
+                raise ValueError("fecha vacía")
+            fecha = fecha.isoformat()
+        log_id = payload["i"]
+        if isinstance(log_id, bool) or not isinstance(log_id, (int, str)):
+            raise TypeError("id no entero")
+        return fecha, int(log_id)
+    except (ValueError, TypeError, KeyError, OverflowError) as e:
+        raise ValidationError(f"Cursor no válido: {e}", field="cursor")
+
+
+class EDPLogService(BaseService):
+    """Timeline, resumen y exportación del historial de cambios de EDPs."""
+
+    def __init__(self):
+        super().__init__()
+        self.log_repository = LogRepository()
+
+    @staticmethod
+    def _filters(n_edp=None, proyecto=None, usuario=None, desde=None, hasta=None) -> Dict[str, Any]:
+        filters = {"proyecto": proyecto, "usuario": usuario, "desde": desde, "hasta": hasta}
+        if n_edp not in (None, ""):
+            n_edp_str = str(n_edp)
+            filters["n_edp"] = int(n_edp_str) if n_edp_str.isdigit() else n_edp_str
+        return filters
+
+    def get_timeline_page(
+        self,
+        n_edp=None,
+        proyecto: Optional[str] = None,
+        usuario: Optional[str] = None,
+        desde=None,
+        hasta=None,
+        cursor: Optional[str] = None,
+        limit: int = EDP_LOG_PAGE_SIZE,
+    ) -> ServiceResponse:
+        """
+        Una página del historial, del cambio más reciente al más antiguo.
+
+        Returns:
+            data: registros (formateados), next_cursor y has_more
+        """
+        try:
+            limit = max(1, min(int(limit), EDP_LOG_MAX_PAGE_SIZE))
+            after = _decode_cursor(cursor) if cursor else None
+
+            # Una fila extra indica si hay otra página sin contar el total
+            response = self.log_repository.find_timeline_page(
+                self._filters(n_edp, proyecto, usuario, desde, hasta), after, limit + 1
+            )
+            if not response['success']:
+                return ServiceResponse(success=False, message=response['message'], data=None)
+
+            rows = response['data']
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            registros = [format_log_entry(row) for row in rows]
+
+            return ServiceResponse(
+                success=True,
+                data={
+                    'registros': registros,
+                    'next_cursor': _encode_cursor(rows[-1]) if has_more else None,
+                    'has_more': has_more,
+                },
+            )
+        except ValidationError as e:
+            return ServiceResponse(success=False, message=e.message, errors={e.field: e.message})
+        except Exception as e:
+            logger.error(f"Error cargando historial del EDP {n_edp}: {e}")
+            return ServiceResponse(success=False, message=f"Error cargando historial: {str(e)}", data=None)
+
+    def get_timeline_summary(self, n_edp) -> ServiceResponse:
+        """
+        Totales del historial completo (cambios, tipos, usuarios, último
+        cambio) leyendo solo campo y usuario, sin formatear entradas.
+
+        Recorrer edp_log es lineal en el historial del EDP, así que el resumen
+        se reutiliza mientras no cambie la generación de datos (cada edición
+        de EDP la sube) y dentro de EDP_LOG_SUMMARY_CACHE_TTL.
+        """
+        from .cache_invalidation_service import current_data_generation
+
+        try:
+            cache_key = (str(n_edp), current_data_generation())
+            now = time.time()
+            with _summary_cache_lock:
+                entry = _summary_cache.get(cache_key)
+            if entry and now - entry[0] < EDP_LOG_SUMMARY_CACHE_TTL:
+                record_cache("edp_log_summary", True)
+                return ServiceResponse(success=True, data=_copy_summary(entry[1]))
+            record_cache("edp_log_summary", False)
+
+            resumen = {
+                'total_cambios': 0,
+                'ultimo_cambio': None,
+                'usuarios_unicos': set(),
+                'tipos_cambios': {},
+            }
+            rows = self.log_repository.iter_timeline(
+                self._filters(n_edp), columns=['campo', 'usuario']
+            )
+            for row in rows:
+                if resumen['ultimo_cambio'] is None and row.get('fecha_hora'):
+                    fecha_hora = pd.to_datetime(row['fecha_hora'], errors='coerce')
+                    if not pd.isna(fecha_hora):
+                        resumen['ultimo_cambio'] = fecha_hora.to_pydatetime()
+                tipo_cambio = clasificar_cambio(row.get('campo'))
+                resumen['total_cambios'] += 1
+                resumen['usuarios_unicos'].add(row.get('usuario') or 'Desconocido')
+                resumen['tipos_cambios'][tipo_cambio] = resumen['tipos_cambios'].get(tipo_cambio, 0) + 1
+
+            resumen['usuarios_unicos'] = sorted(resumen['usuarios_unicos'])
+
+            with _summary_cache_lock:
+                for key, (ts, _) in list(_summary_cache.items()):
+                    if key[1] != cache_key[1] or now - ts >= EDP_LOG_SUMMARY_CACHE_TTL:
+                        del _summary_cache[key]
+                _summary_cache[cache_key] = (now, resumen)
+            return ServiceResponse(success=True, data=_copy_summary(resumen))
+        except Exception as e:
+            logger.error(f"Error resumiendo historial del EDP {n_edp}: {e}")
+            return ServiceResponse(success=False, message=f"Error resumiendo historial: {str(e)}", data=None)
+
+    def iter_log_csv(self, n_edp=None, proyecto=None, usuario=None, desde=None, hasta=None) -> Iterator[str]:
+        """CSV del historial completo, generado por lotes de EDP_LOG_BATCH_SIZE filas."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EDP_LOG_CSV_COLUMNS.values())
+
+        rows = self.log_repository.iter_timeline(
+            self._filters(n_edp, proyecto, usuario, desde, hasta),
+            columns=list(EDP_LOG_CSV_COLUMNS),
+        )
+        for count, row in enumerate(rows, start=1):
+            fecha_hora = pd.to_datetime(row.get('fecha_hora'), errors='coerce')
+            row = dict(row, fecha_hora='' if pd.isna(fecha_hora) else fecha_hora.strftime("%Y-%m-%d %H:%M:%S"))
+            writer.writerow(['' if row.get(column) is None else row[column] for column in EDP_LOG_CSV_COLUMNS])
+            if count % 200 == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
@@ -2,9 +2,11 @@
 Email Permissions Service for role-based email filtering.
 """
 import logging
-from typing import List, Dict, Any, Optional
+from typing import Iterable, List, Dict, Any, Optional
 from enum import Enum
 
+from .identity_cache import get_identities_by_username
+
 logger = logging.getLogger(__name__)
 
 class EmailRole(Enum):
@@ -69,6 +71,30 @@ class EmailPermissionsService:
                 EmailPermission.PAYMENT_REMINDERS
             ]
         }
+        # Identidades del lote de destinatarios en curso (ver preload_recipients)
+        self._recipient_identities: Dict[str, Dict[str, Any]] = {}
+
+    def preload_recipients(self, emails: Iterable[str]) -> None:
+        """
+        Resolver usuario y rol de todos los destinatarios con una sola consulta.
+
+        Reemplaza el lote anterior, así los roles no quedan fijos en una
+        instancia de larga vida.
+        """
+        emails = list(emails)
+        try:
+            identities = get_identities_by_username(emails)
+        except Exception as e:
+            logger.error(f"Error preloading recipients: {e}")
+            identities = {}
+        # None marca destinatarios que no son usuarios activos del sistema
+        self._recipient_identities = {email: identities.get(email) for email in emails}
+
+    def _find_user(self, email: str) -> Optional[Dict[str, Any]]:
+        """Identidad de un usuario activo, desde el lote precargado o la base de datos."""
+        if email in self._recipient_identities:
+            return self._recipient_identities[email]
+        return get_identities_by_username([email]).get(email)
     
     def get_user_role(self, email: str) -> EmailRole:
         """
@@ -81,10 +107,8 @@ class EmailPermissionsService:
             EmailRole: User role
         """
         try:
-            from ..models.user import User
-            
             # Buscar usuario en el sistema existente
-            user = User.query.filter_by(username=email, activo=True).first()
+            user = self._find_user(email)
             
             if user:
                 # Mapear rol del sistema existente a EmailRole
@@ -95,7 +119,7 @@ class EmailPermissionsService:
                     'jefe_proyecto': EmailRole.JEFE_PROYECTO,
                     'miembro_equipo_proyecto': EmailRole.MIEMBRO_EQUIPO
                 }
-                return role_mapping.get(user.rol, EmailRole.MIEMBRO_EQUIPO)
+                return role_mapping.get(user['rol'], EmailRole.MIEMBRO_EQUIPO)
             else:
                 # Fallback a lógica simple si no está en la base de datos
                 if "diegobravobe@gmail.com" in email:
@@ -238,18 +262,16 @@ class EmailPermissionsService:
     def _get_user_projects(self, user_email: str) -> List[str]:
         """Get projects assigned to user using existing User system."""
         try:
-            from ..models.user import User
-            
             # Buscar usuario en el sistema existente
-            user = User.query.filter_by(username=user_email, activo=True).first()
+            user = self._find_user(user_email)
             
             if user:
                 # Para jefes de proyecto, usar su nombre como proyecto asignado
-                if user.rol == 'jefe_proyecto':
-                    return [user.nombre_completo]
+                if user['rol'] == 'jefe_proyecto':
+                    return [user['nombre_completo']]
                 # Para miembros de equipo, usar su jefe asignado
-                elif user.rol == 'miembro_equipo_proyecto' and user.jefe_asignado:
-                    return [user.jefe_asignado]
+                elif user['rol'] == 'miembro_equipo_proyecto' and user['jefe_asignado']:
+                    return [user['jefe_asignado']]
                 # Para otros roles, acceso completo
                 else:
                     return ["Diego Bravo", "Pedro Rojas", "Carolina López"]
@@ -0,0 +1,84 @@
+"""
+Email renderer - plantillas de email compiladas una vez por worker.
+
+EmailService creaba un Environment de Jinja2 por cada render, así que cada
+email volvía a leer y compilar la plantilla y su layout (emails/base.html).
+Aquí el Environment se crea una vez por directorio de plantillas y conserva las
+plantillas compiladas; además los cuerpos ya renderizados se cachean por
+(plantilla, hash de los datos), de modo que los destinatarios de una campaña
+que reciben los mismos datos comparten un solo render.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from jinja2 import Environment, FileSystemLoader
+
+from ..utils.instrumentation import record_cache, stage_timer
+
+logger = logging.getLogger(__name__)
+
+EMAIL_RENDER_CACHE_SIZE = int(os.getenv("EMAIL_RENDER_CACHE_SIZE", "256"))
+
+_environments: Dict[str, Environment] = {}
+_environments_lock = threading.Lock()
+
+# (directorio, plantilla, hash de datos) -> cuerpo renderizado (LRU)
+_rendered_cache: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+_rendered_lock = threading.Lock()
+
+
+def get_email_environment(template_dir: str) -> Environment:
+    """Environment compartido por worker; compila cada plantilla una sola vez."""
+    with _environments_lock:
+        env = _environments.get(template_dir)
+        if env is None:
+            env = Environment(
+                loader=FileSystemLoader(template_dir),
+                auto_reload=False,
+                cache_size=-1,
+            )
+            _environments[template_dir] = env
+        return env
+
+
+def context_hash(context: Dict[str, Any]) -> Optional[str]:
+    """Hash estable de los datos de una plantilla; None si no son serializables."""
+    try:
+        payload = json.dumps(context, sort_keys=True, default=str)
+    except (TypeError, ValueError):
+        return None
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def render_email(template_dir: str, template_name: str, context: Dict[str, Any]) -> str:
+    """
+    Renderizar una plantilla de email, reutilizando el cuerpo si ya se
+    renderizó con los mismos datos.
+    """
+    digest = context_hash(context)
+    cache_key = (template_dir, template_name, digest)
+    if digest is not None:
+        with _rendered_lock:
+            body = _rendered_cache.get(cache_key)
+            if body is not None:
+                _rendered_cache.move_to_end(cache_key)
+        if body is not None:
+            record_cache("email_render", True)
+            return body
+    record_cache("email_render", False)
+
+    with stage_timer("email_render"):
+        body = get_email_environment(template_dir).get_template(template_name).render(**context)
+
+    if digest is not None:
+        with _rendered_lock:
+            _rendered_cache[cache_key] = body
+            while len(_rendered_cache) > EMAIL_RENDER_CACHE_SIZE:
+                _rendered_cache.popitem(last=False)
+    return body
@@ -2,12 +2,14 @@
 Email service for sending notifications and alerts.
 """
 import logging
+import os
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from flask import current_app
 from flask_mail import Mail, Message
 from jinja2 import Template
 from ..config import get_config
+from .email_renderer import render_email
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +22,9 @@ class EmailService:
         self.mail = Mail()
         self.mail.init_app(current_app)
     
+    def _template_dir(self) -> str:
+        return os.path.join(current_app.root_path, 'templates')
+
     def _render_template_safe(self, template_name: str, **context) -> str:
         """
         Render template safely using Jinja2 directly to avoid Flask context issues.
@@ -32,17 +37,8 @@ class EmailService:
             str: Rendered template content
         """
         try:
-            # Use Jinja2 directly to avoid Flask context issues
-            from jinja2 import Environment, FileSystemLoader
-            import os
-            
-            # Get the template directory path
-            template_dir = os.path.join(current_app.root_path, 'templates')
-            env = Environment(loader=FileSystemLoader(template_dir))
-            
-            # Load and render template
-            template = env.get_template(template_name)
-            return template.render(**context)
+            # Use Jinja2 directly (compiled once per worker) to avoid Flask context issues
+            return render_email(self._template_dir(), template_name, context)
         except Exception as e:
             logger.error(f"Error rendering template {template_name}: {e}")
             return f"Error rendering template: {str(e)}"
@@ -59,17 +55,7 @@ class EmailService:
             str: Rendered text template content
         """
         try:
-            # Use Jinja2 directly to avoid Flask context issues
-            from jinja2 import Environment, FileSystemLoader
-            import os
-            
-            # Get the template directory path
-            template_dir = os.path.join(current_app.root_path, 'templates')
-            env = Environment(loader=FileSystemLoader(template_dir))
-            
-            # Load and render template
-            template = env.get_template(template_name)
-            return template.render(**context)
+            return render_email(self._template_dir(), template_name, context)
         except Exception as e:
             logger.error(f"Error rendering text template {template_name}: {e}")
             return f"Error rendering text template: {str(e)}"
@@ -198,6 +184,45 @@ class EmailService:
         
         return self.send_email(subject, recipients, html_body, text_body)
     
+    def send_payment_reminder_digest(self, reminder_edps: List[Dict[str, Any]],
+                                     recipients: List[str]) -> bool:
+        """
+        Send one payment reminder email grouping several EDPs.
+        
+        Args:
+            reminder_edps: List of EDP data dictionaries
+            recipients: List of email addresses
+        
+        Returns:
+            bool: True if email sent successfully
+        """
+        if not self.email_config.enable_payment_reminders:
+            logger.info("📧 Payment reminders disabled, skipping email")
+            return False
+        
+        if not reminder_edps:
+            logger.info("📧 No EDPs to send payment reminders for")
+            return True
+        
+        subject = f"💰 Recordatorio de Pago: {len(reminder_edps)} EDPs pendientes"
+        total_amount = sum(
+            float(edp.get('monto_aprobado') or edp.get('monto_propuesto') or 0) for edp in reminder_edps
+        )
+        
+        html_body = self._render_template_safe(
+            'emails/payment_reminder_digest.html',
+            reminder_edps=reminder_edps,
+            total_amount=total_amount,
+            app_url=current_app.config.get('APP_URL', 'http://localhost:5000')
+        )
+        text_body = self._render_text_template_safe(
+            'emails/text/payment_reminder_digest.txt',
+            reminder_edps=reminder_edps,
+            total_amount=total_amount
+        )
+        
+        return self.send_email(subject, recipients, html_body, text_body)
+    
     def send_weekly_summary(self, kpis_data: Dict[str, Any], 
                            recipients: List[str]) -> bool:
         """
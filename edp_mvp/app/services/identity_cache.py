@@ -0,0 +1,181 @@
+"""
+Identity cache - usuario, rol y permisos resueltos sin consultar la base de
+datos en cada request.
+
+Flask-Login llama a load_user en cada request autenticado (incluidas las
+llamadas AJAX de modales y kanban). La identidad se guarda como snapshot en
+Redis, compartido entre workers, con un TTL corto y una versión por usuario:
+invalidate_identity incrementa la versión, así un snapshot escrito por un
+request que leyó datos viejos no vuelve a servirse.
+
+Sin Redis la versión solo sube en el worker que llamó a invalidate_identity:
+los demás seguirían sirviendo su snapshot local hasta que venza. Por eso el
+cache local tiene su propio TTL corto (IDENTITY_LOCAL_CACHE_TTL) y viene
+desactivado salvo con un único worker (WEB_CONCURRENCY=1); desactivado, cada
+request lee el usuario de la base de datos.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from ..utils.redis_client import redis_client
+
+from ..utils.auth_utils import get_role_permissions, get_user_role_level
+from ..utils.instrumentation import record_cache
+
+logger = logging.getLogger(__name__)
+
+IDENTITY_CACHE_TTL = int(os.getenv("IDENTITY_CACHE_TTL", "120"))
+# Fallback sin Redis; 0 = sin cache local (varios workers no ven las invalidaciones)
+IDENTITY_LOCAL_CACHE_TTL = int(
+    os.getenv("IDENTITY_LOCAL_CACHE_TTL", "10" if os.getenv("WEB_CONCURRENCY") == "1" else "0")
+)
+IDENTITY_KEY = "identity:user:{user_id}"
+IDENTITY_VERSION_KEY = "identity:version:{user_id}"
+
+# Columnas del usuario que viajan en el snapshot (nunca password_hash)
+IDENTITY_FIELDS = (
+    "id", "nombre_completo", "username", "email", "rol",
+    "jefe_asignado", "activo", "fecha_creacion", "ultimo_acceso",
+)
+IDENTITY_DATETIME_FIELDS = ("fecha_creacion", "ultimo_acceso")
+
+# Fallback sin Redis: user_id -> (timestamp, snapshot)
+_local_identities: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+_local_versions: Dict[int, int] = {}
+_identity_lock = threading.Lock()
+
+
+def build_identity(user, version: int = 0) -> Dict[str, Any]:
+    """Snapshot serializable de un usuario con su nivel de rol y permisos."""
+    snapshot = {}
+    for field in IDENTITY_FIELDS:
+        value = getattr(user, field, None)
+        if field in IDENTITY_DATETIME_FIELDS and value is not None:
+            value = value.isoformat()
+        snapshot[field] = value
+    snapshot["role_level"] = get_user_role_level(user.rol)
+    snapshot["permissions"] = sorted(
+        name for name, allowed in get_role_permissions(user.rol).items() if allowed
+    )
+    snapshot["version"] = version
+    return snapshot
+
+
+def _read_identity(user_id: int) -> Tuple[int, Optional[Dict[str, Any]]]:
+    """Versión vigente del usuario y su snapshot, si sigue siendo válido."""
+    if redis_client:
+        try:
+            raw_version, raw_snapshot = redis_client.mget(
+                IDENTITY_VERSION_KEY.format(user_id=user_id),
+                IDENTITY_KEY.format(user_id=user_id),
+            )
+            version = int(raw_version or 0)
+            if raw_snapshot:
+                snapshot = json.loads(raw_snapshot)
+                if snapshot.get("version") == version:
+                    return version, snapshot
+            return version, None
+        except Exception as e:
+            logger.warning(f"⚠️ Identity cache en Redis no disponible: {e}")
+
+    now = time.time()
+    with _identity_lock:
+        version = _local_versions.get(user_id, 0)
+        entry = _local_identities.get(user_id)
+    if entry and now - entry[0] < IDENTITY_LOCAL_CACHE_TTL and entry[1].get("version") == version:
+        return version, entry[1]
+    return version, None
+
+
+def _store_identity(snapshot: Dict[str, Any]) -> None:
+    user_id = snapshot["id"]
+    if redis_client:
+        try:
+            redis_client.setex(
+                IDENTITY_KEY.format(user_id=user_id), IDENTITY_CACHE_TTL, json.dumps(snapshot)
+            )
+            return
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo guardar la identidad {user_id} en Redis: {e}")
+    if IDENTITY_LOCAL_CACHE_TTL <= 0:
+        return
+    with _identity_lock:
+        _local_identities[user_id] = (time.time(), snapshot)
+
+
+def _user_from_identity(snapshot: Dict[str, Any]):
+    """
+    Reconstruye el User desde el snapshot y lo asocia a la sesión sin SELECT.
+
+    Las columnas que no están en el snapshot (password_hash) se cargan de la
+    base de datos solo si se accede a ellas.
+    """
+    from sqlalchemy.orm import make_transient_to_detached
+    from ..extensions import db
+    from ..models.user import User
+
+    user = User.__mapper__.class_manager.new_instance()
+    for field in IDENTITY_FIELDS:
+        value = snapshot.get(field)
+        if field in IDENTITY_DATETIME_FIELDS and value:
+            value = datetime.fromisoformat(value)
+        setattr(user, field, value)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def load_cached_user(user_id: int):
+    """User para Flask-Login, desde el identity cache o la base de datos."""
+    version, snapshot = _read_identity(user_id)
+    if snapshot is not None:
+        record_cache("identity", True)
+        try:
+            return _user_from_identity(snapshot)
+        except Exception as e:
+            logger.warning(f"⚠️ Snapshot de identidad inválido para {user_id}: {e}")
+    else:
+        record_cache("identity", False)
+
+    from ..models.user import User
+
+    user = User.query.get(user_id)
+    if user is not None:
+        _store_identity(build_identity(user, version))
+    return user
+
+
+def get_identities_by_username(usernames: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Identidades de usuarios activos para una lista de usernames, con una sola
+    consulta. Pensado para resolver destinatarios de emails en lote.
+    """
+    usernames = sorted({username for username in usernames if username})
+    if not usernames:
+        return {}
+
+    from ..models.user import User
+
+    users = User.query.filter(User.username.in_(usernames), User.activo.is_(True)).all()
+    return {user.username: build_identity(user) for user in users}
+
+
+def invalidate_identity(user_id: int) -> None:
+    """Descartar la identidad de un usuario tras cambiar su rol, datos o estado."""
+    with _identity_lock:
+        _local_versions[user_id] = _local_versions.get(user_id, 0) + 1
+        _local_identities.pop(user_id, None)
+    if redis_client:
+        try:
+            pipe = redis_client.pipeline()
+            pipe.incr(IDENTITY_VERSION_KEY.format(user_id=user_id))
+            pipe.delete(IDENTITY_KEY.format(user_id=user_id))
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo invalidar la identidad {user_id} en Redis: {e}")
+    logger.info(f"🔄 Identidad del usuario {user_id} invalidada")
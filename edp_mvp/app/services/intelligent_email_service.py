@@ -32,6 +32,9 @@ class IntelligentEmailService:
                 EmailPermission.WEEKLY_SUMMARY
             )
             
+            # Usuario y rol de todos los destinatarios en una sola consulta
+            self.permissions_service.preload_recipients(recipients)
+            
             results = {
                 "total_recipients": len(recipients),
                 "successful_sends": 0,
@@ -102,6 +105,9 @@ class IntelligentEmailService:
                 EmailPermission.CRITICAL_ALERTS
             )
             
+            # Usuario y rol de todos los destinatarios en una sola consulta
+            self.permissions_service.preload_recipients(recipients)
+            
             results = {
                 "total_recipients": len(recipients),
                 "successful_sends": 0,
@@ -179,6 +185,9 @@ class IntelligentEmailService:
                 EmailPermission.PAYMENT_REMINDERS
             )
             
+            # Usuario y rol de todos los destinatarios en una sola consulta
+            self.permissions_service.preload_recipients(recipients)
+            
             results = {
                 "total_recipients": len(recipients),
                 "successful_sends": 0,
@@ -252,8 +261,13 @@ class IntelligentEmailService:
                 return self.email_service.send_bulk_critical_alerts(
                     reminders, [recipient]
                 )
+            elif self.email_service.email_config.digest_enabled:
+                # Para clientes, un digest con todos sus recordatorios
+                return self.email_service.send_payment_reminder_digest(
+                    reminders, [recipient]
+                )
             else:
-                # Para clientes, enviar recordatorios individuales
+                # Con EMAIL_DIGEST_ENABLED=false, recordatorios individuales
                 success_count = 0
                 for reminder in reminders:
                     success = self.email_service.send_payment_reminder(
@@ -295,6 +309,9 @@ class IntelligentEmailService:
                 permission = permission_map.get(email_type, EmailPermission.ALL_DATA)
                 recipients = self.permissions_service.get_recipients_for_permission(permission)
             
+            # Usuario y rol de todos los destinatarios en una sola consulta
+            self.permissions_service.preload_recipients(recipients)
+            
             results = {
                 "total_recipients": len(recipients),
                 "successful_sends": 0,
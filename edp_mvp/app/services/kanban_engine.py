@@ -0,0 +1,302 @@
+"""
+Tablero kanban construido por columnas sobre el frame de EDPs.
+
+Los campos de cada tarjeta (días para pago, días de espera, diferencia de
+montos, antigüedad de validados, crítico, monto y fechas formateadas) se
+derivan como columnas sobre todo el frame filtrado, y cada estado se resume
+con su conteo y su total. Las tarjetas solo se convierten a dicts para la
+página pedida: 'validado' y 'pagado' crecen sin límite, pero el tablero
+inicial cuesta lo mismo que su primera página y el resto se pide al hacer
+scroll en la columna.
+
+Uso:
+
+    board = build_kanban_board(df_edp, filters)
+    board.resumen_columnas()
+    board.page("pagado", offset=25)
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..utils.concurrency import cpu_bound
+from ..utils.instrumentation import record_cache, stage_timer
+
+logger = logging.getLogger(__name__)
+
+KANBAN_ESTADOS = ["revisión", "enviado", "validado", "pagado"]
+KANBAN_PAGE_SIZE = int(os.getenv("KANBAN_PAGE_SIZE", "25"))
+KANBAN_MAX_PAGE_SIZE = 200
+KANBAN_BOARD_CACHE_TTL = int(os.getenv("KANBAN_BOARD_CACHE_TTL", "300"))
+
+DIAS_VALIDADO_ANTIGUO = 10
+KANBAN_DATE_COLUMNS = [
+    "fecha_emision",
+    "fecha_envio_cliente",
+    "fecha_conformidad",
+    "fecha_estimada_pago",
+]
+# Filtros que afectan al tablero; el resto de los filtros de la vista no
+KANBAN_FILTER_KEYS = ("mes", "jefe_proyecto", "cliente", "estado")
+
+# (filtros normalizados, generación de datos) -> (timestamp, tablero)
+_board_cache: Dict[Tuple[str, str], Tuple[float, "KanbanBoard"]] = {}
+_board_cache_lock = threading.Lock()
+
+
+def normalize_filters(filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Filtros del tablero sin valores vacíos ni 'todos'."""
+    filters = filters or {}
+    normalized = {
+        key: filters[key]
+        for key in KANBAN_FILTER_KEYS
+        if filters.get(key) and filters[key] != "todos"
+    }
+    normalized["mostrar_validados_antiguos"] = bool(
+        filters.get("mostrar_validados_antiguos", False)
+    )
+    return normalized
+
+
+def dias_espera(df: pd.DataFrame, now: datetime) -> pd.Series:
+    """
+    Días de espera por EDP: desde el envío al cliente hasta la conformidad si
+    ya fue enviada, o hasta hoy si no. Vacío si el EDP no se ha enviado.
+    """
+    if "fecha_envio_cliente" not in df.columns:
+        return pd.Series(pd.NA, index=df.index, dtype="Int64")
+    envio = pd.to_datetime(df["fecha_envio_cliente"], errors="coerce")
+    conformidad = pd.to_datetime(
+        df["fecha_conformidad"] if "fecha_conformidad" in df.columns else pd.NaT,
+        errors="coerce",
+    )
+    if "conformidad_enviada" in df.columns:
+        con_conformidad = (df["conformidad_enviada"] == "Sí") & conformidad.notna()
+    else:
+        con_conformidad = pd.Series(False, index=df.index)
+    hasta = conformidad.where(con_conformidad, pd.Timestamp(now))
+    return (hasta - envio).dt.days.astype("Int64")
+
+
+def _formatear_montos(montos: pd.Series) -> pd.Series:
+    """'$1.234.567', el mismo formato que muestran las tarjetas."""
+    enteros = montos.round().astype("int64")
+    return "$" + enteros.map("{:,}".format).str.replace(",", ".", regex=False)
+
+
+def _derive_card_columns(df: pd.DataFrame, now: datetime) -> pd.DataFrame:
+    """Agrega al frame filtrado los campos calculados de cada tarjeta."""
+    today = pd.Timestamp(now)
+
+    if "fecha_estimada_pago" in df.columns:
+        df["dias_para_pago"] = (df["fecha_estimada_pago"] - today).dt.days.astype("Int64")
+    else:
+        df["dias_para_pago"] = pd.NA
+
+    if "dias_espera" not in df.columns:
+        df["dias_espera"] = dias_espera(df, now)
+
+    propuesto = df["monto_propuesto"]
+    aprobado = df["monto_aprobado"]
+    df["diferencia_montos"] = aprobado - propuesto
+    df["porcentaje_diferencia"] = (
+        (df["diferencia_montos"] / propuesto.where(propuesto > 0) * 100).fillna(0)
+    )
+    df["monto_formateado"] = _formatear_montos(aprobado)
+
+    if "fecha_conformidad" in df.columns:
+        dias_conformidad = (today - df["fecha_conformidad"]).dt.days
+        validado = (df["estado"] == "validado") & dias_conformidad.notna()
+        df["antiguedad_validado"] = np.where(
+            dias_conformidad > DIAS_VALIDADO_ANTIGUO, "antiguo", "reciente"
+        )
+        df["antiguedad_validado"] = df["antiguedad_validado"].where(validado, None)
+    else:
+        df["antiguedad_validado"] = None
+
+    if "critico" in df.columns:
+        df["es_critico"] = df["critico"].fillna(False).astype(bool)
+    else:
+        df["es_critico"] = False
+
+    # Fechas de la tarjeta con el formato de la vista; el resto de columnas de
+    # fecha se serializan completas al construir cada página
+    for column in KANBAN_DATE_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].dt.strftime("%d-%m-%Y")
+    return df
+
+
+def _records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Tarjetas serializables: NaN/NaT como None y timestamps como texto."""
+    frame = frame.copy()
+    for column in frame.select_dtypes(include=["datetime", "datetimetz"]).columns:
+        frame[column] = frame[column].dt.strftime("%Y-%m-%d %H:%M:%S")
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict("records")
+
+
+@dataclass
+class KanbanBoard:
+    """Tablero filtrado con los campos de tarjeta ya derivados por columna."""
+
+    columnas: Dict[str, pd.DataFrame]
+    total_registros: int
+    registros_filtrados: int
+    total_validados_antiguos: int
+    filter_options: Dict[str, List]
+
+    def page(
+        self, estado: str, offset: int = 0, limit: Optional[int] = KANBAN_PAGE_SIZE
+    ) -> List[Dict[str, Any]]:
+        """Tarjetas de una columna, desde `offset`; todas si `limit` es None."""
+        frame = self.columnas.get(estado)
+        if frame is None:
+            return []
+        offset = max(offset, 0)
+        stop = None if limit is None else offset + max(limit, 0)
+        cards = _records(frame.iloc[offset:stop])
+        for position, card in enumerate(cards, start=offset + 1):
+            card["lazy_index"] = position
+        return cards
+
+    def resumen_columnas(self) -> Dict[str, Dict[str, Any]]:
+        """Conteo, monto total, promedio y críticos de cada columna."""
+        resumen = {}
+        for estado, frame in self.columnas.items():
+            count = len(frame)
+            total = float(frame["monto_aprobado"].sum()) if count else 0.0
+            resumen[estado] = {
+                "count": count,
+                "total_monto": total,
+                "promedio_monto": total / count if count else 0.0,
+                "criticos": int(frame["es_critico"].sum()) if count else 0,
+            }
+        return resumen
+
+    def to_board_data(
+        self, filters: Dict[str, Any], page_size: Optional[int] = KANBAN_PAGE_SIZE
+    ) -> Dict[str, Any]:
+        """Datos del tablero para la vista: primera página de cada columna."""
+        resumen = self.resumen_columnas()
+        porcentaje_reduccion = (
+            (self.total_registros - self.registros_filtrados) / self.total_registros * 100
+            if self.total_registros > 0
+            else 0
+        )
+        estadisticas = {
+            "total_registros": self.total_registros,
+            "registros_filtrados": self.registros_filtrados,
+            "porcentaje_reduccion": round(porcentaje_reduccion, 1),
+            "distribucion_cards": {estado: info["count"] for estado, info in resumen.items()},
+            "total_validados_antiguos": self.total_validados_antiguos,
+        }
+        return {
+            "columnas": {estado: self.page(estado, 0, page_size) for estado in self.columnas},
+            "columnas_resumen": resumen,
+            "page_size": page_size,
+            "filter_options": self.filter_options,
+            "estadisticas": estadisticas,
+            "total_validados_antiguos": self.total_validados_antiguos,
+            "filters": filters or {},
+        }
+
+
+def _filter_options(df: pd.DataFrame) -> Dict[str, List]:
+    def opciones(column: str) -> List:
+        return sorted(df[column].dropna().unique()) if column in df.columns else []
+
+    return {
+        "meses": opciones("mes"),
+        "jefe_proyectos": opciones("jefe_proyecto"),
+        "clientes": opciones("cliente"),
+        "estados": opciones("estado"),
+    }
+
+
+@cpu_bound
+def build_kanban_board(df_edp: pd.DataFrame, filters: Optional[Dict[str, Any]]) -> KanbanBoard:
+    """Filtrar el frame de EDPs y derivar las columnas del tablero."""
+    with stage_timer("kanban_board"):
+        now = datetime.now()
+        normalized = normalize_filters(filters)
+
+        mask = pd.Series(True, index=df_edp.index)
+        for key in KANBAN_FILTER_KEYS:
+            if key in normalized and key in df_edp.columns:
+                mask &= df_edp[key] == normalized[key]
+        df = df_edp[mask].copy()
+
+        for column in KANBAN_DATE_COLUMNS:
+            if column in df.columns:
+                df[column] = pd.to_datetime(df[column], errors="coerce")
+
+        # Validados con más de 10 días desde la conformidad
+        validado_antiguo = (df["estado"] == "validado") & (
+            df["fecha_conformidad"] < now - timedelta(days=DIAS_VALIDADO_ANTIGUO)
+        )
+        total_validados_antiguos = int(validado_antiguo.sum())
+        if not normalized["mostrar_validados_antiguos"]:
+            df = df[~validado_antiguo]
+
+        for column in ["monto_propuesto", "monto_aprobado"]:
+            df[column] = (
+                pd.to_numeric(df[column], errors="coerce").fillna(0)
+                if column in df.columns
+                else 0.0
+            )
+
+        filter_options = _filter_options(df)
+        df = _derive_card_columns(df, now)
+
+        # Cada columna conserva el orden original del frame
+        grupos = {estado: frame for estado, frame in df.groupby("estado", sort=False)}
+        columnas = {
+            estado: grupos.get(estado, df.iloc[0:0]) for estado in KANBAN_ESTADOS
+        }
+
+        return KanbanBoard(
+            columnas=columnas,
+            total_registros=len(df_edp),
+            registros_filtrados=len(df),
+            total_validados_antiguos=total_validados_antiguos,
+            filter_options=filter_options,
+        )
+
+
+def _board_key(filters: Optional[Dict[str, Any]]) -> str:
+    return json.dumps(normalize_filters(filters), sort_keys=True, default=str)
+
+
+def get_cached_board(filters: Optional[Dict[str, Any]]) -> Optional[KanbanBoard]:
+    """Tablero ya construido para estos filtros en la generación de datos vigente."""
+    from .cache_invalidation_service import current_data_generation
+
+    cache_key = (_board_key(filters), current_data_generation())
+    with _board_cache_lock:
+        entry = _board_cache.get(cache_key)
+    hit = entry is not None and time.time() - entry[0] < KANBAN_BOARD_CACHE_TTL
+    record_cache("kanban_board", hit)
+    return entry[1] if hit else None
+
+
+def store_board(filters: Optional[Dict[str, Any]], board: KanbanBoard) -> None:
+    """Guardar el tablero y descartar los de generaciones anteriores o vencidos."""
+    from .cache_invalidation_service import current_data_generation
+
+    generation = current_data_generation()
+    now = time.time()
+    with _board_cache_lock:
+        for key, (ts, _) in list(_board_cache.items()):
+            if key[1] != generation or now - ts >= KANBAN_BOARD_CACHE_TTL:
+                del _board_cache[key]
+        _board_cache[(_board_key(filters), generation)] = (now, board)
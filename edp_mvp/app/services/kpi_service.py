@@ -13,18 +13,26 @@ import traceback
 
 from ..models import EDP, KPI
 from ..repositories.edp_repository import EDPRepository
+from ..repositories.kpi_repository import KPIRepository, ROLLUP_FILTER_COLUMNS, rollups_enabled
 from . import BaseService, ServiceResponse
 from ..utils.business_rules import business_rules, es_critico
+from ..utils.concurrency import cpu_bound
 
 logger = logging.getLogger(__name__)
 
 
 class KPIService(BaseService):
     """Service for managing KPI calculations and analytics."""
+
+    # Estados que NO cuentan como cuentas por cobrar pendientes
+    COMPLETED_STATES = ['pagado', 'validado', 'completado', 'cerrado', 'finalizado']
+    INVOICE_STATES = ['enviado', 'facturado', 'revision']
+    AGING_RANGES = ['0_15', '16_30', '31_45', '46_60', '61_90', '90_plus']
     
     def __init__(self):
         super().__init__()
         self.edp_repository = EDPRepository()
+        self.kpi_repository = KPIRepository()
     
     def calculate_all_kpis(self) -> ServiceResponse:
         """Calculate all KPIs for all EDPs."""
@@ -216,8 +224,15 @@ class KPIService(BaseService):
                 message=f"Error updating KPI targets: {str(e)}"
             )
     
-    def calculate_manager_dashboard_kpis(self, df_full: pd.DataFrame, df_filtered: pd.DataFrame = None) -> ServiceResponse:
-        """Calculate ALL KPIs for manager dashboard including new dashboard.tsx components."""
+    def calculate_manager_dashboard_kpis(self, df_full: pd.DataFrame, df_filtered: pd.DataFrame = None,
+                                         filters: Optional[Dict[str, Any]] = None) -> ServiceResponse:
+        """
+        Calculate ALL KPIs for manager dashboard including new dashboard.tsx components.
+
+        Los KPIs ejecutivos salen del rollup SQL con los filtros del dashboard
+        cuando está habilitado y los filtros caben en sus columnas; si no, se
+        calculan en pandas sobre df_filtered (o df_full sin filtros).
+        """
         try:
             if df_full.empty:
                 return ServiceResponse(
@@ -246,7 +261,7 @@ class KPIService(BaseService):
             
             # 2. NEW DASHBOARD.TSX COMPONENTS
             # Executive dashboard KPIs (all new components)
-            all_kpis.update(self.calculate_executive_dashboard_kpis(df_full))
+            all_kpis.update(self._executive_kpis_for_dashboard(df_full, df_filtered, filters))
             
             # Sanitize for JSON
             all_kpis = self._sanitize_for_json(all_kpis)
@@ -264,6 +279,25 @@ class KPIService(BaseService):
                 data=self.get_empty_manager_kpis()
             )
 
+    def _executive_kpis_for_dashboard(self, df_full: pd.DataFrame, df_filtered: Optional[pd.DataFrame],
+                                      filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Rollup SQL primero; pandas sobre el frame ya filtrado como respaldo."""
+        if rollups_enabled():
+            rollup_kpis = self.calculate_executive_dashboard_kpis_from_rollup(filters)
+            if rollup_kpis is not None:
+                return rollup_kpis
+        active = self.active_filters(filters)
+        df = df_filtered if active and df_filtered is not None else df_full
+        return self.calculate_executive_dashboard_kpis(df)
+
+    @staticmethod
+    def active_filters(filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Filtros con valor; el estado se compara en minúsculas, como en el rollup."""
+        active = {key: value for key, value in (filters or {}).items() if value not in (None, "", "todos")}
+        if "estado" in active:
+            active["estado"] = str(active["estado"]).strip().lower()
+        return active
+
     def _calculate_header_metrics(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Calculate header metrics: dso_actual, forecast_7_dias, progreso_objetivo"""
         try:
@@ -442,6 +476,7 @@ class KPIService(BaseService):
                 'satisfaccion_cliente': 0.0
             }
 
+    @cpu_bound
     def calculate_essential_kpis(self, df_full: pd.DataFrame, df_filtered: pd.DataFrame = None) -> ServiceResponse:
         """Calculate essential KPIs for immediate response, including template requirements."""
         try:
@@ -1976,9 +2011,33 @@ class KPIService(BaseService):
     # DASHBOARD.TSX STYLE KPIs - NEW EXECUTIVE COMPONENTS
     # ==========================================================================
     
-    def calculate_executive_dashboard_kpis(self, df_full: pd.DataFrame) -> Dict[str, Any]:
-        """Calculate all KPIs needed for the new dashboard.tsx style components."""
+    def calculate_executive_dashboard_kpis(self, df_full: Optional[pd.DataFrame] = None,
+                                           filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Calculate all KPIs needed for the new dashboard.tsx style components.
+
+        Con KPI_SQL_ROLLUPS_ENABLED=true y sin df_full, las tarjetas, la matriz
+        de aging y el riesgo de clientes se leen del rollup SQL (kpi_edp_rollup)
+        con los mismos filtros; si no, o si el rollup falla, se calculan en
+        pandas. Un df_full recibido ya viene filtrado por el llamador, así que
+        se usa tal cual.
+
+        Args:
+            df_full: EDPs a considerar (None para leer la tabla completa)
+            filters: igualdad por jefe_proyecto, cliente, mes_emision ('YYYY-MM')
+                     o estado (sin distinguir mayúsculas)
+        """
         try:
+            if rollups_enabled() and df_full is None:
+                rollup_kpis = self.calculate_executive_dashboard_kpis_from_rollup(filters)
+                if rollup_kpis is not None:
+                    return rollup_kpis
+
+            if df_full is None:
+                edps_response = self.edp_repository.find_all_dataframe()
+                df_full = edps_response.get("data", pd.DataFrame()) if edps_response.get("success") else pd.DataFrame()
+                df_full = self.filter_edps_like_rollup(df_full, filters)
+
             if df_full.empty:
                 return self.get_empty_executive_kpis()
             
@@ -2007,7 +2066,93 @@ class KPIService(BaseService):
         except Exception as e:
             logger.error(f"Error calculating executive dashboard KPIs: {str(e)}")
             return self.get_empty_executive_kpis()
+
+    def calculate_executive_dashboard_kpis_from_rollup(self, filters: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Executive KPIs from the SQL rollup (one small query instead of the full edp table).
+
+        Returns None when the rollup is unavailable or the filters don't map to
+        rollup columns, so callers can fall back to pandas.
+        """
+        filters = self.active_filters(filters)
+        if any(key not in ROLLUP_FILTER_COLUMNS for key in filters):
+            return None
+
+        rollup_response = self.kpi_repository.get_edp_rollup(filters)
+        if not rollup_response.get("success"):
+            return None
+
+        rollup = rollup_response["data"]
+        if rollup.empty:
+            return self.get_empty_executive_kpis()
+
+        estados = rollup["estado"].str.strip().str.lower()
+        pending = rollup[~estados.isin(self.COMPLETED_STATES)]
+        valid = pending[pending["aging_bucket"] != "sin_dso"]
+        # Solo EDPs con DSO informado, como dso_values.dropna() en pandas
+        dso_count = rollup["dso_count"].sum()
+
+        bucket_stats = {
+            bucket: (int(group["edp_count"].sum()), float(group["monto_propuesto"].sum()), float(group["dso_sum"].sum()))
+            for bucket, group in valid.groupby("aging_bucket")
+        }
+
+        def stats(*buckets):
+            """Suma (count, amount, days_sum) de varios tramos."""
+            return tuple(sum(bucket_stats.get(b, (0, 0.0, 0.0))[i] for b in buckets) for i in range(3))
+
+        critical_count, critical_amount, _ = stats("90_plus")
+        watch_count, watch_amount, _ = stats("31_45", "46_60", "61_90")
+        safe_count, safe_amount, _ = stats("0_15", "16_30")
+        valid_count, valid_amount, valid_days = stats(*self.AGING_RANGES)
+
+        executive_kpis = {}
+        executive_kpis.update(self._build_executive_kpi_cards(
+            total_receivables=float(pending["monto_propuesto"].sum()),
+            critical_amount=critical_amount,
+            critical_count=critical_count,
+            active_accounts=int(pending["edp_count"].sum()),
+            open_invoices=int(rollup.loc[estados.isin(self.INVOICE_STATES), "edp_count"].sum()),
+            avg_collection_days=float(rollup["dso_sum"].sum() / dso_count) if dso_count else 0,
+        ))
+        if valid_count:
+            executive_kpis.update(self._build_aging_matrix(
+                bucket_stats, valid_amount, stats("61_90", "90_plus")[1], valid_count
+            ))
+            executive_kpis.update(self._build_client_risk_analysis(
+                (critical_count, critical_amount), (watch_count, watch_amount), (safe_count, safe_amount),
+                valid_days / valid_count, valid_count,
+            ))
+        else:
+            executive_kpis.update(self._get_empty_aging_matrix())
+            executive_kpis.update(self._get_empty_client_risk_analysis())
+
+        additional = self._calculate_additional_metrics(pd.DataFrame())
+        additional["ingresos_totales"] = float(rollup["monto_propuesto"].sum())
+        additional["proyectos_completados"] = int(rollup.loc[estados.isin(["pagado", "validado"]), "edp_count"].sum())
+        executive_kpis.update(additional)
+
+        return self._sanitize_for_json(executive_kpis)
     
+    @staticmethod
+    def filter_edps_like_rollup(df: pd.DataFrame, filters: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Aplicar en pandas los filtros que el rollup SQL aplica por columna."""
+        filters = KPIService.active_filters(filters)
+        if df.empty or not filters:
+            return df
+        mask = pd.Series(True, index=df.index)
+        for key, value in filters.items():
+            source = "fecha_emision" if key == "mes_emision" else key
+            if source not in df.columns:
+                return df.iloc[0:0]
+            column = df[source]
+            if key == "mes_emision":
+                column = pd.to_datetime(column, errors="coerce").dt.strftime("%Y-%m")
+            elif key == "estado":
+                column = column.fillna("").astype(str).str.strip().str.lower()
+            mask &= column == value
+        return df[mask]
+
     def _calculate_executive_kpi_cards(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Calculate the 4 main executive KPI cards using REAL database data."""
         try:
@@ -2029,16 +2174,12 @@ class KPIService(BaseService):
             
             # TOTAL RECEIVABLES - Sum all EDPs that are NOT paid/completed (pending receivables)
             # Estados que NO están completamente pagados/cerrados
-            completed_states = ['pagado', 'validado', 'completado', 'cerrado', 'finalizado']
-            df_pending = df[~df['estado'].str.strip().str.lower().isin(completed_states)]
+            df_pending = df[~df['estado'].str.strip().str.lower().isin(self.COMPLETED_STATES)]
             
             total_receivables = 0.0
             if not df_pending.empty and 'monto_propuesto' in df_pending.columns:
                 total_receivables = pd.to_numeric(df_pending['monto_propuesto'], errors='coerce').fillna(0).sum()
             
-            # Convert to millions for display
-            total_receivables_m = total_receivables / 1_000_000
-            
             # CRITICAL (+90D) - EDPs with DSO > 90 days AND still pending (not paid)
             critical_amount = 0.0
             critical_count = 0
@@ -2056,17 +2197,8 @@ class KPIService(BaseService):
                     if 'monto_propuesto' in critical_df.columns:
                         critical_amount = pd.to_numeric(critical_df['monto_propuesto'], errors='coerce').fillna(0).sum()
             
-            critical_amount_m = critical_amount / 1_000_000
-            # Critical percentage should be calculated ONLY from pending receivables
-            critical_percentage = (critical_amount / max(1, total_receivables)) * 100 if total_receivables > 0 else 0
-            
-            # ACTIVE ACCOUNTS - Total EDPs not completed (same as pending for consistency)
-            active_accounts = len(df_pending)
-            
             # Open invoices = EDPs that are specifically sent or invoiced but not paid
-            invoice_states = ['enviado', 'facturado', 'revision']
-            df_invoices = df[df['estado'].str.strip().str.lower().isin(invoice_states)]
-            open_invoices = len(df_invoices)
+            df_invoices = df[df['estado'].str.strip().str.lower().isin(self.INVOICE_STATES)]
             
             # AVG COLLECTION (DSO using real data)
             avg_collection_days = 0
@@ -2075,43 +2207,15 @@ class KPIService(BaseService):
                 if len(dso_values) > 0:
                     avg_collection_days = dso_values.mean()
             
-            # Collection vs target
-            target_days = 60  # Standard target
-            collection_vs_target = avg_collection_days - target_days
-            
-            # Calculate receivables change (simplified - would need historical data)
-            receivables_change = 0.0  # Would be calculated from previous period
-            
-            print(f"📊 Executive KPI Cards calculated:")
-            print(f"   Total Receivables: ${total_receivables_m:.1f}M CLP ({len(df_pending)} EDPs pending)")
-            print(f"   Critical Amount: ${critical_amount_m:.1f}M CLP ({critical_count} EDPs >90d)")
-            print(f"   Critical Percentage: {critical_percentage:.1f}% of total receivables")
-            print(f"   Active Accounts: {active_accounts} EDPs")
-            print(f"   Open Invoices: {open_invoices} EDPs")
-            print(f"   Avg Collection: {avg_collection_days:.0f} days")
-            
-            return {
-                # Executive dashboard names
-                'executive_total_receivables': round(total_receivables_m, 1),
-                'executive_receivables_change': round(receivables_change, 1),
-                'executive_critical_amount': round(critical_amount_m, 1),
-                'executive_critical_percentage': round(critical_percentage, 1),
-                'executive_active_accounts': active_accounts,
-                'executive_open_invoices': open_invoices,
-                'executive_avg_collection_days': round(avg_collection_days, 0),
-                'executive_collection_vs_target': round(collection_vs_target, 0),
-                
-                # Template-expected names (for backward compatibility)
-                'total_monto_propuesto': round(total_receivables, 0),  # In CLP (not millions)
-                'critical_amount': round(critical_amount, 0),  # In CLP (not millions)
-                'critical_projects_count': critical_count,
-                'total_edps_activos': active_accounts,
-                'dso_vs_target': round(collection_vs_target, 1),
-                
-                # Additional names that might be expected
-                'receivables_change': round(receivables_change, 1),
-                'critical_percentage': round(critical_percentage, 1)
-            }
+            # ACTIVE ACCOUNTS - Total EDPs not completed (same as pending for consistency)
+            return self._build_executive_kpi_cards(
+                total_receivables=total_receivables,
+                critical_amount=critical_amount,
+                critical_count=critical_count,
+                active_accounts=len(df_pending),
+                open_invoices=len(df_invoices),
+                avg_collection_days=avg_collection_days,
+            )
             
         except Exception as e:
             logger.error(f"Error calculating executive KPI cards: {str(e)}")
@@ -2128,8 +2232,53 @@ class KPIService(BaseService):
                 'critical_amount': 0.0,
                 'critical_projects_count': 0
             }
-            
- 
+
+    def _build_executive_kpi_cards(self, total_receivables: float, critical_amount: float, critical_count: int,
+                                   active_accounts: int, open_invoices: int, avg_collection_days: float) -> Dict[str, Any]:
+        """Shape executive KPI card totals (shared by the pandas and SQL rollup paths)."""
+        # Convert to millions for display
+        total_receivables_m = total_receivables / 1_000_000
+        critical_amount_m = critical_amount / 1_000_000
+        # Critical percentage should be calculated ONLY from pending receivables
+        critical_percentage = (critical_amount / max(1, total_receivables)) * 100 if total_receivables > 0 else 0
+        
+        # Collection vs target
+        target_days = 60  # Standard target
+        collection_vs_target = avg_collection_days - target_days
+        
+        # Calculate receivables change (simplified - would need historical data)
+        receivables_change = 0.0  # Would be calculated from previous period
+        
+        logger.debug(f"📊 Executive KPI Cards calculated:")
+        logger.debug(f"   Total Receivables: ${total_receivables_m:.1f}M CLP ({active_accounts} EDPs pending)")
+        logger.debug(f"   Critical Amount: ${critical_amount_m:.1f}M CLP ({critical_count} EDPs >90d)")
+        logger.debug(f"   Critical Percentage: {critical_percentage:.1f}% of total receivables")
+        logger.debug(f"   Active Accounts: {active_accounts} EDPs")
+        logger.debug(f"   Open Invoices: {open_invoices} EDPs")
+        logger.debug(f"   Avg Collection: {avg_collection_days:.0f} days")
+        
+        return {
+            # Executive dashboard names
+            'executive_total_receivables': round(total_receivables_m, 1),
+            'executive_receivables_change': round(receivables_change, 1),
+            'executive_critical_amount': round(critical_amount_m, 1),
+            'executive_critical_percentage': round(critical_percentage, 1),
+            'executive_active_accounts': active_accounts,
+            'executive_open_invoices': open_invoices,
+            'executive_avg_collection_days': round(avg_collection_days, 0),
+            'executive_collection_vs_target': round(collection_vs_target, 0),
+            
+            # Template-expected names (for backward compatibility)
+            'total_monto_propuesto': round(total_receivables, 0),  # In CLP (not millions)
+            'critical_amount': round(critical_amount, 0),  # In CLP (not millions)
+            'critical_projects_count': critical_count,
+            'total_edps_activos': active_accounts,
+            'dso_vs_target': round(collection_vs_target, 1),
+            
+            # Additional names that might be expected
+            'receivables_change': round(receivables_change, 1),
+            'critical_percentage': round(critical_percentage, 1)
+        }
     
     def _calculate_aging_distribution_matrix(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Calculate aging distribution matrix with 6 ranges using REAL database data."""
@@ -2142,10 +2291,8 @@ class KPIService(BaseService):
             df_days['days_numeric'] = pd.to_numeric(df_days['dso_actual'], errors='coerce').fillna(0)
             
             # Filter out completed states (consistent with executive KPI cards)
-            estados_completados = ['pagado', 'validado', 'completado', 'cerrado', 'finalizado']
-            # Filter out paid states if needed
             if 'estado' in df_days.columns:
-                df_days = df_days[~df_days['estado'].str.strip().str.lower().isin(estados_completados)]
+                df_days = df_days[~df_days['estado'].str.strip().str.lower().isin(self.COMPLETED_STATES)]
             # Filter only rows with valid DSO data (> 0)
             df_valid = df_days[df_days['days_numeric'] > 0]
             
@@ -2162,76 +2309,75 @@ class KPIService(BaseService):
                 '90_plus': df_valid['days_numeric'] > 90
             }
             
-            # Calculate total receivables for percentage calculations
-            total_amount = 0.0
+            amounts = pd.Series(0.0, index=df_valid.index)
             if 'monto_propuesto' in df_valid.columns:
-                total_amount = pd.to_numeric(df_valid['monto_propuesto'], errors='coerce').fillna(0).sum()
+                amounts = pd.to_numeric(df_valid['monto_propuesto'], errors='coerce').fillna(0)
             
-            aging_matrix = {}
-            total_weighted_days = 0.0
-            total_weight = 0.0
-            
-            print(f"📊 Aging Distribution Matrix calculation: {len(df_valid)} EDPs with valid DSO")
+            # (count, amount, days_sum) por tramo
+            bucket_stats = {
+                range_key: (int(mask.sum()), float(amounts[mask].sum()), float(df_valid.loc[mask, 'days_numeric'].sum()))
+                for range_key, mask in aging_ranges.items()
+            }
             
-            for range_key, mask in aging_ranges.items():
-                df_range = df_valid[mask]
-                count = len(df_range)
-                
-                amount = 0.0
-                if not df_range.empty and 'monto_propuesto' in df_range.columns:
-                    amount = pd.to_numeric(df_range['monto_propuesto'], errors='coerce').fillna(0).sum()
-                
-                percentage = (amount / max(1, total_amount)) * 100 if total_amount > 0 else 0
-                amount_m = amount / 1_000_000  # Convert to millions
-                
-                # Calculate weighted average days for this range
-                if not df_range.empty:
-                    range_avg_days = df_range['days_numeric'].mean()
-                    total_weighted_days += range_avg_days * amount
-                    total_weight += amount
-                
-                aging_matrix.update({
-                    f'aging_{range_key}_count': count,
-                    f'aging_{range_key}_amount': round(amount, 0),  # Keep in CLP for template compatibility
-                    f'aging_{range_key}_percentage': round(percentage, 1)
-                })
-                
-                print(f"   {range_key}: {count} EDPs, ${amount_m:.1f}M ({percentage:.1f}%)")
+            # Calculate at-risk amount (60+ days) - Keep in CLP for template compatibility
+            at_risk_amount_clp = float(amounts[df_valid['days_numeric'] > 60].sum())
             
-            # Calculate weighted average days
-            weighted_avg_days = (total_weighted_days / max(1, total_weight)) if total_weight > 0 else 0
+            return self._build_aging_matrix(bucket_stats, float(amounts.sum()), at_risk_amount_clp, len(df_valid))
             
-            # Calculate total receivables in millions
-            total_receivables_m = total_amount / 1_000_000
+        except Exception as e:
+            logger.error(f"Error calculating aging distribution matrix: {str(e)}")
+            return self._get_empty_aging_matrix()
+
+    def _build_aging_matrix(self, bucket_stats: Dict[str, Tuple[int, float, float]], total_amount: float,
+                            at_risk_amount_clp: float, valid_count: int) -> Dict[str, Any]:
+        """Shape the aging matrix from per-bucket (count, amount, days_sum) totals."""
+        aging_matrix = {}
+        total_weighted_days = 0.0
+        total_weight = 0.0
+        
+        logger.debug(f"📊 Aging Distribution Matrix calculation: {valid_count} EDPs with valid DSO")
+        
+        for range_key in self.AGING_RANGES:
+            count, amount, days_sum = bucket_stats.get(range_key, (0, 0.0, 0.0))
             
-            # Calculate at-risk amount (60+ days) - Keep in CLP for template compatibility
-            at_risk_amount_clp = 0.0
-            if 'monto_propuesto' in df_valid.columns:
-                at_risk_mask = df_valid['days_numeric'] > 60
-                at_risk_df = df_valid[at_risk_mask]
-                if not at_risk_df.empty:
-                    at_risk_amounts = pd.to_numeric(at_risk_df['monto_propuesto'], errors='coerce').fillna(0)
-                    at_risk_amount_clp = at_risk_amounts.sum()
+            percentage = (amount / max(1, total_amount)) * 100 if total_amount > 0 else 0
+            amount_m = amount / 1_000_000  # Convert to millions
             
-            # Collection efficiency (amounts in 0-30 day range)
-            safe_amount_clp = aging_matrix.get('aging_0_15_amount', 0) + aging_matrix.get('aging_16_30_amount', 0)
-            collection_efficiency = (safe_amount_clp / max(1, total_amount)) * 100 if total_amount > 0 else 0
+            # Calculate weighted average days for this range
+            if count:
+                range_avg_days = days_sum / count
+                total_weighted_days += range_avg_days * amount
+                total_weight += amount
             
-            # Add summary metrics - note: some fields aren't used by template but kept for completeness
             aging_matrix.update({
-                'aging_total_receivables': round(total_receivables_m, 1),  # Not used by template
-                'aging_weighted_avg_days': round(weighted_avg_days, 0),   # Not used by template  
-                'aging_at_risk_amount': round(at_risk_amount_clp / 1_000_000, 1),  # Not used by template
-                'collection_efficiency': round(collection_efficiency, 1)   # Used by template
+                f'aging_{range_key}_count': count,
+                f'aging_{range_key}_amount': round(amount, 0),  # Keep in CLP for template compatibility
+                f'aging_{range_key}_percentage': round(percentage, 1)
             })
             
-            print(f"📊 Aging Matrix Summary: ${total_receivables_m:.1f}M total, {weighted_avg_days:.0f}d avg, ${at_risk_amount_clp/1_000_000:.1f}M at risk")
-            
-            return aging_matrix
-            
-        except Exception as e:
-            logger.error(f"Error calculating aging distribution matrix: {str(e)}")
-            return self._get_empty_aging_matrix()
+            logger.debug(f"   {range_key}: {count} EDPs, ${amount_m:.1f}M ({percentage:.1f}%)")
+        
+        # Calculate weighted average days
+        weighted_avg_days = (total_weighted_days / max(1, total_weight)) if total_weight > 0 else 0
+        
+        # Calculate total receivables in millions
+        total_receivables_m = total_amount / 1_000_000
+        
+        # Collection efficiency (amounts in 0-30 day range)
+        safe_amount_clp = aging_matrix.get('aging_0_15_amount', 0) + aging_matrix.get('aging_16_30_amount', 0)
+        collection_efficiency = (safe_amount_clp / max(1, total_amount)) * 100 if total_amount > 0 else 0
+        
+        # Add summary metrics - note: some fields aren't used by template but kept for completeness
+        aging_matrix.update({
+            'aging_total_receivables': round(total_receivables_m, 1),  # Not used by template
+            'aging_weighted_avg_days': round(weighted_avg_days, 0),   # Not used by template  
+            'aging_at_risk_amount': round(at_risk_amount_clp / 1_000_000, 1),  # Not used by template
+            'collection_efficiency': round(collection_efficiency, 1)   # Used by template
+        })
+        
+        logger.debug(f"📊 Aging Matrix Summary: ${total_receivables_m:.1f}M total, {weighted_avg_days:.0f}d avg, ${at_risk_amount_clp/1_000_000:.1f}M at risk")
+        
+        return aging_matrix
     
     def _calculate_client_risk_analysis(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Calculate client risk analysis metrics using REAL database data."""
@@ -2244,9 +2390,8 @@ class KPIService(BaseService):
             df_with_days['days_numeric'] = pd.to_numeric(df_with_days['dso_actual'], errors='coerce').fillna(0)
             
             # Filter out completed states (consistent with other functions)
-            estados_completados = ['pagado', 'validado', 'completado', 'cerrado', 'finalizado']
             if 'estado' in df_with_days.columns:
-                df_with_days = df_with_days[~df_with_days['estado'].str.strip().str.lower().isin(estados_completados)]
+                df_with_days = df_with_days[~df_with_days['estado'].str.strip().str.lower().isin(self.COMPLETED_STATES)]
             
             # Filter valid DSO data
             df_valid = df_with_days[df_with_days['days_numeric'] > 0]
@@ -2259,63 +2404,63 @@ class KPIService(BaseService):
             watch_list_mask = (df_valid['days_numeric'] > 30) & (df_valid['days_numeric'] <= 90)  # Watch list
             safe_mask = df_valid['days_numeric'] <= 30  # Safe
             
-            # Count clients in each category
-            high_risk_clients_count = len(df_valid[high_risk_mask])
-            watch_list_clients_count = len(df_valid[watch_list_mask])
-            safe_clients_count = len(df_valid[safe_mask])
-            
-            # Calculate amounts at risk
-            high_risk_amount = 0.0
-            watch_list_amount = 0.0
-            safe_amount = 0.0
-            
+            amounts = pd.Series(0.0, index=df_valid.index)
             if 'monto_propuesto' in df_valid.columns:
-                high_risk_amount = pd.to_numeric(df_valid[high_risk_mask]['monto_propuesto'], errors='coerce').fillna(0).sum() / 1_000_000
-                watch_list_amount = pd.to_numeric(df_valid[watch_list_mask]['monto_propuesto'], errors='coerce').fillna(0).sum() / 1_000_000
-                safe_amount = pd.to_numeric(df_valid[safe_mask]['monto_propuesto'], errors='coerce').fillna(0).sum() / 1_000_000
-            
-            # Calculate average risk score (0-100 scale based on DSO)
-            if not df_valid.empty:
-                # Risk score based on DSO: 0-30 days = low risk, 90+ days = high risk
-                avg_dso = df_valid['days_numeric'].mean()
-                # Map DSO to risk score: 30 days = 20%, 60 days = 50%, 90+ days = 100%
-                if avg_dso <= 30:
-                    average_risk_score = (avg_dso / 30) * 20  # 0-20% risk
-                elif avg_dso <= 60:
-                    average_risk_score = 20 + ((avg_dso - 30) / 30) * 30  # 20-50% risk
-                else:
-                    average_risk_score = 50 + min(50, ((avg_dso - 60) / 30) * 50)  # 50-100% risk
-            else:
-                average_risk_score = 0
-            
-            # Risk trend (simplified - would need historical data)
-            risk_trend = "stable"  # Would be "increasing", "decreasing", or "stable"
-            
-            # Calculate total monitored amount
-            total_monitored = high_risk_amount + watch_list_amount + safe_amount
-            
-            print(f"📊 Client Risk Analysis: {len(df_valid)} EDPs analyzed")
-            print(f"   High Risk: {high_risk_clients_count} EDPs (${high_risk_amount:.1f}M)")
-            print(f"   Watch List: {watch_list_clients_count} EDPs (${watch_list_amount:.1f}M)")
-            print(f"   Safe: {safe_clients_count} EDPs (${safe_amount:.1f}M)")
-            print(f"   Avg Risk Score: {average_risk_score:.1f}%")
-            
-            return {
-                'client_high_risk_count': high_risk_clients_count,
-                'client_high_risk_amount': round(high_risk_amount, 1),
-                'client_watch_list_count': watch_list_clients_count,
-                'client_watch_list_amount': round(watch_list_amount, 1),
-                'client_safe_count': safe_clients_count,
-                'client_safe_amount': round(safe_amount, 1),
-                'client_average_risk_score': round(average_risk_score, 1),
-                'client_risk_trend': risk_trend,
-                'client_total_monitored': round(total_monitored, 1)
-            }
+                amounts = pd.to_numeric(df_valid['monto_propuesto'], errors='coerce').fillna(0)
+            
+            return self._build_client_risk_analysis(
+                (int(high_risk_mask.sum()), float(amounts[high_risk_mask].sum())),
+                (int(watch_list_mask.sum()), float(amounts[watch_list_mask].sum())),
+                (int(safe_mask.sum()), float(amounts[safe_mask].sum())),
+                df_valid['days_numeric'].mean(),
+                len(df_valid),
+            )
             
         except Exception as e:
             logger.error(f"Error calculating client risk analysis: {str(e)}")
             return self._get_empty_client_risk_analysis()
+
+    def _build_client_risk_analysis(self, high_risk: Tuple[int, float], watch_list: Tuple[int, float],
+                                    safe: Tuple[int, float], avg_dso: float, valid_count: int) -> Dict[str, Any]:
+        """Shape client risk metrics from (count, amount CLP) per risk category."""
+        high_risk_clients_count, high_risk_amount = high_risk[0], high_risk[1] / 1_000_000
+        watch_list_clients_count, watch_list_amount = watch_list[0], watch_list[1] / 1_000_000
+        safe_clients_count, safe_amount = safe[0], safe[1] / 1_000_000
+        
+        # Risk score based on DSO: 0-30 days = low risk, 90+ days = high risk
+        # Map DSO to risk score: 30 days = 20%, 60 days = 50%, 90+ days = 100%
+        if avg_dso <= 30:
+            average_risk_score = (avg_dso / 30) * 20  # 0-20% risk
+        elif avg_dso <= 60:
+            average_risk_score = 20 + ((avg_dso - 30) / 30) * 30  # 20-50% risk
+        else:
+            average_risk_score = 50 + min(50, ((avg_dso - 60) / 30) * 50)  # 50-100% risk
+        
+        # Risk trend (simplified - would need historical data)
+        risk_trend = "stable"  # Would be "increasing", "decreasing", or "stable"
+        
+        # Calculate total monitored amount
+        total_monitored = high_risk_amount + watch_list_amount + safe_amount
+        
+        logger.debug(f"📊 Client Risk Analysis: {valid_count} EDPs analyzed")
+        logger.debug(f"   High Risk: {high_risk_clients_count} EDPs (${high_risk_amount:.1f}M)")
+        logger.debug(f"   Watch List: {watch_list_clients_count} EDPs (${watch_list_amount:.1f}M)")
+        logger.debug(f"   Safe: {safe_clients_count} EDPs (${safe_amount:.1f}M)")
+        logger.debug(f"   Avg Risk Score: {average_risk_score:.1f}%")
+        
+        return {
+            'client_high_risk_count': high_risk_clients_count,
+            'client_high_risk_amount': round(high_risk_amount, 1),
+            'client_watch_list_count': watch_list_clients_count,
+            'client_watch_list_amount': round(watch_list_amount, 1),
+            'client_safe_count': safe_clients_count,
+            'client_safe_amount': round(safe_amount, 1),
+            'client_average_risk_score': round(average_risk_score, 1),
+            'client_risk_trend': risk_trend,
+            'client_total_monitored': round(total_monitored, 1)
+        }
     
+
     def _get_empty_aging_matrix(self) -> Dict[str, Any]:
         """Return empty aging matrix structure."""
         return {
@@ -0,0 +1,500 @@
+"""
+Analítica por encargado calculada en una sola pasada sobre todos los encargados.
+
+El frame de EDPs se prepara una vez (máscaras de estado, DSO, montos y fecha de
+cobro como columnas) y cada familia de métricas sale de un único groupby:
+
+- `metricas`: totales financieros, aging, DSO ponderado, criticidad y tiempos,
+  una fila por encargado.
+- `mensual`: EDPs, cobro y DSO por (encargado, mes) para velocidad y tendencias.
+- `proyectos`: resumen por (encargado, proyecto).
+- `semanal`: monto cobrado por (encargado, semana).
+
+La vista comparativa lee `metricas` completa y el drill-down de un encargado es
+una búsqueda en estas tablas, así que el costo es O(filas) y no
+O(encargados × filas).
+
+Uso:
+
+    analytics = ManagerAnalyticsEngine().compute(df_edp)
+    analytics.resumen_encargados()
+    analytics.financiero("Ana Pérez")
+"""
+
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+ESTADOS_PAGADOS = ["pagado", "validado"]
+ESTADOS_EN_COBRO = ["enviado", "revisión", "pendiente"]
+
+# Metas por encargado (esto debería venir de configuración)
+META_ENCARGADO_DEFAULT = 375_000_000
+METAS_ENCARGADOS = {
+    "Diego Bravo": 375_000_000,
+    "Carolina López": 375_000_000,
+    "Pedro Rojas": 375_000_000,
+    "Ana Pérez": 375_000_000,
+    "Carlos Alvarez": 375_000_000,
+}
+META_MES = 375_000_000  # Meta mensual de cobro
+
+MESES_TENDENCIA = 3
+SEMANAS_TENDENCIA = 12
+
+PROJECT_SUMMARY_COLUMNS = [
+    "Total_EDP", "Monto_Propuesto_Total", "Monto_Aprobado_Total",
+    "Críticos", "Validados", "Monto_Pagado", "Monto_Pendiente",
+]
+
+
+def _numeric(df: pd.DataFrame, column: str) -> pd.Series:
+    if column not in df.columns:
+        return pd.Series(np.nan, index=df.index, dtype=float)
+    return pd.to_numeric(df[column], errors="coerce")
+
+
+def _column(df: pd.DataFrame, column: str) -> pd.Series:
+    if column not in df.columns:
+        return pd.Series(np.nan, index=df.index, dtype=object)
+    return df[column]
+
+
+def _ratio(numerador: pd.Series, denominador: pd.Series) -> pd.Series:
+    """numerador / denominador, con 0 donde el denominador no es positivo."""
+    return (numerador / denominador.where(denominador > 0)).fillna(0)
+
+
+@dataclass
+class ManagerAnalytics:
+    """Resultado agrupado; cada método es una búsqueda por encargado."""
+
+    source: pd.DataFrame
+    metricas: pd.DataFrame
+    mensual: pd.DataFrame
+    proyectos: pd.DataFrame
+    semanal: pd.Series
+    filas: Dict[Any, np.ndarray] = field(default_factory=dict)
+    dso_global: float = 0.0
+    tasa_aprobacion_global: float = 0.0
+
+    def encargados(self) -> List[str]:
+        return list(self.metricas.index)
+
+    def __contains__(self, nombre: str) -> bool:
+        return nombre in self.metricas.index
+
+    def registros(self, nombre: str) -> pd.DataFrame:
+        """Filas originales del encargado (para tablas y top pendientes)."""
+        posiciones = self.filas.get(nombre)
+        if posiciones is None:
+            return self.source.iloc[0:0]
+        return self.source.iloc[posiciones]
+
+    # === VISTA COMPARATIVA ===
+
+    def resumen_encargados(self) -> Dict[str, Dict[str, Any]]:
+        """Métricas básicas de todos los encargados."""
+        m = self.metricas
+        resumen = pd.DataFrame({
+            "total_edps": m["total_edps"],
+            "edps_pagados": m["edps_pagados"],
+            "monto_pagado": m["monto_pagado"],
+            "monto_pendiente": m["monto_pendiente"],
+            "dso": m["dso"].round(1),
+            "edps_criticos": m["edps_criticos"],
+            "porcentaje_criticos": (_ratio(m["edps_criticos"], m["total_edps"]) * 100).round(1),
+            "eficiencia": (_ratio(m["edps_pagados"], m["total_edps"]) * 100).round(1),
+        })
+        return resumen.to_dict("index")
+
+    def comparativas(self) -> Dict[str, float]:
+        """Promedios y extremos entre encargados."""
+        if self.metricas.empty:
+            return {}
+        m = self.metricas
+        eficiencia = (_ratio(m["edps_pagados"], m["total_edps"]) * 100).round(1)
+        dso = m["dso"].round(1)
+        return {
+            "promedio_monto_pagado": float(m["monto_pagado"].mean()),
+            "mejor_monto_pagado": float(m["monto_pagado"].max()),
+            "peor_monto_pagado": float(m["monto_pagado"].min()),
+            "promedio_dso": float(dso.mean()),
+            "mejor_dso": float(dso.min()),  # Menor DSO es mejor
+            "peor_dso": float(dso.max()),
+            "promedio_eficiencia": float(eficiencia.mean()),
+            "mejor_eficiencia": float(eficiencia.max()),
+            "peor_eficiencia": float(eficiencia.min()),
+        }
+
+    def ranking(self) -> List[Dict[str, Any]]:
+        """Ranking por score compuesto (40% monto, 30% eficiencia, 30% DSO)."""
+        if self.metricas.empty:
+            return []
+        m = self.metricas
+        eficiencia = (_ratio(m["edps_pagados"], m["total_edps"]) * 100).round(1)
+        dso = m["dso"].round(1)
+        score = (
+            (m["monto_pagado"] / 1_000_000) * 0.4
+            + eficiencia * 0.3
+            + (100 - dso).clip(lower=0) * 0.3
+        ).round(2)
+        ranking = pd.DataFrame({
+            "encargado": m.index,
+            "score_total": score.to_numpy(),
+            "monto_pagado": m["monto_pagado"].to_numpy(),
+            "eficiencia": eficiencia.to_numpy(),
+            "dso": dso.to_numpy(),
+        }).sort_values("score_total", ascending=False, kind="stable")
+        ranking["posicion"] = np.arange(1, len(ranking) + 1)
+        return ranking.to_dict("records")
+
+    # === DRILL-DOWN ===
+
+    def financiero(self, nombre: str) -> Dict[str, Any]:
+        """Análisis financiero del encargado."""
+        m = self.metricas.loc[nombre]
+        meta_encargado = METAS_ENCARGADOS.get(nombre, META_ENCARGADO_DEFAULT)
+        total_edps = int(m["total_edps"])
+        edps_pagados = int(m["edps_pagados"])
+        tasa_aprobacion = (edps_pagados / total_edps * 100) if total_edps > 0 else 0
+        tiempo_promedio_resolucion = float(m["dso_pagados"])
+
+        # Riesgo (0-100, menor es mejor): críticos 40%, tiempo sobre 30 días 30%, baja aprobación 30%
+        riesgo_score = 0
+        if total_edps > 0:
+            riesgo_score = (
+                (m["cantidad_edp_criticos"] / total_edps * 40)
+                + (max(0, (tiempo_promedio_resolucion - 30)) / 60 * 30)
+                + (max(0, (100 - tasa_aprobacion)) / 100 * 30)
+            )
+
+        return {
+            "meta_encargado": meta_encargado,
+            "monto_pagado": float(m["monto_pagado"]),
+            "monto_pendiente": float(m["monto_pendiente"]),
+            "avance_meta": round(m["monto_pagado"] / meta_encargado * 100, 1) if meta_encargado > 0 else 0,
+            "total_edps": total_edps,
+            "edps_pagados": edps_pagados,
+            "tasa_aprobacion": round(tasa_aprobacion, 1),
+            "monto_proximo_cobro": float(m["monto_proximo_cobro"]),
+            "cantidad_edp_proximos": int(m["cantidad_edp_proximos"]),
+            "monto_pendiente_critico": float(m["monto_pendiente_critico"]),
+            "cantidad_edp_criticos": int(m["cantidad_edp_criticos"]),
+            "distribucion_aging": {
+                "reciente": int(m["aging_reciente"]),
+                "medio": int(m["aging_medio"]),
+                "critico": int(m["aging_critico"]),
+            },
+            "montos_aging": {
+                "reciente": float(m["monto_aging_reciente"]),
+                "medio": float(m["monto_aging_medio"]),
+                "critico": float(m["monto_aging_critico"]),
+            },
+            "tiempo_promedio_resolucion": round(tiempo_promedio_resolucion, 1),
+            "riesgo_score": round(float(riesgo_score), 1),
+        }
+
+    def rendimiento(self, nombre: str) -> Dict[str, Any]:
+        """Rendimiento del encargado comparado con el total."""
+        m = self.metricas.loc[nombre]
+        mensual = self._mensual(nombre)
+
+        velocidad_procesamiento = float(mensual["edps"].mean()) if len(mensual) else 0
+        cobros = mensual.loc[mensual["pagados"] > 0, "cobrado"]
+        velocidad_cobro = float(cobros.mean()) if len(cobros) else 0
+
+        # Tendencia de DSO: último mes vs penúltimo (±10%)
+        tendencia_mejora = "estable"
+        if len(mensual) >= 2:
+            dso_penultimo, dso_ultimo = mensual["dso"].iloc[-2], mensual["dso"].iloc[-1]
+            if dso_ultimo < dso_penultimo * 0.9:
+                tendencia_mejora = "mejorando"
+            elif dso_ultimo > dso_penultimo * 1.1:
+                tendencia_mejora = "empeorando"
+
+        total_edps = int(m["total_edps"])
+        edps_criticos = int(m["edps_criticos"])
+        return {
+            "dso_encargado": round(float(m["dso"]), 1),
+            "dso_global": round(self.dso_global, 1),
+            "diferencia_dso": round(float(m["dso"]) - self.dso_global, 1),
+            "edps_criticos": edps_criticos,
+            "porcentaje_criticos": round(edps_criticos / total_edps * 100, 1) if total_edps > 0 else 0,
+            "tasa_aprobacion_global": round(self.tasa_aprobacion_global, 1),
+            "dias_promedio_aprobacion": round(float(m["dso_aprobacion"]), 1),
+            "velocidad_procesamiento": round(velocidad_procesamiento, 1),
+            "velocidad_cobro": round(velocidad_cobro, 0),
+            "tendencia_mejora": tendencia_mejora,
+        }
+
+    def resumen_proyectos(self, nombre: str) -> Dict[str, Dict[str, Any]]:
+        """Resumen por proyecto del encargado."""
+        if nombre not in self.proyectos.index.get_level_values(0):
+            return {}
+        return self.proyectos.xs(nombre, level=0).to_dict("index")
+
+    def tendencias(self, nombre: str) -> Dict[str, Any]:
+        """Cobro de los últimos meses, variación, proyección y alertas."""
+        ultimos = self._mensual(nombre).tail(MESES_TENDENCIA)
+        meses_unicos = list(ultimos.index)
+        tendencia_cobro = [
+            (mes, float(monto)) for mes, monto in zip(meses_unicos, ultimos["cobrado"])
+        ]
+        montos = [monto for _, monto in tendencia_cobro]
+
+        monto_cobrado_ultimo_mes = montos[-1] if montos else 0
+        monto_cobrado_penultimo_mes = montos[-2] if len(montos) > 1 else 1
+
+        variacion_mensual_cobro = 0
+        if monto_cobrado_penultimo_mes > 0:
+            variacion_mensual_cobro = (
+                (monto_cobrado_ultimo_mes - monto_cobrado_penultimo_mes)
+                / monto_cobrado_penultimo_mes
+                * 100
+            )
+
+        promedio_cobro_mensual = sum(montos) / len(montos) if montos else 0
+        maximo_cobro_mensual = max(montos) if montos else 1
+
+        # Proyección lineal con el crecimiento promedio de los últimos meses
+        if len(montos) >= 2:
+            crecimiento_promedio = (montos[-1] - montos[0]) / (len(montos) - 1)
+            proyeccion_siguiente_mes = monto_cobrado_ultimo_mes + crecimiento_promedio
+        else:
+            proyeccion_siguiente_mes = monto_cobrado_ultimo_mes
+
+        alertas = []
+        if monto_cobrado_ultimo_mes < META_MES * 0.7:
+            alertas.append({
+                "tipo": "warning",
+                "mensaje": "Cobro mensual por debajo del 70% de la meta",
+                "valor": f"${monto_cobrado_ultimo_mes:,.0f} vs ${META_MES:,.0f}",
+            })
+        if variacion_mensual_cobro < -20:
+            alertas.append({
+                "tipo": "danger",
+                "mensaje": "Caída significativa en cobros mensuales",
+                "valor": f"{variacion_mensual_cobro:.1f}%",
+            })
+        if len(montos) == 3 and montos[0] > montos[1] > montos[2]:
+            alertas.append({
+                "tipo": "danger",
+                "mensaje": "Tendencia declinante por 3 meses consecutivos",
+                "valor": "Revisar estrategia",
+            })
+
+        # Eficiencia (0-100, mayor es mejor): cumplimiento de meta 70%, estabilidad 30%
+        efficiency_score = 0
+        if promedio_cobro_mensual > 0 and META_MES > 0:
+            cumplimiento_meta = min(100, (promedio_cobro_mensual / META_MES) * 100)
+            consistency_score = 100 - abs(variacion_mensual_cobro)
+            efficiency_score = (cumplimiento_meta * 0.7) + (consistency_score * 0.3)
+
+        return {
+            "tendencia_cobro": tendencia_cobro,
+            "meses_analizados": meses_unicos,
+            "monto_cobrado_ultimo_mes": float(monto_cobrado_ultimo_mes),
+            "variacion_mensual_cobro": round(variacion_mensual_cobro, 1),
+            "promedio_cobro_mensual": float(promedio_cobro_mensual),
+            "maximo_cobro_mensual": float(maximo_cobro_mensual),
+            "meta_mes_actual": float(META_MES),
+            "proyeccion_siguiente_mes": float(proyeccion_siguiente_mes),
+            "alertas": alertas,
+            "efficiency_score": round(efficiency_score, 1),
+        }
+
+    def tendencia_semanal(self, nombre: str) -> List[Dict[str, Any]]:
+        """Cobro de las últimas 12 semanas; sin cobros devuelve lista vacía."""
+        if nombre not in self.semanal.index.get_level_values(0):
+            return []
+        semanas = self.semanal.xs(nombre, level=0).sort_index().tail(SEMANAS_TENDENCIA)
+        resultado = [
+            {"semana": semana, "fecha": anio_semana, "monto": float(monto), "es_simulado": False}
+            for (anio_semana, semana), monto in semanas.items()
+        ]
+
+        # Con menos de 12 semanas reales se completa con semanas estimadas
+        if len(resultado) < SEMANAS_TENDENCIA:
+            fecha_actual = datetime.now()
+            semanas_faltantes = SEMANAS_TENDENCIA - len(resultado)
+            for i in range(semanas_faltantes, 0, -1):
+                fecha_semana = fecha_actual - timedelta(weeks=i + len(resultado))
+                promedio_real = (
+                    sum(item["monto"] for item in resultado) / len(resultado)
+                    if resultado
+                    else 20_000_000
+                )
+                resultado.insert(0, {
+                    "semana": f"Sem {fecha_semana.strftime('%W')}",
+                    "fecha": fecha_semana.strftime("%Y-%m-%d"),
+                    "monto": float(promedio_real * (0.8 + (i * 0.05))),
+                    "es_simulado": True,
+                })
+
+        return resultado[-SEMANAS_TENDENCIA:]
+
+    def _mensual(self, nombre: str) -> pd.DataFrame:
+        if nombre not in self.mensual.index.get_level_values(0):
+            return pd.DataFrame(columns=self.mensual.columns)
+        return self.mensual.xs(nombre, level=0).sort_index()
+
+
+class ManagerAnalyticsEngine:
+    """Calcula todas las métricas por encargado con un groupby por familia."""
+
+    def compute(self, df: pd.DataFrame) -> ManagerAnalytics:
+        if df is None or df.empty or "jefe_proyecto" not in df.columns:
+            return self._empty(df)
+
+        source = df.reset_index(drop=True)
+        rows = self._prepare(source)
+        por_encargado = rows.groupby("encargado", sort=False)
+
+        metricas = por_encargado.agg(
+            total_edps=("uno", "sum"),
+            edps_pagados=("pagado", "sum"),
+            monto_pagado=("monto_pagado", "sum"),
+            monto_pendiente=("monto_pendiente", "sum"),
+            dso_ponderado=("dso_ponderado", "sum"),
+            monto_dso=("monto_dso", "sum"),
+            edps_criticos=("critico", "sum"),
+            monto_proximo_cobro=("monto_proximo", "sum"),
+            cantidad_edp_proximos=("proximo", "sum"),
+            monto_pendiente_critico=("monto_en_cobro_critico", "sum"),
+            cantidad_edp_criticos=("en_cobro_critico", "sum"),
+            aging_reciente=("aging_reciente", "sum"),
+            aging_medio=("aging_medio", "sum"),
+            aging_critico=("aging_critico", "sum"),
+            monto_aging_reciente=("monto_aging_reciente", "sum"),
+            monto_aging_medio=("monto_aging_medio", "sum"),
+            monto_aging_critico=("monto_aging_critico", "sum"),
+            dso_pagados=("dso_pagado", "mean"),
+            dso_aprobacion=("dso_aprobacion", "mean"),
+        )
+        metricas["dso"] = _ratio(metricas["dso_ponderado"], metricas["monto_dso"])
+        metricas[["dso_pagados", "dso_aprobacion"]] = metricas[["dso_pagados", "dso_aprobacion"]].fillna(0)
+
+        mensual = rows.groupby(["encargado", "mes"], sort=True).agg(
+            edps=("uno", "sum"),
+            pagados=("pagado", "sum"),
+            cobrado=("monto_pagado", "sum"),
+            dso_ponderado=("dso_ponderado", "sum"),
+            monto_dso=("monto_dso", "sum"),
+        )
+        mensual["dso"] = _ratio(mensual["dso_ponderado"], mensual["monto_dso"])
+
+        total_monto_dso = rows["monto_dso"].sum()
+        total_edps = len(rows)
+        return ManagerAnalytics(
+            source=source,
+            metricas=metricas,
+            mensual=mensual,
+            proyectos=self._project_summary(rows),
+            semanal=self._weekly_collections(source, rows),
+            filas=por_encargado.indices,
+            dso_global=float(rows["dso_ponderado"].sum() / total_monto_dso) if total_monto_dso > 0 else 0.0,
+            tasa_aprobacion_global=float(rows["pagado"].sum() / total_edps * 100) if total_edps else 0.0,
+        )
+
+    def _prepare(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Columnas por fila que alimentan todos los agregados."""
+        estado = _column(df, "estado")
+        pagado = estado.isin(ESTADOS_PAGADOS)
+        pendiente = ~pagado
+        en_cobro = estado.isin(ESTADOS_EN_COBRO)
+        dso = _numeric(df, "dso_actual")
+        monto_aprobado = _numeric(df, "monto_aprobado")
+        monto_propuesto = _numeric(df, "monto_propuesto")
+
+        if "critico" in df.columns:
+            critico = df["critico"] == 1
+        else:
+            # Críticos: más de 30 días de espera sin pago
+            critico = (dso.fillna(0) > 30) & pendiente
+
+        # DSO ponderado por monto aprobado (solo montos y días válidos)
+        valido_dso = dso.notna() & monto_aprobado.notna() & (monto_aprobado > 0) & (dso >= 0)
+        proximo = en_cobro & (dso <= 15) & (dso >= 0)
+        en_cobro_critico = en_cobro & (dso > 30)
+        aging_reciente = pendiente & (dso <= 15)
+        aging_medio = pendiente & (dso > 15) & (dso <= 30)
+        aging_critico = pendiente & (dso > 30)
+
+        return pd.DataFrame({
+            "encargado": df["jefe_proyecto"],
+            "proyecto": _column(df, "proyecto"),
+            "mes": _column(df, "mes"),
+            "uno": 1,
+            "tiene_n_edp": _column(df, "n_edp").notna().astype(int),
+            "pagado": pagado.astype(int),
+            "critico": critico.astype(int),
+            "monto_aprobado": monto_aprobado,
+            "monto_propuesto": monto_propuesto,
+            "monto_pagado": monto_aprobado.where(pagado),
+            "monto_pendiente": monto_propuesto.where(pendiente),
+            "dso_ponderado": (dso * monto_aprobado).where(valido_dso),
+            "monto_dso": monto_aprobado.where(valido_dso),
+            "proximo": proximo.astype(int),
+            "monto_proximo": monto_aprobado.where(proximo),
+            "en_cobro_critico": en_cobro_critico.astype(int),
+            "monto_en_cobro_critico": monto_aprobado.where(en_cobro_critico),
+            "aging_reciente": aging_reciente.astype(int),
+            "aging_medio": aging_medio.astype(int),
+            "aging_critico": aging_critico.astype(int),
+            "monto_aging_reciente": monto_aprobado.where(aging_reciente),
+            "monto_aging_medio": monto_aprobado.where(aging_medio),
+            "monto_aging_critico": monto_aprobado.where(aging_critico),
+            "dso_pagado": dso.where(pagado),
+            "dso_aprobacion": dso.where(pagado & (dso > 0)),
+        })
+
+    def _project_summary(self, rows: pd.DataFrame) -> pd.DataFrame:
+        resumen = rows.groupby(["encargado", "proyecto"], sort=False).agg(
+            Total_EDP=("tiene_n_edp", "sum"),
+            Monto_Propuesto_Total=("monto_propuesto", "sum"),
+            Monto_Aprobado_Total=("monto_aprobado", "sum"),
+            Críticos=("critico", "sum"),
+            Validados=("pagado", "sum"),
+            Monto_Pagado=("monto_pagado", "sum"),
+        )
+        resumen["Monto_Pendiente"] = resumen["Monto_Aprobado_Total"] - resumen["Monto_Pagado"]
+        return resumen[PROJECT_SUMMARY_COLUMNS]
+
+    def _weekly_collections(self, source: pd.DataFrame, rows: pd.DataFrame) -> pd.Series:
+        """Monto cobrado por (encargado, año-semana, semana)."""
+        pagados = rows["pagado"] == 1
+        if not pagados.any():
+            return pd.Series(dtype=float)
+
+        # Sin fecha de pago se usa el primer día del mes del EDP
+        if "fecha_pago" in source.columns:
+            fecha_cobro = pd.to_datetime(source.loc[pagados, "fecha_pago"], errors="coerce")
+        else:
+            fecha_cobro = pd.to_datetime(
+                rows.loc[pagados, "mes"].astype(str) + "-01", errors="coerce"
+            )
+
+        cobros = pd.DataFrame({
+            "encargado": rows.loc[pagados, "encargado"],
+            "anio_semana": fecha_cobro.dt.strftime("%Y-Sem%W"),
+            "semana": fecha_cobro.dt.strftime("Sem %W"),
+            "monto": rows.loc[pagados, "monto_aprobado"],
+        })
+        return cobros.groupby(["encargado", "anio_semana", "semana"])["monto"].sum()
+
+    def _empty(self, df: pd.DataFrame) -> ManagerAnalytics:
+        return ManagerAnalytics(
+            source=df if df is not None else pd.DataFrame(),
+            metricas=pd.DataFrame(columns=["total_edps", "edps_pagados", "monto_pagado",
+                                           "monto_pendiente", "dso", "edps_criticos"]),
+            mensual=pd.DataFrame(columns=["edps", "pagados", "cobrado", "dso"]),
+            proyectos=pd.DataFrame(columns=PROJECT_SUMMARY_COLUMNS),
+            semanal=pd.Series(dtype=float),
+        )
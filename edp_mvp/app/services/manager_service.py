@@ -12,27 +12,48 @@ import os
 import json
 import traceback
 import hashlib
+import threading
+import time
 
-try:  # pragma: no cover - optional redis cache
-    import redis
-
-    redis_url = os.getenv("REDIS_URL")
-    redis_client = redis.from_url(redis_url) if redis_url else None
-except Exception:
-    redis_client = None
+from ..utils.redis_client import redis_client
+from ..utils.cache_codec import decode_payload, encode_payload
+from ..utils.cache_inspector import delete_matching, namespace_of, record_lookup, unlink_keys
+from ..utils.concurrency import cpu_bound
 
 from . import BaseService, ServiceResponse, ValidationError
 from ..models import EDP, KPI
 from ..repositories.edp_repository import EDPRepository
 from ..repositories.project_repository import ProjectRepository
+from ..repositories.kpi_repository import KPIRepository, rollups_enabled
 from ..services.cost_service import CostService
 from ..services.kpi_service import KPIService
+from ..services.cache_invalidation_service import current_data_generation
 from ..utils.date_utils import DateUtils
 from ..utils.format_utils import FormatUtils
 from ..utils.validation_utils import ValidationUtils
+from ..utils.instrumentation import record_cache, stage_timer
+from ..utils.business_rules import business_rules
+from .related_data import RelatedData, find_all_dataframe_memoized
 
 logger = logging.getLogger(__name__)
 
+# Frame de EDPs clasificados compartido por los modales del dashboard ejecutivo
+# (críticos, aging, cobro rápido, detalle por rango).
+# (generación de datos, hash de filtros) -> (timestamp, frame)
+CLASSIFIED_EDP_CACHE_TTL = int(os.getenv("CLASSIFIED_EDP_CACHE_TTL", "60"))
+CLASSIFIED_EDP_CACHE_MAX_ENTRIES = int(os.getenv("CLASSIFIED_EDP_CACHE_MAX_ENTRIES", "16"))
+_classified_edp_cache: Dict[Tuple[str, str], Tuple[float, pd.DataFrame]] = {}
+_classified_edp_lock = threading.Lock()
+
+AGING_DETAIL_BINS = [-1, 15, 30, 45, 60, 90, 999]
+AGING_DETAIL_LABELS = ["0-15", "16-30", "31-45", "46-60", "61-90", "90+"]
+
+
+def clear_classified_edp_cache() -> None:
+    """Vaciar el frame clasificado de este proceso (tras cambios en EDPs)."""
+    with _classified_edp_lock:
+        _classified_edp_cache.clear()
+
 
 class ManagerService(BaseService):
     """Service for handling manager dashboard operations."""
@@ -43,6 +64,7 @@ class ManagerService(BaseService):
         self.project_repo = ProjectRepository()
         self.cost_service = CostService()
         self.kpi_service = KPIService()  # Use centralized KPI service
+        self.kpi_repository = KPIRepository()  # Optional SQL rollups
         # Cache configuration
         self.cache_ttl = {
             "dashboard": 300,  # 5 minutes for dashboard data
@@ -92,9 +114,11 @@ class ManagerService(BaseService):
                 try:
                     cached = redis_client.get(cache_key)
                     cache_meta = redis_client.get(cache_meta_key)
+                    record_cache("manager_dashboard", bool(cached and cache_meta))
+                    record_lookup(namespace_of(cache_key), bool(cached and cache_meta))
 
                     if cached and cache_meta:
-                        meta_data = json.loads(cache_meta)
+                        meta_data = decode_payload(cache_meta)
                         cache_timestamp = meta_data.get("timestamp", 0)
                         current_time = datetime.now().timestamp()
                         cache_age = current_time - cache_timestamp
@@ -108,7 +132,7 @@ class ManagerService(BaseService):
                             )
 
                         if cache_valid:
-                            data = json.loads(cached)
+                            data = decode_payload(cached)
                             # Mark as cached data with age info
                             data["_is_immediate"] = False
                             data["_is_cached"] = True
@@ -130,8 +154,8 @@ class ManagerService(BaseService):
 
             # If not in cache or force refresh, calculate complete data synchronously
             # Load base data as DataFrame for analytics
-            edps_response = self.edp_repo.find_all_dataframe()
-     
+            with stage_timer("manager_dashboard.load_edps"):
+                edps_response = find_all_dataframe_memoized("edps", self.edp_repo)
 
             # Check if the response has a success key (dictionary)
             if isinstance(edps_response, dict) and not edps_response.get(
@@ -155,22 +179,27 @@ class ManagerService(BaseService):
             df_filtered = self._apply_manager_filters(df_edp, filters or {})
 
             # Calculate COMPLETE executive KPIs (not essential ones)
-            executive_kpis = self._calculate_executive_kpis(df_edp, df_filtered)
+            with stage_timer("manager_dashboard.executive_kpis"):
+                executive_kpis = self._calculate_executive_kpis(df_edp, df_filtered, filters)
 
             # Calculate financial metrics
-            financial_metrics = self._calculate_financial_metrics(df_edp, df_filtered)
+            with stage_timer("manager_dashboard.financial_metrics"):
+                financial_metrics = self._calculate_financial_metrics(df_edp, df_filtered)
 
             # Generate chart data
-            chart_data = self._generate_chart_data(df_edp, df_filtered)
+            with stage_timer("manager_dashboard.charts"):
+                chart_data = self._generate_chart_data(df_edp, df_filtered)
 
             # Calculate cash forecast
-            cash_forecast = self._calculate_cash_forecast(df_edp)
+            with stage_timer("manager_dashboard.cash_forecast"):
+                cash_forecast = self._calculate_cash_forecast(df_edp)
 
             # Generate alerts
             alerts = self._generate_alerts(df_edp)
 
             # Get cost management data
-            cost_data_response = self.cost_service.get_cost_dashboard_data(filters)
+            with stage_timer("manager_dashboard.cost_data"):
+                cost_data_response = self.cost_service.get_cost_dashboard_data(filters)
             cost_data = cost_data_response.data if cost_data_response.success else {}
 
             # Get filter options
@@ -207,23 +236,20 @@ class ManagerService(BaseService):
                         "filters_hash": filters_hash,
                         "ttl": self.cache_ttl["dashboard"],
                     }
-
-                    redis_client.setex(
-                        cache_key,
-                        self.cache_ttl["dashboard"],
-                        json.dumps(self._sanitize_for_json(result_data)),
+                    payload = encode_payload(
+                        self._sanitize_for_json(result_data), "manager_dashboard"
                     )
+
+                    redis_client.setex(cache_key, self.cache_ttl["dashboard"], payload)
                     redis_client.setex(
                         cache_meta_key,
                         self.cache_ttl["dashboard"],
-                        json.dumps(cache_metadata),
+                        encode_payload(cache_metadata, "manager_dashboard"),
                     )
 
                     # Also keep a stale copy for fallback
                     redis_client.setex(
-                        f"{cache_key}:stale",
-                        self.cache_ttl["dashboard"] * 4,
-                        json.dumps(self._sanitize_for_json(result_data)),
+                        f"{cache_key}:stale", self.cache_ttl["dashboard"] * 4, payload
                     )
 
                     logger.info(
@@ -278,22 +304,24 @@ class ManagerService(BaseService):
             kpis_cache_key = f"executive_kpis:{self._generate_cache_key(filters or {})}"
             if redis_client:
                 cached_kpis = redis_client.get(kpis_cache_key)
+                record_lookup(namespace_of(kpis_cache_key), bool(cached_kpis))
                 if cached_kpis:
-                    components["executive_kpis"] = json.loads(cached_kpis)
+                    components["executive_kpis"] = decode_payload(cached_kpis)
                 else:
                     components["executive_kpis"] = self._calculate_executive_kpis(
-                        df_edp, df_filtered
+                        df_edp, df_filtered, filters
                     )
                     redis_client.setex(
                         kpis_cache_key,
                         self.cache_ttl["kpis"],
-                        json.dumps(
-                            self._sanitize_for_json(components["executive_kpis"])
+                        encode_payload(
+                            self._sanitize_for_json(components["executive_kpis"]),
+                            "executive_kpis",
                         ),
                     )
             else:
                 components["executive_kpis"] = self._calculate_executive_kpis(
-                    df_edp, df_filtered
+                    df_edp, df_filtered, filters
                 )
 
             # Calculate other components
@@ -326,16 +354,13 @@ class ManagerService(BaseService):
             # Cache the complete result
             cache_key = f"manager_dashboard:{self._generate_cache_key(filters or {})}"
             if redis_client:
-                redis_client.setex(
-                    cache_key,
-                    self.cache_ttl["dashboard"],
-                    json.dumps(self._sanitize_for_json(result_data)),
+                payload = encode_payload(
+                    self._sanitize_for_json(result_data), "manager_dashboard"
                 )
+                redis_client.setex(cache_key, self.cache_ttl["dashboard"], payload)
                 # Also keep a stale copy for fallback
                 redis_client.setex(
-                    f"{cache_key}:stale",
-                    self.cache_ttl["dashboard"] * 4,
-                    json.dumps(self._sanitize_for_json(result_data)),
+                    f"{cache_key}:stale", self.cache_ttl["dashboard"] * 4, payload
                 )
 
             return ServiceResponse(success=True, data=result_data)
@@ -503,17 +528,19 @@ class ManagerService(BaseService):
 
         # Status filter
         if filters.get("estado") and filters["estado"] != "todos":
-            filtered_df = filtered_df[filtered_df["estado"] == filters["estado"]]
+            # Sin distinguir mayúsculas ni espacios, igual que el rollup de KPIs
+            estados = filtered_df["estado"].fillna("").astype(str).str.strip().str.lower()
+            filtered_df = filtered_df[estados == str(filters["estado"]).strip().lower()]
 
         return filtered_df
 
     def _calculate_executive_kpis(
-        self, df_full: pd.DataFrame, df_filtered: pd.DataFrame
+        self, df_full: pd.DataFrame, df_filtered: pd.DataFrame, filters: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """Calculate executive-level KPIs using centralized KPI service."""
         try:
             # Use the complete manager dashboard KPIs calculation
-            kpi_response = self.kpi_service.calculate_manager_dashboard_kpis(df_full, df_filtered)
+            kpi_response = self.kpi_service.calculate_manager_dashboard_kpis(df_full, df_filtered, filters)
             if kpi_response.success:
                 logger.info(f"✅ KPI Service returned {len(kpi_response.data)} metrics")
                 return kpi_response.data
@@ -795,102 +822,145 @@ class ManagerService(BaseService):
             logger.info(f"Error in client performance chart: {e}")
             return {"labels": [], "datasets": []}
 
-    def _build_monthly_trend_chart(self, df: pd.DataFrame) -> Dict[str, Any]:
-        """Build comprehensive monthly financial trend chart with costs and projections."""
-        try:
-            from datetime import datetime, timedelta
+    def _monthly_trend_series(
+        self, df: pd.DataFrame
+    ) -> Optional[Tuple[pd.Series, pd.Series, pd.Series]]:
+        """Monthly paid income, issued income and costs (millions) computed in pandas."""
+        from datetime import datetime
 
-            # Preparar datos base
-            df_copia = df.copy()
+        # Preparar datos base
+        df_copia = df.copy()
 
-            # Ensure fecha_emision is datetime
-            if "fecha_emision" in df_copia.columns:
-                df_copia["fecha_emision"] = pd.to_datetime(
-                    df_copia["fecha_emision"], errors="coerce"
-                )
-                df_copia["mes"] = df_copia["fecha_emision"].dt.strftime("%Y-%m")
-            else:
-                return self._create_mock_monthly_trend()
+        # Ensure fecha_emision is datetime
+        if "fecha_emision" in df_copia.columns:
+            df_copia["fecha_emision"] = pd.to_datetime(
+                df_copia["fecha_emision"], errors="coerce"
+            )
+            df_copia["mes"] = df_copia["fecha_emision"].dt.strftime("%Y-%m")
+        else:
+            return None
 
-            # Obtener datos de costos reales del CostService
-            df_costs = pd.DataFrame()
-            try:
-                cost_response = self.cost_service.cost_repository.find_all_dataframe()
-                if cost_response.get("success", False):
-                    df_costs = cost_response.get("data", pd.DataFrame())
-                    if not df_costs.empty:
-                        # Procesar datos de costos
-                        if "importe_neto" in df_costs.columns:
-                            df_costs["importe_neto"] = pd.to_numeric(
-                                df_costs["importe_neto"], errors="coerce"
-                            ).fillna(0)
-
-                        # Crear columna de mes para costos
-                        if "fecha_costo" in df_costs.columns:
-                            df_costs["fecha_costo"] = pd.to_datetime(
-                                df_costs["fecha_costo"], errors="coerce"
-                            )
-                            df_costs["mes"] = df_costs["fecha_costo"].dt.strftime(
-                                "%Y-%m"
-                            )
-                        elif "created_at" in df_costs.columns:
-                            df_costs["created_at"] = pd.to_datetime(
-                                df_costs["created_at"], errors="coerce"
+        # Obtener datos de costos reales del CostService
+        df_costs = pd.DataFrame()
+        try:
+            cost_response = self.cost_service.cost_repository.find_all_dataframe()
+            if cost_response.get("success", False):
+                df_costs = cost_response.get("data", pd.DataFrame())
+                if not df_costs.empty:
+                    # Procesar datos de costos
+                    if "importe_neto" in df_costs.columns:
+                        df_costs["importe_neto"] = pd.to_numeric(
+                            df_costs["importe_neto"], errors="coerce"
+                        ).fillna(0)
+
+                    # Crear columna de mes para costos
+                    if "fecha_costo" in df_costs.columns:
+                        df_costs["fecha_costo"] = pd.to_datetime(
+                            df_costs["fecha_costo"], errors="coerce"
+                        )
+                        df_costs["mes"] = df_costs["fecha_costo"].dt.strftime(
+                            "%Y-%m"
+                        )
+                    elif "created_at" in df_costs.columns:
+                        df_costs["created_at"] = pd.to_datetime(
+                            df_costs["created_at"], errors="coerce"
+                        )
+                        df_costs["mes"] = df_costs["created_at"].dt.strftime(
+                            "%Y-%m"
+                        )
+                    else:
+                        # Si no hay fecha de costo, usar fecha de emisión del EDP correspondiente
+                        if "project_id" in df_costs.columns:
+                            proyecto_fechas = df_copia[
+                                ["proyecto", "fecha_emision"]
+                            ].drop_duplicates()
+                            proyecto_fechas.columns = [
+                                "project_id",
+                                "fecha_emision",
+                            ]
+                            df_costs = df_costs.merge(
+                                proyecto_fechas, on="project_id", how="left"
                             )
-                            df_costs["mes"] = df_costs["created_at"].dt.strftime(
+                            df_costs["mes"] = df_costs["fecha_emision"].dt.strftime(
                                 "%Y-%m"
                             )
                         else:
-                            # Si no hay fecha de costo, usar fecha de emisión del EDP correspondiente
-                            if "project_id" in df_costs.columns:
-                                proyecto_fechas = df_copia[
-                                    ["proyecto", "fecha_emision"]
-                                ].drop_duplicates()
-                                proyecto_fechas.columns = [
-                                    "project_id",
-                                    "fecha_emision",
-                                ]
-                                df_costs = df_costs.merge(
-                                    proyecto_fechas, on="project_id", how="left"
-                                )
-                                df_costs["mes"] = df_costs["fecha_emision"].dt.strftime(
-                                    "%Y-%m"
-                                )
-                            else:
-                                # Usar mes actual como fallback
-                                df_costs["mes"] = datetime.now().strftime("%Y-%m")
+                            # Usar mes actual como fallback
+                            df_costs["mes"] = datetime.now().strftime("%Y-%m")
 
-                        logger.info(
-                            f"✅ Loaded {len(df_costs)} cost records for trend analysis"
-                        )
-            except Exception as e:
-                logger.info(f"⚠️ Could not load cost data for trend: {e}")
+                    logger.info(
+                        f"✅ Loaded {len(df_costs)} cost records for trend analysis"
+                    )
+        except Exception as e:
+            logger.info(f"⚠️ Could not load cost data for trend: {e}")
 
-            # ===== CALCULAR MÉTRICAS POR MES =====
+        # ===== CALCULAR MÉTRICAS POR MES =====
 
-            # 1. Ingresos mensuales reales (EDP completados/pagados)
-            df_completados = df_copia[
-                df_copia["estado"].str.strip().isin(["pagado", "validado"])
-            ]
-            ingresos_mensuales = (
-                df_completados.groupby("mes")["monto_aprobado"].sum() / 1_000_000
-            )
+        # 1. Ingresos mensuales reales (EDP completados/pagados)
+        df_completados = df_copia[
+            df_copia["estado"].str.strip().isin(["pagado", "validado"])
+        ]
+        ingresos_mensuales = (
+            df_completados.groupby("mes")["monto_aprobado"].sum() / 1_000_000
+        )
+
+        # 2. Ingresos totales emitidos (todos los EDP)
+        ingresos_emitidos = (
+            df_copia.groupby("mes")["monto_aprobado"].sum() / 1_000_000
+        )
 
-            # 2. Ingresos totales emitidos (todos los EDP)
-            ingresos_emitidos = (
-                df_copia.groupby("mes")["monto_aprobado"].sum() / 1_000_000
+        # 3. Costos reales mensuales
+        costos_mensuales = pd.Series(dtype=float)
+        if (
+            not df_costs.empty
+            and "mes" in df_costs.columns
+            and "importe_neto" in df_costs.columns
+        ):
+            costos_mensuales = (
+                df_costs.groupby("mes")["importe_neto"].sum() / 1_000_000
             )
 
-            # 3. Costos reales mensuales
-            costos_mensuales = pd.Series(dtype=float)
-            if (
-                not df_costs.empty
-                and "mes" in df_costs.columns
-                and "importe_neto" in df_costs.columns
-            ):
-                costos_mensuales = (
-                    df_costs.groupby("mes")["importe_neto"].sum() / 1_000_000
-                )
+        return ingresos_mensuales, ingresos_emitidos, costos_mensuales
+
+    def _monthly_trend_series_from_rollup(
+        self,
+    ) -> Optional[Tuple[pd.Series, pd.Series, pd.Series]]:
+        """Same monthly series read from the SQL KPI rollups; None if unavailable."""
+        rollup_response = self.kpi_repository.get_edp_rollup()
+        if not rollup_response.get("success") or rollup_response["data"].empty:
+            return None
+
+        rollup = rollup_response["data"]
+        rollup = rollup[rollup["mes_emision"] != ""]
+        por_mes = rollup.groupby("mes_emision")
+
+        ingresos_emitidos = por_mes["monto_aprobado"].sum() / 1_000_000
+        pagados = rollup[rollup["estado"].isin(["pagado", "validado"])]
+        ingresos_mensuales = (
+            pagados.groupby("mes_emision")["monto_aprobado"].sum() / 1_000_000
+        )
+
+        cost_response = self.kpi_repository.get_cost_monthly()
+        costos_mensuales = (
+            cost_response["data"] / 1_000_000
+            if cost_response.get("success")
+            else pd.Series(dtype=float)
+        )
+
+        return ingresos_mensuales, ingresos_emitidos, costos_mensuales
+
+    def _build_monthly_trend_chart(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """Build comprehensive monthly financial trend chart with costs and projections."""
+        try:
+            from datetime import datetime, timedelta
+
+            # Series mensuales (millones CLP): rollup SQL si está habilitado, si no pandas
+            series = self._monthly_trend_series_from_rollup() if rollups_enabled() else None
+            if series is None:
+                series = self._monthly_trend_series(df)
+            if series is None:
+                return self._create_mock_monthly_trend()
+            ingresos_mensuales, ingresos_emitidos, costos_mensuales = series
 
             # ===== DETERMINAR PERÍODO (ÚLTIMOS 6 MESES + 3 PROYECCIONES) =====
 
@@ -1738,38 +1808,27 @@ class ManagerService(BaseService):
         return recommendations
 
     def load_related_data(self) -> ServiceResponse:
-        """Load all related data needed for manager dashboard."""
+        """
+        Load all related data needed for manager dashboard.
+
+        Returns a RelatedData container (DataFrames, memoized per request);
+        use `.records(name)` only at the JSON/template boundary.
+        """
         try:
-            # Get EDP data
-            edps_response = self.edp_repo.find_all_dataframe()
+            edps_response = find_all_dataframe_memoized("edps", self.edp_repo)
 
-            # Check if the response has a success key (dictionary)
-            if isinstance(edps_response, dict) and not edps_response.get(
-                "success", False
-            ):
+            if not edps_response.get("success", False):
                 return ServiceResponse(
                     success=False,
                     message=f"Failed to load EDPs data: {edps_response.get('message', 'Unknown error')}",
                     data=None,
                 )
 
-            # Extract the data based on the response type
-            if isinstance(edps_response, dict):
-                edps_data = edps_response.get("data", [])
-            else:
-                # If it's a direct list (for backward compatibility)
-                edps_data = edps_response
-
-            # For now, return just EDP data. In the future, this could include
-            # projects, logs, and other related data
+            # Projects and logs are not needed by the manager views yet
             return ServiceResponse(
                 success=True,
                 message="Related data loaded successfully",
-                data={
-                    "edps": edps_data,
-                    "projects": [],  # TODO: Implement when needed
-                    "logs": [],  # TODO: Implement when needed
-                },
+                data=RelatedData(edps=edps_response.get("data")),
             )
 
         except Exception as e:
@@ -1779,6 +1838,103 @@ class ManagerService(BaseService):
                 data=None,
             )
 
+    def get_classified_edps(self, filters: Optional[Dict[str, Any]] = None) -> ServiceResponse:
+        """
+        Filtered EDP frame with business-rule classification columns, cached per filters.
+
+        Columnas añadidas (calculadas por columna, sin iterrows):
+        - estado_norm: estado en minúsculas y sin espacios
+        - dso_num: dso_actual numérico (NaN si no hay DSO: no cuenta en ningún umbral)
+        - dias: días truncados desde dso_actual; si es 0, días desde fecha_emision
+        - dias_sin_movimiento: dso_actual truncado si es > 0, si no 0
+        - monto: monto_aprobado (o monto_propuesto si no existe la columna)
+        - es_critico / es_aging / es_fast_collection: máscaras de BusinessRules
+        - riesgo: clase categórica (critico > aging > fast_collection > normal)
+        - aging_rango: tramo 0-15 ... 90+ según dias_sin_movimiento
+
+        El frame es compartido: quienes lo usen deben filtrar/copiar, no modificarlo.
+        Se indexa por generación de datos: un cambio de EDPs lo deja obsoleto.
+        """
+        generation = current_data_generation()
+        cache_key = (generation, self._generate_cache_key(filters or {}))
+        now = time.monotonic()
+        with _classified_edp_lock:
+            entry = _classified_edp_cache.get(cache_key)
+        if entry and now - entry[0] < CLASSIFIED_EDP_CACHE_TTL:
+            record_cache("classified_edps", True)
+            return ServiceResponse(success=True, data=entry[1])
+        record_cache("classified_edps", False)
+
+        datos_response = self.load_related_data()
+        if not datos_response.success:
+            return datos_response
+
+        df_edp = datos_response.data.frame("edps")
+        if df_edp.empty:
+            return ServiceResponse(
+                success=False, message="No hay datos de EDPs disponibles", data=None
+            )
+
+        with stage_timer("classified_edps.build"):
+            df_filtered = self._apply_manager_filters(df_edp, filters or {})
+            df = self._classify_edps(self._prepare_kpi_data(df_filtered))
+        df.attrs["total_records"] = len(df_edp)
+
+        with _classified_edp_lock:
+            for key, (ts, _) in list(_classified_edp_cache.items()):
+                if key[0] != generation or now - ts >= CLASSIFIED_EDP_CACHE_TTL:
+                    del _classified_edp_cache[key]
+            # Inserción en orden de llegada: se descartan primero los más antiguos
+            while len(_classified_edp_cache) >= CLASSIFIED_EDP_CACHE_MAX_ENTRIES:
+                del _classified_edp_cache[next(iter(_classified_edp_cache))]
+            _classified_edp_cache[cache_key] = (now, df)
+        return ServiceResponse(success=True, data=df)
+
+    @cpu_bound
+    def _classify_edps(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Add classification columns to a prepared EDP frame (see get_classified_edps)."""
+        df = df.reset_index(drop=True)
+        estado = df["estado"] if "estado" in df.columns else pd.Series("", index=df.index)
+        dso_raw = (
+            pd.to_numeric(df["dso_actual"], errors="coerce")
+            if "dso_actual" in df.columns
+            else pd.Series(np.nan, index=df.index)
+        )
+
+        df["estado_norm"] = estado.fillna("").astype(str).str.strip().str.lower()
+        df["dso_num"] = dso_raw
+
+        # Días desde emisión como respaldo cuando dso_actual no aporta
+        if "fecha_emision" in df.columns:
+            fecha_emision = pd.to_datetime(df["fecha_emision"], errors="coerce")
+            if getattr(fecha_emision.dt, "tz", None) is not None:
+                fecha_emision = fecha_emision.dt.tz_localize(None)
+            dias_emision = (pd.Timestamp(datetime.now()) - fecha_emision).dt.days.fillna(0)
+        else:
+            dias_emision = pd.Series(0, index=df.index)
+
+        dso_trunc = np.trunc(dso_raw.fillna(0))
+        df["dias"] = np.where(dso_trunc != 0, dso_trunc, dias_emision).astype(int)
+        df["dias_sin_movimiento"] = np.where(dso_raw > 0, dso_trunc, 0).astype(int)
+
+        if "monto_aprobado" in df.columns:
+            df["monto"] = df["monto_aprobado"].astype(float)
+        elif "monto_propuesto" in df.columns:
+            df["monto"] = df["monto_propuesto"].astype(float)
+        else:
+            df["monto"] = 0.0
+
+        df["es_critico"] = business_rules.mascara_criticos(df["dso_num"], df["estado_norm"])
+        df["es_aging"] = business_rules.mascara_aging(df["dso_num"], df["estado_norm"])
+        df["es_fast_collection"] = business_rules.mascara_fast_collection(
+            df["dso_num"], df["estado_norm"]
+        )
+        df["riesgo"] = business_rules.clasificar_riesgo(df["dso_num"], df["estado_norm"])
+        df["aging_rango"] = pd.cut(
+            df["dias_sin_movimiento"], bins=AGING_DETAIL_BINS, labels=AGING_DETAIL_LABELS
+        )
+        return df
+
     def get_empty_kpis(self) -> Dict[str, Any]:
         """Get empty KPI structure using centralized KPI service."""
         return self.kpi_service.get_empty_manager_kpis()
@@ -1846,7 +2002,7 @@ class ManagerService(BaseService):
             df_filtered = self._apply_manager_filters(df, filters)
 
             # Calculate KPIs
-            kpis = self._calculate_executive_kpis(df, df_filtered)
+            kpis = self._calculate_executive_kpis(df, df_filtered, filters)
 
             return ServiceResponse(
                 success=True,
@@ -3373,10 +3529,7 @@ class ManagerService(BaseService):
                     f"financials:{filters_hash}",
                 ]
 
-                deleted_count = 0
-                for key in keys_to_delete:
-                    if redis_client.delete(key):
-                        deleted_count += 1
+                deleted_count = unlink_keys(keys_to_delete)
 
                 logger.info(
                     f"✅ Invalidated {deleted_count} cache keys for specific filters"
@@ -3387,9 +3540,7 @@ class ManagerService(BaseService):
 
                 total_deleted = 0
                 for pattern in patterns:
-                    keys = redis_client.keys(pattern)
-                    if keys:
-                        total_deleted += redis_client.delete(*keys)
+                    total_deleted += delete_matching(pattern)
 
                 logger.info(
                     f"✅ Invalidated {total_deleted} cache keys (all dashboard data)"
@@ -3426,9 +3577,7 @@ class ManagerService(BaseService):
 
             total_deleted = 0
             for pattern in patterns:
-                keys = redis_client.keys(pattern)
-                if keys:
-                    total_deleted += redis_client.delete(*keys)
+                total_deleted += delete_matching(pattern)
 
             logger.info(
                 f"✅ Invalidated {total_deleted} cache keys for change type: {change_type}"
@@ -3451,29 +3600,34 @@ class ManagerService(BaseService):
             cache_key = f"manager_dashboard:{filters_hash}"
             cache_meta_key = f"{cache_key}:meta"
 
-            # Check main cache
-            cache_exists = redis_client.exists(cache_key)
-            cache_ttl = redis_client.ttl(cache_key) if cache_exists else -2
-
-            # Check metadata
-            meta_exists = redis_client.exists(cache_meta_key)
+            # Todas las consultas en un solo round trip
+            related_keys = {
+                "kpis": f"kpis:{filters_hash}",
+                "charts": f"charts:{filters_hash}",
+                "financials": f"financials:{filters_hash}",
+                "stale_backup": f"{cache_key}:stale",
+            }
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.ttl(cache_key)
+            pipe.get(cache_meta_key)
+            for key in related_keys.values():
+                pipe.exists(key)
+            cache_ttl, raw_meta, *related_exists = pipe.execute()
+
+            cache_exists = cache_ttl != -2
+            meta_exists = raw_meta is not None
             cache_age = None
 
             if meta_exists:
                 try:
-                    meta_data = json.loads(redis_client.get(cache_meta_key))
+                    meta_data = decode_payload(raw_meta)
                     cache_timestamp = meta_data.get("timestamp", 0)
                     cache_age = datetime.now().timestamp() - cache_timestamp
                 except Exception:
                     pass
 
             # Check related cache
-            related_cache = {
-                "kpis": redis_client.exists(f"kpis:{filters_hash}"),
-                "charts": redis_client.exists(f"charts:{filters_hash}"),
-                "financials": redis_client.exists(f"financials:{filters_hash}"),
-                "stale_backup": redis_client.exists(f"{cache_key}:stale"),
-            }
+            related_cache = dict(zip(related_keys, related_exists))
 
             return {
                 "redis_available": True,
@@ -1,6 +1,10 @@
 """
 Service for Project Manager (Jefe de Proyecto) business logic.
 Handles calculations and data processing for project manager views.
+
+El dashboard de cada jefe de proyecto se arma una vez por generación de datos
+(ver cache_invalidation_service.current_data_generation) a partir de un solo
+DataFrame filtrado, y cada endpoint lee su sección del view model cacheado.
 """
 
 from typing import Dict, List, Any, Optional, Tuple
@@ -8,15 +12,35 @@ from datetime import datetime, timedelta
 from ..repositories.project_manager_repository import ProjectManagerRepository
 from ..repositories.edp_repository import EDPRepository
 from ..services.analytics_service import AnalyticsService
+from ..services.cache_invalidation_service import current_data_generation
 from ..services.kpi_service import KPIService
 from ..utils.date_utils import DateUtils
 from ..utils.format_utils import FormatUtils
+from ..utils.instrumentation import record_cache, stage_timer
 import pandas as pd
 import logging
+import os
+import threading
+import time
 import traceback
 
 logger = logging.getLogger(__name__)
 
+MANAGER_VIEW_CACHE_TTL = int(os.getenv("MANAGER_VIEW_CACHE_TTL", "300"))
+REVISION_INDICATORS = ['revision', 'corrección', 'error', 'cambio', 'modificación', 'ajuste']
+
+# (jefe_proyecto, generación) -> (timestamp, view model)
+_manager_view_cache: Dict[Tuple[str, str], Tuple[float, Dict[str, Any]]] = {}
+_manager_view_lock = threading.Lock()
+
+
+def _monto_pagado(df: pd.DataFrame) -> pd.Series:
+    if df['monto_pagado'].sum() == 0:
+        estados = df['estado'].astype(str).str.lower()
+        return df['monto_aprobado'].where(estados.isin(['pagado', 'validado']), 0)
+    return df['monto_pagado']
+
+
 class ProjectManagerService:
     """Service class for project manager business logic."""
 
@@ -29,53 +53,80 @@ class ProjectManagerService:
     def get_dashboard_data(self, manager_name: str) -> Dict[str, Any]:
         """Get comprehensive dashboard data for a project manager."""
         try:
-            # Get basic manager data
-            manager_summary = self.pm_repo.get_manager_summary(manager_name)
-            projects_by_status = self.pm_repo.get_projects_by_status(manager_name)
-            financial_metrics = self.pm_repo.get_financial_metrics(manager_name)
-            
-            # Calculate KPIs
-            kpis = self._calculate_manager_kpis(manager_name)
-            
-            # Get project performance data
-            project_performance = self._get_project_performance(manager_name)
-            
-            # Get team metrics
-            team_performance = self.pm_repo.get_team_performance(manager_name)
-            
-            # Calculate trends
-            trends = self._calculate_trends(manager_name)
-            
-            # Get alerts and notifications
-            alerts = self._generate_alerts(manager_name, manager_summary, projects_by_status)
-            
-            # Get pending EDPs for validation (enviado y revisión)
-            pending_edps = self.pm_repo.get_pending_edps_for_validation(manager_name)
-            
-            return {
-                'manager_name': manager_name,
-                'summary': manager_summary,
-                'projects_by_status': projects_by_status,
-                'financial_metrics': financial_metrics,
-                'kpis': kpis,
-                'project_performance': project_performance,
-                'team_performance': team_performance,
-                'trends': trends,
-                'alerts': alerts,
-                'pending_edps': pending_edps,
-                'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-            
+            return dict(self._get_manager_view(manager_name)['dashboard'])
         except Exception as e:
             logger.error(f"Error getting dashboard data for {manager_name}: {str(e)}")
             return {}
 
-    def _calculate_manager_kpis(self, manager_name: str) -> Dict[str, Any]:
+    def get_dashboard_section(self, manager_name: str, section: str, default: Any = None) -> Any:
+        """Sección del dashboard (kpis, alerts, project_performance, ...) sin copiar el resto."""
+        try:
+            return self._get_manager_view(manager_name)['dashboard'].get(section, default)
+        except Exception as e:
+            logger.error(f"Error getting dashboard section {section} for {manager_name}: {str(e)}")
+            return default
+
+    def _get_manager_view(self, manager_name: str) -> Dict[str, Any]:
+        """
+        View model del jefe de proyecto para la generación de datos vigente.
+
+        Un cambio de datos cambia la generación, así que las entradas viejas no
+        se vuelven a leer; el TTL acota datos que cambien fuera de la app.
+        """
+        generation = current_data_generation()
+        cache_key = (manager_name, generation)
+        now = time.time()
+        with _manager_view_lock:
+            entry = _manager_view_cache.get(cache_key)
+        if entry and now - entry[0] < MANAGER_VIEW_CACHE_TTL:
+            record_cache("manager_view", True)
+            return entry[1]
+        record_cache("manager_view", False)
+
+        with stage_timer("manager_view.build"):
+            view = self._build_manager_view(manager_name)
+        with _manager_view_lock:
+            for key in [key for key in _manager_view_cache if key[1] != generation]:
+                del _manager_view_cache[key]
+            _manager_view_cache[cache_key] = (now, view)
+        return view
+
+    def _build_manager_view(self, manager_name: str) -> Dict[str, Any]:
+        """Arma dashboard y equipo desde una sola lectura de los EDPs del jefe."""
+        df = self.pm_repo.get_manager_frame(manager_name)
+        projects_cost = self.pm_repo.get_projects_cost(manager_name)
+
+        # Get basic manager data
+        manager_summary = self.pm_repo.get_manager_summary(manager_name, df=df)
+        projects_by_status = self.pm_repo.get_projects_by_status(manager_name, df=df)
+        financial_metrics = self.pm_repo.get_financial_metrics(manager_name, df=df)
+
+        # Get team metrics
+        team_performance = self.pm_repo.get_team_performance(manager_name, df=df)
+
+        dashboard = {
+            'manager_name': manager_name,
+            'summary': manager_summary,
+            'projects_by_status': projects_by_status,
+            'financial_metrics': financial_metrics,
+            'kpis': self._calculate_manager_kpis(manager_name, df, projects_cost),
+            'project_performance': self._get_project_performance(manager_name, df),
+            'team_performance': team_performance,
+            'trends': self._calculate_trends(manager_name, df),
+            'alerts': self._generate_alerts(manager_name, manager_summary, projects_by_status),
+            # Get pending EDPs for validation (enviado y revisión)
+            'pending_edps': self.pm_repo.get_pending_edps_for_validation(manager_name, df=df),
+            'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        return {
+            'dashboard': dashboard,
+            'team': self._build_team_dashboard(manager_name, team_performance, projects_cost),
+        }
+
+    def _calculate_manager_kpis(self, manager_name: str, df: pd.DataFrame, projects_cost: float) -> Dict[str, Any]:
         """Calculate key performance indicators for the project manager."""
         try:
-            proyectos = self.pm_repo.get_manager_projects(manager_name)
-            projects_cost = self.pm_repo.get_projects_cost(manager_name)
-            df = pd.DataFrame(proyectos)
+            df = df.copy()
             if df.empty:
                 return {
                     'project_efficiency': 0,
@@ -92,30 +143,25 @@ class ProjectManagerService:
                 df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
             if "estado" not in df.columns:
                 df["estado"] = ""
-            if 'monto_pagado' not in df.columns or df['monto_pagado'].sum() == 0:
-                df["monto_pagado"] = df.apply(
-                    lambda row: row["monto_aprobado"] if str(row["estado"]).lower() in ["pagado", "validado"] else 0, axis=1
-                )
+            df["monto_pagado"] = _monto_pagado(df)
             # Project Efficiency (% of projects on time)
             on_time_projects = 0
             total_completed = 0
             if 'fecha_emision' in df.columns and 'fecha_envio_conformidad' in df.columns:
-                for _, row in df.iterrows():
-                    if str(row['estado']).lower() in ['pagado', 'conformado']:
-                        total_completed += 1
-                        fecha_creacion = row.get('fecha_emision')
-                        fecha_pago = row.get('fecha_envio_conformidad')
-                        if pd.notnull(fecha_creacion) and pd.notnull(fecha_pago):
-                            days = (fecha_pago - fecha_creacion).days
-                            if days <= 45:
-                                on_time_projects += 1
+                completed = df[df['estado'].astype(str).str.lower().isin(['pagado', 'conformado'])]
+                total_completed = len(completed)
+                days = (
+                    pd.to_datetime(completed['fecha_envio_conformidad'], errors='coerce')
+                    - pd.to_datetime(completed['fecha_emision'], errors='coerce')
+                ).dt.days
+                on_time_projects = int((days <= 45).sum())
             project_efficiency = (on_time_projects / total_completed * 100) if total_completed > 0 else 0
             # Budget Performance (approved vs proposed)
             total_proposed = df['monto_propuesto'].sum()
             total_approved = df['monto_aprobado'].sum()
             budget_performance = (total_approved / total_proposed * 100) if total_proposed > 0 else 0
             # Time Performance (average processing days vs target)
-            avg_processing = df['dso_actual'].mean() if 'dso_actual' in df.columns else 0
+            avg_processing = df['dso_actual'].mean()
             target_days = 45
             time_performance = max(0, 100 - ((avg_processing - target_days) / target_days * 100))
             # Quality Score (based on rework rate)
@@ -126,7 +172,6 @@ class ProjectManagerService:
             total_costs = projects_cost
             
             profit_margin = (total_approved - total_costs) / total_costs * 100 if total_costs > 0 else 0
-            print(f'Total costs: {total_costs}')
             return {
                 'project_efficiency': round(project_efficiency, 1),
                 'budget_performance': round(min(100, budget_performance), 1),
@@ -147,57 +192,53 @@ class ProjectManagerService:
         try:
             if df.empty:
                 return 0
-            revision_count = 0
-            total_edps = len(df)
-            for _, row in df.iterrows():
-                observaciones = str(row.get('observaciones', '')).lower()
-                descripcion = str(row.get('descripcion', '')).lower() if 'descripcion' in row else ''
-                revision_indicators = ['revision', 'corrección', 'error', 'cambio', 'modificación', 'ajuste']
-                if any(indicator in observaciones or indicator in descripcion for indicator in revision_indicators):
-                    revision_count += 1
-            rework_rate = revision_count / total_edps if total_edps > 0 else 0
+            pattern = '|'.join(REVISION_INDICATORS)
+            has_revision = pd.Series(False, index=df.index)
+            for column in ['observaciones', 'descripcion']:
+                if column in df.columns:
+                    text = df[column].fillna('').astype(str).str.lower()
+                    has_revision |= text.str.contains(pattern, regex=True)
+            rework_rate = has_revision.mean()
             quality_score = max(0, 100 - (rework_rate * 100))
             return quality_score
         except Exception as e:
             logger.error(f"Error calculating quality score: {str(e)}")
             return 75
 
-    def _get_project_performance(self, manager_name: str) -> List[Dict[str, Any]]:
+    def _get_project_performance(self, manager_name: str, df: pd.DataFrame) -> List[Dict[str, Any]]:
         """Get performance metrics for all projects under the manager."""
         try:
-            proyectos = self.pm_repo.get_manager_projects(manager_name)
-            df = pd.DataFrame(proyectos)
             if df.empty or 'proyecto' not in df.columns:
                 return []
+            df = df.copy()
             for col in ["monto_propuesto", "monto_aprobado", "monto_pagado", "dso_actual"]:
                 if col not in df.columns:
                     df[col] = 0
                 df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
             if "estado" not in df.columns:
                 df["estado"] = ""
-            if 'monto_pagado' not in df.columns or df['monto_pagado'].sum() == 0:
-                df["monto_pagado"] = df.apply(
-                    lambda row: row["monto_aprobado"] if str(row["estado"]).lower() in ["pagado", "validado"] else 0, axis=1
-                )
+            df["monto_pagado"] = _monto_pagado(df)
+            grouped = df.groupby('proyecto').agg(
+                total_edps=('proyecto', 'size'),
+                total_proposed=('monto_propuesto', 'sum'),
+                total_approved=('monto_aprobado', 'sum'),
+                total_paid=('monto_pagado', 'sum'),
+                avg_processing=('dso_actual', 'mean'),
+            )
             project_performance = []
-            for project_name, group in df.groupby('proyecto'):
-                total_edps = len(group)
-                total_proposed = group['monto_propuesto'].sum()
-                total_approved = group['monto_aprobado'].sum()
-                total_paid = group['monto_pagado'].sum()
-                avg_processing = group['dso_actual'].mean() if 'dso_actual' in group.columns else 0
-                completion_rate = (total_paid / total_approved * 100) if total_approved > 0 else 0
+            for project_name, row in grouped.iterrows():
+                completion_rate = (row.total_paid / row.total_approved * 100) if row.total_approved > 0 else 0
                 progress_class = 'green' if completion_rate >= 90 else 'amber' if completion_rate >= 60 else 'red'
                 status = 'completed' if completion_rate >= 99 else 'in_progress' if completion_rate >= 60 else 'pending'
                 project_performance.append({
                     'project_name': project_name,
-                    'total_edps': int(total_edps),
-                    'total_proposed': float(total_proposed),
-                    'total_approved': float(total_approved),
-                    'total_paid': float(total_paid),
-                    'pending_amount': float(total_approved - total_paid),
+                    'total_edps': int(row.total_edps),
+                    'total_proposed': float(row.total_proposed),
+                    'total_approved': float(row.total_approved),
+                    'total_paid': float(row.total_paid),
+                    'pending_amount': float(row.total_approved - row.total_paid),
                     'completion_rate': round(completion_rate, 1),
-                    'avg_processing_days': round(avg_processing, 1),
+                    'avg_processing_days': round(row.avg_processing, 1),
                     'progress_class': progress_class,
                     'status': status
                 })
@@ -226,62 +267,57 @@ class ProjectManagerService:
         else:
             return 'danger'
 
-    def _calculate_trends(self, manager_name: str) -> Dict[str, Any]:
+    def _calculate_trends(self, manager_name: str, df: pd.DataFrame) -> Dict[str, Any]:
         """Calculate trend data for the manager's metrics."""
         try:
-            projects = self.pm_repo.get_manager_projects(manager_name)
-            
+            empty_month = {
+                'edps_sent': 0,
+                'edps_approved': 0,
+                'edps_paid': 0,
+                'amount_proposed': 0,
+                'amount_approved': 0,
+                'amount_paid': 0
+            }
+
             # Group by month for trend analysis
             monthly_data = {}
-            
-            for edp in projects:
-                # Handle both dict and object formats
-                if hasattr(edp, '__dict__'):
-                    edp_data = edp.__dict__
-                else:
-                    edp_data = edp
-                
+            if not df.empty:
                 # Try different date field names
-                fecha_emision = edp_data.get('fecha_emision') or edp_data.get('Fecha_Creacion')
-                
-                # Parse date if it's a string
-                if fecha_emision:
-                    if isinstance(fecha_emision, str):
-                        try:
-                            fecha_emision = datetime.strptime(fecha_emision, '%Y-%m-%d')
-                        except ValueError:
-                            try:
-                                fecha_emision = datetime.strptime(fecha_emision, '%Y-%m-%d %H:%M:%S')
-                            except ValueError:
-                                continue
-                    
-                    if isinstance(fecha_emision, datetime):
-                        month_key = fecha_emision.strftime('%Y-%m')
-                        
-                        if month_key not in monthly_data:
-                            monthly_data[month_key] = {
-                                'edps_sent': 0,
-                                'edps_approved': 0,
-                                'edps_paid': 0,
-                                'amount_proposed': 0,
-                                'amount_approved': 0,
-                                'amount_paid': 0
-                            }
-                        
-                        # Count EDPs sent (created)
-                        monthly_data[month_key]['edps_sent'] += 1
-                        monthly_data[month_key]['amount_proposed'] += float(edp_data.get('monto_propuesto', 0) or 0)
-                        
-                        # Count EDPs approved
-                        estado = str(edp_data.get('estado', '')).lower()
-                        if estado in ['validado', 'pagado', 'enviado']:
-                            monthly_data[month_key]['edps_approved'] += 1
-                            monthly_data[month_key]['amount_approved'] += float(edp_data.get('monto_aprobado', 0) or 0)
-                        
-                        # Count EDPs paid
-                        if estado in ['pagado', 'validado']:
-                            monthly_data[month_key]['edps_paid'] += 1
-                            monthly_data[month_key]['amount_paid'] += float(edp_data.get('monto_aprobado', 0) or 0)
+                fecha = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+                for column in ['fecha_emision', 'Fecha_Creacion']:
+                    if column in df.columns:
+                        fecha = fecha.fillna(pd.to_datetime(df[column], errors='coerce'))
+
+                def _monto(column: str) -> pd.Series:
+                    if column not in df.columns:
+                        return pd.Series(0.0, index=df.index)
+                    return pd.to_numeric(df[column], errors='coerce').fillna(0)
+
+                estado = df['estado'].astype(str).str.lower() if 'estado' in df.columns else pd.Series('', index=df.index)
+                approved = estado.isin(['validado', 'pagado', 'enviado'])
+                paid = estado.isin(['pagado', 'validado'])
+                monto_aprobado = _monto('monto_aprobado')
+                frame = pd.DataFrame({
+                    'month_key': fecha.dt.strftime('%Y-%m'),
+                    'edps_sent': 1,
+                    'edps_approved': approved.astype(int),
+                    'edps_paid': paid.astype(int),
+                    'amount_proposed': _monto('monto_propuesto'),
+                    'amount_approved': monto_aprobado.where(approved, 0),
+                    'amount_paid': monto_aprobado.where(paid, 0),
+                })[fecha.notna()]
+                monthly = frame.groupby('month_key').sum()
+                monthly_data = {
+                    month_key: {
+                        'edps_sent': int(row.edps_sent),
+                        'edps_approved': int(row.edps_approved),
+                        'edps_paid': int(row.edps_paid),
+                        'amount_proposed': float(row.amount_proposed),
+                        'amount_approved': float(row.amount_approved),
+                        'amount_paid': float(row.amount_paid)
+                    }
+                    for month_key, row in monthly.iterrows()
+                }
             
             # Get last 6 months
             current_date = datetime.now()
@@ -298,14 +334,7 @@ class ProjectManagerService:
                 month_key = month_date.strftime('%Y-%m')
                 month_name = month_names.get(month_date.month, month_date.strftime('%b'))
                 
-                data = monthly_data.get(month_key, {
-                    'edps_sent': 0,
-                    'edps_approved': 0,
-                    'edps_paid': 0,
-                    'amount_proposed': 0,
-                    'amount_approved': 0,
-                    'amount_paid': 0
-                })
+                data = monthly_data.get(month_key, empty_month)
                 
                 last_6_months.append({
                     'month': month_name,
@@ -397,8 +426,14 @@ class ProjectManagerService:
     def get_team_dashboard(self, manager_name: str) -> Dict[str, Any]:
         """Get team performance dashboard data with cost management."""
         try:
-            team_performance = self.pm_repo.get_team_performance(manager_name)
-            
+            return dict(self._get_manager_view(manager_name)['team'])
+        except Exception as e:
+            logger.error(f"Error getting team dashboard for {manager_name}: {str(e)}")
+            return {}
+
+    def _build_team_dashboard(self, manager_name: str, team_performance: Dict,
+                              total_project_costs: float) -> Dict[str, Any]:
+        try:
             # Ensure team_performance values are JSON serializable
             team_performance = self._ensure_json_serializable(team_performance)
             
@@ -412,7 +447,7 @@ class ProjectManagerService:
             }
             
             # Get cost data for team analysis
-            team_cost_data = self._get_team_cost_analysis(manager_name, team_performance)
+            team_cost_data = self._get_team_cost_analysis(manager_name, team_performance, total_project_costs)
             
             if team_performance:
                 efficiencies = [float(member['efficiency_score']) for member in team_performance.values()]
@@ -467,15 +502,10 @@ class ProjectManagerService:
         else:
             return obj
 
-    def _get_team_cost_analysis(self, manager_name: str, team_performance: Dict) -> Dict[str, Any]:
+    def _get_team_cost_analysis(self, manager_name: str, team_performance: Dict,
+                                total_project_costs: float) -> Dict[str, Any]:
         """Analyze cost metrics for team members."""
         try:
-            from ..repositories.cost_repository import CostRepository
-            cost_repo = CostRepository()
-            
-            # Get total project costs for manager
-            total_project_costs = cost_repo.get_cost_by_manager(manager_name)
-            
             # Define average monthly salaries by role (in pesos)
             SALARY_DATA = {
                 'inspector_senior': 2_800_000,
@@ -730,7 +760,7 @@ class ProjectManagerService:
                             df = df[df[key].astype(str).str.contains(value, case=False, na=False)]
             
             # Get kanban data using the kanban service
-            kanban_response = kanban_service.get_kanban_board_data(df, filters or {})
+            kanban_response = kanban_service.get_kanban_board_data(df, filters or {}, page_size=None)
             
             if not kanban_response.success:
                 logger.error(f"Error getting kanban data: {kanban_response.message}")
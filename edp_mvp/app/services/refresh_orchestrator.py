@@ -0,0 +1,207 @@
+"""
+Refresh orchestrator - recálculo de caches en Celery disparado por cambios.
+
+El beat recalculaba KPIs, kanban, cashflow, analytics y los dashboards
+precalculados cada 5 a 30 minutos, hubiera o no cambios, y una edición real
+esperaba hasta el siguiente tick. Aquí cada cambio de datos
+(CacheInvalidationService.register_data_change, update_row, append_edp)
+programa solo las tareas de las familias de cache afectadas:
+
+- Debounce: la primera petición programa la tarea con REFRESH_DEBOUNCE_SECONDS
+  de espera y las siguientes dentro de esa ventana se descartan (SET NX en
+  Redis, compartido entre workers). La tarea libera la marca al empezar, así
+  un cambio durante el recálculo programa otro.
+- El beat queda como red de seguridad de baja frecuencia: una ejecución
+  programada por beat se omite si la generación de datos no cambió desde el
+  último recálculo de esa tarea, de modo que los periodos sin cambios no
+  cuestan nada.
+
+Uso:
+
+    schedule_refresh_for_data(["edps"])  # desde una escritura
+
+    generation = begin_refresh("refresh_kanban_metrics", trigger)  # en la tarea
+    if generation is None:
+        return {"skipped": True}
+    ...
+    finish_refresh("refresh_kanban_metrics", generation)
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+from ..utils.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+REFRESH_ON_CHANGE_ENABLED = os.getenv("REFRESH_ON_CHANGE_ENABLED", "true").lower() == "true"
+REFRESH_DEBOUNCE_SECONDS = int(os.getenv("REFRESH_DEBOUNCE_SECONDS", "10"))
+# Intervalo del beat como red de seguridad (antes 300-3600s por tarea)
+REFRESH_SAFETY_NET_SECONDS = int(os.getenv("REFRESH_SAFETY_NET_SECONDS", "3600"))
+
+TRIGGER_CHANGE = "change"
+TRIGGER_BEAT = "beat"
+
+PENDING_KEY = "refresh:pending:{task}"
+GENERATION_KEY = "refresh:generation:{task}"
+
+# Familia de cache -> tipos de dato de los que depende (también la usa
+# CacheInvalidationService para decidir qué invalidar)
+CACHE_DEPENDENCIES: Dict[str, List[str]] = {
+    'manager_dashboard': ['edps', 'projects', 'costs'],
+    'kpis': ['edps', 'projects'],
+    'charts': ['edps', 'projects', 'costs'],
+    'financials': ['edps', 'costs'],
+    'analytics': ['edps', 'projects'],
+    'kanban': ['edps'],
+    'cashflow': ['edps', 'costs'],
+}
+
+# Familia de cache -> tareas de tasks/metrics que la recalculan
+REFRESH_TASKS: Dict[str, List[str]] = {
+    'manager_dashboard': ['precompute_dashboard_variants'],
+    'charts': ['precompute_dashboard_variants'],
+    'financials': ['precompute_dashboard_variants'],
+    'kpis': ['refresh_executive_kpis', 'refresh_all_kpis'],
+    'analytics': ['refresh_global_analytics'],
+    'kanban': ['refresh_kanban_metrics'],
+    'cashflow': ['refresh_cashflow'],
+}
+
+# Tabla de Supabase -> tipo de dato
+TABLE_DATA_TYPES = {
+    'edp': 'edps',
+    'projects': 'projects',
+    'cost_header': 'costs',
+    'cost_lines': 'costs',
+}
+
+# Fallback sin Redis: tarea -> vencimiento de la marca / última generación
+_local_pending: Dict[str, float] = {}
+_local_generations: Dict[str, str] = {}
+_local_lock = threading.Lock()
+
+
+def cache_types_for(data_types: Iterable[str]) -> Set[str]:
+    """Familias de cache que dependen de alguno de los tipos de dato."""
+    data_types = set(data_types)
+    return {
+        cache_type
+        for cache_type, dependencies in CACHE_DEPENDENCIES.items()
+        if data_types & set(dependencies)
+    }
+
+
+def _claim(task_name: str, delay: int) -> bool:
+    """Marcar la tarea como programada; False si ya lo estaba."""
+    ttl = max(delay * 4, 60)
+    if redis_client:
+        try:
+            return bool(redis_client.set(PENDING_KEY.format(task=task_name), "1", nx=True, ex=ttl))
+        except Exception as e:
+            logger.warning(f"⚠️ Debounce de {task_name} sin Redis: {e}")
+    now = time.time()
+    with _local_lock:
+        if _local_pending.get(task_name, 0) > now:
+            return False
+        _local_pending[task_name] = now + ttl
+        return True
+
+
+def _release(task_name: str) -> None:
+    with _local_lock:
+        _local_pending.pop(task_name, None)
+    if redis_client:
+        try:
+            redis_client.delete(PENDING_KEY.format(task=task_name))
+        except Exception as e:
+            logger.debug(f"No se pudo liberar la marca de {task_name}: {e}")
+
+
+def schedule_refresh(cache_types: Iterable[str], delay: int = REFRESH_DEBOUNCE_SECONDS) -> List[str]:
+    """
+    Programar, con debounce, las tareas que recalculan estas familias de
+    cache. Devuelve las tareas efectivamente encoladas.
+    """
+    # El broker de Celery es el mismo Redis: sin él no hay a quién encolar
+    if not REFRESH_ON_CHANGE_ENABLED or not redis_client:
+        return []
+
+    task_names = sorted({task for cache_type in cache_types for task in REFRESH_TASKS.get(cache_type, [])})
+    scheduled = []
+    for task_name in task_names:
+        if not _claim(task_name, delay):
+            continue
+        try:
+            from ..tasks import metrics
+
+            getattr(metrics, task_name).apply_async(
+                kwargs={"trigger": TRIGGER_CHANGE}, countdown=delay
+            )
+            scheduled.append(task_name)
+        except Exception as e:
+            # Sin broker la tarea no corre; liberar para reintentar en el próximo cambio
+            _release(task_name)
+            logger.warning(f"⚠️ No se pudo programar {task_name}: {e}")
+
+    if scheduled:
+        logger.info(f"🔄 Recálculo programado en {delay}s: {', '.join(scheduled)}")
+    return scheduled
+
+
+def schedule_refresh_for_data(data_types: Iterable[str], delay: int = REFRESH_DEBOUNCE_SECONDS) -> List[str]:
+    """Programar el recálculo de los caches que dependen de estos tipos de dato."""
+    return schedule_refresh(cache_types_for(data_types), delay)
+
+
+def schedule_refresh_for_table(table_name: str) -> List[str]:
+    """Programar el recálculo tras escribir en una tabla de Supabase."""
+    data_type = TABLE_DATA_TYPES.get(table_name)
+    return schedule_refresh_for_data([data_type]) if data_type else []
+
+
+def _last_generation(task_name: str):
+    if redis_client:
+        try:
+            value = redis_client.get(GENERATION_KEY.format(task=task_name))
+            return value.decode() if isinstance(value, bytes) else value
+        except Exception as e:
+            logger.debug(f"No se pudo leer la generación de {task_name}: {e}")
+    with _local_lock:
+        return _local_generations.get(task_name)
+
+
+def begin_refresh(task_name: str, trigger: str = TRIGGER_BEAT) -> Optional[str]:
+    """
+    Llamar al inicio de una tarea de recálculo. Libera la marca de debounce y
+    devuelve la generación de datos que se va a recalcular, o None si es una
+    ejecución de beat sin cambios desde el último recálculo.
+    """
+    from .cache_invalidation_service import current_data_generation
+
+    _release(task_name)
+    generation = current_data_generation()
+    if trigger == TRIGGER_BEAT and _last_generation(task_name) == generation:
+        logger.info(f"⏭️ {task_name}: sin cambios de datos desde el último recálculo")
+        return None
+    return generation
+
+
+def finish_refresh(task_name: str, generation: str) -> None:
+    """
+    Registrar la generación recalculada. Se usa la leída al empezar: un
+    cambio durante el recálculo deja la tarea pendiente para el beat.
+    """
+    with _local_lock:
+        _local_generations[task_name] = generation
+    if redis_client:
+        try:
+            # Con TTL: si la marca se pierde, el beat vuelve a recalcular
+            redis_client.setex(
+                GENERATION_KEY.format(task=task_name), REFRESH_SAFETY_NET_SECONDS * 24, generation
+            )
+        except Exception as e:
+            logger.debug(f"No se pudo guardar la generación de {task_name}: {e}")
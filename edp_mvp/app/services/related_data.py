@@ -0,0 +1,125 @@
+"""
+Contenedor columnar para los datos relacionados (EDPs, proyectos, logs).
+
+`load_related_data()` devuelve un RelatedData en lugar de un dict de listas:
+cada tabla se mantiene como DataFrame tipado y solo se convierte a registros
+(lista de dicts) cuando se pide explícitamente con `.records(nombre)`, en el
+borde JSON/plantilla. Se comporta como un Mapping, así que el código existente
+`pd.DataFrame(datos.get("edps", []))` sigue funcionando sin copiar filas.
+
+Dentro de un request de Flask las tablas se memorizan en `flask.g`: varias
+llamadas a `load_related_data()` (p.ej. la vista y `get_classified_edps`)
+leen cada tabla una sola vez. El memo se descarta al terminar el request o al
+registrar un cambio de datos (CacheInvalidationService.register_data_change).
+"""
+
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+from flask import g, has_request_context
+
+from ..utils.json_serialization import dataframe_to_records
+from ..utils.instrumentation import record_cache
+
+_MEMO_ATTR = "_related_data_frames"
+
+
+class RelatedData(Mapping):
+    """
+    Tablas relacionadas como DataFrames, con conversión a registros perezosa.
+
+    Los DataFrames son compartidos dentro del request: quien necesite
+    modificarlos debe trabajar sobre una copia.
+    """
+
+    TABLES = ("edps", "projects", "logs")
+
+    def __init__(self, **frames: Optional[pd.DataFrame]):
+        self._frames: Dict[str, pd.DataFrame] = {
+            name: _as_frame(frames.get(name)) for name in self.TABLES
+        }
+        self._records: Dict[str, List[Dict[str, Any]]] = {}
+
+    def __getitem__(self, name: str) -> pd.DataFrame:
+        return self._frames[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._frames)
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def frame(self, name: str) -> pd.DataFrame:
+        """
+        DataFrame de una tabla (vacío si no se cargó).
+
+        Copia profunda: el llamador puede modificarla (columnas o celdas) sin
+        tocar el memo del request. Para lectura sin copia, usar `datos[nombre]`.
+        """
+        return self._frames.get(name, pd.DataFrame()).copy()
+
+    def records(self, name: str) -> List[Dict[str, Any]]:
+        """Registros JSON-friendly de una tabla, convertidos una sola vez."""
+        if name not in self._records:
+            self._records[name] = dataframe_to_records(self._frames.get(name))
+        return self._records[name]
+
+    def to_dict(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Forma histórica {tabla: [registros]} para respuestas JSON."""
+        return {name: self.records(name) for name in self.TABLES}
+
+
+def _as_frame(data: Any) -> pd.DataFrame:
+    if data is None:
+        return pd.DataFrame()
+    if isinstance(data, pd.DataFrame):
+        return data
+    return pd.DataFrame(data)
+
+
+def _request_memo() -> Optional[Dict[str, pd.DataFrame]]:
+    # Fuera de un request (Celery, scripts) no se memoriza
+    if not has_request_context():
+        return None
+    memo = getattr(g, _MEMO_ATTR, None)
+    if memo is None:
+        memo = {}
+        setattr(g, _MEMO_ATTR, memo)
+    return memo
+
+
+def find_all_dataframe_memoized(name: str, repository) -> Dict[str, Any]:
+    """
+    `repository.find_all_dataframe()` memorizado por request.
+
+    Devuelve la misma estructura {'success', 'data', 'message'} del repositorio,
+    con una copia superficial del frame memorizado; solo se memorizan las
+    lecturas exitosas.
+    """
+    memo = _request_memo()
+    if memo is not None and name in memo:
+        record_cache("related_data_request", True)
+        return {
+            "success": True,
+            "data": memo[name].copy(deep=False),
+            "message": f"{name} (request memo)",
+        }
+    if memo is not None:
+        record_cache("related_data_request", False)
+
+    response = repository.find_all_dataframe()
+    if not isinstance(response, dict):
+        # Repositorios antiguos devuelven la lista/DataFrame directamente
+        response = {"success": True, "data": response, "message": ""}
+
+    if memo is not None and response.get("success", False):
+        memo[name] = _as_frame(response.get("data"))
+        response["data"] = memo[name].copy(deep=False)
+    return response
+
+
+def clear_request_memo() -> None:
+    """Olvidar las tablas memorizadas del request actual (tras escrituras)."""
+    if has_request_context() and hasattr(g, _MEMO_ATTR):
+        delattr(g, _MEMO_ATTR)
@@ -7,6 +7,8 @@ from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
 from enum import Enum
 
+from ..utils.business_calendar import is_business_day
+
 logger = logging.getLogger(__name__)
 
 class AlertAction(Enum):
@@ -168,8 +170,8 @@ class SmartAlertService:
         """Verifica si estamos en horario laboral"""
         now = datetime.now()
         current_hour = now.hour
-        # Solo lunes a viernes
-        if now.weekday() >= 5:  # 5 = sábado, 6 = domingo
+        # Solo días hábiles: lunes a viernes sin feriados
+        if not is_business_day(now):
             return False
         
         return self.business_hours[0] <= current_hour < self.business_hours[1]
@@ -10,20 +10,16 @@ from typing import List, Dict, Any, Optional, Union
 from datetime import datetime, timedelta
 import pandas as pd
 import requests
+import time
 from concurrent.futures import ThreadPoolExecutor
 import logging
 
-# Redis para cache
-try:
-    import redis
-    redis_url = os.getenv("REDIS_URL")
-    redis_client = redis.from_url(redis_url) if redis_url else None
-    if redis_client:
-        redis_client.ping()
-        print("✅ Redis disponible para cache de Supabase")
-except (ImportError, Exception) as e:
-    redis_client = None
-    print(f"⚠️ Redis no disponible para cache: {e}")
+from ..utils.instrumentation import record_cache, record_supabase_request
+
+from ..utils.redis_client import redis_client
+from ..utils.cache_codec import decode_payload, encode_payload
+from ..utils.cache_inspector import delete_matching, namespace_of, record_lookup
+from ..utils.json_serialization import encode_default
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -75,8 +71,10 @@ class SupabaseService:
         if redis_client:
             try:
                 cached_data = redis_client.get(cache_key)
+                record_cache("supabase_redis", bool(cached_data))
+                record_lookup(namespace_of(cache_key), bool(cached_data))
                 if cached_data:
-                    return json.loads(cached_data)
+                    return decode_payload(cached_data)
             except Exception as e:
                 logger.warning(f"Error leyendo cache Redis: {e}")
         
@@ -84,10 +82,12 @@ class SupabaseService:
         if cache_key in self._cache:
             timestamp, data = self._cache[cache_key]
             if datetime.now().timestamp() - timestamp < self.cache_timeout:
+                record_cache("supabase_memory", True)
                 return data
             else:
                 del self._cache[cache_key]
         
+        record_cache("supabase_memory", False)
         return None
     
     def _set_cache(self, cache_key: str, data: Any, ttl: int = None) -> None:
@@ -97,11 +97,7 @@ class SupabaseService:
         # Guardar en Redis
         if redis_client:
             try:
-                redis_client.setex(
-                    cache_key, 
-                    ttl, 
-                    json.dumps(data, default=str)
-                )
+                redis_client.setex(cache_key, ttl, encode_payload(data, "supabase"))
             except Exception as e:
                 logger.warning(f"Error guardando cache Redis: {e}")
         
@@ -113,14 +109,9 @@ class SupabaseService:
         # Limpiar Redis
         if redis_client:
             try:
-                if pattern:
-                    keys = redis_client.keys(f"supabase:*{pattern}*")
-                else:
-                    keys = redis_client.keys("supabase:*")
-                
-                if keys:
-                    redis_client.delete(*keys)
-                    logger.info(f"🧹 Cache Redis limpiado: {len(keys)} keys")
+                deleted = delete_matching(f"supabase:*{pattern}*" if pattern else "supabase:*")
+                if deleted:
+                    logger.info(f"🧹 Cache Redis limpiado: {deleted} keys")
             except Exception as e:
                 logger.warning(f"Error limpiando cache Redis: {e}")
         
@@ -147,6 +138,7 @@ class SupabaseService:
     def _make_request(self, method: str, endpoint: str, data: Dict = None, params: Dict = None) -> requests.Response:
         """Realizar petición HTTP a Supabase"""
         url = f"{self.base_url}/{endpoint}"
+        start = time.perf_counter()
         
         try:
             response = requests.request(
@@ -158,9 +150,11 @@ class SupabaseService:
                 timeout=30
             )
             response.raise_for_status()
+            record_supabase_request(method, endpoint, time.perf_counter() - start)
             return response
         
         except requests.exceptions.RequestException as e:
+            record_supabase_request(method, endpoint, time.perf_counter() - start, outcome="error")
             logger.error(f"Error en petición Supabase: {e}")
             raise
     
@@ -223,12 +217,15 @@ class SupabaseService:
             data_converted = self._convert_updates_for_json(data)
         
         # Hacer petición
+        start = time.perf_counter()
         response = requests.post(
             f"{self.base_url}/{table}",
             headers=headers,
             json=data_converted,
             timeout=30
         )
+        record_supabase_request("POST", table, time.perf_counter() - start,
+                                outcome="ok" if response.ok else "error")
         response.raise_for_status()
         
         # Limpiar cache relacionado
@@ -257,6 +254,7 @@ class SupabaseService:
         print(f"   - Updates: {updates_converted}")
         
         # Hacer petición
+        start = time.perf_counter()
         response = requests.patch(
             f"{self.base_url}/{table}",
             headers=self.headers,
@@ -264,6 +262,8 @@ class SupabaseService:
             params=params,
             timeout=30
         )
+        record_supabase_request("PATCH", table, time.perf_counter() - start,
+                                outcome="ok" if response.ok else "error")
         
         if not response.ok:
             print(f"❌ Error response status: {response.status_code}")
@@ -289,12 +289,15 @@ class SupabaseService:
                 params[f"{key}"] = f"eq.{value}"
             
             # Hacer petición
+            start = time.perf_counter()
             response = requests.delete(
                 f"{self.base_url}/{table}",
                 headers=self.headers,
                 params=params,
                 timeout=30
             )
+            record_supabase_request("DELETE", table, time.perf_counter() - start,
+                                    outcome="ok" if response.ok else "error")
             
             response.raise_for_status()
             
@@ -383,7 +386,7 @@ class SupabaseService:
                     "log_type": "update",
                     "message": f"EDP actualizado por {usuario or 'sistema'}",
                     "user": usuario or "sistema",
-                    "details": json.dumps(filtered_updates)
+                    "details": json.dumps(filtered_updates, default=encode_default)
                 })
             except Exception as log_error:
                 logger.warning(f"No se pudo registrar log para EDP {edp_id}: {log_error}")
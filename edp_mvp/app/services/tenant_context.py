@@ -4,9 +4,12 @@ This middleware manages tenant identification and database switching.
 """
 from flask import g, request, abort, current_app
 from functools import wraps
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 import re
 
+if TYPE_CHECKING:
+    from .tenant_registry import TenantSnapshot
+
 
 class TenantContext:
     """Manages tenant context throughout the request lifecycle."""
@@ -14,6 +17,7 @@ class TenantContext:
     def __init__(self, app=None):
         self.app = app if app else current_app
         self.tenant_db_manager = None
+        self.tenant_registry = None
         
         if app:
             self.init_app(app)
@@ -24,8 +28,10 @@ class TenantContext:
         
         # Initialize database manager
         from .tenant_database_manager import TenantDatabaseManager
+        from .tenant_registry import get_tenant_registry
         master_db_url = app.config.get('SQLALCHEMY_DATABASE_URI')
         self.tenant_db_manager = TenantDatabaseManager(master_db_url)
+        self.tenant_registry = get_tenant_registry()
         
         # Register request handlers
         app.before_request(self.before_request)
@@ -76,7 +82,7 @@ class TenantContext:
         if hasattr(g, 'tenant_db_session'):
             g.tenant_db_session.close()
     
-    def _identify_by_subdomain(self) -> Optional['Tenant']:
+    def _identify_by_subdomain(self) -> Optional['TenantSnapshot']:
         """Identify tenant by subdomain."""
         try:
             host = request.host.lower()
@@ -102,24 +108,20 @@ class TenantContext:
             current_app.logger.error(f"Error identifying tenant by subdomain: {e}")
             return None
     
-    def _identify_by_api_key(self) -> Optional['Tenant']:
+    def _identify_by_api_key(self) -> Optional['TenantSnapshot']:
         """Identify tenant by API key header."""
         try:
             api_key = request.headers.get('X-Tenant-API-Key')
             if not api_key:
                 return None
             
-            from ..models.tenant import Tenant
-            return Tenant.query.filter_by(
-                api_key=api_key,
-                is_active=True
-            ).first()
+            return self.tenant_registry.get_by_api_key(api_key)
             
         except Exception as e:
             current_app.logger.error(f"Error identifying tenant by API key: {e}")
             return None
     
-    def _identify_by_path(self) -> Optional['Tenant']:
+    def _identify_by_path(self) -> Optional['TenantSnapshot']:
         """Identify tenant by URL path."""
         try:
             path = request.path
@@ -136,14 +138,10 @@ class TenantContext:
             current_app.logger.error(f"Error identifying tenant by path: {e}")
             return None
     
-    def _get_tenant_by_slug(self, slug: str) -> Optional['Tenant']:
-        """Get tenant by slug."""
+    def _get_tenant_by_slug(self, slug: str) -> Optional['TenantSnapshot']:
+        """Get tenant by slug (cached in the tenant registry)."""
         try:
-            from ..models.tenant import Tenant
-            return Tenant.query.filter_by(
-                company_slug=slug,
-                is_active=True
-            ).first()
+            return self.tenant_registry.get_by_slug(slug)
             
         except Exception as e:
             current_app.logger.error(f"Error getting tenant by slug {slug}: {e}")
@@ -183,13 +181,11 @@ class TenantContext:
     def _setup_tenant_database(self, tenant):
         """Set up database connection for the tenant."""
         try:
-            # Get tenant-specific database engine
-            engine = self.tenant_db_manager.get_tenant_engine(tenant)
+            # Get tenant-specific engine and session factory (one pool lookup)
+            engine, session_factory = self.tenant_db_manager.get_engine_and_session_factory(tenant)
             
             # Create session for this tenant
-            from sqlalchemy.orm import sessionmaker
-            Session = sessionmaker(bind=engine)
-            g.tenant_db_session = Session()
+            g.tenant_db_session = session_factory()
             
             # Store engine for direct access if needed
             g.tenant_db_engine = engine
@@ -3,13 +3,149 @@ Database Manager for Multi-Tenant Architecture.
 Handles database creation and management for each tenant.
 """
 import os
+import time
+import threading
+from collections import OrderedDict
 import psycopg2
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from flask import current_app
 import logging
-from typing import Optional, Dict
+from typing import Optional, Dict, Any
+
+
+class TenantEnginePool:
+    """
+    LRU pool of per-tenant SQLAlchemy engines with a global connection budget.
+
+    Each engine reserves ``pool_size + max_overflow`` connections from the
+    budget. When a new tenant does not fit, least recently used engines are
+    disposed until it does. Engines idle longer than ``idle_timeout`` are
+    disposed on the next access.
+    """
+
+    def __init__(self, engine_factory, pool_size: int = None, max_overflow: int = None,
+                 connection_budget: int = None, idle_timeout: int = None):
+        self.engine_factory = engine_factory
+        self.pool_size = pool_size or int(os.getenv('TENANT_POOL_SIZE', '5'))
+        self.max_overflow = max_overflow if max_overflow is not None else int(os.getenv('TENANT_MAX_OVERFLOW', '5'))
+        self.connection_budget = connection_budget or int(os.getenv('TENANT_CONNECTION_BUDGET', '100'))
+        self.idle_timeout = idle_timeout or int(os.getenv('TENANT_ENGINE_IDLE_SECONDS', '900'))
+        self.logger = logging.getLogger(__name__)
+        self._engines = OrderedDict()  # tenant_id -> entry dict, most recent last
+        self._lock = threading.RLock()
+        self._evictions = 0
+
+    @property
+    def connections_per_engine(self) -> int:
+        return self.pool_size + self.max_overflow
+
+    @property
+    def max_engines(self) -> int:
+        return max(1, self.connection_budget // self.connections_per_engine)
+
+    def get(self, tenant, count_request: bool = True):
+        """Return the pool entry for a tenant, creating its engine if needed."""
+        with self._lock:
+            self._dispose_idle()
+
+            entry = self._engines.get(tenant.id)
+            if entry is None:
+                while len(self._engines) >= self.max_engines:
+                    if not self._evict_lru():
+                        self.logger.warning(
+                            f"All {len(self._engines)} tenant engines have connections in use; "
+                            f"exceeding the connection budget for tenant {tenant.id}"
+                        )
+                        break
+                engine = self.engine_factory(
+                    tenant,
+                    pool_size=self.pool_size,
+                    max_overflow=self.max_overflow,
+                )
+                entry = {
+                    'engine': engine,
+                    'session_factory': sessionmaker(bind=engine),
+                    'database_name': tenant.database_name,
+                    'created_at': time.time(),
+                    'last_used': time.time(),
+                    'requests': 0,
+                }
+                self._engines[tenant.id] = entry
+            else:
+                self._engines.move_to_end(tenant.id)
+
+            entry['last_used'] = time.time()
+            if count_request:
+                entry['requests'] += 1
+            return entry
+
+    def discard(self, tenant_id) -> None:
+        """Dispose and forget a tenant engine."""
+        with self._lock:
+            entry = self._engines.pop(tenant_id, None)
+        if entry:
+            entry['engine'].dispose()
+
+    def dispose_all(self) -> None:
+        with self._lock:
+            entries = list(self._engines.values())
+            self._engines.clear()
+        for entry in entries:
+            entry['engine'].dispose()
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-tenant pool statistics plus global budget usage."""
+        with self._lock:
+            tenants = {}
+            for tenant_id, entry in self._engines.items():
+                pool = entry['engine'].pool
+                tenants[tenant_id] = {
+                    'database_name': entry['database_name'],
+                    'requests': entry['requests'],
+                    'idle_seconds': round(time.time() - entry['last_used'], 1),
+                    'checked_out': self._checked_out(entry['engine']),
+                    'pool_status': pool.status(),
+                }
+            return {
+                'engines': len(self._engines),
+                'max_engines': self.max_engines,
+                'connection_budget': self.connection_budget,
+                'reserved_connections': len(self._engines) * self.connections_per_engine,
+                'evictions': self._evictions,
+                'tenants': tenants,
+            }
+
+    @staticmethod
+    def _checked_out(engine) -> int:
+        checkedout = getattr(engine.pool, 'checkedout', None)
+        return checkedout() if checkedout else 0
+
+    def _evict_lru(self) -> bool:
+        """Dispose the least recently used engine without checked-out connections."""
+        for tenant_id, entry in self._engines.items():
+            # Never dispose an engine with connections in use
+            if self._checked_out(entry['engine']) > 0:
+                continue
+            del self._engines[tenant_id]
+            entry['engine'].dispose()
+            self._evictions += 1
+            self.logger.info(f"Disposed LRU engine for tenant {tenant_id} ({entry['database_name']})")
+            return True
+        return False
+
+    def _dispose_idle(self) -> None:
+        cutoff = time.time() - self.idle_timeout
+        idle = [tid for tid, entry in self._engines.items() if entry['last_used'] < cutoff]
+        for tenant_id in idle:
+            entry = self._engines.pop(tenant_id)
+            # Never dispose an engine with connections in use
+            if self._checked_out(entry['engine']) > 0:
+                self._engines[tenant_id] = entry
+                continue
+            entry['engine'].dispose()
+            self.logger.info(f"Disposed idle engine for tenant {tenant_id} ({entry['database_name']})")
 
 
 class TenantDatabaseManager:
@@ -24,7 +160,23 @@ class TenantDatabaseManager:
         """
         self.master_db_url = master_db_url
         self.logger = logging.getLogger(__name__)
-        self._tenant_engines = {}  # Cache for tenant database engines
+        self._master_engine = None
+        self._master_lock = threading.Lock()
+        self._engine_pool = TenantEnginePool(self._create_tenant_engine)
+    
+    @property
+    def master_engine(self):
+        """Shared engine for the master database, created on first use."""
+        if self._master_engine is None:
+            with self._master_lock:
+                if self._master_engine is None:
+                    self._master_engine = create_engine(self.master_db_url, pool_pre_ping=True)
+        return self._master_engine
+    
+    def _get_base_url(self) -> str:
+        """Server URL without database name, derived from the master engine."""
+        url_parts = self.master_engine.url.render_as_string(hide_password=False).split('/')
+        return '/'.join(url_parts[:-1])
     
     def create_tenant_database(self, tenant) -> bool:
         """
@@ -37,13 +189,8 @@ class TenantDatabaseManager:
             bool: True if successful, False otherwise
         """
         try:
-            # Parse master DB URL to get connection info
-            master_engine = create_engine(self.master_db_url)
-            connection_parts = str(master_engine.url).split('/')
-            base_url = '/'.join(connection_parts[:-1])
-            
             # Connect to PostgreSQL server (not specific database)
-            server_url = base_url + '/postgres'
+            server_url = self._get_base_url() + '/postgres'
             
             # Create database
             engine = create_engine(server_url, isolation_level='AUTOCOMMIT')
@@ -61,6 +208,7 @@ class TenantDatabaseManager:
                 # Create the database
                 conn.execute(f'CREATE DATABASE "{tenant.database_name}"')
                 self.logger.info(f"Created database: {tenant.database_name}")
+            engine.dispose()
             
             # Initialize schema in the new database
             self._initialize_tenant_schema(tenant)
@@ -73,8 +221,7 @@ class TenantDatabaseManager:
     def _initialize_tenant_schema(self, tenant):
         """Initialize the database schema for a tenant."""
         try:
-            tenant_db_url = self._get_tenant_db_url(tenant)
-            engine = create_engine(tenant_db_url)
+            engine = self.get_tenant_engine(tenant)
             
             # Import your models here to create tables
             from ..models import db
@@ -130,29 +277,36 @@ class TenantDatabaseManager:
     def get_tenant_engine(self, tenant):
         """
         Get SQLAlchemy engine for a specific tenant.
-        Uses caching for performance.
+        Engines live in a bounded LRU pool (see TenantEnginePool).
         """
-        if tenant.id not in self._tenant_engines:
-            tenant_db_url = self._get_tenant_db_url(tenant)
-            engine = create_engine(
-                tenant_db_url,
-                pool_size=10,
-                max_overflow=20,
-                pool_pre_ping=True,
-                pool_recycle=3600
-            )
-            self._tenant_engines[tenant.id] = engine
-        
-        return self._tenant_engines[tenant.id]
+        return self._engine_pool.get(tenant)['engine']
+    
+    def get_session_factory(self, tenant):
+        """Get the cached sessionmaker bound to the tenant engine."""
+        return self._engine_pool.get(tenant, count_request=False)['session_factory']
+    
+    def get_engine_and_session_factory(self, tenant):
+        """Get the tenant engine and its sessionmaker from a single pool lookup."""
+        entry = self._engine_pool.get(tenant)
+        return entry['engine'], entry['session_factory']
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Get per-tenant engine pool statistics."""
+        return self._engine_pool.stats()
+    
+    def _create_tenant_engine(self, tenant, pool_size: int, max_overflow: int):
+        """Engine factory used by the tenant engine pool."""
+        return create_engine(
+            self._get_tenant_db_url(tenant),
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_pre_ping=True,
+            pool_recycle=3600
+        )
     
     def _get_tenant_db_url(self, tenant) -> str:
         """Generate database URL for a specific tenant."""
-        # Parse master DB URL
-        master_engine = create_engine(self.master_db_url)
-        url_parts = str(master_engine.url).split('/')
-        base_url = '/'.join(url_parts[:-1])
-        
-        return f"{base_url}/{tenant.database_name}"
+        return f"{self._get_base_url()}/{tenant.database_name}"
     
     def delete_tenant_database(self, tenant) -> bool:
         """
@@ -166,15 +320,10 @@ class TenantDatabaseManager:
         """
         try:
             # First, close any existing connections
-            if tenant.id in self._tenant_engines:
-                self._tenant_engines[tenant.id].dispose()
-                del self._tenant_engines[tenant.id]
+            self._engine_pool.discard(tenant.id)
             
             # Connect to PostgreSQL server
-            master_engine = create_engine(self.master_db_url)
-            connection_parts = str(master_engine.url).split('/')
-            base_url = '/'.join(connection_parts[:-1])
-            server_url = base_url + '/postgres'
+            server_url = self._get_base_url() + '/postgres'
             
             engine = create_engine(server_url, isolation_level='AUTOCOMMIT')
             with engine.connect() as conn:
@@ -188,6 +337,7 @@ class TenantDatabaseManager:
                 # Drop the database
                 conn.execute(f'DROP DATABASE IF EXISTS "{tenant.database_name}"')
                 self.logger.info(f"Deleted database: {tenant.database_name}")
+            engine.dispose()
             
             return True
             
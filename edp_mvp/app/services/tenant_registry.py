@@ -0,0 +1,208 @@
+"""
+Tenant Registry - resolución de tenants con cache en proceso y Redis.
+
+Evita una consulta a la base maestra en cada request: la metadata del tenant
+se guarda como un snapshot desacoplado de la sesión SQLAlchemy, primero en un
+cache local con TTL y luego en Redis para compartirlo entre workers.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from ..utils.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Marcador para cachear búsquedas negativas (subdominio o API key inexistente)
+_MISSING = "__missing__"
+
+
+@dataclass
+class TenantSnapshot:
+    """Metadata inmutable de un tenant, independiente de la sesión de BD."""
+
+    id: int
+    company_name: str
+    company_slug: str
+    database_name: str
+    contact_email: str = ""
+    contact_name: str = ""
+    plan_type: str = "starter"
+    max_users: int = 2
+    max_edps_monthly: int = 100
+    is_active: bool = True
+    is_trial: bool = True
+    trial_ends_at: Optional[str] = None
+    db_host: Optional[str] = None
+    db_port: Optional[int] = None
+
+    @classmethod
+    def from_model(cls, tenant) -> "TenantSnapshot":
+        """Crear snapshot desde una instancia del modelo Tenant."""
+        return cls(
+            id=tenant.id,
+            company_name=tenant.company_name,
+            company_slug=tenant.company_slug,
+            database_name=tenant.database_name,
+            contact_email=tenant.contact_email or "",
+            contact_name=tenant.contact_name or "",
+            plan_type=tenant.plan_type,
+            max_users=tenant.max_users,
+            max_edps_monthly=tenant.max_edps_monthly,
+            is_active=bool(tenant.is_active),
+            is_trial=bool(tenant.is_trial),
+            trial_ends_at=tenant.trial_ends_at.isoformat() if tenant.trial_ends_at else None,
+            db_host=tenant.db_host,
+            db_port=tenant.db_port,
+        )
+
+    @property
+    def is_trial_expired(self) -> bool:
+        """Check if trial period has expired."""
+        if not self.is_trial or not self.trial_ends_at:
+            return False
+        return datetime.utcnow() > datetime.fromisoformat(self.trial_ends_at)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class TenantRegistry:
+    """Resuelve tenants por slug o API key con cache de dos niveles."""
+
+    KEY_PREFIX = "tenant_registry"
+
+    def __init__(self, ttl: Optional[int] = None, negative_ttl: Optional[int] = None):
+        self.ttl = ttl or int(os.getenv("TENANT_CACHE_TTL", "300"))
+        self.negative_ttl = negative_ttl or int(os.getenv("TENANT_NEGATIVE_CACHE_TTL", "30"))
+        self.redis_client = redis_client
+        self._local: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self._stats = {"local_hits": 0, "redis_hits": 0, "db_lookups": 0}
+
+    # === API PÚBLICA ===
+
+    def get_by_slug(self, slug: str) -> Optional[TenantSnapshot]:
+        """Obtener tenant activo por company_slug."""
+        return self._resolve(
+            f"{self.KEY_PREFIX}:slug:{slug}",
+            lambda: self._query_tenant(company_slug=slug),
+        )
+
+    def get_by_api_key(self, api_key: str) -> Optional[TenantSnapshot]:
+        """Obtener tenant activo por API key (la key se guarda hasheada)."""
+        digest = hashlib.sha256(api_key.encode()).hexdigest()
+        return self._resolve(
+            f"{self.KEY_PREFIX}:api_key:{digest}",
+            lambda: self._query_tenant(api_key=api_key),
+        )
+
+    def invalidate(self, tenant) -> None:
+        """Eliminar un tenant del cache (llamar tras modificarlo o desactivarlo)."""
+        keys = [f"{self.KEY_PREFIX}:slug:{tenant.company_slug}"]
+        api_key = getattr(tenant, "api_key", None)
+        if api_key:
+            digest = hashlib.sha256(api_key.encode()).hexdigest()
+            keys.append(f"{self.KEY_PREFIX}:api_key:{digest}")
+
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+
+        if self.redis_client:
+            try:
+                self.redis_client.delete(*keys)
+            except Exception as e:
+                logger.warning(f"Error invalidando tenant en Redis: {e}")
+
+        # Las entradas por API key de snapshots no conocen la key: limpiar las locales
+        with self._lock:
+            stale = [
+                key for key, (_, value) in self._local.items()
+                if isinstance(value, TenantSnapshot) and value.id == tenant.id
+            ]
+            for key in stale:
+                del self._local[key]
+
+    def clear(self) -> None:
+        """Vaciar el cache local."""
+        with self._lock:
+            self._local.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "local_entries": len(self._local), "ttl": self.ttl}
+
+    # === INTERNOS ===
+
+    def _resolve(self, key: str, loader) -> Optional[TenantSnapshot]:
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._local.get(key)
+            if entry and entry[0] > now:
+                self._stats["local_hits"] += 1
+                return entry[1]
+
+        value = self._get_from_redis(key)
+        from_redis = value is not None
+        if not from_redis:
+            tenant = loader()
+            value = TenantSnapshot.from_model(tenant) if tenant else _MISSING
+            self._set_in_redis(key, value)
+
+        ttl = self.ttl if value is not _MISSING else self.negative_ttl
+        with self._lock:
+            self._stats["redis_hits" if from_redis else "db_lookups"] += 1
+            self._local[key] = (now + ttl, value)
+
+        return None if value is _MISSING else value
+
+    def _get_from_redis(self, key: str):
+        if not self.redis_client:
+            return None
+        try:
+            raw = self.redis_client.get(key)
+            if not raw:
+                return None
+            payload = json.loads(raw)
+            if payload == _MISSING:
+                return _MISSING
+            return TenantSnapshot(**payload)
+        except Exception as e:
+            logger.warning(f"Error leyendo tenant desde Redis: {e}")
+            return None
+
+    def _set_in_redis(self, key: str, value) -> None:
+        if not self.redis_client:
+            return
+        try:
+            if value is _MISSING:
+                self.redis_client.setex(key, self.negative_ttl, json.dumps(_MISSING))
+            else:
+                self.redis_client.setex(key, self.ttl, json.dumps(value.to_dict()))
+        except Exception as e:
+            logger.warning(f"Error guardando tenant en Redis: {e}")
+
+    def _query_tenant(self, **filters):
+        from ..models.tenant import Tenant
+
+        return Tenant.query.filter_by(is_active=True, **filters).first()
+
+
+# === INSTANCIA GLOBAL ===
+_tenant_registry = None
+
+
+def get_tenant_registry() -> TenantRegistry:
+    """Obtener instancia singleton del registro de tenants"""
+    global _tenant_registry
+    if _tenant_registry is None:
+        _tenant_registry = TenantRegistry()
+    return _tenant_registry
@@ -113,6 +113,12 @@ document.addEventListener("DOMContentLoaded", function () {
 	} catch (e) {
 		console.log("Error configurando toggle de validados:", e);
 	}
+
+	try {
+		setupColumnPaging();
+	} catch (e) {
+		console.log("Error configurando paginación de columnas:", e);
+	}
 	// setupBatchLoading();
 	// Función para inicializar el lazy loading
 	function initLazyLoading() {
@@ -993,6 +999,12 @@ function calcularTotalesColumna() {
 			}
 		});
 
+		// Columna paginada: el total incluye las tarjetas aún no cargadas
+		const paginada = totalesColumnaPaginada(col);
+		if (paginada) {
+			totalMonto = paginada.monto;
+		}
+
 		// Actualizar totales en la columna
 		const totalElement = col.querySelector(`[data-columna-total="${estado}"]`);
 		if (totalElement) {
@@ -1009,6 +1021,105 @@ function calcularTotalesColumna() {
 	});
 }
 
+/**
+ * PAGINACIÓN POR COLUMNA
+ * El servidor entrega la primera página de tarjetas de cada columna junto con
+ * el conteo y el monto total de la columna completa (window.kanbanColumnas);
+ * las páginas siguientes se piden al hacer scroll en la columna.
+ */
+
+function sumarMontosTarjetas(tarjetas) {
+	let monto = 0;
+	tarjetas.forEach((tarjeta) => {
+		const valor = parseFloat(tarjeta.dataset.monto);
+		if (!isNaN(valor)) {
+			monto += valor;
+		}
+	});
+	return monto;
+}
+
+/**
+ * Conteo y monto total de una columna paginada: el resumen del servidor
+ * ajustado por las tarjetas que entraron o salieron de la columna (drag & drop).
+ * Devuelve null si la vista no trae resumen por columna.
+ */
+function totalesColumnaPaginada(col) {
+	const meta = (window.kanbanColumnas || {})[col.dataset.estado];
+	if (!meta || meta.cargadas === undefined) return null;
+
+	const tarjetas = col.querySelectorAll(".kanban-item");
+	return {
+		count: meta.count - meta.cargadas + tarjetas.length,
+		monto: meta.total_monto - meta.monto_cargado + sumarMontosTarjetas(tarjetas),
+	};
+}
+
+function setupColumnPaging() {
+	if (!window.kanbanColumnas || !window.kanbanColumnUrl) return;
+
+	document.querySelectorAll(".kanban-column").forEach((col) => {
+		const meta = window.kanbanColumnas[col.dataset.estado];
+		const list = col.querySelector(".kanban-list");
+		if (!meta || !list) return;
+
+		// Tarjetas entregadas por el servidor, para ajustar los totales
+		const tarjetas = list.querySelectorAll(".kanban-item");
+		meta.cargadas = tarjetas.length;
+		meta.monto_cargado = sumarMontosTarjetas(tarjetas);
+		meta.next_offset = tarjetas.length;
+		meta.has_more = meta.next_offset < meta.count;
+		meta.loading = false;
+
+		list.addEventListener("scroll", () => {
+			if (list.scrollTop + list.clientHeight >= list.scrollHeight - 200) {
+				cargarSiguientePaginaColumna(col, list, meta);
+			}
+		});
+	});
+}
+
+function cargarSiguientePaginaColumna(col, list, meta) {
+	if (meta.loading || !meta.has_more) return;
+	meta.loading = true;
+
+	const params = new URLSearchParams(window.kanbanFilters || {});
+	params.set("offset", meta.next_offset);
+	const url = window.kanbanColumnUrl.replace(
+		"__estado__",
+		encodeURIComponent(col.dataset.estado)
+	);
+
+	fetch(`${url}?${params.toString()}`, { credentials: "same-origin" })
+		.then((response) => response.json())
+		.then((data) => {
+			if (!data.success) {
+				throw new Error(data.message);
+			}
+
+			const template = document.createElement("template");
+			template.innerHTML = data.html;
+			const nuevas = Array.from(template.content.querySelectorAll(".kanban-item"))
+				// Una tarjeta movida por drag & drop puede venir de nuevo
+				.filter((tarjeta) => !document.querySelector(`.kanban-item[data-id="${tarjeta.dataset.id}"]`));
+
+			const placeholder = list.querySelector(".empty-placeholder");
+			if (placeholder && nuevas.length) placeholder.remove();
+			nuevas.forEach((tarjeta) => list.appendChild(tarjeta));
+
+			meta.cargadas += nuevas.length;
+			meta.monto_cargado += sumarMontosTarjetas(nuevas);
+			meta.next_offset = data.next_offset;
+			meta.has_more = data.has_more;
+		})
+		.catch((error) => {
+			console.log("Error cargando tarjetas de la columna:", error);
+		})
+		.finally(() => {
+			meta.loading = false;
+		});
+}
+
 /**
  * Actualiza el panel de resumen con estadísticas generales
  */
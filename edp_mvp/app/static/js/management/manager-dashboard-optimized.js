@@ -149,13 +149,22 @@ class ManagerDashboardOptimized {
             const response = await fetch('/management/api/cache/clear?pattern=manager_dashboard:*');
             const result = await response.json();
 
-            if (result.success) {
-                this.showStatusMessage(`✅ Cache limpiado (${result.cleared_count} entradas)`, 'success');
-                
+            if (!result.success) {
+                this.showStatusMessage(`❌ Error limpiando cache: ${result.message}`, 'error');
+                return;
+            }
+
+            // La limpieza corre en background: seguir el trabajo hasta que termine
+            this.showStatusMessage('🧹 Limpiando cache...', 'info');
+            const job = await this.waitForCacheClear(result.status_url);
+
+            if (job && job.status === 'done') {
+                this.showStatusMessage(`✅ Cache limpiado (${job.deleted} entradas)`, 'success');
+
                 // Refresh after clearing cache
                 setTimeout(() => this.forceRefresh(), 1000);
             } else {
-                this.showStatusMessage(`❌ Error limpiando cache: ${result.message}`, 'error');
+                this.showStatusMessage(`❌ Error limpiando cache: ${job ? job.error || job.status : 'sin respuesta'}`, 'error');
             }
         } catch (error) {
             console.error('Error clearing cache:', error);
@@ -163,6 +172,18 @@ class ManagerDashboardOptimized {
         }
     }
 
+    async waitForCacheClear(statusUrl, timeoutMs = 60000) {
+        const deadline = Date.now() + timeoutMs;
+        while (Date.now() < deadline) {
+            const response = await fetch(statusUrl);
+            const result = await response.json();
+            if (!result.success) return null;
+            if (result.job.status === 'done' || result.job.status === 'failed') return result.job;
+            await new Promise(resolve => setTimeout(resolve, 500));
+        }
+        return null;
+    }
+
     startTaskMonitoring() {
         if (!this.taskId) return;
 
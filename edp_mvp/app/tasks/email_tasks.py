@@ -75,8 +75,8 @@ def send_critical_edp_alerts(self):
         logger.info("📧 Starting critical EDP alerts task")
         
         # Create Flask app context
-        from .. import create_app
-        app = create_app()
+        from .. import get_worker_app
+        app = get_worker_app()
         
         with app.app_context():
             email_service = get_email_service()
@@ -106,10 +106,14 @@ def send_critical_edp_alerts(self):
             
             # Send alerts
             sent_count = 0
-            for edp in critical_edps:
-                success = email_service.send_critical_edp_alert(edp, recipients)
-                if success:
-                    sent_count += 1
+            if email_service.email_config.digest_enabled:
+                if email_service.send_bulk_critical_alerts(critical_edps, recipients):
+                    sent_count = len(critical_edps)
+            else:
+                for edp in critical_edps:
+                    success = email_service.send_critical_edp_alert(edp, recipients)
+                    if success:
+                        sent_count += 1
             
             logger.info(f"📧 Critical alerts sent: {sent_count}/{len(critical_edps)}")
             return {
@@ -133,8 +137,8 @@ def send_payment_reminders(self):
         logger.info("📧 Starting payment reminders task")
         
         # Create Flask app context
-        from .. import create_app
-        app = create_app()
+        from .. import get_worker_app
+        app = get_worker_app()
         
         with app.app_context():
             email_service = get_email_service()
@@ -164,10 +168,14 @@ def send_payment_reminders(self):
             
             # Send reminders
             sent_count = 0
-            for edp in reminder_edps:
-                success = email_service.send_payment_reminder(edp, recipients)
-                if success:
-                    sent_count += 1
+            if email_service.email_config.digest_enabled:
+                if email_service.send_payment_reminder_digest(reminder_edps, recipients):
+                    sent_count = len(reminder_edps)
+            else:
+                for edp in reminder_edps:
+                    success = email_service.send_payment_reminder(edp, recipients)
+                    if success:
+                        sent_count += 1
             
             logger.info(f"📧 Payment reminders sent: {sent_count}/{len(reminder_edps)}")
             return {
@@ -191,8 +199,8 @@ def send_weekly_summary(self):
         logger.info("📧 Starting weekly summary task")
         
         # Create Flask app context
-        from .. import create_app
-        app = create_app()
+        from .. import get_worker_app
+        app = get_worker_app()
         
         with app.app_context():
             email_service = get_email_service()
@@ -2,6 +2,9 @@ import json
 import logging
 from typing import Dict, Any
 from .. import celery
+from ..utils.cache_codec import encode_payload
+from ..utils.cache_inspector import delete_expiring, run_clear_job
+from ..services.refresh_orchestrator import TRIGGER_BEAT, begin_refresh, finish_refresh
 
 logger = logging.getLogger(__name__)
 
@@ -27,13 +30,17 @@ def get_kpi_service():
     return KPIService()
 
 def get_redis_client():
-    from ..repositories import _redis_client
-    return _redis_client
+    from ..utils.redis_client import get_redis
+    return get_redis()
 
 
 @celery.task(bind=True, max_retries=3)
-def refresh_executive_kpis(self):
+def refresh_executive_kpis(self, trigger: str = TRIGGER_BEAT):
     """Calculate executive KPIs and cache the result."""
+    generation = begin_refresh("refresh_executive_kpis", trigger)
+    if generation is None:
+        return {"skipped": True}
+
     try:
         service = get_manager_service()
         response = service.get_manager_dashboard_data_sync()
@@ -41,9 +48,10 @@ def refresh_executive_kpis(self):
         
         redis_client = get_redis_client()
         if redis_client:
-            redis_client.setex("kpis:latest", 900, json.dumps(data))
+            redis_client.setex("kpis:latest", 900, encode_payload(data, "kpis"))
             logger.info("✅ Executive KPIs cached successfully")
         
+        finish_refresh("refresh_executive_kpis", generation)
         return data
     except Exception as e:
         logger.error(f"❌ Error refreshing executive KPIs: {e}")
@@ -72,15 +80,16 @@ def refresh_manager_dashboard_async(self, filters: Dict[str, Any] = None):
             cache_key = f"manager_dashboard:{filters_hash}"
             
             # Cache complete dashboard data
-            redis_client.setex(cache_key, 300, json.dumps(data))
+            payload = encode_payload(data, "manager_dashboard")
+            redis_client.setex(cache_key, 300, payload)
             
             # Cache individual components for faster access
-            redis_client.setex(f"kpis:{filters_hash}", 600, json.dumps(data.get("executive_kpis", {})))
-            redis_client.setex(f"charts:{filters_hash}", 900, json.dumps(data.get("chart_data", {})))
-            redis_client.setex(f"financials:{filters_hash}", 1800, json.dumps(data.get("financial_metrics", {})))
+            redis_client.setex(f"kpis:{filters_hash}", 600, encode_payload(data.get("executive_kpis", {}), "kpis"))
+            redis_client.setex(f"charts:{filters_hash}", 900, encode_payload(data.get("chart_data", {}), "charts"))
+            redis_client.setex(f"financials:{filters_hash}", 1800, encode_payload(data.get("financial_metrics", {}), "financials"))
             
             # Keep stale copy for fallback
-            redis_client.setex(f"{cache_key}:stale", 1200, json.dumps(data))
+            redis_client.setex(f"{cache_key}:stale", 1200, payload)
             
             logger.info(f"✅ Dashboard data cached successfully: {cache_key}")
         
@@ -91,8 +100,12 @@ def refresh_manager_dashboard_async(self, filters: Dict[str, Any] = None):
 
 
 @celery.task(bind=True, max_retries=3)
-def refresh_kanban_metrics(self):
+def refresh_kanban_metrics(self, trigger: str = TRIGGER_BEAT):
     """Compute Kanban metrics and cache the result."""
+    generation = begin_refresh("refresh_kanban_metrics", trigger)
+    if generation is None:
+        return {"skipped": True}
+
     try:
         service = get_kanban_service()
         response = service.get_kanban_data()
@@ -100,9 +113,10 @@ def refresh_kanban_metrics(self):
         
         redis_client = get_redis_client()
         if redis_client:
-            redis_client.setex("kanban:latest", 900, json.dumps(data))
+            redis_client.setex("kanban:latest", 900, encode_payload(data, "kanban"))
             logger.info("✅ Kanban data cached successfully")
         
+        finish_refresh("refresh_kanban_metrics", generation)
         return data
     except Exception as e:
         logger.error(f"❌ Error refreshing kanban metrics: {e}")
@@ -110,8 +124,12 @@ def refresh_kanban_metrics(self):
 
 
 @celery.task(bind=True, max_retries=3)
-def refresh_cashflow(self):
+def refresh_cashflow(self, trigger: str = TRIGGER_BEAT):
     """Generate cashflow forecast and cache it."""
+    generation = begin_refresh("refresh_cashflow", trigger)
+    if generation is None:
+        return {"skipped": True}
+
     try:
         service = get_cashflow_service()
         response = service.get_cashflow_data()
@@ -119,9 +137,10 @@ def refresh_cashflow(self):
         
         redis_client = get_redis_client()
         if redis_client:
-            redis_client.setex("cashflow:latest", 1800, json.dumps(data))
+            redis_client.setex("cashflow:latest", 1800, encode_payload(data, "cashflow"))
             logger.info("✅ Cashflow data cached successfully")
         
+        finish_refresh("refresh_cashflow", generation)
         return data
     except Exception as e:
         logger.error(f"❌ Error refreshing cashflow: {e}")
@@ -129,8 +148,12 @@ def refresh_cashflow(self):
 
 
 @celery.task(bind=True, max_retries=3)
-def refresh_global_analytics(self):
+def refresh_global_analytics(self, trigger: str = TRIGGER_BEAT):
     """Generate global analytics charts and cache them."""
+    generation = begin_refresh("refresh_global_analytics", trigger)
+    if generation is None:
+        return {"skipped": True}
+
     try:
         service = get_analytics_service()
         response = service.get_analytics_data()
@@ -138,9 +161,10 @@ def refresh_global_analytics(self):
         
         redis_client = get_redis_client()
         if redis_client:
-            redis_client.setex("analytics:latest", 1800, json.dumps(data))
+            redis_client.setex("analytics:latest", 1800, encode_payload(data, "analytics"))
             logger.info("✅ Global analytics cached successfully")
         
+        finish_refresh("refresh_global_analytics", generation)
         return data
     except Exception as e:
         logger.error(f"❌ Error refreshing global analytics: {e}")
@@ -148,8 +172,12 @@ def refresh_global_analytics(self):
 
 
 @celery.task(bind=True, max_retries=3)
-def refresh_all_kpis(self):
+def refresh_all_kpis(self, trigger: str = TRIGGER_BEAT):
     """Calculate full KPI set across all EDPs."""
+    generation = begin_refresh("refresh_all_kpis", trigger)
+    if generation is None:
+        return {"skipped": True}
+
     try:
         service = get_kpi_service()
         response = service.get_all_kpis()
@@ -157,9 +185,10 @@ def refresh_all_kpis(self):
         
         redis_client = get_redis_client()
         if redis_client:
-            redis_client.setex("all_kpis:latest", 1200, json.dumps(data))
+            redis_client.setex("all_kpis:latest", 1200, encode_payload(data, "all_kpis"))
             logger.info("✅ All KPIs cached successfully")
         
+        finish_refresh("refresh_all_kpis", generation)
         return data
     except Exception as e:
         logger.error(f"❌ Error refreshing all KPIs: {e}")
@@ -167,8 +196,12 @@ def refresh_all_kpis(self):
 
 
 @celery.task(bind=True, max_retries=3)
-def precompute_dashboard_variants(self):
+def precompute_dashboard_variants(self, trigger: str = TRIGGER_BEAT):
     """Precompute dashboard data for common filter combinations."""
+    generation = begin_refresh("precompute_dashboard_variants", trigger)
+    if generation is None:
+        return {"skipped": True}
+
     try:
         service = get_manager_service()
         
@@ -190,9 +223,10 @@ def precompute_dashboard_variants(self):
         
         redis_client = get_redis_client()
         if redis_client:
-            redis_client.setex("dashboard:precomputed", 1800, json.dumps(results))
+            redis_client.setex("dashboard:precomputed", 1800, encode_payload(results, "dashboard"))
             logger.info(f"✅ Precomputed {len(results)} dashboard variants")
         
+        finish_refresh("precompute_dashboard_variants", generation)
         return results
     except Exception as e:
         logger.error(f"❌ Error precomputing dashboards: {e}")
@@ -209,18 +243,39 @@ def cleanup_stale_cache(self):
         
         # Patterns to clean up
         patterns = ["temp:*", "session:*", "*:expired"]
-        cleaned_count = 0
-        
-        for pattern in patterns:
-            keys = redis_client.keys(pattern)
-            for key in keys:
-                ttl = redis_client.ttl(key)
-                if ttl < 60:  # Less than 1 minute remaining
-                    redis_client.delete(key)
-                    cleaned_count += 1
+
+        # SCAN + TTL en pipeline por lote: less than 1 minute remaining (or no TTL)
+        cleaned_count = delete_expiring(patterns, min_ttl=60)
         
         logger.info(f"✅ Cleaned up {cleaned_count} stale cache entries")
         return {"cleaned": cleaned_count}
     except Exception as e:
         logger.error(f"❌ Error cleaning cache: {e}")
         raise self.retry(countdown=60, exc=e)
+
+
+@celery.task(bind=True)
+def clear_cache_pattern(self, job_id: str):
+    """Borrar un patrón de cache por lotes (trabajo de /management/api/cache/clear)."""
+    # Sin reintentos: el trabajo registra el error y el operador puede relanzarlo
+    return run_clear_job(job_id)
+
+
+@celery.task(bind=True, max_retries=3)
+def refresh_kpi_rollups(self):
+    """Refresh the SQL KPI materialized views (REFRESH ... CONCURRENTLY)."""
+    try:
+        from ..repositories.kpi_repository import KPIRepository
+        from ..services.cache_invalidation_service import redis_client
+
+        if redis_client:
+            # Permitir que el próximo cambio de datos vuelva a programar un refresco
+            redis_client.delete("kpi_rollups:refresh_scheduled")
+
+        result = KPIRepository().refresh()
+        if not result["success"]:
+            raise RuntimeError(result["message"])
+        return result["data"]
+    except Exception as e:
+        logger.error(f"❌ Error refreshing KPI rollups: {e}")
+        raise self.retry(countdown=60, exc=e)
@@ -3,6 +3,9 @@ import logging
 from typing import Dict, Any
 from datetime import datetime
 from celery import current_app as celery_app
+from ..utils.cache_codec import encode_payload
+from ..utils.cache_inspector import delete_expiring, key_ttls, scan_keys, unlink_keys
+from ..services.refresh_orchestrator import TRIGGER_BEAT, begin_refresh, finish_refresh
 
 logger = logging.getLogger(__name__)
 
@@ -28,13 +31,17 @@ def get_kpi_service():
     return KPIService()
 
 def get_redis_client():
-    from ..repositories import _redis_client
-    return _redis_client
+    from ..utils.redis_client import get_redis
+    return get_redis()
 
 
 @celery_app.task(bind=True, max_retries=3)
-def refresh_executive_kpis(self):
+def refresh_executive_kpis(self, trigger: str = TRIGGER_BEAT):
     """Calculate executive KPIs and cache the result."""
+    generation = begin_refresh("refresh_executive_kpis", trigger)
+    if generation is None:
+        return {"skipped": True}
+
     try:
         service = get_manager_service()
         response = service.get_manager_dashboard_data_sync()
@@ -42,9 +49,10 @@ def refresh_executive_kpis(self):
         
         redis_client = get_redis_client()
         if redis_client:
-            redis_client.setex("kpis:latest", 900, json.dumps(data))
+            redis_client.setex("kpis:latest", 900, encode_payload(data, "kpis"))
             logger.info("✅ Executive KPIs cached successfully")
         
+        finish_refresh("refresh_executive_kpis", generation)
         return data
     except Exception as e:
         logger.error(f"❌ Error refreshing executive KPIs: {e}")
@@ -73,15 +81,16 @@ def refresh_manager_dashboard_async(self, filters: Dict[str, Any] = None):
             cache_key = f"manager_dashboard:{filters_hash}"
             
             # Cache complete dashboard data
-            redis_client.setex(cache_key, 300, json.dumps(data))
+            payload = encode_payload(data, "manager_dashboard")
+            redis_client.setex(cache_key, 300, payload)
             
             # Cache individual components for faster access
-            redis_client.setex(f"kpis:{filters_hash}", 600, json.dumps(data.get("executive_kpis", {})))
-            redis_client.setex(f"charts:{filters_hash}", 900, json.dumps(data.get("chart_data", {})))
-            redis_client.setex(f"financials:{filters_hash}", 1800, json.dumps(data.get("financial_metrics", {})))
+            redis_client.setex(f"kpis:{filters_hash}", 600, encode_payload(data.get("executive_kpis", {}), "kpis"))
+            redis_client.setex(f"charts:{filters_hash}", 900, encode_payload(data.get("chart_data", {}), "charts"))
+            redis_client.setex(f"financials:{filters_hash}", 1800, encode_payload(data.get("financial_metrics", {}), "financials"))
             
             # Keep stale copy for fallback
-            redis_client.setex(f"{cache_key}:stale", 1200, json.dumps(data))
+            redis_client.setex(f"{cache_key}:stale", 1200, payload)
             
             logger.info(f"✅ Dashboard data cached successfully: {cache_key}")
         
@@ -92,8 +101,12 @@ def refresh_manager_dashboard_async(self, filters: Dict[str, Any] = None):
 
 
 @celery_app.task(bind=True, max_retries=3)
-def refresh_kanban_metrics(self):
+def refresh_kanban_metrics(self, trigger: str = TRIGGER_BEAT):
     """Compute Kanban metrics and cache the result."""
+    generation = begin_refresh("refresh_kanban_metrics", trigger)
+    if generation is None:
+        return {"skipped": True}
+
     try:
         service = get_kanban_service()
         response = service.get_kanban_data()
@@ -101,9 +114,10 @@ def refresh_kanban_metrics(self):
         
         redis_client = get_redis_client()
         if redis_client:
-            redis_client.setex("kanban:latest", 900, json.dumps(data))
+            redis_client.setex("kanban:latest", 900, encode_payload(data, "kanban"))
             logger.info("✅ Kanban data cached successfully")
         
+        finish_refresh("refresh_kanban_metrics", generation)
         return data
     except Exception as e:
         logger.error(f"❌ Error refreshing kanban metrics: {e}")
@@ -111,8 +125,12 @@ def refresh_kanban_metrics(self):
 
 
 @celery_app.task(bind=True, max_retries=3)
-def refresh_cashflow(self):
+def refresh_cashflow(self, trigger: str = TRIGGER_BEAT):
     """Generate cashflow forecast and cache it."""
+    generation = begin_refresh("refresh_cashflow", trigger)
+    if generation is None:
+        return {"skipped": True}
+
     try:
         service = get_cashflow_service()
         response = service.get_cashflow_data()
@@ -120,9 +138,10 @@ def refresh_cashflow(self):
         
         redis_client = get_redis_client()
         if redis_client:
-            redis_client.setex("cashflow:latest", 1800, json.dumps(data))
+            redis_client.setex("cashflow:latest", 1800, encode_payload(data, "cashflow"))
             logger.info("✅ Cashflow data cached successfully")
         
+        finish_refresh("refresh_cashflow", generation)
         return data
     except Exception as e:
         logger.error(f"❌ Error refreshing cashflow: {e}")
@@ -130,8 +149,12 @@ def refresh_cashflow(self):
 
 
 @celery_app.task(bind=True, max_retries=3)
-def refresh_global_analytics(self):
+def refresh_global_analytics(self, trigger: str = TRIGGER_BEAT):
     """Generate global analytics charts and cache them."""
+    generation = begin_refresh("refresh_global_analytics", trigger)
+    if generation is None:
+        return {"skipped": True}
+
     try:
         service = get_analytics_service()
         response = service.get_analytics_data()
@@ -139,9 +162,10 @@ def refresh_global_analytics(self):
         
         redis_client = get_redis_client()
         if redis_client:
-            redis_client.setex("analytics:latest", 1800, json.dumps(data))
+            redis_client.setex("analytics:latest", 1800, encode_payload(data, "analytics"))
             logger.info("✅ Global analytics cached successfully")
         
+        finish_refresh("refresh_global_analytics", generation)
         return data
     except Exception as e:
         logger.error(f"❌ Error refreshing global analytics: {e}")
@@ -149,8 +173,12 @@ def refresh_global_analytics(self):
 
 
 @celery_app.task(bind=True, max_retries=3)
-def refresh_all_kpis(self):
+def refresh_all_kpis(self, trigger: str = TRIGGER_BEAT):
     """Calculate full KPI set across all EDPs."""
+    generation = begin_refresh("refresh_all_kpis", trigger)
+    if generation is None:
+        return {"skipped": True}
+
     try:
         service = get_kpi_service()
         response = service.get_all_kpis()
@@ -158,9 +186,10 @@ def refresh_all_kpis(self):
         
         redis_client = get_redis_client()
         if redis_client:
-            redis_client.setex("all_kpis:latest", 1200, json.dumps(data))
+            redis_client.setex("all_kpis:latest", 1200, encode_payload(data, "all_kpis"))
             logger.info("✅ All KPIs cached successfully")
         
+        finish_refresh("refresh_all_kpis", generation)
         return data
     except Exception as e:
         logger.error(f"❌ Error refreshing all KPIs: {e}")
@@ -168,8 +197,12 @@ def refresh_all_kpis(self):
 
 
 @celery_app.task(bind=True, max_retries=3)
-def precompute_dashboard_variants(self):
+def precompute_dashboard_variants(self, trigger: str = TRIGGER_BEAT):
     """Precompute dashboard data for common filter combinations."""
+    generation = begin_refresh("precompute_dashboard_variants", trigger)
+    if generation is None:
+        return {"skipped": True}
+
     try:
         service = get_manager_service()
         
@@ -191,9 +224,10 @@ def precompute_dashboard_variants(self):
         
         redis_client = get_redis_client()
         if redis_client:
-            redis_client.setex("dashboard:precomputed", 1800, json.dumps(results))
+            redis_client.setex("dashboard:precomputed", 1800, encode_payload(results, "dashboard"))
             logger.info(f"✅ Precomputed {len(results)} dashboard variants")
         
+        finish_refresh("precompute_dashboard_variants", generation)
         return results
     except Exception as e:
         logger.error(f"❌ Error precomputing dashboards: {e}")
@@ -210,15 +244,9 @@ def cleanup_stale_cache(self):
         
         # Patterns to clean up
         patterns = ["temp:*", "session:*", "*:expired"]
-        cleaned_count = 0
-        
-        for pattern in patterns:
-            keys = redis_client.keys(pattern)
-            for key in keys:
-                ttl = redis_client.ttl(key)
-                if ttl < 60:  # Less than 1 minute remaining
-                    redis_client.delete(key)
-                    cleaned_count += 1
+
+        # SCAN + TTL en pipeline por lote: less than 1 minute remaining (or no TTL)
+        cleaned_count = delete_expiring(patterns, min_ttl=60)
         
         logger.info(f"✅ Cleaned up {cleaned_count} stale cache entries")
         return {"cleaned": cleaned_count}
@@ -274,28 +302,27 @@ def cleanup_cache_events(self):
         
         # Clean old cache events (older than 24 hours)
         pattern = "cache_events:*"
-        keys = redis_client.keys(pattern)
         cleaned_count = 0
         current_time = datetime.now()
         
-        for key in keys:
-            try:
-                # Extract timestamp from key if possible
-                timestamp_str = key.decode('utf-8').split(':')[-1]
-                if len(timestamp_str) == 14:  # YYYYMMDDHHMMSS format
-                    key_time = datetime.strptime(timestamp_str, '%Y%m%d%H%M%S')
-                    age_hours = (current_time - key_time).total_seconds() / 3600
-                    
-                    if age_hours > 24:  # Older than 24 hours
-                        redis_client.delete(key)
-                        cleaned_count += 1
+        for keys in scan_keys(pattern):
+            expired = []
+            for key, ttl in zip(keys, key_ttls(keys)):
+                try:
+                    # Extract timestamp from key if possible
+                    timestamp_str = key.decode('utf-8').split(':')[-1]
+                    if len(timestamp_str) == 14:  # YYYYMMDDHHMMSS format
+                        key_time = datetime.strptime(timestamp_str, '%Y%m%d%H%M%S')
+                        age_hours = (current_time - key_time).total_seconds() / 3600
                         
-            except (ValueError, UnicodeDecodeError):
-                # If we can't parse the timestamp, delete keys older than TTL
-                ttl = redis_client.ttl(key)
-                if ttl < 300:  # Less than 5 minutes remaining
-                    redis_client.delete(key)
-                    cleaned_count += 1
+                        if age_hours > 24:  # Older than 24 hours
+                            expired.append(key)
+                            
+                except (ValueError, UnicodeDecodeError):
+                    # If we can't parse the timestamp, delete keys older than TTL
+                    if -2 < ttl < 300:  # Less than 5 minutes remaining
+                        expired.append(key)
+            cleaned_count += unlink_keys(expired)
         
         logger.info(f"✅ Cleaned up {cleaned_count} old cache events")
         return {"cleaned": cleaned_count, "message": f"Cleaned {cleaned_count} old events"}
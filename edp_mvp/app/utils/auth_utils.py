@@ -3,7 +3,7 @@ Authentication utilities for the EDP Management System.
 Provides decorators and utilities for login and role-based access control.
 """
 
-from functools import wraps
+from functools import lru_cache, wraps
 from flask import session, flash, redirect, url_for, request
 from flask_login import current_user
 
@@ -30,6 +30,35 @@ def check_role_hierarchy(user_role, required_level):
     return user_level >= required_level
 
 
+@lru_cache(maxsize=None)
+def get_required_level(roles):
+    """Minimum role level among the given roles (tuple, resolved once)."""
+    return min(get_user_role_level(role) for role in roles)
+
+
+@lru_cache(maxsize=None)
+def _role_permissions(user_role):
+    role_level = get_user_role_level(user_role)
+    return tuple({
+        'can_view_admin': role_level >= ROLE_HIERARCHY['admin'],
+        'can_view_manager': role_level >= ROLE_HIERARCHY['manager'],
+        'can_view_controller': role_level >= ROLE_HIERARCHY['controller'],
+        'can_edit_users': role_level >= ROLE_HIERARCHY['admin'],
+        'can_view_analytics': role_level >= ROLE_HIERARCHY['manager'],
+        'can_edit_edps': role_level >= ROLE_HIERARCHY['controller'],
+        'can_delete_edps': role_level >= ROLE_HIERARCHY['manager'],
+        'can_export_data': role_level >= ROLE_HIERARCHY['controller'],
+        'can_manage_system': role_level >= ROLE_HIERARCHY['admin'],
+        'can_view_reports': role_level >= ROLE_HIERARCHY['controller'],
+        'can_approve_edps': role_level >= ROLE_HIERARCHY['manager'],
+    }.items())
+
+
+def get_role_permissions(user_role):
+    """Permission flags for a role, based on role hierarchy."""
+    return dict(_role_permissions(user_role))
+
+
 def role_required(*allowed_roles):
     """
     Decorator to require specific roles for accessing a route.
@@ -43,6 +72,9 @@ def role_required(*allowed_roles):
     Args:
         allowed_roles: One or more role names that are allowed to access the route
     """
+    # Get minimum required level from allowed roles (once, at decoration time)
+    required_level = get_required_level(tuple(allowed_roles))
+
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
@@ -58,9 +90,6 @@ def role_required(*allowed_roles):
             else:
                 user_role = session.get('user_role', 'guest')
             
-            # Get minimum required level from allowed roles
-            required_level = min(get_user_role_level(role) for role in allowed_roles)
-            
             # Check if user has required level (hierarchy-based)
             if not check_role_hierarchy(user_role, required_level):
                 flash(f'No tienes permisos para acceder a esta página. Rol requerido: {", ".join(allowed_roles)} o superior', 'error')
@@ -176,7 +205,7 @@ def check_user_permission(required_roles, user_role=None):
             user_role = session.get('user_role', 'guest')
     
     # Check hierarchy - minimum required level
-    required_level = min(get_user_role_level(role) for role in required_roles)
+    required_level = get_required_level(tuple(required_roles))
     return check_role_hierarchy(user_role, required_level)
 
 
@@ -221,19 +250,7 @@ def get_user_context():
     role_level = get_user_role_level(user_role)
     
     # Define permissions based on role hierarchy
-    permissions = {
-        'can_view_admin': role_level >= ROLE_HIERARCHY['admin'],
-        'can_view_manager': role_level >= ROLE_HIERARCHY['manager'],
-        'can_view_controller': role_level >= ROLE_HIERARCHY['controller'],
-        'can_edit_users': role_level >= ROLE_HIERARCHY['admin'],
-        'can_view_analytics': role_level >= ROLE_HIERARCHY['manager'],
-        'can_edit_edps': role_level >= ROLE_HIERARCHY['controller'],
-        'can_delete_edps': role_level >= ROLE_HIERARCHY['manager'],
-        'can_export_data': role_level >= ROLE_HIERARCHY['controller'],
-        'can_manage_system': role_level >= ROLE_HIERARCHY['admin'],
-        'can_view_reports': role_level >= ROLE_HIERARCHY['controller'],
-        'can_approve_edps': role_level >= ROLE_HIERARCHY['manager'],
-    }
+    permissions = get_role_permissions(user_role)
     
     return {
         'is_authenticated': True,
@@ -0,0 +1,238 @@
+"""
+Calendario de días hábiles de Chile para DSO, aging y días hábiles.
+
+Los días hábiles se calculaban fila por fila con pd.bdate_range, np.busday_count
+o un ciclo de días, y ninguno descontaba feriados. Aquí el calendario se
+construye una vez por proceso sobre los años que cubre el archivo de feriados
+(acotados por BUSINESS_CALENDAR_START_YEAR / BUSINESS_CALENDAR_END_YEAR si se
+definen): un arreglo con los días hábiles acumulados hasta
+cada día (ordinal) y otro con las fechas hábiles. "Días hábiles entre A y B" es
+la resta de dos ordinales y "A + N días hábiles" una búsqueda en el arreglo de
+fechas, ambas vectorizadas sobre Series completas. Las fechas fuera del rango se
+resuelven con np.busday_count / np.busday_offset; como no hay feriados cargados
+para esos años solo se descuentan fines de semana, y se registra una advertencia
+(una vez por proceso).
+
+Los feriados se leen de BUSINESS_CALENDAR_HOLIDAYS_FILE (por defecto
+config/feriados_cl.json), una lista de {"fecha": "YYYY-MM-DD", "nombre": ...}.
+
+Uso:
+
+    df["dias_habiles"] = business_days_between(df["fecha_envio_cliente"], hoy)
+    vencimiento = add_business_days(fecha_emision, 30)
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+BUSINESS_CALENDAR_HOLIDAYS_FILE = os.getenv(
+    "BUSINESS_CALENDAR_HOLIDAYS_FILE",
+    str(Path(__file__).resolve().parent.parent / "config" / "feriados_cl.json"),
+)
+# Opcionales: por defecto el rango son los años presentes en el archivo de feriados
+BUSINESS_CALENDAR_START_YEAR = int(os.getenv("BUSINESS_CALENDAR_START_YEAR", "0")) or None
+BUSINESS_CALENDAR_END_YEAR = int(os.getenv("BUSINESS_CALENDAR_END_YEAR", "0")) or None
+# Rango sin archivo de feriados (solo fines de semana)
+_FALLBACK_YEARS = (2015, 2035)
+
+_calendar: Optional["BusinessCalendar"] = None
+_calendar_lock = threading.Lock()
+
+
+def load_holidays(path: str) -> np.ndarray:
+    """Feriados del archivo como datetime64[D]; vacío si no se puede leer."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        entries = data.get("feriados", []) if isinstance(data, dict) else data
+        fechas = [entry["fecha"] if isinstance(entry, dict) else entry for entry in entries]
+        return np.unique(np.array(fechas, dtype="datetime64[D]"))
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logger.warning(
+            f"⚠️ No se pudo leer el archivo de feriados {path}: {e}; "
+            f"solo se excluyen fines de semana"
+        )
+        return np.array([], dtype="datetime64[D]")
+
+
+def _to_days(values: Any) -> Tuple[np.ndarray, Callable[[Any], Any]]:
+    """
+    Fechas como datetime64[D] (NaT si no son válidas) y una función que
+    devuelve un resultado con la forma de la entrada: escalar, Series con el
+    mismo índice o arreglo.
+    """
+    scalar = np.ndim(values) == 0
+    series = values if isinstance(values, pd.Series) else pd.Series([values] if scalar else values)
+    dates = pd.to_datetime(series, errors="coerce")
+    if getattr(dates.dtype, "tz", None) is not None:
+        dates = dates.dt.tz_localize(None)
+    days = dates.to_numpy(dtype="datetime64[ns]").astype("datetime64[D]")
+
+    if scalar:
+        return days, lambda result: result[0]
+    if isinstance(values, pd.Series):
+        return days, lambda result: pd.Series(result, index=values.index)
+    return days, lambda result: result
+
+
+class BusinessCalendar:
+    """Días hábiles (lunes a viernes sin feriados) precalculados sobre un rango."""
+
+    def __init__(self, holidays: np.ndarray, start_year: int, end_year: int):
+        self.holidays = holidays
+        self.start = np.datetime64(f"{start_year}-01-01", "D")
+        self.end = np.datetime64(f"{end_year}-12-31", "D")
+        self._busdaycal = np.busdaycalendar(holidays=holidays)
+
+        days = np.arange(self.start, self.end + 1)
+        self._is_business = np.is_busday(days, busdaycal=self._busdaycal)
+        # Días hábiles acumulados hasta cada día, inclusive
+        self._ordinal = np.cumsum(self._is_business)
+        self._business_dates = days[self._is_business]
+        self._warned_outside = False
+
+    def _warn_outside(self) -> None:
+        """Advertir una vez que hay fechas sin feriados cargados."""
+        if not self._warned_outside:
+            self._warned_outside = True
+            logger.warning(
+                f"⚠️ Fechas fuera de {self.start}..{self.end} (años con feriados cargados): "
+                f"para ellas solo se descuentan fines de semana"
+            )
+
+    def _positions(self, days: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Posición de cada día en el rango y máscara de los que caen dentro."""
+        in_range = ~np.isnat(days) & (days >= self.start) & (days <= self.end)
+        offsets = np.zeros(days.shape, dtype="int64")
+        offsets[in_range] = (days[in_range] - self.start).astype("int64")
+        return offsets, in_range
+
+    def business_days_between(self, start: Any, end: Any) -> Any:
+        """
+        Días hábiles en (start, end]: no cuenta el día de inicio. Negativo si
+        end es anterior a start y NaN si alguna fecha no es válida.
+        """
+        start_days, start_wrap = _to_days(start)
+        end_days, end_wrap = _to_days(end)
+        wrap = start_wrap if np.ndim(start) else end_wrap
+        start_days, end_days = np.broadcast_arrays(start_days, end_days)
+
+        result = np.full(start_days.shape, np.nan)
+        start_offsets, start_ok = self._positions(start_days)
+        end_offsets, end_ok = self._positions(end_days)
+        both = start_ok & end_ok
+        result[both] = self._ordinal[end_offsets[both]] - self._ordinal[start_offsets[both]]
+
+        rest = ~both & ~np.isnat(start_days) & ~np.isnat(end_days)
+        if rest.any():
+            self._warn_outside()
+            # busday_count cuenta [begin, end); un día después cuenta (start, end]
+            result[rest] = np.busday_count(
+                start_days[rest] + 1, end_days[rest] + 1, busdaycal=self._busdaycal
+            )
+        return wrap(result)
+
+    def add_business_days(self, dates: Any, n: Any) -> Any:
+        """
+        Fecha N días hábiles después (o antes, si N es negativo). Una fecha no
+        hábil cuenta desde el día hábil anterior: sábado + 1 es el lunes.
+        """
+        days, wrap = _to_days(dates)
+        steps = np.broadcast_to(np.asarray(n, dtype="int64"), days.shape)
+
+        result = np.full(days.shape, np.datetime64("NaT"), dtype="datetime64[D]")
+        offsets, ok = self._positions(days)
+        target = np.where(ok, self._ordinal[offsets] + steps - 1, -1)
+        found = ok & (target >= 0) & (target < len(self._business_dates))
+        result[found] = self._business_dates[target[found]]
+
+        rest = ~found & ~np.isnat(days)
+        if rest.any():
+            self._warn_outside()
+            result[rest] = np.busday_offset(
+                days[rest], steps[rest], roll="backward", busdaycal=self._busdaycal
+            )
+        return wrap(pd.to_datetime(result))
+
+    def is_business_day(self, dates: Any) -> Any:
+        """True para días hábiles; False para fines de semana, feriados y NaT."""
+        days, wrap = _to_days(dates)
+        result = np.zeros(days.shape, dtype=bool)
+        offsets, ok = self._positions(days)
+        result[ok] = self._is_business[offsets[ok]]
+
+        rest = ~ok & ~np.isnat(days)
+        if rest.any():
+            self._warn_outside()
+            result[rest] = np.is_busday(days[rest], busdaycal=self._busdaycal)
+        return wrap(result)
+
+
+def get_business_calendar() -> BusinessCalendar:
+    """Calendario del proceso, construido en el primer uso."""
+    global _calendar
+    if _calendar is None:
+        with _calendar_lock:
+            if _calendar is None:
+                holidays = load_holidays(BUSINESS_CALENDAR_HOLIDAYS_FILE)
+                start_year, end_year = _calendar_years(holidays)
+                _calendar = BusinessCalendar(holidays, start_year, end_year)
+                logger.info(
+                    f"📅 Calendario hábil {start_year}-{end_year} con {len(holidays)} feriados"
+                )
+    return _calendar
+
+
+def _calendar_years(holidays: np.ndarray) -> Tuple[int, int]:
+    """Años del calendario: los cubiertos por los feriados, acotados por la configuración."""
+    if holidays.size == 0:
+        return (
+            BUSINESS_CALENDAR_START_YEAR or _FALLBACK_YEARS[0],
+            BUSINESS_CALENDAR_END_YEAR or _FALLBACK_YEARS[1],
+        )
+
+    years = holidays.astype("datetime64[Y]").astype(int) + 1970
+    first, last = int(years.min()), int(years.max())
+    start_year = max(BUSINESS_CALENDAR_START_YEAR or first, first)
+    end_year = min(BUSINESS_CALENDAR_END_YEAR or last, last)
+    if start_year > end_year:
+        start_year, end_year = first, last
+    if (BUSINESS_CALENDAR_START_YEAR or first) < first or (BUSINESS_CALENDAR_END_YEAR or last) > last:
+        logger.warning(
+            f"⚠️ Calendario hábil acotado a {start_year}-{end_year}: el archivo de "
+            f"feriados solo cubre {first}-{last}"
+        )
+    return start_year, end_year
+
+
+def business_days_between(start: Any, end: Any) -> Any:
+    """Días hábiles en (start, end] según el calendario del proceso."""
+    return get_business_calendar().business_days_between(start, end)
+
+
+def business_days_count(start: Any, end: Any) -> Any:
+    """Días hábiles en [start, end), como np.busday_count, según el calendario del proceso."""
+    one_day = pd.Timedelta(days=1)
+    return business_days_between(
+        pd.to_datetime(start, errors="coerce") - one_day,
+        pd.to_datetime(end, errors="coerce") - one_day,
+    )
+
+
+def add_business_days(dates: Any, n: Any) -> Any:
+    """Fecha N días hábiles después según el calendario del proceso."""
+    return get_business_calendar().add_business_days(dates, n)
+
+
+def is_business_day(dates: Any) -> Any:
+    """Si la fecha es hábil según el calendario del proceso."""
+    return get_business_calendar().is_business_day(dates)
@@ -13,6 +13,9 @@ from enum import Enum
 from typing import List, Dict, Any
 from dataclasses import dataclass, field
 
+import numpy as np
+import pandas as pd
+
 
 class EstadoEDP(Enum):
     """Estados posibles de un EDP"""
@@ -137,6 +140,58 @@ class BusinessRules:
         
         return dso_rapido or estado_favorable
     
+    # ============= CLASIFICACIÓN VECTORIZADA =============
+    # Equivalentes por columna de es_edp_critico / es_edp_aging / es_edp_fast_collection:
+    # reciben las columnas dso_actual y estado completas y devuelven máscaras booleanas.
+    
+    RIESGO_CATEGORIAS = ["fast_collection", "normal", "aging", "critico"]
+    
+    @staticmethod
+    def _dso_array(dso_actual) -> np.ndarray:
+        # Sin DSO queda NaN: no supera ni cae bajo ningún umbral (como la versión escalar)
+        return pd.to_numeric(pd.Series(dso_actual), errors="coerce").to_numpy(dtype=float)
+    
+    @staticmethod
+    def _estado_array(estado) -> pd.Series:
+        return pd.Series(estado).fillna("").astype(str).str.strip().str.lower()
+    
+    def mascara_no_pagados(self, estado) -> np.ndarray:
+        """True para EDPs que NO están en un estado pagado/cobrado/finalizado"""
+        estados_excluidos = [e.lower() for e in self.criterios.CRITICOS_ESTADOS_EXCLUIDOS]
+        return ~self._estado_array(estado).isin(estados_excluidos).to_numpy()
+    
+    def mascara_criticos(self, dso_actual, estado) -> np.ndarray:
+        """Versión por columnas de es_edp_critico"""
+        dso = self._dso_array(dso_actual)
+        return self.mascara_no_pagados(estado) & (dso > self.criterios.CRITICOS_DSO_MINIMO)
+    
+    def mascara_aging(self, dso_actual, estado) -> np.ndarray:
+        """Versión por columnas de es_edp_aging"""
+        dso = self._dso_array(dso_actual)
+        en_rango_aging = (dso >= self.criterios.AGING_DSO_MINIMO) & (dso <= self.criterios.AGING_DSO_MAXIMO)
+        return self.mascara_no_pagados(estado) & en_rango_aging
+    
+    def mascara_fast_collection(self, dso_actual, estado) -> np.ndarray:
+        """Versión por columnas de es_edp_fast_collection"""
+        dso = self._dso_array(dso_actual)
+        estados_favorables = [e.lower() for e in self.criterios.FAST_COLLECTION_ESTADOS_FAVORABLES]
+        estado_favorable = self._estado_array(estado).isin(estados_favorables).to_numpy()
+        return (dso < self.criterios.FAST_COLLECTION_DSO_MAXIMO) | estado_favorable
+    
+    def clasificar_riesgo(self, dso_actual, estado) -> pd.Categorical:
+        """
+        Clase de riesgo por EDP en una sola pasada.
+        
+        Prioridad: critico > aging > fast_collection > normal
+        """
+        condiciones = [
+            self.mascara_criticos(dso_actual, estado),
+            self.mascara_aging(dso_actual, estado),
+            self.mascara_fast_collection(dso_actual, estado),
+        ]
+        clases = np.select(condiciones, ["critico", "aging", "fast_collection"], default="normal")
+        return pd.Categorical(clases, categories=self.RIESGO_CATEGORIAS, ordered=True)
+    
     # ============= CÁLCULOS DE TENDENCIA =============
     
     def calcular_tendencia_criticos(self, cantidad_criticos: int) -> Dict[str, Any]:
@@ -236,6 +291,22 @@ def es_fast_collection(dso_actual: float, estado: str) -> bool:
     """Función directa para validar si un EDP es de cobro rápido"""
     return business_rules.es_edp_fast_collection(dso_actual, estado)
 
+def mascara_critico(dso_actual, estado) -> np.ndarray:
+    """Función directa: máscara de EDPs críticos para columnas completas"""
+    return business_rules.mascara_criticos(dso_actual, estado)
+
+def mascara_aging(dso_actual, estado) -> np.ndarray:
+    """Función directa: máscara de EDPs en aging para columnas completas"""
+    return business_rules.mascara_aging(dso_actual, estado)
+
+def mascara_fast_collection(dso_actual, estado) -> np.ndarray:
+    """Función directa: máscara de EDPs de cobro rápido para columnas completas"""
+    return business_rules.mascara_fast_collection(dso_actual, estado)
+
+def clasificar_riesgo(dso_actual, estado) -> pd.Categorical:
+    """Función directa: clase de riesgo categórica para columnas completas"""
+    return business_rules.clasificar_riesgo(dso_actual, estado)
+
 def obtener_tendencia_criticos(cantidad: int) -> Dict[str, Any]:
     """Función directa para calcular tendencia de críticos"""
     return business_rules.calcular_tendencia_criticos(cantidad)
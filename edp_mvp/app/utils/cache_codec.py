@@ -0,0 +1,233 @@
+"""
+Codificación compacta de payloads grandes en Redis.
+
+Los caches de dashboard, KPIs, Google Sheets, Supabase y kanban guardaban JSON
+en texto. Con `maxmemory 256mb` y `allkeys-lru` esos blobs se desalojan entre
+sí y provocan recálculos en cadena. Aquí cada valor se serializa como JSON
+compacto y, sobre CACHE_COMPRESS_MIN_BYTES, se comprime con zlib: los dos
+vienen con Python, así que cualquier proceso que comparta el Redis (web,
+Celery, FastAPI, scripts) puede leer lo que escribe otro.
+
+msgpack (CACHE_SERIALIZER=msgpack) y zstd / lz4 (CACHE_COMPRESSION) son
+opcionales y solo se usan si se piden explícitamente: un proceso sin esa
+librería no puede leer esas entradas, las registra como error y las trata como
+miss. Actívalos solo si todos los procesos las tienen instaladas.
+
+Cada entrada lleva una cabecera de 6 bytes: marca, versión de formato,
+serializador y compresión, así el lector no depende de su propia
+configuración. Los valores sin cabecera (JSON escrito antes de este formato)
+se siguen leyendo.
+
+Uso:
+
+    redis_client.setex(key, ttl, encode_payload(data, "manager_dashboard"))
+    data = decode_payload(redis_client.get(key))
+"""
+
+import json
+import logging
+import os
+import struct
+import threading
+import zlib
+from typing import Any, Dict, Tuple
+
+from .cache_inspector import record_write
+from .instrumentation import record_cache_payload
+from .json_serialization import dumps as json_dumps, encode_default
+
+try:  # pragma: no cover - optional dependency
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:  # pragma: no cover - optional dependency
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:  # pragma: no cover - optional dependency
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "1024"))
+# json | msgpack (msgpack exige la librería en todos los procesos)
+CACHE_SERIALIZER = os.getenv("CACHE_SERIALIZER", "json").lower()
+# zlib | none | zstd | lz4 (zstd / lz4 exigen la librería en todos los procesos)
+CACHE_COMPRESSION = os.getenv("CACHE_COMPRESSION", "zlib").lower()
+
+# Cabecera: marca (NUL + "EC" nunca inicia un JSON), versión, serializador, compresión
+_MAGIC = b"\x00EC"
+_HEADER = struct.Struct("!3sBBB")
+FORMAT_VERSION = 1
+
+SERIALIZER_JSON = 1
+SERIALIZER_MSGPACK = 2
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_ZSTD = 2
+COMPRESSION_LZ4 = 3
+
+COMPRESSION_NAMES = {
+    COMPRESSION_NONE: "none",
+    COMPRESSION_ZLIB: "zlib",
+    COMPRESSION_ZSTD: "zstd",
+    COMPRESSION_LZ4: "lz4",
+}
+
+# Bytes serializados vs. almacenados (tras comprimir), por namespace, en este proceso
+_stats: Dict[str, Dict[str, int]] = {}
+_stats_lock = threading.Lock()
+
+
+def _default(obj: Any) -> Any:
+    # Igual que json.dumps(default=str) para tipos que encode_default no conoce
+    try:
+        return encode_default(obj)
+    except TypeError:
+        return str(obj)
+
+
+def _select_compression() -> int:
+    available = {
+        "zstd": COMPRESSION_ZSTD if zstandard else None,
+        "lz4": COMPRESSION_LZ4 if lz4_frame else None,
+        "zlib": COMPRESSION_ZLIB,
+        "none": COMPRESSION_NONE,
+    }
+    codec = available.get(CACHE_COMPRESSION)
+    if codec is None:
+        logger.warning(f"⚠️ CACHE_COMPRESSION={CACHE_COMPRESSION} no disponible, usando zlib")
+        return COMPRESSION_ZLIB
+    return codec
+
+
+def _select_serializer() -> int:
+    if CACHE_SERIALIZER == "msgpack":
+        if msgpack:
+            return SERIALIZER_MSGPACK
+        logger.warning("⚠️ CACHE_SERIALIZER=msgpack pero msgpack no está instalado, usando JSON")
+    return SERIALIZER_JSON
+
+
+DEFAULT_COMPRESSION = _select_compression()
+DEFAULT_SERIALIZER = _select_serializer()
+
+if zstandard:
+    _zstd_compressor = zstandard.ZstdCompressor(level=3)
+    _zstd_decompressor = zstandard.ZstdDecompressor()
+
+
+def _compress(data: bytes, codec: int) -> bytes:
+    if codec == COMPRESSION_ZSTD:
+        return _zstd_compressor.compress(data)
+    if codec == COMPRESSION_LZ4:
+        return lz4_frame.compress(data)
+    if codec == COMPRESSION_ZLIB:
+        return zlib.compress(data, 1)
+    return data
+
+
+def _decompress(data: bytes, codec: int) -> bytes:
+    if codec == COMPRESSION_NONE:
+        return data
+    if codec == COMPRESSION_ZLIB:
+        return zlib.decompress(data)
+    if codec == COMPRESSION_ZSTD and zstandard:
+        return _zstd_decompressor.decompress(data)
+    if codec == COMPRESSION_LZ4 and lz4_frame:
+        return lz4_frame.decompress(data)
+    raise ValueError(f"Compresión {COMPRESSION_NAMES.get(codec, codec)} no disponible en este proceso")
+
+
+def _serialize(value: Any) -> Tuple[int, bytes]:
+    if DEFAULT_SERIALIZER == SERIALIZER_MSGPACK:
+        return SERIALIZER_MSGPACK, msgpack.packb(value, default=_default, use_bin_type=True)
+    try:
+        return SERIALIZER_JSON, json_dumps(value)
+    except TypeError:
+        body = json.dumps(value, default=_default, separators=(",", ":"), ensure_ascii=False)
+        return SERIALIZER_JSON, body.encode("utf-8")
+
+
+def _record_stats(namespace: str, serialized_bytes: int, stored_bytes: int) -> None:
+    with _stats_lock:
+        entry = _stats.setdefault(
+            namespace, {"entries": 0, "serialized_bytes": 0, "stored_bytes": 0}
+        )
+        entry["entries"] += 1
+        entry["serialized_bytes"] += serialized_bytes
+        entry["stored_bytes"] += stored_bytes
+    record_cache_payload(namespace, serialized_bytes, stored_bytes)
+    record_write(namespace, stored_bytes)
+
+
+def encode_payload(value: Any, namespace: str = "default") -> bytes:
+    """Serializar y, si supera el umbral, comprimir un valor para Redis.
+
+    `namespace` debe ser el prefijo de la clave (namespace_of) para que en
+    cache_stats las escrituras y las lecturas caigan en la misma entrada.
+    """
+    serializer, body = _serialize(value)
+    serialized_size = len(body)
+    compression = COMPRESSION_NONE
+    if len(body) >= CACHE_COMPRESS_MIN_BYTES and DEFAULT_COMPRESSION != COMPRESSION_NONE:
+        compressed = _compress(body, DEFAULT_COMPRESSION)
+        if len(compressed) < len(body):
+            body, compression = compressed, DEFAULT_COMPRESSION
+
+    payload = _HEADER.pack(_MAGIC, FORMAT_VERSION, serializer, compression) + body
+    _record_stats(namespace, serialized_size, len(payload))
+    return payload
+
+
+def decode_payload(raw: Any) -> Any:
+    """Leer un valor de Redis; None si no hay valor. Acepta JSON sin cabecera."""
+    if raw is None:
+        return None
+    if isinstance(raw, str):
+        return json.loads(raw)
+    if not raw.startswith(_MAGIC):
+        return json.loads(raw)
+
+    _, version, serializer, compression = _HEADER.unpack_from(raw)
+    try:
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Versión de payload no soportada: {version}")
+        body = _decompress(raw[_HEADER.size:], compression)
+        if serializer == SERIALIZER_MSGPACK:
+            if msgpack is None:
+                raise ValueError("Payload msgpack y msgpack no está instalado")
+            return msgpack.unpackb(body, raw=False, strict_map_key=False)
+    except ValueError as e:
+        # Los llamadores lo tratan como miss; que quede registrado por qué
+        logger.warning(f"⚠️ Payload de cache ilegible en este proceso, se trata como miss: {e}")
+        raise
+    return json.loads(body)
+
+
+def codec_stats() -> Dict[str, Any]:
+    """Codec activo y ratio de compresión por namespace en este proceso."""
+    with _stats_lock:
+        namespaces = {
+            namespace: dict(
+                entry,
+                ratio=(
+                    round(entry["serialized_bytes"] / entry["stored_bytes"], 2)
+                    if entry["stored_bytes"]
+                    else None
+                ),
+            )
+            for namespace, entry in _stats.items()
+        }
+    return {
+        "serializer": "msgpack" if DEFAULT_SERIALIZER == SERIALIZER_MSGPACK else "json",
+        "compression": COMPRESSION_NAMES[DEFAULT_COMPRESSION],
+        "compress_min_bytes": CACHE_COMPRESS_MIN_BYTES,
+        "format_version": FORMAT_VERSION,
+        "namespaces": namespaces,
+    }
@@ -0,0 +1,442 @@
+"""
+Introspección y limpieza del cache en Redis sin bloquear a los demás workers.
+
+Los endpoints de /management/api/cache/* y las tareas de limpieza y monitoreo
+listaban claves con KEYS y después pedían TTL clave por clave. KEYS recorre
+todo el keyspace en un solo comando: mientras corre, Redis no atiende a los
+demás workers ni al broker de Celery. Aquí:
+
+- Contadores por namespace (escrituras, bytes escritos, hits, misses,
+  evicciones por invalidación o limpieza) que se acumulan en memoria al
+  escribir o consultar el cache y se vuelcan a Redis con HINCRBY, en un
+  pipeline, cada CACHE_STATS_FLUSH_SECONDS. Leerlos no recorre claves.
+- Enumeración con SCAN en lotes de CACHE_SCAN_BATCH; MEMORY USAGE y TTL van en
+  un pipeline por lote. La inspección de un namespace se corta en
+  CACHE_INSPECT_MAX_KEYS y guarda las entradas y bytes vistos junto a sus
+  contadores.
+- Borrado por patrón con SCAN + UNLINK por lotes (Redis libera la memoria en
+  segundo plano). Las limpiezas pedidas por un operador corren como trabajos
+  en background (Celery, o un thread si no hay broker) con progreso
+  consultable.
+
+Uso:
+
+    deleted = delete_matching("kpis:*")
+    stats = inspect_namespace("manager_dashboard")
+    job = start_clear_job("manager_dashboard:*")
+    get_clear_job(job["job_id"])
+"""
+
+import heapq
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from .redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+CACHE_SCAN_BATCH = int(os.getenv("CACHE_SCAN_BATCH", "500"))
+CACHE_INSPECT_MAX_KEYS = int(os.getenv("CACHE_INSPECT_MAX_KEYS", "20000"))
+CACHE_STATS_FLUSH_SECONDS = float(os.getenv("CACHE_STATS_FLUSH_SECONDS", "10"))
+CACHE_KEY_COUNT_TTL = int(os.getenv("CACHE_KEY_COUNT_TTL", "30"))
+CACHE_CLEAR_JOB_TTL = int(os.getenv("CACHE_CLEAR_JOB_TTL", "86400"))
+
+STATS_KEY = "cache_stats:{namespace}"
+STATS_NAMESPACES_KEY = "cache_stats:namespaces"
+CLEAR_JOB_KEY = "cache_clear_job:{job_id}"
+CLEAR_ACTIVE_KEY = "cache_clear_job:active:{pattern}"
+
+# Prefijos de claves que comparten el Redis del cache (broker de Celery,
+# estado propio) y no se limpian desde la API
+PROTECTED_NAMESPACES = ("celery", "_kombu", "unacked", "cache_stats", "cache_clear_job")
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+_INT_FIELDS = ("writes", "bytes_written", "hits", "misses", "evictions", "entries", "bytes",
+               "scanned", "deleted")
+_FLOAT_FIELDS = ("scanned_at", "created_at", "started_at", "updated_at", "finished_at")
+
+# Contadores pendientes de volcar y totales del proceso (fallback sin Redis)
+_pending: Dict[str, Counter] = {}
+_local_totals: Dict[str, Counter] = {}
+_pending_state = {"pid": None, "flushed_at": 0.0}
+_pending_lock = threading.Lock()
+
+# Conteo de claves por patrón: patrón -> (timestamp, cantidad)
+_key_counts: Dict[str, tuple] = {}
+_key_counts_lock = threading.Lock()
+
+
+def _text(value: Any) -> str:
+    return value.decode("utf-8", "replace") if isinstance(value, bytes) else str(value)
+
+
+def namespace_of(key: Any) -> str:
+    """Namespace de una clave o patrón: lo que va antes del primer ':'."""
+    return _text(key).split(":", 1)[0]
+
+
+# === CONTADORES ===
+
+def _count(namespace: str, **fields: int) -> None:
+    pid = os.getpid()
+    now = time.time()
+    with _pending_lock:
+        if _pending_state["pid"] != pid:
+            # Lo acumulado por el master (preload_app) no es de este worker
+            _pending.clear()
+            _local_totals.clear()
+            _pending_state.update(pid=pid, flushed_at=now)
+        pending = _pending.setdefault(namespace, Counter())
+        totals = _local_totals.setdefault(namespace, Counter())
+        for field, amount in fields.items():
+            pending[field] += amount
+            totals[field] += amount
+        due = now - _pending_state["flushed_at"] >= CACHE_STATS_FLUSH_SECONDS
+    if due:
+        flush_counters()
+
+
+def record_write(namespace: str, stored_bytes: int) -> None:
+    """Registrar una escritura en el cache (la llama encode_payload)."""
+    _count(namespace, writes=1, bytes_written=stored_bytes)
+
+
+def record_lookup(namespace: str, hit: bool) -> None:
+    """Registrar un hit o miss de una lectura de Redis, con namespace_of(clave)."""
+    _count(namespace, **{"hits" if hit else "misses": 1})
+
+
+def record_evictions(namespace: str, count: int) -> None:
+    """Registrar claves removidas por invalidación o limpieza."""
+    if count:
+        _count(namespace, evictions=count)
+
+
+def flush_counters() -> None:
+    """Volcar a Redis los contadores acumulados en este proceso."""
+    with _pending_lock:
+        pending = {ns: counters for ns, counters in _pending.items() if counters}
+        _pending.clear()
+        _pending_state["flushed_at"] = time.time()
+    if not pending or not redis_client:
+        return
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.sadd(STATS_NAMESPACES_KEY, *pending)
+        for namespace, counters in pending.items():
+            key = STATS_KEY.format(namespace=namespace)
+            for field, amount in counters.items():
+                pipe.hincrby(key, field, amount)
+        pipe.execute()
+    except Exception as e:
+        logger.debug(f"No se pudieron volcar los contadores de cache: {e}")
+
+
+def _parse_fields(raw: Dict[Any, Any]) -> Dict[str, Any]:
+    parsed = {}
+    for field, value in raw.items():
+        field, value = _text(field), _text(value)
+        if field in _INT_FIELDS:
+            parsed[field] = int(float(value))
+        elif field in _FLOAT_FIELDS:
+            parsed[field] = float(value)
+        elif value in ("True", "False"):
+            parsed[field] = value == "True"
+        else:
+            parsed[field] = value
+    return parsed
+
+
+def _with_ratio(stats: Dict[str, Any]) -> Dict[str, Any]:
+    lookups = stats.get("hits", 0) + stats.get("misses", 0)
+    stats["hit_ratio"] = round(stats.get("hits", 0) / lookups, 3) if lookups else None
+    return stats
+
+
+def counter_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Contadores por namespace: compartidos entre procesos con Redis, del
+    proceso actual sin él. Sin recorrer claves.
+    """
+    flush_counters()
+    if redis_client:
+        try:
+            namespaces = sorted(_text(ns) for ns in redis_client.smembers(STATS_NAMESPACES_KEY))
+            pipe = redis_client.pipeline(transaction=False)
+            for namespace in namespaces:
+                pipe.hgetall(STATS_KEY.format(namespace=namespace))
+            return {
+                namespace: _with_ratio(_parse_fields(raw))
+                for namespace, raw in zip(namespaces, pipe.execute())
+            }
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudieron leer los contadores de cache: {e}")
+    with _pending_lock:
+        return {ns: _with_ratio(dict(totals)) for ns, totals in sorted(_local_totals.items())}
+
+
+# === ENUMERACIÓN ===
+
+def scan_keys(pattern: str, batch: int = CACHE_SCAN_BATCH) -> Iterator[List[Any]]:
+    """
+    Lotes de claves que coinciden con el patrón (SCAN). Una clave puede
+    repetirse si el keyspace cambia durante el recorrido.
+    """
+    cursor = 0
+    while True:
+        cursor, keys = redis_client.scan(cursor=cursor, match=pattern, count=batch)
+        if keys:
+            yield keys
+        if not int(cursor):
+            break
+
+
+def key_ttls(keys: List[Any]) -> List[int]:
+    """TTL de cada clave en un solo pipeline (-1 sin TTL, -2 ya no existe)."""
+    pipe = redis_client.pipeline(transaction=False)
+    for key in keys:
+        pipe.ttl(key)
+    return pipe.execute()
+
+
+def unlink_keys(keys: List[Any]) -> int:
+    """Borrar claves sin bloquear a Redis liberando su memoria (UNLINK)."""
+    if not keys:
+        return 0
+    try:
+        deleted = redis_client.unlink(*keys)
+    except Exception as e:
+        # Redis < 4 no tiene UNLINK
+        logger.debug(f"UNLINK no disponible, se usa DEL: {e}")
+        deleted = redis_client.delete(*keys)
+    namespaces = Counter(namespace_of(key) for key in keys)
+    if len(namespaces) == 1:
+        record_evictions(next(iter(namespaces)), deleted)
+    else:
+        # Lote mixto (p.ej. '*:expired'): se atribuyen las claves vistas por SCAN
+        for namespace, count in namespaces.items():
+            record_evictions(namespace, count)
+    return deleted
+
+
+def count_keys(pattern: str, max_keys: int = CACHE_INSPECT_MAX_KEYS) -> int:
+    """
+    Cantidad de claves del patrón (hasta max_keys), recorrida con SCAN y
+    guardada CACHE_KEY_COUNT_TTL segundos en este proceso.
+    """
+    now = time.time()
+    with _key_counts_lock:
+        cached = _key_counts.get(pattern)
+        if cached and now - cached[0] < CACHE_KEY_COUNT_TTL:
+            return cached[1]
+
+    count = 0
+    for keys in scan_keys(pattern):
+        count += len(keys)
+        if count >= max_keys:
+            count = max_keys
+            break
+
+    with _key_counts_lock:
+        _key_counts[pattern] = (now, count)
+    return count
+
+
+def inspect_namespace(namespace: str, pattern: Optional[str] = None,
+                      max_keys: int = CACHE_INSPECT_MAX_KEYS, top: int = 5) -> Dict[str, Any]:
+    """
+    Entradas, bytes (MEMORY USAGE), distribución de TTL y claves más grandes
+    de un namespace, recorrido por lotes.
+    """
+    pattern = pattern or f"{namespace}:*"
+    entries = total_bytes = 0
+    ttl_distribution = {"no_ttl": 0, "lt_1m": 0, "lt_10m": 0, "lt_1h": 0, "gte_1h": 0}
+    largest: List[tuple] = []
+    truncated = False
+    started = time.perf_counter()
+
+    for keys in scan_keys(pattern):
+        pipe = redis_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.memory_usage(key)
+            pipe.ttl(key)
+        # MEMORY puede estar deshabilitado en Redis administrados: bytes desconocidos
+        results = pipe.execute(raise_on_error=False)
+
+        for key, size, ttl in zip(keys, results[::2], results[1::2]):
+            if isinstance(ttl, Exception) or ttl == -2:
+                continue  # expiró entre SCAN y el pipeline
+            size = size if isinstance(size, int) else 0
+            entries += 1
+            total_bytes += size
+            if ttl == -1:
+                ttl_distribution["no_ttl"] += 1
+            elif ttl < 60:
+                ttl_distribution["lt_1m"] += 1
+            elif ttl < 600:
+                ttl_distribution["lt_10m"] += 1
+            elif ttl < 3600:
+                ttl_distribution["lt_1h"] += 1
+            else:
+                ttl_distribution["gte_1h"] += 1
+            entry = (size, _text(key))
+            if len(largest) < top:
+                heapq.heappush(largest, entry)
+            elif entry > largest[0]:
+                heapq.heapreplace(largest, entry)
+
+        if entries >= max_keys:
+            truncated = True
+            break
+
+    snapshot = {
+        "entries": entries,
+        "bytes": total_bytes,
+        "scanned_at": time.time(),
+        "truncated": truncated,
+    }
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.sadd(STATS_NAMESPACES_KEY, namespace)
+        pipe.hset(STATS_KEY.format(namespace=namespace), mapping={k: str(v) for k, v in snapshot.items()})
+        pipe.execute()
+    except Exception as e:
+        logger.debug(f"No se pudo guardar el snapshot de {namespace}: {e}")
+
+    return dict(
+        snapshot,
+        namespace=namespace,
+        pattern=pattern,
+        ttl_distribution=ttl_distribution,
+        largest_keys=[{"key": key, "bytes": size} for size, key in sorted(largest, reverse=True)],
+        duration_ms=round((time.perf_counter() - started) * 1000, 1),
+    )
+
+
+def delete_matching(pattern: str, batch: int = CACHE_SCAN_BATCH,
+                    progress: Optional[Callable[[int, int], None]] = None) -> int:
+    """Borrar las claves del patrón por lotes (SCAN + UNLINK). Devuelve las borradas."""
+    scanned = deleted = 0
+    for keys in scan_keys(pattern, batch):
+        scanned += len(keys)
+        deleted += unlink_keys(keys)
+        if progress:
+            progress(scanned, deleted)
+    with _key_counts_lock:
+        _key_counts.pop(pattern, None)
+    return deleted
+
+
+def delete_expiring(patterns: Iterable[str], min_ttl: int) -> int:
+    """Borrar las claves de los patrones con menos de min_ttl segundos de vida (o sin TTL)."""
+    deleted = 0
+    for pattern in patterns:
+        for keys in scan_keys(pattern):
+            expiring = [key for key, ttl in zip(keys, key_ttls(keys)) if -2 < ttl < min_ttl]
+            deleted += unlink_keys(expiring)
+    return deleted
+
+
+# === TRABAJOS DE LIMPIEZA ===
+
+def validate_pattern(pattern: str) -> str:
+    """Un patrón de limpieza debe empezar con un namespace de cache."""
+    pattern = (pattern or "").strip()
+    namespace = namespace_of(pattern)
+    if not namespace or any(char in namespace for char in "*?[]"):
+        raise ValueError("El patrón debe empezar con un namespace, p.ej. 'kpis:*'")
+    if namespace.startswith(PROTECTED_NAMESPACES):
+        raise ValueError(f"El namespace '{namespace}' no es de cache")
+    return pattern
+
+
+def _save_job(job_id: str, **fields: Any) -> None:
+    key = CLEAR_JOB_KEY.format(job_id=job_id)
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hset(key, mapping={field: str(value) for field, value in fields.items()})
+    pipe.expire(key, CACHE_CLEAR_JOB_TTL)
+    pipe.execute()
+
+
+def get_clear_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Estado y progreso de un trabajo de limpieza; None si no existe o expiró."""
+    if not redis_client:
+        return None
+    raw = redis_client.hgetall(CLEAR_JOB_KEY.format(job_id=job_id))
+    return _parse_fields(raw) if raw else None
+
+
+def start_clear_job(pattern: str) -> Dict[str, Any]:
+    """
+    Programar el borrado de un patrón en background. Si ya hay un trabajo
+    activo para el mismo patrón, devuelve ese.
+    """
+    pattern = validate_pattern(pattern)
+    if not redis_client:
+        raise ConnectionError("Redis no disponible")
+
+    job_id = uuid.uuid4().hex[:12]
+    active_key = CLEAR_ACTIVE_KEY.format(pattern=pattern)
+    if not redis_client.set(active_key, job_id, nx=True, ex=CACHE_CLEAR_JOB_TTL):
+        current = get_clear_job(_text(redis_client.get(active_key) or ""))
+        if current and current.get("status") in (JOB_QUEUED, JOB_RUNNING):
+            return current
+        redis_client.set(active_key, job_id, ex=CACHE_CLEAR_JOB_TTL)
+
+    now = time.time()
+    _save_job(job_id, job_id=job_id, pattern=pattern, status=JOB_QUEUED,
+              scanned=0, deleted=0, created_at=now, updated_at=now)
+
+    try:
+        from ..tasks.metrics import clear_cache_pattern
+
+        clear_cache_pattern.delay(job_id)
+    except Exception as e:
+        logger.warning(f"⚠️ Celery no disponible, limpieza {job_id} en un thread: {e}")
+        threading.Thread(
+            target=run_clear_job, args=(job_id,), name=f"cache-clear-{job_id}", daemon=True
+        ).start()
+
+    logger.info(f"🧹 Limpieza de cache {job_id} programada: {pattern}")
+    return get_clear_job(job_id)
+
+
+def run_clear_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Ejecutar un trabajo de limpieza registrando el progreso por lote."""
+    job = get_clear_job(job_id)
+    if not job or job.get("status") not in (JOB_QUEUED, JOB_RUNNING):
+        return job
+
+    pattern = job["pattern"]
+    _save_job(job_id, status=JOB_RUNNING, started_at=time.time(), updated_at=time.time())
+
+    def progress(scanned: int, deleted: int) -> None:
+        _save_job(job_id, scanned=scanned, deleted=deleted, updated_at=time.time())
+
+    try:
+        deleted = delete_matching(pattern, progress=progress)
+        _save_job(job_id, status=JOB_DONE, deleted=deleted, finished_at=time.time(),
+                  updated_at=time.time())
+        logger.info(f"✅ Limpieza de cache {job_id}: {deleted} claves de {pattern}")
+    except Exception as e:
+        logger.error(f"❌ Limpieza de cache {job_id} falló: {e}")
+        _save_job(job_id, status=JOB_FAILED, error=str(e), finished_at=time.time(),
+                  updated_at=time.time())
+    finally:
+        try:
+            active_key = CLEAR_ACTIVE_KEY.format(pattern=pattern)
+            if _text(redis_client.get(active_key) or "") == job_id:
+                redis_client.delete(active_key)
+        except Exception as e:
+            logger.debug(f"No se pudo liberar la limpieza activa de {pattern}: {e}")
+
+    return get_clear_job(job_id)
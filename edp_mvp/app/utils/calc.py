@@ -1,4 +1,6 @@
-def calcular_dias_habiles(fecha_inicio, fecha_fin):
-    dias = pd.bdate_range(start=fecha_inicio, end=fecha_fin)
-    return len(dias) - 1  # no incluye el día de envío
+from .business_calendar import business_days_between
+
 
+def calcular_dias_habiles(fecha_inicio, fecha_fin):
+    # no incluye el día de envío; descuenta fines de semana y feriados
+    return business_days_between(fecha_inicio, fecha_fin)
@@ -0,0 +1,106 @@
+"""
+Modo de servicio cooperativo (gevent / eventlet) y pool acotado para pandas.
+
+Con workers `sync` y 2 threads cada worker atiende a lo sumo dos requests a la
+vez, aunque casi todo su tiempo se va esperando a PostgREST y a Redis. Con
+SERVING_MODE=gevent (o eventlet) gunicorn_config.py aplica el monkeypatch
+antes de cargar la app: requests, redis y smtplib pasan a usar sockets
+cooperativos y un worker atiende decenas de requests en espera.
+
+El cálculo con pandas no cede el control: una clasificación de EDPs o un
+tablero kanban bloquearía a todos los greenlets del worker. Las funciones
+marcadas con @cpu_bound corren en un pool de threads nativos de CPU_POOL_SIZE
+(gevent.threadpool / eventlet.tpool) mientras el worker sigue atendiendo I/O.
+Solo deben marcarse funciones puras sobre DataFrames, sin I/O: los sockets
+parcheados pertenecen al hub del worker. El contexto de Flask viaja con la
+llamada (contextvars).
+
+En modo sync @cpu_bound llama a la función directamente.
+"""
+
+import contextvars
+import functools
+import logging
+import os
+import sys
+import threading
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+SERVING_MODES = ("sync", "gevent", "eventlet")
+SERVING_MODE = os.getenv("SERVING_MODE", "sync").lower()
+if SERVING_MODE not in SERVING_MODES:
+    logger.warning(f"⚠️ SERVING_MODE={SERVING_MODE} no soportado, se usa sync")
+    SERVING_MODE = "sync"
+
+CPU_POOL_SIZE = int(os.getenv("CPU_POOL_SIZE", str(os.cpu_count() or 2)))
+
+_gevent_pool = None
+_gevent_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def cooperative_backend() -> Optional[str]:
+    """
+    'gevent' o 'eventlet' si el proceso tiene los sockets parcheados; None si
+    no. El monkeypatch ocurre antes de importar la app, así que basta con
+    mirarlo una vez.
+    """
+    # Sin importar gevent/eventlet: si nadie los importó, no hay monkeypatch
+    monkey = sys.modules.get("gevent.monkey")
+    if monkey is not None and monkey.is_module_patched("socket"):
+        return "gevent"
+    patcher = sys.modules.get("eventlet.patcher")
+    if patcher is not None and patcher.is_monkey_patched("socket"):
+        return "eventlet"
+    return None
+
+
+def socketio_async_mode() -> str:
+    """async_mode de Socket.IO acorde al worker (SOCKETIO_ASYNC_MODE lo fuerza)."""
+    configured = os.getenv("SOCKETIO_ASYNC_MODE")
+    if configured:
+        return configured
+    return cooperative_backend() or "threading"
+
+
+def _get_gevent_pool():
+    global _gevent_pool, _gevent_pool_pid
+    # Un pool por proceso: el master (preload_app) no debe heredarlo a los workers
+    if _gevent_pool is None or _gevent_pool_pid != os.getpid():
+        with _pool_lock:
+            if _gevent_pool is None or _gevent_pool_pid != os.getpid():
+                from gevent.threadpool import ThreadPool
+
+                _gevent_pool = ThreadPool(CPU_POOL_SIZE)
+                _gevent_pool_pid = os.getpid()
+                logger.info(f"🧵 Pool de cálculo gevent con {CPU_POOL_SIZE} threads")
+    return _gevent_pool
+
+
+def run_cpu_bound(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Ejecutar fn fuera del hub cooperativo; directo si el proceso no es cooperativo."""
+    backend = cooperative_backend()
+    if backend is None:
+        return fn(*args, **kwargs)
+
+    call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+    if backend == "gevent":
+        return _get_gevent_pool().apply(call)
+
+    from eventlet import tpool
+
+    # El tamaño del pool de eventlet se fija con EVENTLET_THREADPOOL_SIZE
+    return tpool.execute(call)
+
+
+def cpu_bound(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Marcar una función pura de pandas para correr en el pool de cálculo."""
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return run_cpu_bound(fn, *args, **kwargs)
+
+    return wrapper
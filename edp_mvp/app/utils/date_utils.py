@@ -162,12 +162,16 @@ class DateUtils:
     
     @staticmethod
     def is_business_day(dt: Union[datetime, date]) -> bool:
-        """Check if a date is a business day (Monday-Friday)."""
-        return not DateUtils.is_weekend(dt)
+        """Check if a date is a business day (Monday-Friday, excluding holidays)."""
+        from .business_calendar import is_business_day
+
+        return bool(is_business_day(dt))
     
     @staticmethod
     def get_business_days_between(start_date: Union[datetime, date], end_date: Union[datetime, date]) -> int:
-        """Calculate business days between two dates."""
+        """Calculate business days between two dates, both inclusive, excluding holidays."""
+        from .business_calendar import business_days_between, is_business_day
+
         try:
             if isinstance(start_date, datetime):
                 start_date = start_date.date()
@@ -177,16 +181,10 @@ class DateUtils:
             if start_date > end_date:
                 start_date, end_date = end_date, start_date
             
-            business_days = 0
-            current_date = start_date
-            
-            while current_date <= end_date:
-                if DateUtils.is_business_day(current_date):
-                    business_days += 1
-                current_date += timedelta(days=1)
-            
-            return business_days
-        except (AttributeError, TypeError):
+            # The calendar counts (start, end]; add the start date if it is a business day
+            business_days = business_days_between(start_date, end_date) + is_business_day(start_date)
+            return int(business_days)
+        except (AttributeError, TypeError, ValueError):
             return 0
     
     @staticmethod
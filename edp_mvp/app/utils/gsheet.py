@@ -8,6 +8,8 @@ import re
 import traceback
 from time import time
 import json
+from .instrumentation import record_cache
+from .business_calendar import business_days_between
 
 # Importar Flask-Login para obtener el usuario actual
 try:
@@ -19,19 +21,9 @@ except ImportError:
     has_request_context = None
     HAS_FLASK_LOGIN = False
 
-# Redis setup for cache
-try:
-    import redis
-    import os
-    redis_url = os.getenv("REDIS_URL")
-    redis_client = redis.from_url(redis_url) if redis_url else None
-    if redis_client:
-        # Test connection
-        redis_client.ping()
-        print("✅ Redis disponible para cache de Google Sheets")
-except (ImportError, Exception) as e:
-    redis_client = None
-    print(f"⚠️ Redis no disponible para cache: {e}")
+from .redis_client import redis_client
+from .cache_codec import decode_payload, encode_payload
+from .cache_inspector import delete_matching, namespace_of, record_lookup
 
 SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
 
@@ -49,10 +41,8 @@ def clear_all_cache():
     # 2. Limpiar Redis cache para Google Sheets
     if redis_client:
         try:
-            pattern = "gsheet:*"
-            keys = redis_client.keys(pattern)
-            if keys:
-                deleted = redis_client.delete(*keys)
+            deleted = delete_matching("gsheet:*")
+            if deleted:
                 print(f"🧹 Redis cache limpiado: {deleted} keys eliminadas")
             else:
                 print("🧹 Redis cache ya estaba limpio")
@@ -98,6 +88,14 @@ def generate_unique_id():
 
 
 
+def _schedule_refresh(sheet_name):
+    """Programar el recálculo de los caches que dependen de la hoja escrita."""
+    try:
+        from ..services.refresh_orchestrator import schedule_refresh_for_table
+        schedule_refresh_for_table(sheet_name)
+    except Exception as e:
+        print(f"⚠️ No se pudo programar el recálculo tras escribir en {sheet_name}: {e}")
+
 def append_edp(edp_data):
     """Inserta un nuevo EDP asignándole un ID único"""
     # Generar ID único
@@ -112,6 +110,7 @@ def append_edp(edp_data):
     
     # Insertar en la hoja
     append_row(row_values, sheet_name="edp")
+    _schedule_refresh("edp")
     
     # Devolver el ID asignado
     return unique_id
@@ -207,7 +206,7 @@ def get_service():
     Obtener servicio de Google Sheets desde la configuración centralizada.
     """
     config = get_config()
-    return config.GOOGLE_SERVICE
+    return config.get_google_service()
 
 def read_sheet(range_name, apply_transformations=True):
     """
@@ -232,9 +231,12 @@ def read_sheet(range_name, apply_transformations=True):
     # 1. Intentar Redis cache primero (más duradero)
     if redis_client:
         try:
-            cached_data = redis_client.get(f"gsheet:{range_name}")
+            redis_key = f"gsheet:{range_name}"
+            cached_data = redis_client.get(redis_key)
+            record_cache("gsheet_redis", bool(cached_data))
+            record_lookup(namespace_of(redis_key), bool(cached_data))
             if cached_data:
-                values = json.loads(cached_data)
+                values = decode_payload(cached_data)
                 cache_source = "Redis"
                 print(f"🚀 Cache hit Redis para {range_name}")
         except Exception as e:
@@ -249,6 +251,8 @@ def read_sheet(range_name, apply_transformations=True):
             print(f"🚀 Cache hit memoria para {range_name}")
         else:
             print(f"🕐 Cache en memoria expirado para {range_name}")
+    if cache_source != "Redis":
+        record_cache("range_cache", values is not None)
     
     # 3. Si no hay cache válido, leer desde Google Sheets
     if values is None:
@@ -313,7 +317,9 @@ def read_sheet(range_name, apply_transformations=True):
             
             if redis_client:
                 try:
-                    redis_client.setex(f"gsheet:{range_name}", redis_timeout, json.dumps(values))
+                    redis_client.setex(
+                        f"gsheet:{range_name}", redis_timeout, encode_payload(values, "gsheet")
+                    )
                     print(f"📊 Datos cargados desde Google Sheets y cacheados en Redis+memoria: {range_name}")
                 except Exception as e:
                     print(f"⚠️ Error guardando en Redis: {e}")
@@ -332,7 +338,7 @@ def read_sheet(range_name, apply_transformations=True):
                 try:
                     cached_data = redis_client.get(f"gsheet:{range_name}")
                     if cached_data:
-                        values = json.loads(cached_data)
+                        values = decode_payload(cached_data)
                         cache_source = "Redis expirado (fallback)"
                         print(f"⚠️ Usando Redis cache como fallback para {range_name}")
                 except Exception:
@@ -632,19 +638,13 @@ def read_sheet(range_name, apply_transformations=True):
         
         # Días Hábiles
         if "Fecha Envío al Cliente" in df.columns:
-            def calcular_dias_habiles(row):
-                inicio = row.get("Fecha Envío al Cliente")
-                fin = row.get("Fecha Conformidad")
-                if pd.isna(inicio):
-                    return "—"
-                if pd.isna(fin):
-                    fin = hoy
-                try:
-                    dias = pd.bdate_range(start=inicio, end=fin)
-                    return max(len(dias) - 1, 0)
-                except Exception:
-                    return "—"
-            df["Días Hábiles"] = df.apply(calcular_dias_habiles, axis=1)
+            fin = (
+                df["Fecha Conformidad"].fillna(hoy)
+                if "Fecha Conformidad" in df.columns
+                else hoy
+            )
+            dias = business_days_between(df["Fecha Envío al Cliente"], fin).clip(lower=0)
+            df["Días Hábiles"] = dias.astype("Int64").astype(object).where(dias.notna(), "—")
         else:
             df["Días Hábiles"] = "—"
 
@@ -872,6 +872,7 @@ def update_row(row_number, updates, sheet_name="edp", usuario=None, force_update
                     usuario=usuario  # Se pasa None si no se especifica, permitiendo auto-detección
                 )
             
+            _schedule_refresh(sheet_name)
             return True
         else:
             print("No se detectaron cambios para actualizar")
@@ -1021,8 +1022,10 @@ def read_log(n_edp=None, proyecto=None, usuario=None, range_name="log!A1:G"):
     if range_name in _range_cache:
         ts, values = _range_cache[range_name]
         if now - ts < timeout:
+            record_cache("range_cache", True)
             print(f"🚀 Cache hit para {range_name}")
         else:
+            record_cache("range_cache", False)
             # Cache expirado, leer desde Sheets
             service = get_service()
             config = get_config()
@@ -1037,6 +1040,7 @@ def read_log(n_edp=None, proyecto=None, usuario=None, range_name="log!A1:G"):
             print(f"📊 Cache actualizado para {range_name}")
     else:
         # Primera vez, leer desde Sheets
+        record_cache("range_cache", False)
         service = get_service()
         config = get_config()
         sheet = service.spreadsheets()
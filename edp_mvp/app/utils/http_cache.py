@@ -0,0 +1,268 @@
+"""
+GET condicional (ETag / Last-Modified) y compresión de las APIs JSON.
+
+Los dashboards consultan KPIs, proyectos críticos, resumen financiero y kanban
+cada pocos segundos y cada consulta devolvía el JSON completo, sin comprimir,
+aunque nada hubiera cambiado.
+
+- @conditional_json() deriva un ETag fuerte de la generación de datos
+  (CacheInvalidationService), la URL y el usuario, y responde 304 a un
+  If-None-Match vigente sin ejecutar la vista: una consulta sin cambios no
+  llega a pandas. La ventana HTTP_ETAG_WINDOW_SECONDS acota cuánto puede
+  durar un ETag si los datos cambian fuera de la app (y cubre los cálculos
+  que dependen de la fecha). Con by="payload" el ETag es el hash del cuerpo:
+  ahorra transferencia, no cálculo.
+- init_app registra la compresión gzip (o brotli, si está instalado y el
+  cliente lo acepta) de los cuerpos de HTTP_COMPRESS_MIN_BYTES o más. El
+  ETag de la respuesta comprimida lleva el sufijo de la codificación.
+
+Las funciones sin Flask (validadores, negociación, compresión) también las
+usa el middleware de la API FastAPI.
+
+Uso:
+
+    @management_bp.route("/api/kpis")
+    @login_required
+    @conditional_json()
+    def api_kpis():
+        ...
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import time
+from functools import wraps
+from typing import Callable, Optional, Tuple
+
+from flask import current_app, request
+from flask_login import current_user
+from werkzeug.http import http_date, parse_date, parse_etags
+
+from .instrumentation import record_cache
+
+try:  # pragma: no cover - optional dependency
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+HTTP_CACHE_ENABLED = os.getenv("HTTP_CACHE_ENABLED", "true").lower() == "true"
+HTTP_ETAG_WINDOW_SECONDS = int(os.getenv("HTTP_ETAG_WINDOW_SECONDS", "300"))
+HTTP_COMPRESS_ENABLED = os.getenv("HTTP_COMPRESS_ENABLED", "true").lower() == "true"
+HTTP_COMPRESS_MIN_BYTES = int(os.getenv("HTTP_COMPRESS_MIN_BYTES", "1024"))
+HTTP_GZIP_LEVEL = int(os.getenv("HTTP_GZIP_LEVEL", "6"))
+HTTP_BROTLI_QUALITY = int(os.getenv("HTTP_BROTLI_QUALITY", "5"))
+HTTP_COMPRESS_MIMETYPES = frozenset(
+    os.getenv(
+        "HTTP_COMPRESS_MIMETYPES",
+        "application/json,text/html,text/csv,text/css,text/javascript,application/javascript",
+    ).split(",")
+)
+
+# Preferencia del servidor cuando el cliente acepta varias
+ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+
+# Sin cache compartido: el cliente guarda la respuesta y la revalida siempre
+CACHE_CONTROL = "private, no-cache"
+
+Validators = Tuple[str, Optional[float]]
+
+
+# === VALIDADORES ===
+
+def generation_validators(key: str) -> Validators:
+    """
+    ETag y Last-Modified de una respuesta que depende solo de los datos
+    (generación vigente), de la ventana de tiempo actual y de `key`.
+    """
+    from ..services.cache_invalidation_service import data_generation_state
+
+    generation, updated_at = data_generation_state()
+    window = int(time.time() // HTTP_ETAG_WINDOW_SECONDS) * HTTP_ETAG_WINDOW_SECONDS
+    digest = hashlib.blake2b(f"{generation}|{window}|{key}".encode("utf-8"), digest_size=12)
+    return digest.hexdigest(), max(updated_at or 0, window)
+
+
+def payload_etag(body: bytes) -> str:
+    """ETag fuerte a partir del cuerpo de la respuesta."""
+    return hashlib.blake2b(body, digest_size=12).hexdigest()
+
+
+def _strip_encoding(etag: str) -> str:
+    for encoding in ("br", "gzip"):
+        suffix = f"-{encoding}"
+        if etag.endswith(suffix):
+            return etag[: -len(suffix)]
+    return etag
+
+
+def is_not_modified(if_none_match: Optional[str], if_modified_since: Optional[str],
+                    etag: str, last_modified: Optional[float]) -> bool:
+    """
+    Si el cliente ya tiene la representación vigente. If-None-Match manda
+    sobre If-Modified-Since; se ignora el sufijo de codificación del ETag.
+    """
+    if if_none_match:
+        etags = parse_etags(if_none_match)
+        if etags.star_tag:
+            return True
+        return any(_strip_encoding(tag) == etag for tag in etags.as_set(include_weak=True))
+    if if_modified_since and last_modified:
+        since = parse_date(if_modified_since)
+        return since is not None and since.timestamp() >= int(last_modified)
+    return False
+
+
+def validator_headers(etag: str, last_modified: Optional[float]) -> dict:
+    headers = {"ETag": f'"{etag}"', "Cache-Control": CACHE_CONTROL}
+    if last_modified:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+# === COMPRESIÓN ===
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Codificación a usar según Accept-Encoding (q=0 la excluye)."""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=HTTP_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=HTTP_GZIP_LEVEL)
+
+
+def should_compress(mimetype: Optional[str], size: int) -> bool:
+    return HTTP_COMPRESS_ENABLED and size >= HTTP_COMPRESS_MIN_BYTES and mimetype in HTTP_COMPRESS_MIMETYPES
+
+
+def add_vary(current: Optional[str], *fields: str) -> str:
+    values = [value.strip() for value in (current or "").split(",") if value.strip()]
+    for field in fields:
+        if field.lower() not in (value.lower() for value in values):
+            values.append(field)
+    return ", ".join(values)
+
+
+# === FLASK ===
+
+def _request_key(per_user: bool) -> str:
+    key = request.full_path
+    if per_user and current_user.is_authenticated:
+        key = f"{current_user.get_id()}:{getattr(current_user, 'rol', '')}|{key}"
+    return key
+
+
+def _not_modified(etag: str, last_modified: Optional[float]):
+    response = current_app.response_class(status=304)
+    response.headers.update(validator_headers(etag, last_modified))
+    response.headers["Vary"] = add_vary(response.headers.get("Vary"), "Accept-Encoding", "Cookie")
+    return response
+
+
+def _is_error_payload(response) -> bool:
+    # Varias APIs responden errores con 200 y success=false: no deben quedar cacheados
+    payload = response.get_json(silent=True) if response.is_json else None
+    return isinstance(payload, dict) and payload.get("success") is False
+
+
+def conditional_json(by: str = "generation", per_user: bool = True) -> Callable:
+    """
+    Responder 304 a consultas repetidas de una API JSON.
+
+    Args:
+        by: "generation" (304 sin ejecutar la vista) o "payload" (hash del cuerpo)
+        per_user: incluir usuario y rol en el ETag (las vistas filtran por rol)
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not HTTP_CACHE_ENABLED or request.method != "GET":
+                return view(*args, **kwargs)
+
+            if_none_match = request.headers.get("If-None-Match")
+            if_modified_since = request.headers.get("If-Modified-Since")
+
+            validators = None
+            if by == "generation":
+                validators = generation_validators(_request_key(per_user))
+                if is_not_modified(if_none_match, if_modified_since, *validators):
+                    record_cache("http_conditional", True)
+                    return _not_modified(*validators)
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed or _is_error_payload(response):
+                return response
+
+            if validators is None:
+                validators = (payload_etag(response.get_data()), None)
+                if is_not_modified(if_none_match, None, *validators):
+                    record_cache("http_conditional", True)
+                    return _not_modified(*validators)
+
+            record_cache("http_conditional", False)
+            response.headers.update(validator_headers(*validators))
+            response.headers["Vary"] = add_vary(response.headers.get("Vary"), "Cookie")
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def compress_response(response):
+    """after_request: comprimir cuerpos grandes según Accept-Encoding."""
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+
+    body = response.get_data()
+    if not should_compress(response.mimetype, len(body)):
+        return response
+
+    response.headers["Vary"] = add_vary(response.headers.get("Vary"), "Accept-Encoding")
+    encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+    if encoding is None:
+        return response
+
+    response.set_data(compress_body(body, encoding))
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
+
+
+def init_app(app) -> None:
+    """Registrar la compresión de respuestas en la app Flask."""
+    if not HTTP_COMPRESS_ENABLED:
+        logger.info("🗜️ Compresión HTTP deshabilitada (HTTP_COMPRESS_ENABLED=false)")
+        return
+    app.after_request(compress_response)
+    logger.info(
+        f"🗜️ Compresión HTTP: {', '.join(ENCODINGS)} desde {HTTP_COMPRESS_MIN_BYTES} bytes"
+    )
@@ -0,0 +1,226 @@
+"""
+Instrumentación liviana para producción (formato Prometheus).
+
+Expone:
+- Latencia de requests por blueprint/endpoint (histograma)
+- Llamadas a Supabase por tabla: contador y latencia
+- Hits/misses por capa de cache (range_cache, gsheet Redis, manager_dashboard,
+  kanban_cache, api_cache, supabase)
+- Bytes serializados vs. almacenados de los payloads en Redis (ratio de compresión)
+- Duración de tareas Celery
+- Tiempos por etapa con `stage_timer("nombre")`
+
+Con gunicorn se usa el modo multiproceso de prometheus_client: cada worker
+escribe en PROMETHEUS_MULTIPROC_DIR y `/metrics` agrega todos los procesos.
+Si prometheus_client no está instalado, todas las funciones son no-op.
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+try:  # pragma: no cover - optional dependency
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        CollectorRegistry,
+        Counter,
+        Histogram,
+        generate_latest,
+        multiprocess,
+    )
+
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = PROMETHEUS_AVAILABLE and os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Paths que no se miden (ruido o el propio endpoint de métricas)
+_SKIPPED_PREFIXES = ("/static", "/metrics", "/favicon.ico")
+
+# Buckets en segundos pensados para dashboards (10ms .. 30s)
+_LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+_TASK_BUCKETS = (0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 900, 1800)
+
+if METRICS_ENABLED:
+    REQUEST_LATENCY = Histogram(
+        "edp_http_request_duration_seconds",
+        "Latencia de requests HTTP",
+        ["blueprint", "endpoint", "method", "status"],
+        buckets=_LATENCY_BUCKETS,
+    )
+    SUPABASE_REQUESTS = Counter(
+        "edp_supabase_requests_total",
+        "Peticiones a Supabase (PostgREST)",
+        ["method", "table", "outcome"],
+    )
+    SUPABASE_LATENCY = Histogram(
+        "edp_supabase_request_duration_seconds",
+        "Latencia de peticiones a Supabase",
+        ["method", "table"],
+        buckets=_LATENCY_BUCKETS,
+    )
+    CACHE_REQUESTS = Counter(
+        "edp_cache_requests_total",
+        "Consultas a cache por capa",
+        ["layer", "result"],
+    )
+    CACHE_PAYLOAD_BYTES = Counter(
+        "edp_cache_payload_bytes_total",
+        "Bytes de payloads escritos en Redis, serializados y almacenados",
+        ["namespace", "kind"],
+    )
+    STAGE_LATENCY = Histogram(
+        "edp_stage_duration_seconds",
+        "Duración de etapas internas (carga, cálculo, render)",
+        ["stage"],
+        buckets=_LATENCY_BUCKETS,
+    )
+    TASK_DURATION = Histogram(
+        "edp_celery_task_duration_seconds",
+        "Duración de tareas Celery",
+        ["task", "state"],
+        buckets=_TASK_BUCKETS,
+    )
+
+
+# === API DE REGISTRO ===
+
+def record_cache(layer: str, hit: bool) -> None:
+    """Registrar un hit o miss en una capa de cache (solo Prometheus).
+
+    Las lecturas de Redis además cuentan en cache_stats con
+    cache_inspector.record_lookup bajo el namespace de la clave.
+    """
+    if METRICS_ENABLED:
+        CACHE_REQUESTS.labels(layer=layer, result="hit" if hit else "miss").inc()
+
+
+def record_cache_payload(namespace: str, serialized_bytes: int, stored_bytes: int) -> None:
+    """Registrar el tamaño de un payload antes y después de comprimir."""
+    if METRICS_ENABLED:
+        CACHE_PAYLOAD_BYTES.labels(namespace=namespace, kind="serialized").inc(serialized_bytes)
+        CACHE_PAYLOAD_BYTES.labels(namespace=namespace, kind="stored").inc(stored_bytes)
+
+
+def record_request(blueprint: str, endpoint: str, method: str, status: int, duration: float) -> None:
+    if METRICS_ENABLED:
+        REQUEST_LATENCY.labels(
+            blueprint=blueprint, endpoint=endpoint, method=method, status=str(status)
+        ).observe(duration)
+
+
+def record_supabase_request(method: str, endpoint: str, duration: float, outcome: str = "ok") -> None:
+    """Registrar una petición a Supabase; `endpoint` puede incluir query string."""
+    if not METRICS_ENABLED:
+        return
+    table = endpoint.split("?", 1)[0].split("/", 1)[0] or "unknown"
+    SUPABASE_REQUESTS.labels(method=method, table=table, outcome=outcome).inc()
+    SUPABASE_LATENCY.labels(method=method, table=table).observe(duration)
+
+
+def record_stage(stage: str, duration: float) -> None:
+    if METRICS_ENABLED:
+        STAGE_LATENCY.labels(stage=stage).observe(duration)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """
+    Medir una etapa interna:
+
+        with stage_timer("manager_dashboard.load_edps"):
+            df = repo.find_all_dataframe()
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+# === FLASK ===
+
+def init_app(app) -> None:
+    """Registrar hooks de latencia y el endpoint /metrics en la app Flask."""
+    if not METRICS_ENABLED:
+        logger.info("📉 Métricas deshabilitadas (prometheus_client no disponible o METRICS_ENABLED=false)")
+        return
+
+    from flask import Response, abort, g, request
+
+    @app.before_request
+    def _start_request_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        start = getattr(g, "_metrics_start", None)
+        if start is None or request.path.startswith(_SKIPPED_PREFIXES):
+            return response
+        record_request(
+            request.blueprint or "app",
+            # Endpoint de Flask (no el path) para acotar la cardinalidad
+            request.endpoint or "unmatched",
+            request.method,
+            response.status_code,
+            time.perf_counter() - start,
+        )
+        return response
+
+    token = os.getenv("METRICS_TOKEN")
+
+    def metrics():
+        if token and request.headers.get("Authorization") != f"Bearer {token}":
+            abort(401)
+        return Response(generate_metrics(), mimetype=CONTENT_TYPE_LATEST)
+
+    app.add_url_rule("/metrics", "metrics", metrics)
+    logger.info("📈 Métricas Prometheus disponibles en /metrics")
+
+
+def generate_metrics() -> bytes:
+    """Serializar métricas; en modo multiproceso agrega todos los workers."""
+    if not PROMETHEUS_AVAILABLE:
+        return b""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
+
+def mark_process_dead(pid: int) -> None:
+    """Limpiar los archivos de un worker terminado (hook child_exit de gunicorn)."""
+    if PROMETHEUS_AVAILABLE and os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
+
+
+# === CELERY ===
+
+_task_starts = {}
+
+
+def connect_celery_signals() -> None:
+    """Medir la duración de cada tarea Celery vía señales prerun/postrun."""
+    if not METRICS_ENABLED:
+        return
+
+    from celery.signals import task_postrun, task_prerun
+
+    @task_prerun.connect(weak=False)
+    def _task_started(task_id: Optional[str] = None, **kwargs):
+        _task_starts[task_id] = time.perf_counter()
+
+    @task_postrun.connect(weak=False)
+    def _task_finished(task_id: Optional[str] = None, task=None, state: Optional[str] = None, **kwargs):
+        start = _task_starts.pop(task_id, None)
+        if start is None:
+            return
+        name = getattr(task, "name", "unknown")
+        TASK_DURATION.labels(task=name, state=state or "UNKNOWN").observe(time.perf_counter() - start)
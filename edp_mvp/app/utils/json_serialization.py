@@ -0,0 +1,150 @@
+"""
+Serialización JSON rápida para respuestas con tipos numpy/pandas.
+
+Un solo encoder entiende escalares y arrays numpy, Timestamp, NaT/NaN, Decimal
+y fechas en una única pasada (sin reintentar tras un TypeError). Si orjson está
+instalado se usa como encoder nativo; si no, se usa json estándar con el mismo
+`default`.
+
+Uso opt-in por endpoint:
+
+    from ..utils.json_serialization import fast_jsonify
+    return fast_jsonify({"success": True, "data": data})
+"""
+
+import json
+import logging
+import os
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+from flask import Response, current_app, jsonify
+from flask.json.provider import DefaultJSONProvider
+
+try:  # pragma: no cover - optional native encoder
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+ENCODER_NAME = "orjson" if orjson else "stdlib"
+
+if orjson:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def encode_default(obj: Any) -> Any:
+    """
+    Convierte un objeto no serializable a un tipo JSON nativo.
+    Se usa como `default` tanto en orjson como en json estándar.
+    """
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return None if np.isnan(obj) else float(obj)
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if obj is pd.NaT:
+        return None
+    if isinstance(obj, (pd.Timestamp, datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, pd.Timedelta):
+        return obj.total_seconds()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, pd.DataFrame):
+        return dataframe_to_records(obj)
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if obj.__class__.__name__ == "DictToObject":
+        return obj.__dict__
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """Serializa a JSON (bytes UTF-8) en una sola pasada."""
+    if orjson:
+        return orjson.dumps(obj, default=encode_default, option=_ORJSON_OPTIONS)
+    return json.dumps(obj, default=encode_default, ensure_ascii=False).encode("utf-8")
+
+
+def dataframe_to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Convierte un DataFrame a lista de dicts sin pasar por to_dict('records').
+
+    Trabaja por columna: fechas a ISO y NaN/NaT a None con operaciones
+    vectorizadas, luego un único zip sobre listas Python nativas.
+    """
+    if df is None or df.empty:
+        return []
+
+    columns = []
+    for name in df.columns:
+        series = df[name]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            if getattr(series.dt, "tz", None) is not None:
+                series = series.dt.tz_localize(None)
+            values = np.datetime_as_string(series.to_numpy(), unit="s").astype(object)
+            values[series.isna().to_numpy()] = None
+        elif pd.api.types.is_float_dtype(series):
+            values = series.to_numpy(dtype=object)
+            values[series.isna().to_numpy()] = None
+        elif pd.api.types.is_object_dtype(series):
+            values = series.to_numpy(copy=True)
+            mask = series.isna().to_numpy()
+            if mask.any():
+                values[mask] = None
+        else:
+            # int/bool/categorical: tolist() ya entrega tipos nativos
+            values = series.tolist()
+        columns.append(values.tolist() if isinstance(values, np.ndarray) else values)
+
+    names = [str(name) for name in df.columns]
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def fast_jsonify(payload: Any, status: int = 200) -> Response:
+    """
+    Equivalente a jsonify() usando el encoder rápido.
+
+    Añade cabeceras X-JSON-Encoder y X-Serialization-Ms para comparar contra
+    jsonify(). Con FAST_JSON_ENABLED=false se usa jsonify() normal.
+    """
+    if os.getenv("FAST_JSON_ENABLED", "true").lower() != "true":
+        start = time.perf_counter()
+        response = jsonify(payload)
+        response.status_code = status
+        response.headers["X-JSON-Encoder"] = "flask"
+        response.headers["X-Serialization-Ms"] = f"{(time.perf_counter() - start) * 1000:.2f}"
+        return response
+
+    start = time.perf_counter()
+    body = dumps(payload)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    response = current_app.response_class(body, status=status, mimetype="application/json")
+    response.headers["X-JSON-Encoder"] = ENCODER_NAME
+    response.headers["X-Serialization-Ms"] = f"{elapsed_ms:.2f}"
+    return response
+
+
+class NumpyJSONProvider(DefaultJSONProvider):
+    """Proveedor JSON de Flask que entiende tipos numpy/pandas en una pasada."""
+
+    @staticmethod
+    def default(obj: Any) -> Any:
+        try:
+            return encode_default(obj)
+        except TypeError:
+            return DefaultJSONProvider.default(obj)
@@ -0,0 +1,177 @@
+"""
+Acceso compartido a Redis: un pool de conexiones por proceso.
+
+Cada módulo creaba su propio cliente con `redis.from_url` al importarse, y
+algunos endpoints de management uno nuevo en cada request. Con gunicorn
+`preload_app = True` esos clientes nacían en el master y los workers heredaban
+sus sockets. Aquí el pool se crea de forma perezosa en el proceso que lo usa,
+se descarta si el pid cambió (fork de gunicorn o de Celery) y gunicorn lo
+reinicia explícitamente en `post_fork`.
+
+Un circuit breaker evita que cada request espere el timeout del socket cuando
+Redis está caído: tras REDIS_BREAKER_THRESHOLD errores de conexión seguidos,
+`redis_client` se evalúa como falso durante REDIS_BREAKER_COOLDOWN segundos y
+los módulos usan su cache local, igual que cuando Redis no está configurado.
+
+Uso:
+
+    from ..utils.redis_client import redis_client
+
+    if redis_client:
+        redis_client.get(key)
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+try:  # pragma: no cover - optional dependency
+    import redis
+
+    REDIS_AVAILABLE = True
+except ImportError:
+    redis = None
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "20"))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "2"))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "2"))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+REDIS_BREAKER_THRESHOLD = int(os.getenv("REDIS_BREAKER_THRESHOLD", "3"))
+REDIS_BREAKER_COOLDOWN = float(os.getenv("REDIS_BREAKER_COOLDOWN", "30"))
+
+# Estado del proceso actual: cliente, pid que lo creó y circuit breaker
+_state: Dict[str, Any] = {"pid": None, "client": None, "failures": 0, "open_until": 0.0}
+_lock = threading.Lock()
+
+
+def _record_failure() -> None:
+    with _lock:
+        _state["failures"] += 1
+        if _state["failures"] >= REDIS_BREAKER_THRESHOLD:
+            if _state["open_until"] <= time.time():
+                logger.warning(
+                    f"⚠️ Redis no responde ({_state['failures']} errores seguidos); "
+                    f"usando cache local por {REDIS_BREAKER_COOLDOWN:.0f}s"
+                )
+            _state["open_until"] = time.time() + REDIS_BREAKER_COOLDOWN
+
+
+def _record_success() -> None:
+    if _state["failures"]:
+        with _lock:
+            if _state["open_until"]:
+                logger.info("✅ Redis disponible nuevamente")
+            _state["failures"] = 0
+            _state["open_until"] = 0.0
+
+
+if REDIS_AVAILABLE:
+
+    class _BreakerRedis(redis.Redis):
+        """Cliente que informa al circuit breaker de cada comando."""
+
+        def execute_command(self, *args, **options):
+            try:
+                result = super().execute_command(*args, **options)
+            except (redis.ConnectionError, redis.TimeoutError):
+                _record_failure()
+                raise
+            _record_success()
+            return result
+
+
+def _create_client():
+    pool = redis.ConnectionPool.from_url(
+        os.getenv("REDIS_URL"),
+        max_connections=REDIS_MAX_CONNECTIONS,
+        socket_timeout=REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+        health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+    )
+    return _BreakerRedis(connection_pool=pool)
+
+
+def get_redis():
+    """
+    Cliente Redis del proceso actual, o None si Redis no está configurado o el
+    circuito está abierto.
+    """
+    if not REDIS_AVAILABLE or not os.getenv("REDIS_URL"):
+        return None
+    if time.time() < _state["open_until"]:
+        return None
+
+    pid = os.getpid()
+    client = _state["client"]
+    if client is None or _state["pid"] != pid:
+        with _lock:
+            if _state["client"] is None or _state["pid"] != pid:
+                try:
+                    _state["client"] = _create_client()
+                except Exception as e:
+                    logger.warning(f"⚠️ No se pudo crear el cliente Redis: {e}")
+                    return None
+                _state["pid"] = pid
+                _state["failures"] = 0
+                _state["open_until"] = 0.0
+            client = _state["client"]
+    return client
+
+
+def reset_redis() -> None:
+    """
+    Descartar el cliente heredado del proceso padre. Se llama en el post_fork
+    de gunicorn; el pool no se desconecta porque sus sockets son del master.
+    """
+    global _lock
+    _lock = threading.Lock()
+    _state.update(pid=None, client=None, failures=0, open_until=0.0)
+
+
+def ping_redis() -> bool:
+    """True si Redis está configurado y responde."""
+    client = get_redis()
+    if client is None:
+        return False
+    try:
+        return bool(client.ping())
+    except Exception as e:
+        logger.warning(f"⚠️ Redis no disponible: {e}")
+        return False
+
+
+def redis_status() -> Dict[str, Any]:
+    """Configuración del pool y estado del circuit breaker de este proceso."""
+    return {
+        "configured": REDIS_AVAILABLE and bool(os.getenv("REDIS_URL")),
+        "breaker_open": time.time() < _state["open_until"],
+        "consecutive_failures": _state["failures"],
+        "max_connections": REDIS_MAX_CONNECTIONS,
+        "socket_timeout": REDIS_SOCKET_TIMEOUT,
+        "pid": os.getpid(),
+    }
+
+
+class RedisClientProxy:
+    """
+    Referencia estable al cliente del proceso para usar como variable de
+    módulo: se evalúa como falso si Redis no está disponible y delega cada
+    atributo al cliente vigente (creado después del fork).
+    """
+
+    def __bool__(self) -> bool:
+        return get_redis() is not None
+
+    def __getattr__(self, name: str):
+        client = get_redis()
+        if client is None:
+            raise ConnectionError("Redis no disponible")
+        return getattr(client, name)
+
+
+redis_client = RedisClientProxy()
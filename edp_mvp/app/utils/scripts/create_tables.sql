@@ -133,6 +133,9 @@ CREATE INDEX IF NOT EXISTS idx_cost_header_cost_id ON cost_header(cost_id);
 CREATE INDEX IF NOT EXISTS idx_issues_estado ON issues(estado);
 CREATE INDEX IF NOT EXISTS idx_edp_log_n_edp ON edp_log(n_edp);
 CREATE INDEX IF NOT EXISTS idx_edp_log_edp_id ON edp_log(edp_id);
+-- Timeline paginado por cursor (EDPLogService): orden fecha_hora DESC, id DESC
+CREATE INDEX IF NOT EXISTS idx_edp_log_n_edp_fecha_id ON edp_log(n_edp, fecha_hora DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_edp_log_fecha_id ON edp_log(fecha_hora DESC, id DESC);
 
 -- 8. Añadir relaciones después (opcional - para integridad referencial)
 -- Ejecutar solo si necesitas integridad referencial estricta:
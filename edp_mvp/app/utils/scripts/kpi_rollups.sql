@@ -0,0 +1,65 @@
+-- 📊 Agregados de KPI en Postgres (vistas materializadas)
+-- Ejecutar en el SQL Editor de Supabase después de create_tables.sql
+--
+-- Los dashboards ejecutivos leen estas vistas vía KPIRepository en lugar de
+-- traer toda la tabla edp a pandas. Se activan con KPI_SQL_ROLLUPS_ENABLED=true.
+-- Los tramos de aging replican KPIService._calculate_aging_distribution_matrix.
+-- Si la vista ya existía sin dso_count: DROP MATERIALIZED VIEW kpi_edp_rollup;
+-- y volver a ejecutar este script.
+
+-- 1. Rollup de EDPs por jefe de proyecto / cliente / mes / estado / tramo de aging
+CREATE MATERIALIZED VIEW IF NOT EXISTS kpi_edp_rollup AS
+SELECT
+    COALESCE(jefe_proyecto, '') AS jefe_proyecto,
+    COALESCE(cliente, '') AS cliente,
+    COALESCE(to_char(fecha_emision, 'YYYY-MM'), '') AS mes_emision,
+    lower(trim(COALESCE(estado, ''))) AS estado,
+    CASE
+        WHEN COALESCE(dso_actual, 0) <= 0 THEN 'sin_dso'
+        WHEN dso_actual <= 15 THEN '0_15'
+        WHEN dso_actual <= 30 THEN '16_30'
+        WHEN dso_actual <= 45 THEN '31_45'
+        WHEN dso_actual <= 60 THEN '46_60'
+        WHEN dso_actual <= 90 THEN '61_90'
+        ELSE '90_plus'
+    END AS aging_bucket,
+    COUNT(*) AS edp_count,
+    COALESCE(SUM(monto_propuesto), 0) AS monto_propuesto,
+    COALESCE(SUM(monto_aprobado), 0) AS monto_aprobado,
+    COALESCE(SUM(dso_actual), 0) AS dso_sum,
+    -- EDPs con DSO informado: el promedio de cobro ignora los nulos, como pandas
+    COUNT(dso_actual) AS dso_count
+FROM edp
+GROUP BY 1, 2, 3, 4, 5;
+
+-- Índice único requerido por REFRESH ... CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS idx_kpi_edp_rollup_key
+    ON kpi_edp_rollup (jefe_proyecto, cliente, mes_emision, estado, aging_bucket);
+
+-- 2. Costos netos por mes (tendencia financiera)
+CREATE MATERIALIZED VIEW IF NOT EXISTS kpi_cost_monthly AS
+SELECT
+    COALESCE(to_char(created_at, 'YYYY-MM'), '') AS mes,
+    COUNT(*) AS cost_count,
+    COALESCE(SUM(importe_neto), 0) AS importe_neto
+FROM cost_header
+GROUP BY 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_kpi_cost_monthly_mes ON kpi_cost_monthly (mes);
+
+-- 3. Refresco concurrente (no bloquea lecturas); se llama vía /rpc/refresh_kpi_rollups
+CREATE OR REPLACE FUNCTION refresh_kpi_rollups()
+RETURNS TIMESTAMPTZ
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    REFRESH MATERIALIZED VIEW CONCURRENTLY kpi_edp_rollup;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY kpi_cost_monthly;
+    RETURN now();
+END;
+$$;
+
+-- Lectura para la API (PostgREST)
+GRANT SELECT ON kpi_edp_rollup TO anon, authenticated, service_role;
+GRANT SELECT ON kpi_cost_monthly TO anon, authenticated, service_role;
@@ -0,0 +1,137 @@
+-- 🔁 Almacén de eventos de re-trabajo (tabla de hechos pre-unida)
+-- Ejecutar en el SQL Editor de Supabase después de create_tables.sql
+--
+-- Cada vez que se registra en edp_log un cambio de estado_detallado a
+-- 're-trabajo solicitado' se agrega una fila a edp_rework_events con los datos
+-- del EDP ya unidos (proyecto, jefe_proyecto, cliente, mes, tipo_falla, motivo,
+-- monto). La vista /dashboard/retrabajos lee esta tabla vía ReworkRepository,
+-- filtrando por fecha / encargado / cliente en el servidor, en lugar de cargar
+-- todo edp_log y toda la tabla edp. Se activa con REWORK_STORE_ENABLED=true.
+--
+-- Motivo y tipo de falla replican AnalyticsService.get_rework_analysis: se toma
+-- el primer registro de motivo_no_aprobado / tipo_falla del mismo EDP dentro de
+-- ±1 hora del cambio de estado y, si no existe, el valor actual del EDP.
+
+-- 1. Tabla de eventos (solo inserción; los triggers completan motivo / tipo)
+CREATE TABLE IF NOT EXISTS edp_rework_events (
+    id SERIAL PRIMARY KEY,
+    log_id INTEGER UNIQUE,
+    fecha_hora TIMESTAMP NOT NULL,
+    n_edp INTEGER,
+    edp_id INTEGER,
+    proyecto VARCHAR(100),
+    jefe_proyecto VARCHAR(100),
+    cliente VARCHAR(100),
+    mes VARCHAR(100),
+    tipo_falla VARCHAR(500),
+    motivo VARCHAR(500),
+    monto BIGINT DEFAULT 0,
+    estado_anterior VARCHAR(500),
+    usuario VARCHAR(100),
+    tipo_falla_desde_log BOOLEAN DEFAULT FALSE,
+    motivo_desde_log BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_rework_events_fecha ON edp_rework_events (fecha_hora DESC);
+CREATE INDEX IF NOT EXISTS idx_rework_events_jefe_fecha ON edp_rework_events (jefe_proyecto, fecha_hora DESC);
+CREATE INDEX IF NOT EXISTS idx_rework_events_cliente_fecha ON edp_rework_events (cliente, fecha_hora DESC);
+CREATE INDEX IF NOT EXISTS idx_rework_events_mes ON edp_rework_events (mes);
+CREATE INDEX IF NOT EXISTS idx_rework_events_n_edp_fecha ON edp_rework_events (n_edp, fecha_hora);
+
+-- Índice auxiliar para buscar motivo / tipo de falla cercanos en el log
+CREATE INDEX IF NOT EXISTS idx_edp_log_n_edp_campo_fecha ON edp_log (n_edp, campo, fecha_hora);
+
+-- 2. Mantenimiento al escribir en edp_log
+CREATE OR REPLACE FUNCTION edp_rework_events_on_log()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_fecha TIMESTAMP := COALESCE(NEW.fecha_hora, NEW.created_at, now());
+BEGIN
+    IF NEW.campo = 'estado_detallado' AND NEW.despues = 're-trabajo solicitado' THEN
+        INSERT INTO edp_rework_events (
+            log_id, fecha_hora, n_edp, edp_id, proyecto, jefe_proyecto, cliente, mes,
+            tipo_falla, motivo, monto, estado_anterior, usuario,
+            tipo_falla_desde_log, motivo_desde_log
+        )
+        SELECT
+            NEW.id, v_fecha, NEW.n_edp, COALESCE(e.id, NEW.edp_id),
+            COALESCE(e.proyecto, NEW.proyecto), e.jefe_proyecto, e.cliente, e.mes,
+            COALESCE(tf.despues, e.tipo_falla), COALESCE(mo.despues, e.motivo_no_aprobado),
+            COALESCE(e.monto_aprobado, 0), NEW.antes, NEW.usuario,
+            tf.despues IS NOT NULL, mo.despues IS NOT NULL
+        FROM (SELECT 1) AS dummy
+        LEFT JOIN LATERAL (
+            SELECT * FROM edp WHERE edp.n_edp = NEW.n_edp ORDER BY edp.id LIMIT 1
+        ) e ON TRUE
+        LEFT JOIN LATERAL (
+            SELECT l.despues FROM edp_log l
+            WHERE l.n_edp = NEW.n_edp AND l.campo = 'tipo_falla'
+              AND l.fecha_hora BETWEEN v_fecha - INTERVAL '1 hour' AND v_fecha + INTERVAL '1 hour'
+            ORDER BY l.id LIMIT 1
+        ) tf ON TRUE
+        LEFT JOIN LATERAL (
+            SELECT l.despues FROM edp_log l
+            WHERE l.n_edp = NEW.n_edp AND l.campo = 'motivo_no_aprobado'
+              AND l.fecha_hora BETWEEN v_fecha - INTERVAL '1 hour' AND v_fecha + INTERVAL '1 hour'
+            ORDER BY l.id LIMIT 1
+        ) mo ON TRUE
+        ON CONFLICT (log_id) DO NOTHING;
+
+    -- Motivo / tipo registrados después del cambio de estado: completar el evento
+    ELSIF NEW.campo = 'tipo_falla' THEN
+        UPDATE edp_rework_events
+        SET tipo_falla = NEW.despues, tipo_falla_desde_log = TRUE
+        WHERE n_edp = NEW.n_edp AND NOT tipo_falla_desde_log
+          AND fecha_hora BETWEEN v_fecha - INTERVAL '1 hour' AND v_fecha + INTERVAL '1 hour';
+
+    ELSIF NEW.campo = 'motivo_no_aprobado' THEN
+        UPDATE edp_rework_events
+        SET motivo = NEW.despues, motivo_desde_log = TRUE
+        WHERE n_edp = NEW.n_edp AND NOT motivo_desde_log
+          AND fecha_hora BETWEEN v_fecha - INTERVAL '1 hour' AND v_fecha + INTERVAL '1 hour';
+    END IF;
+
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_edp_rework_events ON edp_log;
+CREATE TRIGGER trg_edp_rework_events AFTER INSERT ON edp_log
+    FOR EACH ROW EXECUTE FUNCTION edp_rework_events_on_log();
+
+-- 3. Carga inicial desde el historial existente (idempotente)
+INSERT INTO edp_rework_events (
+    log_id, fecha_hora, n_edp, edp_id, proyecto, jefe_proyecto, cliente, mes,
+    tipo_falla, motivo, monto, estado_anterior, usuario,
+    tipo_falla_desde_log, motivo_desde_log
+)
+SELECT
+    r.id, COALESCE(r.fecha_hora, r.created_at), r.n_edp, COALESCE(e.id, r.edp_id),
+    COALESCE(e.proyecto, r.proyecto), e.jefe_proyecto, e.cliente, e.mes,
+    COALESCE(tf.despues, e.tipo_falla), COALESCE(mo.despues, e.motivo_no_aprobado),
+    COALESCE(e.monto_aprobado, 0), r.antes, r.usuario,
+    tf.despues IS NOT NULL, mo.despues IS NOT NULL
+FROM edp_log r
+LEFT JOIN LATERAL (
+    SELECT * FROM edp WHERE edp.n_edp = r.n_edp ORDER BY edp.id LIMIT 1
+) e ON TRUE
+LEFT JOIN LATERAL (
+    SELECT l.despues FROM edp_log l
+    WHERE l.n_edp = r.n_edp AND l.campo = 'tipo_falla'
+      AND l.fecha_hora BETWEEN r.fecha_hora - INTERVAL '1 hour' AND r.fecha_hora + INTERVAL '1 hour'
+    ORDER BY l.id LIMIT 1
+) tf ON TRUE
+LEFT JOIN LATERAL (
+    SELECT l.despues FROM edp_log l
+    WHERE l.n_edp = r.n_edp AND l.campo = 'motivo_no_aprobado'
+      AND l.fecha_hora BETWEEN r.fecha_hora - INTERVAL '1 hour' AND r.fecha_hora + INTERVAL '1 hour'
+    ORDER BY l.id LIMIT 1
+) mo ON TRUE
+WHERE r.campo = 'estado_detallado' AND r.despues = 're-trabajo solicitado'
+ON CONFLICT (log_id) DO NOTHING;
+
+-- Lectura para la API (PostgREST)
+GRANT SELECT ON edp_rework_events TO anon, authenticated, service_role;
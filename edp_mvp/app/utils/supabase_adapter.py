@@ -15,6 +15,8 @@ import numpy as np
 
 # Importar el nuevo servicio de Supabase
 from ..services.supabase_service import get_supabase_service, get_supabase_async_service
+from .business_calendar import business_days_count
+from .json_serialization import encode_default
 
 # Importar Flask-Login para obtener el usuario actual
 try:
@@ -192,6 +194,41 @@ def append_row(row_values: List[Any], sheet_name: str = "edp") -> bool:
         print(f"❌ Error insertando fila en {sheet_name}: {e}")
         return False
 
+# Tabla escrita -> operación de CacheInvalidationService.register_data_change
+TABLE_CHANGE_OPERATIONS = {
+    'edp': 'edp_updated',
+    'projects': 'project_updated',
+    'cost_header': 'cost_updated',
+    'cost_lines': 'cost_updated',
+}
+
+
+def _schedule_refresh(table_name: str) -> None:
+    """Programar el recálculo de los caches que dependen de la tabla escrita."""
+    try:
+        from ..services.refresh_orchestrator import schedule_refresh_for_table
+        schedule_refresh_for_table(table_name)
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo programar el recálculo tras escribir en {table_name}: {e}")
+
+
+def _register_change(table_name: str, record_id: Any, operation: Optional[str] = None) -> None:
+    """
+    Registrar la escritura (generación de datos, caches en memoria y Redis) y
+    programar el recálculo con debounce de los caches que dependen de la tabla.
+    """
+    operation = operation or TABLE_CHANGE_OPERATIONS.get(table_name)
+    if operation:
+        try:
+            from ..services.cache_invalidation_service import CacheInvalidationService
+            CacheInvalidationService().register_data_change(
+                operation, affected_ids=[str(record_id)] if record_id is not None else None,
+                metadata={'table': table_name, 'source': 'supabase_adapter'},
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo registrar el cambio en {table_name}: {e}")
+    _schedule_refresh(table_name)
+
 def update_row(row_number: int, updates: Dict[str, Any], sheet_name: str = "edp", 
                usuario: str = None, force_update: bool = False) -> bool:
     """
@@ -273,13 +310,14 @@ def update_row(row_number: int, updates: Dict[str, Any], sheet_name: str = "edp"
                     "log_type": "update",
                     "message": log_message,
                     "user": usuario or "sistema",
-                    "details": json.dumps(cambios_reales)
+                    "details": json.dumps(cambios_reales, default=encode_default)
                 })
             except Exception as log_error:
                 print(f"⚠️ No se pudo registrar log para EDP {record_id}: {log_error}")
                 # Continuar sin bloquear la actualización
         
         print(f"✅ Registro {record_id} actualizado en {table_name}")
+        _register_change(table_name, record_id)
         return True
         
     except Exception as e:
@@ -300,6 +338,7 @@ def append_edp(edp_data: Dict[str, Any]) -> int:
         # Obtener el ID del nuevo registro
         edp_id = result.get('id')
         print(f"✅ EDP creado con ID: {edp_id}")
+        _register_change("edp", edp_id, operation="edp_created")
         
         return edp_id
         
@@ -478,25 +517,12 @@ def _apply_transformations(df: pd.DataFrame, table_name: str) -> pd.DataFrame:
 
                 df["fecha_final"] = df["fecha_conformidad"].fillna(hoy)
 
-                # Asegúrate de que ambas fechas no sean NaT
-                mask_validas = (~df["fecha_envio_cliente"].isna()) & (
-                    ~df["fecha_final"].isna()
-                )
+                # Días hábiles en [envío, fin) como el antiguo np.busday_count,
+                # descontando feriados; 0 si falta una fecha
+                df["dias_habiles"] = business_days_count(
+                    df["fecha_envio_cliente"], df["fecha_final"]
+                ).clip(lower=0)
 
-                # Calcular días hábiles solo para filas válidas
-                def calcular_dias_habiles_seguro(row):
-                    try:
-                        fecha_inicio = row["fecha_envio_cliente"].date()
-                        fecha_fin = row["fecha_final"].date()
-                        dias = np.busday_count(fecha_inicio, fecha_fin)
-                        return max(0, int(dias))  # Asegurar que sea entero positivo
-                    except Exception:
-                        return 0  # Retornar 0 en caso de error
-                
-                df.loc[mask_validas, "dias_habiles"] = df.loc[mask_validas].apply(
-                    calcular_dias_habiles_seguro, axis=1
-                )
-                
                 # Asegurar que todos los valores sean numéricos
                 df["dias_habiles"] = pd.to_numeric(df["dias_habiles"], errors="coerce").fillna(0).astype(int)
 
@@ -736,6 +762,9 @@ def log_cambio_edp(n_edp: str, proyecto: str, campo: str, antes: str, despues: s
                 print(f"⚠️ Log no registrado - continuando operación")
                 return True  # No fallar la operación principal por un problema de logging
         
+        from ..services.edp_log_service import clear_timeline_summary_cache
+        clear_timeline_summary_cache(n_edp_str)
+
         print(f"✅ Log registrado: EDP {n_edp} - {campo}")
         return True
         
@@ -748,6 +777,10 @@ def read_log(n_edp: str = None, proyecto: str = None, usuario: str = None, range
     Lee el historial de cambios desde Supabase.
     Equivalente a read_log de Google Sheets.
     
+    Los filtros y el orden se aplican en Postgres y el historial se lee
+    completo por páginas (cursor sobre fecha_hora, id), sin límite de filas.
+    Para mostrarlo por páginas usar EDPLogService.get_timeline_page.
+    
     Args:
         n_edp (str, optional): Filtrar por número de EDP
         proyecto (str, optional): Filtrar por proyecto 
@@ -757,57 +790,26 @@ def read_log(n_edp: str = None, proyecto: str = None, usuario: str = None, range
     Returns:
         DataFrame: Historial de cambios filtrado
     """
+    columns = ['fecha_hora', 'n_edp', 'proyecto', 'campo', 'antes', 'despues', 'usuario']
     try:
-        service = get_supabase_service()
+        from ..repositories.log_repository import LogRepository
         
-        # Construir filtros para Supabase
-        filters = {}
+        filters = {"proyecto": str(proyecto) if proyecto else None, "usuario": usuario}
         if n_edp:
             n_edp_str = str(n_edp)
             filters["n_edp"] = int(n_edp_str) if n_edp_str.isdigit() else n_edp
         
-        # Obtener datos de logs
-        logs_data = service.select('edp_log', filters, limit=1000)  # Límite ajustable
-        
-        if not logs_data:
+        rows = list(LogRepository().iter_timeline(filters, columns=columns))
+        if not rows:
             # Devolver DataFrame vacío con columnas esperadas
-            return pd.DataFrame(columns=['fecha_hora', 'n_edp', 'proyecto', 'campo', 'antes', 'despues', 'usuario'])
-        
-        # Convertir a DataFrame compatible (la tabla edp_log ya tiene la estructura correcta)
-        processed_logs = []
-        for log in logs_data:
-            try:
-                processed_logs.append({
-                    'fecha_hora': log.get('fecha_hora'),
-                    'n_edp': str(log.get('n_edp', '')),
-                    'proyecto': log.get('proyecto', ''),
-                    'campo': log.get('campo', ''),
-                    'antes': log.get('antes', ''),
-                    'despues': log.get('despues', ''),
-                    'usuario': log.get('usuario', '')
-                })
-            except Exception as e:
-                print(f"⚠️ Error procesando log: {e}")
-                continue
-        
-        df = pd.DataFrame(processed_logs)
-        
-        if df.empty:
-            return pd.DataFrame(columns=['fecha_hora', 'n_edp', 'proyecto', 'campo', 'antes', 'despues', 'usuario'])
+            return pd.DataFrame(columns=columns)
         
-        # Convertir fecha-hora
-        if "fecha_hora" in df.columns:
-            df["fecha_hora"] = pd.to_datetime(df["fecha_hora"], errors="coerce")
-        
-        # Aplicar filtros adicionales
-        if proyecto:
-            df = df[df["proyecto"] == str(proyecto)]
-        if usuario:
-            df = df[df["usuario"].str.lower() == usuario.lower()]
+        df = pd.DataFrame(rows, columns=columns)
+        # str por fila: con nulos pandas convertiría n_edp a float ("123.0")
+        df["n_edp"] = [str(row.get("n_edp", "")) for row in rows]
         
-        # Orden descendente por fecha
-        if "fecha_hora" in df.columns:
-            df = df.sort_values("fecha_hora", ascending=False)
+        # Convertir fecha-hora (ya viene en orden descendente)
+        df["fecha_hora"] = pd.to_datetime(df["fecha_hora"], errors="coerce")
         
         print(f"📊 Obtenidos {len(df)} registros de log")
         return df
@@ -0,0 +1,199 @@
+"""
+Paridad entre los KPIs ejecutivos calculados en pandas y desde el rollup SQL
+(kpi_edp_rollup). El rollup se construye aquí en pandas replicando
+utils/scripts/kpi_rollups.sql, de modo que cualquier diferencia entre los dos
+caminos de KPIService aparece sin necesitar Postgres.
+
+Ejecutar con `make test` (python -m pytest edp_mvp/test/).
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from edp_mvp.app.repositories.kpi_repository import EDP_ROLLUP_COLUMNS
+from edp_mvp.app.services.kpi_service import KPIService
+
+ROLLUP_KEYS = ["jefe_proyecto", "cliente", "mes_emision", "estado", "aging_bucket"]
+
+
+def build_rollup(df: pd.DataFrame) -> pd.DataFrame:
+    """Equivalente en pandas de la vista kpi_edp_rollup."""
+    if df.empty:
+        return pd.DataFrame(columns=EDP_ROLLUP_COLUMNS)
+
+    dso = pd.to_numeric(df["dso_actual"], errors="coerce")
+    rows = pd.DataFrame({
+        "jefe_proyecto": df["jefe_proyecto"].fillna(""),
+        "cliente": df["cliente"].fillna(""),
+        "mes_emision": pd.to_datetime(df["fecha_emision"], errors="coerce").dt.strftime("%Y-%m").fillna(""),
+        "estado": df["estado"].fillna("").str.strip().str.lower(),
+        "aging_bucket": np.select(
+            [dso.fillna(0) <= 0, dso <= 15, dso <= 30, dso <= 45, dso <= 60, dso <= 90],
+            ["sin_dso", "0_15", "16_30", "31_45", "46_60", "61_90"],
+            default="90_plus",
+        ),
+        "monto_propuesto": pd.to_numeric(df["monto_propuesto"], errors="coerce").fillna(0),
+        "monto_aprobado": pd.to_numeric(df["monto_aprobado"], errors="coerce").fillna(0),
+        "dso": dso,
+    })
+    grouped = rows.groupby(ROLLUP_KEYS, as_index=False).agg(
+        edp_count=("monto_propuesto", "size"),
+        monto_propuesto=("monto_propuesto", "sum"),
+        monto_aprobado=("monto_aprobado", "sum"),
+        dso_sum=("dso", "sum"),
+        dso_count=("dso", "count"),
+    )
+    return grouped[EDP_ROLLUP_COLUMNS]
+
+
+class FakeKPIRepository:
+    """Sirve el rollup filtrando por igualdad, como PostgREST."""
+
+    def __init__(self, rollup: pd.DataFrame):
+        self.rollup = rollup
+        self.filters = None
+
+    def get_edp_rollup(self, filters=None):
+        self.filters = filters
+        df = self.rollup
+        for key, value in (filters or {}).items():
+            df = df[df[key] == value]
+        return {"success": True, "data": df.reset_index(drop=True)}
+
+
+class FakeEDPRepository:
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+
+    def find_all_dataframe(self):
+        return {"success": True, "data": self.df.copy()}
+
+
+@pytest.fixture
+def edps() -> pd.DataFrame:
+    return pd.DataFrame([
+        # jefe, cliente, fecha, estado, monto_propuesto, monto_aprobado, dso
+        ("Ana", "Codelco", "2024-01-10", "enviado", 10_000_000, 9_000_000, 12),
+        ("Ana", "Codelco", "2024-01-22", "revision", 5_000_000, 0, 95),
+        ("Ana", "BHP", "2024-02-03", " Pagado ", 7_500_000, 7_500_000, 40),
+        ("Ana", "BHP", "2024-02-15", "facturado", 3_200_000, 3_000_000, None),
+        ("Luis", "Codelco", "2024-01-05", "enviado", 8_000_000, 0, 61),
+        ("Luis", "Antofagasta", "2024-03-01", "validado", 4_400_000, 4_400_000, 0),
+        ("Luis", "Antofagasta", "2024-03-09", "pendiente", 2_100_000, 0, 150),
+        ("Luis", None, "2024-03-20", None, 1_000_000, 0, 30),
+        ("Marta", "BHP", None, "revision", 6_600_000, 0, 46),
+        ("Marta", "BHP", "2024-02-28", "enviado", 900_000, 0, None),
+    ], columns=["jefe_proyecto", "cliente", "fecha_emision", "estado",
+                "monto_propuesto", "monto_aprobado", "dso_actual"])
+
+
+def make_service(df: pd.DataFrame, monkeypatch, rollups: bool) -> KPIService:
+    monkeypatch.setenv("KPI_SQL_ROLLUPS_ENABLED", "true" if rollups else "false")
+    service = KPIService()
+    service.edp_repository = FakeEDPRepository(df)
+    service.kpi_repository = FakeKPIRepository(build_rollup(df))
+    return service
+
+
+def pandas_kpis(service: KPIService, df: pd.DataFrame, filters=None):
+    return service.calculate_executive_dashboard_kpis(KPIService.filter_edps_like_rollup(df, filters))
+
+
+def assert_parity(rollup_kpis, pandas_result):
+    assert rollup_kpis is not None
+    for key, value in pandas_result.items():
+        assert key in rollup_kpis, key
+        if isinstance(value, (int, float)):
+            assert rollup_kpis[key] == pytest.approx(value, abs=0.1), key
+        else:
+            assert rollup_kpis[key] == value, key
+
+
+def test_parity_full_dataset(edps, monkeypatch):
+    service = make_service(edps, monkeypatch, rollups=False)
+    assert_parity(service.calculate_executive_dashboard_kpis_from_rollup(), pandas_kpis(service, edps))
+
+
+def test_avg_collection_days_ignores_null_dso(edps, monkeypatch):
+    service = make_service(edps, monkeypatch, rollups=False)
+    rollup_kpis = service.calculate_executive_dashboard_kpis_from_rollup()
+
+    expected = pd.to_numeric(edps["dso_actual"], errors="coerce").dropna().mean()
+    assert rollup_kpis["executive_avg_collection_days"] == round(expected, 0)
+    assert rollup_kpis["executive_avg_collection_days"] == pandas_kpis(service, edps)["executive_avg_collection_days"]
+
+
+def test_all_dso_null(edps, monkeypatch):
+    df = edps.assign(dso_actual=None)
+    service = make_service(df, monkeypatch, rollups=False)
+    rollup_kpis = service.calculate_executive_dashboard_kpis_from_rollup()
+
+    assert rollup_kpis["executive_avg_collection_days"] == 0
+    assert_parity(rollup_kpis, pandas_kpis(service, df))
+
+
+def test_empty_frame(edps, monkeypatch):
+    df = edps.iloc[0:0]
+    service = make_service(df, monkeypatch, rollups=False)
+
+    assert service.calculate_executive_dashboard_kpis_from_rollup() == service.get_empty_executive_kpis()
+    assert service.calculate_executive_dashboard_kpis(df) == service.get_empty_executive_kpis()
+
+
+@pytest.mark.parametrize("filters", [
+    {"jefe_proyecto": "Ana"},
+    {"cliente": "BHP"},
+    {"mes_emision": "2024-01"},
+    {"jefe_proyecto": "Luis", "cliente": "Antofagasta"},
+    {"jefe_proyecto": "Nadie"},
+    {"estado": "Pagado"},
+    {"estado": " REVISION ", "cliente": "BHP"},
+])
+def test_parity_filtered(edps, monkeypatch, filters):
+    service = make_service(edps, monkeypatch, rollups=False)
+    rollup_kpis = service.calculate_executive_dashboard_kpis_from_rollup(filters)
+
+    assert service.kpi_repository.filters == KPIService.active_filters(filters)
+    assert_parity(rollup_kpis, pandas_kpis(service, edps, filters))
+
+
+def test_filtered_request_uses_rollup_filters(edps, monkeypatch):
+    filters = {"cliente": "Codelco"}
+    with_rollup = make_service(edps, monkeypatch, rollups=True).calculate_executive_dashboard_kpis(filters=filters)
+    without_rollup = make_service(edps, monkeypatch, rollups=False).calculate_executive_dashboard_kpis(filters=filters)
+
+    assert_parity(with_rollup, without_rollup)
+    assert with_rollup["executive_active_accounts"] == 3
+
+
+def test_unsupported_filter_falls_back_to_pandas(edps, monkeypatch):
+    service = make_service(edps, monkeypatch, rollups=True)
+
+    assert service.calculate_executive_dashboard_kpis_from_rollup({"fecha_inicio": "2024-01-01"}) is None
+    assert service.kpi_repository.filters is None
+
+
+def test_received_frame_is_not_replaced_by_rollup(edps, monkeypatch):
+    subset = edps[edps["jefe_proyecto"] == "Marta"]
+    service = make_service(edps, monkeypatch, rollups=True)
+
+    result = service.calculate_executive_dashboard_kpis(subset)
+
+    assert service.kpi_repository.filters is None
+    assert result["executive_active_accounts"] == 2
+
+
+@pytest.mark.parametrize("filters", [None, {"cliente": "BHP"}, {"estado": "Enviado"}])
+def test_manager_dashboard_uses_rollup(edps, monkeypatch, filters):
+    service = make_service(edps, monkeypatch, rollups=True)
+    df_filtered = KPIService.filter_edps_like_rollup(edps, filters)
+
+    response = service.calculate_manager_dashboard_kpis(edps, df_filtered, filters)
+    fallback = make_service(edps, monkeypatch, rollups=False).calculate_manager_dashboard_kpis(
+        edps, df_filtered, filters
+    )
+
+    assert response.success
+    assert service.kpi_repository.filters == KPIService.active_filters(filters)
+    executive = {key: value for key, value in fallback.data.items() if key.startswith("executive_")}
+    assert_parity(response.data, executive)
@@ -1,16 +1,49 @@
 # Configuración de Gunicorn para producción en Render
 import os
+import shutil
 import multiprocessing
 
+# Modo de servicio: sync (por defecto) o gevent/eventlet para tráfico de I/O
+# (PostgREST, Redis, SMTP). El monkeypatch va antes de cargar la app
+# (preload_app) para que requests, redis y smtplib usen sockets cooperativos.
+serving_mode = os.environ.get('SERVING_MODE', 'sync').lower()
+cpu_pool_size = int(os.environ.get('CPU_POOL_SIZE', os.cpu_count() or 2))
+
+if serving_mode == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+    try:
+        # psycopg2 (SQLAlchemy) no cede el control sin este parche
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    except ImportError:
+        pass
+elif serving_mode == 'eventlet':
+    # Pool de threads nativos para el cálculo con pandas (utils/concurrency.py)
+    os.environ.setdefault('EVENTLET_THREADPOOL_SIZE', str(cpu_pool_size))
+    import eventlet
+    eventlet.monkey_patch()
+    try:
+        from psycogreen.eventlet import patch_psycopg
+        patch_psycopg()
+    except ImportError:
+        pass
+elif serving_mode != 'sync':
+    raise ValueError(f"SERVING_MODE no soportado: {serving_mode} (sync, gevent o eventlet)")
+
+# Métricas Prometheus compartidas entre workers (debe definirse antes de cargar la app)
+prometheus_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/edp_prometheus_metrics')
+
 # Server socket
 bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
 backlog = 2048
 
 # Worker processes - Mejor configuración para Render
 workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
-worker_class = 'sync'  # Usar workers síncronos para mayor estabilidad
-worker_connections = 1000
-threads = 2  # Añadir threads para manejar SocketIO con threading mode
+worker_class = serving_mode
+# Requests concurrentes por worker en modo gevent/eventlet
+worker_connections = int(os.environ.get('WORKER_CONNECTIONS', '100'))
+threads = 2 if serving_mode == 'sync' else 1  # Threads para SocketIO en threading mode
 timeout = 120  # Timeout más alto para requests largos
 keepalive = 2
 
@@ -48,9 +81,18 @@ secure_scheme_headers = {
     'X-FORWARDED-SSL': 'on'
 }
 
+def on_starting(server):
+    # Limpiar métricas de ejecuciones anteriores
+    shutil.rmtree(prometheus_dir, ignore_errors=True)
+    os.makedirs(prometheus_dir, exist_ok=True)
+
 def when_ready(server):
     server.log.info("🚀 Gunicorn server is ready. Spawning workers")
-    server.log.info(f"🔧 Workers: {workers}, Timeout: {timeout}s")
+    server.log.info(f"🔧 Workers: {workers} ({worker_class}), Timeout: {timeout}s")
+    if serving_mode != 'sync':
+        server.log.info(
+            f"🔧 Conexiones por worker: {worker_connections}, pool de cálculo: {cpu_pool_size} threads"
+        )
 
 def worker_int(worker):
     worker.log.info("⚠️  Worker received INT or QUIT signal")
@@ -62,4 +104,12 @@ def pre_exec(server):
     server.log.info("🔄 Forked child, re-executing.")
 
 def post_fork(server, worker):
+    # El master (preload_app) puede haber abierto conexiones a Redis; cada
+    # worker crea su propio pool
+    from edp_mvp.app.utils.redis_client import reset_redis
+    reset_redis()
     server.log.info("✅ Worker spawned (pid: %s)", worker.pid)
+
+def child_exit(server, worker):
+    from edp_mvp.app.utils.instrumentation import mark_process_dead
+    mark_process_dead(worker.pid)